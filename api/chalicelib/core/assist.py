@@ -1,17 +1,30 @@
+from concurrent.futures import Future
+from functools import cmp_to_key
 from os import access, R_OK
 from os.path import exists as path_exists, getsize
+from threading import Lock
 
 import jwt
 import requests
+from requests.adapters import HTTPAdapter
 from decouple import config
 from fastapi import HTTPException, status
 
 import schemas
 from chalicelib.core import projects
 from chalicelib.utils.TimeUTC import TimeUTC
+from chalicelib.utils.ttl_cache import TTLCache
 
 ASSIST_KEY = config("ASSIST_KEY")
 ASSIST_URL = config("ASSIST_URL") % ASSIST_KEY
+# keep-alive connections to the peers server, shared by all the requests
+__http = requests.Session()
+__http.mount("http://", HTTPAdapter(pool_maxsize=config("assistPoolSize", cast=int, default=20)))
+__http.mount("https://", HTTPAdapter(pool_maxsize=config("assistPoolSize", cast=int, default=20)))
+# project_key -> live sessions, every UI polling the same project is served by one request per TTL
+LIVE_SESSIONS_CACHE = TTLCache(maxsize=1000, ttl=config("assistCacheTTL", cast=float, default=3))
+__in_flight = {}
+__in_flight_lock = Lock()
 SESSION_PROJECTION_COLS = """s.project_id,
                            s.session_id::text AS session_id,
                            s.user_uuid,
@@ -60,19 +73,19 @@ def get_live_sessions_ws(project_id, body: schemas.LiveSessionsSearchPayloadSche
     return __get_live_sessions_ws(project_id=project_id, data=data)
 
 
-def __get_live_sessions_ws(project_id, data):
-    project_key = projects.get_project_key(project_id)
+def __fetch_live_sessions(project_key):
+    # the unfiltered list of live sessions of a project, None if the peers server didn't answer properly
     try:
-        results = requests.post(ASSIST_URL + config("assist") + f"/{project_key}",
-                                json=data, timeout=config("assistTimeout", cast=int, default=5))
+        results = __http.post(ASSIST_URL + config("assist") + f"/{project_key}",
+                              json={"filter": {}}, timeout=config("assistTimeout", cast=int, default=5))
         if results.status_code != 200:
             print(f"!! issue with the peer-server code:{results.status_code} for __get_live_sessions_ws")
             print(results.text)
-            return {"total": 0, "sessions": []}
+            return None
         live_peers = results.json().get("data", [])
     except requests.exceptions.Timeout:
         print("!! Timeout getting Assist response")
-        live_peers = {"total": 0, "sessions": []}
+        return None
     except Exception as e:
         print("!! Issue getting Live-Assist response")
         print(str(e))
@@ -81,18 +94,134 @@ def __get_live_sessions_ws(project_id, data):
             print(results.text)
         except:
             print("couldn't get response")
-        live_peers = {"total": 0, "sessions": []}
-    _live_peers = live_peers
-    if "sessions" in live_peers:
-        _live_peers = live_peers["sessions"]
-    for s in _live_peers:
-        s["live"] = True
-        s["projectId"] = project_id
-        if "projectID" in s:
-            s.pop("projectID")
+        return None
+    if isinstance(live_peers, dict):
+        live_peers = live_peers.get("sessions", [])
     return live_peers
 
 
+def __get_all_live_sessions(project_id):
+    """
+    Returns the cached list of live sessions of a project.
+    Concurrent calls for the same project wait for the single in-flight request to the peers server.
+    """
+    project_key = projects.get_project_key(project_id)
+    sessions = LIVE_SESSIONS_CACHE.get(project_key)
+    if sessions is not None:
+        return sessions
+    with __in_flight_lock:
+        in_flight = __in_flight.get(project_key)
+        is_leader = in_flight is None
+        if is_leader:
+            in_flight = __in_flight[project_key] = Future()
+    if not is_leader:
+        return in_flight.result()
+    try:
+        sessions = __fetch_live_sessions(project_key)
+        if sessions is not None:
+            for s in sessions:
+                s["live"] = True
+                s["projectId"] = project_id
+                if "projectID" in s:
+                    s.pop("projectID")
+            LIVE_SESSIONS_CACHE.set(project_key, sessions)
+        in_flight.set_result(sessions)
+    except Exception as e:
+        in_flight.set_exception(e)
+        raise e
+    finally:
+        with __in_flight_lock:
+            __in_flight.pop(project_key, None)
+    return sessions
+
+
+def __match_filter(session_info, filter_name, values, operator):
+    # same matching as the peers server: case-insensitive key search in nested objects, 'is' or 'contains'
+    items = session_info.items() if isinstance(session_info, dict) else enumerate(session_info)
+    for k, v in items:
+        if v is None:
+            continue
+        if isinstance(v, (dict, list)):
+            matched = __match_filter(v, filter_name, values, operator)
+            if matched is not None:
+                return matched
+        elif str(k).lower() == filter_name.lower():
+            for f_v in values:
+                if operator == "is" and f_v and str(v).lower() == str(f_v).lower() \
+                        or operator != "is" and str(f_v).lower() in str(v).lower():
+                    return f_v
+    return None
+
+
+def __get_value(obj, key):
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return None
+    items = obj.items() if isinstance(obj, dict) else enumerate(obj)
+    for k, v in items:
+        if isinstance(v, (dict, list)) or v is None:
+            v = __get_value(v, key)
+        elif str(k).lower() != key.lower():
+            continue
+        if v is not None:
+            try:
+                return float(v)
+            except (TypeError, ValueError):
+                return v
+    return None
+
+
+def __compare(a, b):
+    try:
+        return 1 if a > b else -1 if a < b else 0
+    except TypeError:
+        return 0
+
+
+def __filter_sort_paginate(sessions, data):
+    # filtering, sorting and pagination of the peers server, applied to the cached list
+    filters = {}
+    for name, body in data.get("filter", {}).items():
+        if not isinstance(body, dict):
+            body = {"values": body if isinstance(body, list) or body is None else [body]}
+        filters[name] = (None if body.get("values") is None else [str(v) for v in body["values"]],
+                         body.get("operator") or "contains")
+    results = []
+    counter = {}
+    for s in sessions:
+        matches = {}
+        for name, (values, operator) in filters.items():
+            matched = None if values is None else __match_filter(s, name, values, operator)
+            if matched is None:
+                break
+            matches[name] = matched
+        else:
+            results.append(dict(s))
+            for name, value in matches.items():
+                counter[name] = counter.get(name, {})
+                counter[name][value] = counter[name].get(value, 0) + 1
+
+    sort = data.get("sort", {})
+    sort_key = sort.get("key")
+    if sort_key and sort_key != "timestamp":
+        results.sort(key=cmp_to_key(lambda a, b: __compare(__get_value(a, sort_key), __get_value(b, sort_key))))
+    else:
+        results.sort(key=cmp_to_key(lambda a, b: __compare(__get_value(b, "timestamp"), __get_value(a, "timestamp"))))
+    if not (sort.get("order") or "").lower() == "desc":
+        results.reverse()
+    total = len(results)
+    pagination = data.get("pagination", {})
+    if pagination.get("page") and pagination.get("limit"):
+        results = results[(pagination["page"] - 1) * pagination["limit"]:pagination["page"] * pagination["limit"]]
+    return {"total": total, "sessions": results, "counter": counter}
+
+
+def __get_live_sessions_ws(project_id, data):
+    sessions = __get_all_live_sessions(project_id)
+    if sessions is None:
+        return {"total": 0, "sessions": []}
+    return __filter_sort_paginate(sessions=sessions, data=data)
+
+
 def __get_agent_token(project_id, project_key, session_id):
     iat = TimeUTC.now()
     return jwt.encode(
@@ -113,7 +242,7 @@ def __get_agent_token(project_id, project_key, session_id):
 def get_live_session_by_id(project_id, session_id):
     project_key = projects.get_project_key(project_id)
     try:
-        results = requests.get(ASSIST_URL + config("assist") + f"/{project_key}/{session_id}",
+        results = __http.get(ASSIST_URL + config("assist") + f"/{project_key}/{session_id}",
                                timeout=config("assistTimeout", cast=int, default=5))
         if results.status_code != 200:
             print(f"!! issue with the peer-server code:{results.status_code} for get_live_session_by_id")
@@ -143,7 +272,7 @@ def is_live(project_id, session_id, project_key=None):
     if project_key is None:
         project_key = projects.get_project_key(project_id)
     try:
-        results = requests.get(ASSIST_URL + config("assistList") + f"/{project_key}/{session_id}",
+        results = __http.get(ASSIST_URL + config("assistList") + f"/{project_key}/{session_id}",
                                timeout=config("assistTimeout", cast=int, default=5))
         if results.status_code != 200:
             print(f"!! issue with the peer-server code:{results.status_code} for is_live")
@@ -171,7 +300,7 @@ def autocomplete(project_id, q: str, key: str = None):
     if key:
         params["key"] = key
     try:
-        results = requests.get(
+        results = __http.get(
             ASSIST_URL + config("assistList") + f"/{project_key}/autocomplete",
             params=params, timeout=config("assistTimeout", cast=int, default=5))
         if results.status_code != 200:
@@ -255,7 +384,7 @@ def get_raw_devtools_by_id(project_id, session_id):
 def session_exists(project_id, session_id):
     project_key = projects.get_project_key(project_id)
     try:
-        results = requests.get(ASSIST_URL + config("assist") + f"/{project_key}/{session_id}",
+        results = __http.get(ASSIST_URL + config("assist") + f"/{project_key}/{session_id}",
                                timeout=config("assistTimeout", cast=int, default=5))
         if results.status_code != 200:
             print(f"!! issue with the peer-server code:{results.status_code} for session_exists")
@@ -1,11 +1,10 @@
 import logging
-from typing import Union
-
-import logging
-from typing import Union
+import math
+from typing import Union, List
 
 import schemas
 from chalicelib.core import metrics
+from chalicelib.utils import helper
 
 logger = logging.getLogger(__name__)
 
@@ -60,3 +59,73 @@ def get_metric(key: Union[schemas.MetricOfWebVitals, schemas.MetricOfErrors, \
                  schemas.MetricOfWebVitals.count_users: metrics.get_unique_users,}
 
     return supported.get(key, lambda *args: None)(project_id=project_id, **data)
+
+
+# how the shared-scan results are presented, mirrors the output of the dedicated metrics functions
+SHARED_SCAN_FORMATS = {
+    schemas.MetricOfWebVitals.avg_response_time: {"progress": False, "time": True},
+    schemas.MetricOfWebVitals.avg_first_paint: {"progress": False, "time": True},
+    schemas.MetricOfWebVitals.avg_dom_content_loaded: {"progress": False, "time": True},
+    schemas.MetricOfWebVitals.avg_till_first_byte: {"progress": False, "time": True},
+    schemas.MetricOfWebVitals.avg_time_to_interactive: {"progress": False, "time": True},
+    schemas.MetricOfWebVitals.avg_page_load_time: {"progress": True, "time": True},
+    schemas.MetricOfWebVitals.avg_dom_content_load_start: {"progress": True, "time": True},
+    schemas.MetricOfWebVitals.avg_first_contentful_pixel: {"progress": True, "time": True},
+    schemas.MetricOfWebVitals.count_requests: {"progress": False, "count": True},
+    schemas.MetricOfWebVitals.avg_visited_pages: {"progress": True, "ceil": True},
+    schemas.MetricOfWebVitals.avg_session_duration: {"progress": True, "time": True},
+    schemas.MetricOfWebVitals.count_sessions: {"progress": True, "count": True}
+}
+
+
+def __shared_scan_value(key, sum_count):
+    s, c = sum_count
+    if SHARED_SCAN_FORMATS[key].get("count"):
+        return c
+    return s / c if c > 0 else 0
+
+
+def __shared_scan_total(key, sum_count):
+    # like the dedicated functions, only the value is rounded up, not the chart
+    value = __shared_scan_value(key, sum_count)
+    if SHARED_SCAN_FORMATS[key].get("ceil"):
+        value = math.ceil(value)
+    return value
+
+
+def __format_shared_scan(key, scan):
+    result = {"value": __shared_scan_total(key, scan["current"]),
+              "chart": [{"timestamp": c["timestamp"], "value": __shared_scan_value(key, c["value"])}
+                        for c in scan["chart"]]}
+    if SHARED_SCAN_FORMATS[key]["progress"]:
+        result["progress"] = helper.__progress(old_val=__shared_scan_total(key, scan["previous"]),
+                                               new_val=result["value"])
+    if SHARED_SCAN_FORMATS[key].get("time"):
+        helper.__time_value(result)
+    else:
+        result["unit"] = schemas.TemplatePredefinedUnits.count
+    return result
+
+
+def get_metrics(keys: List[Union[schemas.MetricOfWebVitals, schemas.MetricOfErrors, \
+        schemas.MetricOfPerformance, schemas.MetricOfResources]], project_id: int, data: dict):
+    """
+    Evaluates a list of predefined metrics at once: metrics reading the same table are planned
+    into a single grouped scan (one per table), the others fall back to get_metric.
+    """
+    scans = {}
+    results = {}
+    for k in dict.fromkeys(keys):
+        spec = metrics.SHARED_SCAN_METRICS.get(k)
+        if spec is None or data.get("value") is not None:
+            results[k] = get_metric(key=k, project_id=project_id, data=data)
+        else:
+            scans.setdefault(spec["table"], []).append(k)
+    for table, table_keys in scans.items():
+        logger.debug(f"shared scan of {table} for {len(table_keys)} predefined metrics")
+        scan = metrics.get_shared_scan(project_id=project_id, table=table, keys=table_keys,
+                                       previous=any([SHARED_SCAN_FORMATS[k]["progress"] for k in table_keys]),
+                                       **data)
+        for k in table_keys:
+            results[k] = __format_shared_scan(key=k, scan=scan[k])
+    return {k: results[k] for k in keys}
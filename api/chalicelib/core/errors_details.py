@@ -0,0 +1,266 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from decouple import config
+
+from chalicelib.utils import pg_client, metrics_helper
+from chalicelib.utils.TimeUTC import TimeUTC
+from chalicelib.utils.metrics_helper import __get_step_size
+from chalicelib.utils.ttl_cache import TTLCache
+
+# (project_id, error_id, day) -> partitions&sessions count of a closed day, each day is queried on its own bounds
+# so its counts don't depend on the requested window
+DAYS_CACHE = TTLCache(maxsize=config("ERRORS_DETAILS_CACHE_SIZE", cast=int, default=20000),
+                      ttl=config("ERRORS_DETAILS_CACHE_TTL", cast=int, default=24 * 60 * 60))
+# a day is cached only once it is over since this number of seconds, late errors are ingested meanwhile
+CACHE_LAG = config("ERRORS_DETAILS_CACHE_LAG", cast=int, default=60 * 60)
+# GROUPING(browser, os, device_type, country) of each grouping set of the days query
+PARTITIONS = {7: "browsers_partition", 11: "os_partition", 13: "device_partition", 14: "country_partition"}
+DAY_SESSIONS = 15
+
+
+def __get_summary(params):
+    with pg_client.PostgresClient() as cur:
+        query = cur.mogrify("""\
+            SELECT error_id,
+                   name,
+                   message,
+                   users,
+                   sessions,
+                   last_occurrence,
+                   first_occurrence,
+                   last_session_id,
+                   custom_tags
+            FROM (SELECT error_id,
+                         name,
+                         message,
+                         COUNT(DISTINCT user_id)  AS users,
+                         COUNT(DISTINCT session_id) AS sessions
+                  FROM public.errors
+                           INNER JOIN events.errors AS s_errors USING (error_id)
+                           INNER JOIN public.sessions USING (session_id)
+                  WHERE errors.project_id = %(project_id)s
+                    AND timestamp >= %(startDate30)s
+                    AND timestamp < %(endDate30)s
+                    AND sessions.project_id = %(project_id)s
+                    AND sessions.start_ts >= %(startDate30)s
+                    AND sessions.start_ts <= %(endDate30)s
+                    AND error_id = %(error_id)s
+                    AND source = 'js_exception'
+                  GROUP BY error_id, name, message) AS details
+                     INNER JOIN (SELECT MAX(timestamp) AS last_occurrence,
+                                        MIN(timestamp) AS first_occurrence
+                                 FROM events.errors
+                                 WHERE error_id = %(error_id)s) AS time_details ON (TRUE)
+                     INNER JOIN (SELECT session_id AS last_session_id,
+                                        coalesce(custom_tags, '[]')::jsonb AS custom_tags
+                                 FROM events.errors
+                                 LEFT JOIN LATERAL (
+                                        SELECT jsonb_agg(jsonb_build_object(errors_tags.key, errors_tags.value)) AS custom_tags
+                                        FROM errors_tags
+                                        WHERE errors_tags.error_id = %(error_id)s
+                                          AND errors_tags.session_id = errors.session_id
+                                          AND errors_tags.message_id = errors.message_id) AS errors_tags ON (TRUE)
+                                 WHERE error_id = %(error_id)s
+                                 ORDER BY errors.timestamp DESC
+                                 LIMIT 1) AS last_session_details ON (TRUE);""", params)
+        cur.execute(query)
+        return cur.fetchone()
+
+
+def __get_chart24(params):
+    with pg_client.PostgresClient() as cur:
+        query = cur.mogrify(f"""\
+            SELECT {metrics_helper.get_step_expression("timestamp", start_key="startDate24", step_key="step_size24")} AS step,
+                   COUNT(DISTINCT session_id) AS count
+            FROM events.errors INNER JOIN public.sessions USING (session_id)
+            WHERE project_id = %(project_id)s
+              AND error_id = %(error_id)s
+              AND timestamp >= %(startDate24)s
+              AND timestamp < %(endDate24)s
+            GROUP BY step;""", params)
+        cur.execute(query)
+        rows = cur.fetchall()
+    return metrics_helper.complete_steps(rows=rows, startTimestamp=params["startDate24"],
+                                         endTimestamp=params["endDate24"], step_size=params["step_size24"],
+                                         neutral={"count": 0})
+
+
+def __get_days(params, days=None, excluded_days=None):
+    # an error is counted on the day its session started, so a session is in a single day and the distinct sessions
+    # of several days are their sum, errors after midnight of a session started the day before are not counted
+    constraints = ["sessions.project_id = %(project_id)s",
+                   "error_id = %(error_id)s",
+                   "sessions.start_ts / %(day_size)s = timestamp / %(day_size)s"]
+    if days is not None:
+        # each day is bounded to itself whatever the requested window
+        constraints += ["timestamp / %(day_size)s = ANY (%(days)s)",
+                        "timestamp >= %(days_start)s",
+                        "timestamp < %(days_end)s",
+                        "sessions.start_ts >= %(days_start)s",
+                        "sessions.start_ts < %(days_end)s"]
+        params = {**params, "days": days, "days_start": days[0] * TimeUTC.MS_DAY,
+                  "days_end": (days[-1] + 1) * TimeUTC.MS_DAY}
+    else:
+        constraints += ["timestamp >= %(startDate30)s",
+                        "timestamp < %(endDate30)s",
+                        "sessions.start_ts >= %(startDate30)s",
+                        "sessions.start_ts <= %(endDate30)s"]
+        if excluded_days is not None and len(excluded_days) > 0:
+            constraints.append("NOT (timestamp / %(day_size)s = ANY (%(excluded_days)s))")
+    with pg_client.PostgresClient() as cur:
+        # a single scan for all the partitions and the daily sessions count
+        query = cur.mogrify(f"""\
+            SELECT day,
+                   GROUPING(browser, os, device_type, country) AS facet,
+                   browser, browser_version, os, os_version, device_type, device, country,
+                   COUNT(session_id)          AS count,
+                   COUNT(DISTINCT session_id) AS sessions
+            FROM (SELECT timestamp / %(day_size)s AS day,
+                         session_id,
+                         user_browser AS browser,
+                         user_browser_version AS browser_version,
+                         user_os AS os,
+                         COALESCE(user_os_version, 'unknown') AS os_version,
+                         user_device_type AS device_type,
+                         CASE
+                             WHEN user_device = '' OR user_device ISNULL
+                                 THEN 'unknown'
+                             ELSE user_device END AS device,
+                         user_country AS country
+                  FROM events.errors INNER JOIN public.sessions USING (session_id)
+                  WHERE {" AND ".join(constraints)}) AS errors_details
+            GROUP BY GROUPING SETS ((day, browser, browser_version),
+                                    (day, os, os_version),
+                                    (day, device_type, device),
+                                    (day, country),
+                                    (day));""",
+                            {**params, "day_size": TimeUTC.MS_DAY, "excluded_days": excluded_days})
+        cur.execute(query)
+        rows = cur.fetchall()
+    days = {}
+    for r in rows:
+        if r["day"] not in days:
+            days[r["day"]] = __empty_day()
+        day = days[r["day"]]
+        if r["facet"] == DAY_SESSIONS:
+            day["sessions"] = r["sessions"]
+        elif r["facet"] == 7:
+            day["browsers_partition"][(r["browser"], r["browser_version"])] = r["count"]
+        elif r["facet"] == 11:
+            day["os_partition"][(r["os"], r["os_version"])] = r["count"]
+        elif r["facet"] == 13:
+            key = (r["device_type"], r["device"])
+            day["device_partition"][key] = day["device_partition"].get(key, 0) + r["count"]
+        elif r["facet"] == 14:
+            day["country_partition"][(r["country"], None)] = r["count"]
+    return days
+
+
+def __empty_day():
+    return {"sessions": 0, **{p: {} for p in PARTITIONS.values()}}
+
+
+def __get_cached_days(project_id, error_id, params):
+    # the days over since CACHE_LAG are cached, the rest of the window (partial, current and recent days) is queried
+    closed_days = TimeUTC.closed_days(params["startDate30"], params["endDate30"], margin=CACHE_LAG * 1000)
+    days = {}
+    missing_days = []
+    for d in closed_days:
+        cached = DAYS_CACHE.get((project_id, error_id, d))
+        if cached is not None:
+            days[d] = cached
+        else:
+            missing_days.append(d)
+    if len(missing_days) > 0:
+        fetched = __get_days(params=params, days=missing_days)
+        for d in missing_days:
+            days[d] = fetched.get(d, __empty_day())
+            DAYS_CACHE.set((project_id, error_id, d), days[d])
+    return {**days, **__get_days(params=params, excluded_days=closed_days)}
+
+
+def __build_partition(counts, with_versions=True):
+    # same structure as the jsonb_agg of the partitions: [{name, count, partition: [{version, count}]}] sorted by count
+    if len(counts) == 0:
+        return None
+    names = {}
+    for (name, version), count in counts.items():
+        if name not in names:
+            names[name] = {"name": name, "count": 0, "partition": {}}
+        names[name]["count"] += count
+        names[name]["partition"][version] = names[name]["partition"].get(version, 0) + count
+    partition = sorted(names.values(), key=lambda o: o["count"], reverse=True)
+    for p in partition:
+        versions = p.pop("partition")
+        if with_versions:
+            p["partition"] = sorted([{"version": v, "count": c} for v, c in versions.items()],
+                                    key=lambda o: o["count"], reverse=True)
+    return partition
+
+
+def __get_chart30(days, params, density30):
+    # daily buckets aligned on UTC days, several days per bucket for a lower density; the distinct sessions of a bucket
+    # are the sum of its days' as a session is counted on its start day only (see __get_days)
+    step_days = max(-(-30 // max(density30, 1)), 1)
+    first_day = params["startDate30"] // TimeUTC.MS_DAY
+    chart = []
+    for d in range(first_day, params["endDate30"] // TimeUTC.MS_DAY + 1, step_days):
+        chart.append({"timestamp": d * TimeUTC.MS_DAY,
+                      "count": sum(days[i]["sessions"] for i in range(d, d + step_days) if i in days)})
+    return chart
+
+
+def __get_last_hydrated_session(params):
+    with pg_client.PostgresClient() as cur:
+        query = cur.mogrify(
+            f"""SELECT error_id, status, session_id, start_ts,
+                        parent_error_id,session_id, user_anonymous_id,
+                        user_id, user_uuid, user_browser, user_browser_version,
+                        user_os, user_os_version, user_device, payload,
+                                    FALSE AS favorite,
+                                       True AS viewed
+                                FROM public.errors AS pe
+                                         INNER JOIN events.errors AS ee USING (error_id)
+                                         INNER JOIN public.sessions USING (session_id)
+                                WHERE pe.project_id = %(project_id)s
+                                  AND error_id = %(error_id)s
+                                ORDER BY start_ts DESC
+                                LIMIT 1;""", params)
+        cur.execute(query=query)
+        return cur.fetchone()
+
+
+def get_details(project_id, error_id, user_id, density24=24, density30=30):
+    """
+    Computes the error details as independent facets, in parallel.
+    The 30 days partitions and chart are built from per-day counts, closed days are cached,
+    only the current day (and the partial first day) are recomputed on each call.
+    Returns (details row, last hydrated session)
+    """
+    params = {"startDate24": TimeUTC.now(-1),
+              "endDate24": TimeUTC.now(),
+              "startDate30": TimeUTC.now(-30),
+              "endDate30": TimeUTC.now(),
+              "project_id": project_id,
+              "userId": user_id,
+              "error_id": error_id}
+    params["step_size24"] = max(__get_step_size(params["startDate24"], params["endDate24"], density24, factor=1), 1)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        summary = executor.submit(__get_summary, params)
+        chart24 = executor.submit(__get_chart24, params)
+        days = executor.submit(__get_cached_days, project_id, error_id, params)
+        status = executor.submit(__get_last_hydrated_session, params)
+    row = summary.result()
+    if row is None:
+        return None, None
+    days = days.result()
+    for p in PARTITIONS.values():
+        counts = {}
+        for d in days.values():
+            for k, c in d[p].items():
+                counts[k] = counts.get(k, 0) + c
+        row[p] = __build_partition(counts=counts, with_versions=p != "country_partition")
+    row["chart24"] = chart24.result()
+    row["chart30"] = __get_chart30(days=days, params=params, density30=density30)
+    return row, status.result()
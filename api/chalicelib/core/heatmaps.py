@@ -2,7 +2,7 @@ import logging
 
 import schemas
 from chalicelib.core import sessions_mobs, sessions, events
-from chalicelib.utils import pg_client, helper
+from chalicelib.utils import pg_client, helper, heatmaps_helper
 
 # from chalicelib.utils import sql_helper as sh
 
@@ -58,6 +58,9 @@ def get_by_url(project_id, data: schemas.GetHeatMapPayloadSchema):
                                     AND mis.type='click_rage'))""")
         query_from += """LEFT JOIN events_common.issues USING (timestamp, session_id)
                        LEFT JOIN issues AS mis USING (issue_id)"""
+    if data.mode == schemas.HeatMapMode.density:
+        return __get_density_grid(project_id=project_id, data=data, args=args,
+                                  query_from=query_from, constraints=constraints)
     with pg_client.PostgresClient() as cur:
         query = cur.mogrify(f"""SELECT normalized_x, normalized_y
                                 FROM {query_from}
@@ -80,6 +83,62 @@ def get_by_url(project_id, data: schemas.GetHeatMapPayloadSchema):
     return helper.list_to_camel_case(rows)
 
 
+def __get_density_grid(project_id, data: schemas.GetHeatMapPayloadSchema, args, query_from, constraints):
+    args = {**args, "grid_size": data.grid_size, "day_size": heatmaps_helper.DAY_MS}
+
+    def __day_constraints(days, excluded_days):
+        if days is not None:
+            # each day is bounded to itself whatever the requested window: its clicks of the sessions started that day
+            return constraints + ["clicks.timestamp / %(day_size)s = ANY (%(days)s)",
+                                  "start_ts / %(day_size)s = clicks.timestamp / %(day_size)s"], \
+                {**args, "days": days, "startDate": days[0] * heatmaps_helper.DAY_MS,
+                 "endDate": (days[-1] + 1) * heatmaps_helper.DAY_MS - 1}
+        if len(excluded_days) == 0:
+            return constraints, args
+        return constraints + ["NOT (clicks.timestamp / %(day_size)s = ANY (%(excluded_days)s))"], \
+            {**args, "excluded_days": excluded_days}
+
+    def fetch_cells(days, excluded_days):
+        day_constraints, day_args = __day_constraints(days, excluded_days)
+        return __execute(f"""SELECT clicks.timestamp / %(day_size)s AS day,
+                                    {heatmaps_helper.get_cell_expression("normalized_x")} AS x,
+                                    {heatmaps_helper.get_cell_expression("normalized_y")} AS y,
+                                    COUNT(1) AS count
+                             FROM {query_from}
+                             WHERE {" AND ".join(day_constraints)}
+                             GROUP BY day, x, y;""", day_args, data)
+
+    def fetch_selectors(days, excluded_days):
+        day_constraints, day_args = __day_constraints(days, excluded_days)
+        return __execute(f"""SELECT clicks.timestamp / %(day_size)s AS day,
+                                    clicks.selector,
+                                    COUNT(1) AS count
+                             FROM {query_from}
+                             WHERE {" AND ".join(day_constraints)}
+                             GROUP BY day, clicks.selector;""", day_args, data)
+
+    return heatmaps_helper.get_density_grid(project_id=project_id, data=data,
+                                            fetch_cells=fetch_cells, fetch_selectors=fetch_selectors)
+
+
+def __execute(query, args, data):
+    with pg_client.PostgresClient() as cur:
+        query = cur.mogrify(query, args)
+        logger.debug("---------")
+        logger.debug(query.decode('UTF-8'))
+        logger.debug("---------")
+        try:
+            cur.execute(query)
+        except Exception as err:
+            logger.warning("--------- HEATMAP DENSITY QUERY EXCEPTION -----------")
+            logger.warning(query.decode('UTF-8'))
+            logger.warning("--------- PAYLOAD -----------")
+            logger.warning(data)
+            logger.warning("--------------------")
+            raise err
+        return cur.fetchall()
+
+
 def get_x_y_by_url_and_session_id(project_id, session_id, data: schemas.GetHeatMapPayloadSchema):
     args = {"session_id": session_id, "url": data.url}
     constraints = ["session_id = %(session_id)s",
@@ -6,6 +6,7 @@ from chalicelib.utils import args_transformer
 from chalicelib.utils import helper
 from chalicelib.utils import pg_client
 from chalicelib.utils.TimeUTC import TimeUTC
+from chalicelib.utils import metrics_helper
 from chalicelib.utils.metrics_helper import __get_step_size
 
 
@@ -28,6 +29,13 @@ def __quantiles(a, q, interpolation='higher'):
         return arr[ind]
 
 
+def __get_chart_step_size(startTimestamp, endTimestamp, density):
+    # charts computed in a single GROUP BY step pass, the density is capped by the time range
+    density = metrics_helper.get_adaptive_density(startTimestamp=startTimestamp, endTimestamp=endTimestamp,
+                                                  density=density)
+    return max(__get_step_size(startTimestamp, endTimestamp, density, factor=1), 1)
+
+
 def __get_constraints(project_id, time_constraint=True, chart=False, duration=True, project=True,
                       project_identifier="project_id",
                       main_table="sessions", time_column="start_ts", data={}):
@@ -129,24 +137,19 @@ SESSIONS_META_FIELDS = {"revId": "rev_id",
 def get_processed_sessions(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                            endTimestamp=TimeUTC.now(),
                            density=7, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query = __get_constraints(project_id=project_id, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=True,
-                                           chart=True, data=args)
     with pg_client.PostgresClient() as cur:
-        pg_query = f"""SELECT generated_timestamp AS timestamp,
-                               COALESCE(COUNT(sessions), 0) AS value
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                             LEFT JOIN LATERAL ( SELECT 1
-                                                 FROM public.sessions
-                                                 WHERE {" AND ".join(pg_sub_query_chart)}
-                             ) AS sessions ON (TRUE)
-                        GROUP BY generated_timestamp
-                        ORDER BY generated_timestamp;"""
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("sessions.start_ts")} AS step,
+                               COUNT(1) AS value
+                        FROM public.sessions
+                        WHERE {" AND ".join(pg_sub_query)}
+                        GROUP BY step;"""
         params = {"step_size": step_size, "project_id": project_id, "startTimestamp": startTimestamp,
                   "endTimestamp": endTimestamp, **__get_constraint_values(args)}
         cur.execute(cur.mogrify(pg_query, params))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size, neutral={"value": 0})
         results = {
             "value": sum([r["value"] for r in rows]),
             "chart": rows
@@ -173,35 +176,26 @@ def get_processed_sessions(project_id, startTimestamp=TimeUTC.now(delta_days=-1)
 
 def get_errors(project_id, startTimestamp=TimeUTC.now(delta_days=-1), endTimestamp=TimeUTC.now(),
                density=7, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
 
     pg_sub_query_subset = __get_constraints(project_id=project_id, data=args, duration=False, main_table="m_errors",
                                             time_constraint=False)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False,
-                                           chart=True, data=args, main_table="errors", time_column="timestamp",
-                                           project=False, duration=False)
     pg_sub_query_subset.append("m_errors.source = 'js_exception'")
     pg_sub_query_subset.append("errors.timestamp>=%(startTimestamp)s")
     pg_sub_query_subset.append("errors.timestamp<%(endTimestamp)s")
     with pg_client.PostgresClient() as cur:
-        pg_query = f"""WITH errors AS (SELECT DISTINCT session_id, timestamp
-                                        FROM events.errors
-                                                 INNER JOIN public.errors AS m_errors USING (error_id)
-                                        WHERE {" AND ".join(pg_sub_query_subset)}
-                        )
-                        SELECT generated_timestamp          AS timestamp,
-                               COALESCE(COUNT(sessions), 0) AS count
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                                 LEFT JOIN LATERAL ( SELECT session_id
-                                                     FROM errors
-                                                     WHERE {" AND ".join(pg_sub_query_chart)}
-                            ) AS sessions ON (TRUE)
-                        GROUP BY generated_timestamp
-                        ORDER BY generated_timestamp;"""
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("errors.timestamp")} AS step,
+                               COUNT(1)                                                  AS count
+                        FROM (SELECT DISTINCT session_id, timestamp
+                              FROM events.errors
+                                       INNER JOIN public.errors AS m_errors USING (error_id)
+                              WHERE {" AND ".join(pg_sub_query_subset)}) AS errors
+                        GROUP BY step;"""
         params = {"step_size": step_size, "project_id": project_id, "startTimestamp": startTimestamp,
                   "endTimestamp": endTimestamp, **__get_constraint_values(args)}
         cur.execute(cur.mogrify(pg_query, params))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size, neutral={"count": 0})
         results = {
             "count": 0 if len(rows) == 0 else \
                 __count_distinct_errors(cur, project_id, startTimestamp, endTimestamp, pg_sub_query_subset),
@@ -232,18 +226,13 @@ def __count_distinct_errors(cur, project_id, startTimestamp, endTimestamp, pg_su
 def get_errors_trend(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                      endTimestamp=TimeUTC.now(),
                      density=7, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
 
     pg_sub_query_subset = __get_constraints(project_id=project_id, time_constraint=False,
                                             chart=False, data=args, main_table="m_errors", duration=False)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False, project=False,
-                                           chart=True, data=args, main_table="errors_subsest", time_column="timestamp",
-                                           duration=False)
     pg_sub_query_subset.append("errors.timestamp >= %(startTimestamp)s")
     pg_sub_query_subset.append("errors.timestamp < %(endTimestamp)s")
 
-    pg_sub_query_chart.append("errors_subsest.error_id = top_errors.error_id")
-
     with pg_client.PostgresClient() as cur:
         pg_query = f"""WITH errors_subsest AS (SELECT session_id, error_id, timestamp
                                         FROM events.errors
@@ -269,20 +258,20 @@ def get_errors_trend(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                                                      WHERE error_id = top_errors.error_id
                                                      GROUP BY error_id) AS errors_time ON (TRUE)
                                  INNER JOIN LATERAL (SELECT jsonb_agg(chart) AS chart
-                                                     FROM (SELECT generated_timestamp AS timestamp, COALESCE(COUNT(sessions), 0) AS count
-                                                           FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                                                                    LEFT JOIN LATERAL ( SELECT DISTINCT session_id
-                                                                                        FROM errors_subsest
-                                                                                        WHERE {" AND ".join(pg_sub_query_chart)}
-                                                               ) AS sessions ON (TRUE)
-                                                           GROUP BY generated_timestamp
-                                                           ORDER BY generated_timestamp) AS chart) AS chart ON (TRUE);"""
+                                                     FROM (SELECT {metrics_helper.get_step_expression("errors_subsest.timestamp")} AS step,
+                                                                  COUNT(DISTINCT session_id) AS count
+                                                           FROM errors_subsest
+                                                           WHERE errors_subsest.error_id = top_errors.error_id
+                                                           GROUP BY step) AS chart) AS chart ON (TRUE);"""
         params = {"step_size": step_size, "project_id": project_id, "startTimestamp": startTimestamp,
                   "endTimestamp": endTimestamp, **__get_constraint_values(args)}
         cur.execute(cur.mogrify(pg_query, params))
         rows = cur.fetchall()
 
         for i in range(len(rows)):
+            rows[i]["chart"] = metrics_helper.complete_steps(rows=rows[i]["chart"] or [], startTimestamp=startTimestamp,
+                                                             endTimestamp=endTimestamp, step_size=step_size,
+                                                             neutral={"count": 0})
             rows[i] = helper.dict_to_camel_case(rows[i])
             rows[i]["sessions"] = rows[i].pop("sessionsCount")
             rows[i]["error_id"] = rows[i]["errorId"]
@@ -347,7 +336,7 @@ def __get_application_activity(cur, project_id, startTimestamp, endTimestamp, **
     result = {}
     pg_sub_query = __get_constraints(project_id=project_id, data=args)
     pg_sub_query.append("pages.timestamp >= %(startTimestamp)s")
-    pg_sub_query.append("pages.timestamp > %(endTimestamp)s")
+    pg_sub_query.append("pages.timestamp < %(endTimestamp)s")
     pg_sub_query.append("pages.load_time > 0")
     pg_sub_query.append("pages.load_time IS NOT NULL")
     pg_query = f"""SELECT COALESCE(AVG(pages.load_time) ,0) AS avg_page_load_time
@@ -413,11 +402,10 @@ def __get_user_activity(cur, project_id, startTimestamp, endTimestamp, **args):
 def get_slowest_images(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                        endTimestamp=TimeUTC.now(),
                        density=7, **args):
-    step_size = __get_step_size(endTimestamp=endTimestamp, startTimestamp=startTimestamp, density=density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query = __get_constraints(project_id=project_id, data=args)
     pg_sub_query.append("resources.type = 'img'")
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=True,
-                                           chart=True, data=args)
+    pg_sub_query_chart = __get_constraints(project_id=project_id, data=args)
     pg_sub_query_chart.append("resources.type = 'img'")
     pg_sub_query_chart.append("resources.url_hostpath = top_img.url_hostpath")
 
@@ -442,15 +430,11 @@ def get_slowest_images(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                               LIMIT 10) AS top_img
                                  LEFT JOIN LATERAL (
                             SELECT jsonb_agg(chart) AS chart
-                            FROM (SELECT generated_timestamp        AS timestamp,
-                                         COALESCE(AVG(duration), 0) AS avg_duration
-                                  FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                                           LEFT JOIN LATERAL ( SELECT resources.duration
-                                                               FROM events.resources INNER JOIN public.sessions USING (session_id)
-                                                               WHERE {" AND ".join(pg_sub_query_chart)}
-                                      ) AS sessions ON (TRUE)
-                                  GROUP BY generated_timestamp
-                                  ORDER BY generated_timestamp) AS chart
+                            FROM (SELECT {metrics_helper.get_step_expression("sessions.start_ts")} AS step,
+                                         COALESCE(AVG(resources.duration), 0) AS avg_duration
+                                  FROM events.resources INNER JOIN public.sessions USING (session_id)
+                                  WHERE {" AND ".join(pg_sub_query_chart)}
+                                  GROUP BY step) AS chart
                             ) AS chart ON (TRUE);"""
 
         cur.execute(
@@ -458,6 +442,9 @@ def get_slowest_images(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                                    "endTimestamp": endTimestamp, **__get_constraint_values(args)}))
         rows = cur.fetchall()
     for i in range(len(rows)):
+        rows[i]["chart"] = metrics_helper.complete_steps(rows=rows[i]["chart"] or [], startTimestamp=startTimestamp,
+                                                         endTimestamp=endTimestamp, step_size=step_size,
+                                                         neutral={"avg_duration": 0})
         rows[i]["sessions"] = rows[i].pop("sessions_count")
         rows[i] = helper.dict_to_camel_case(rows[i])
 
@@ -473,7 +460,7 @@ def __get_performance_constraint(l):
 
 def get_performance(project_id, startTimestamp=TimeUTC.now(delta_days=-1), endTimestamp=TimeUTC.now(),
                     density=19, resources=None, **args):
-    step_size = __get_step_size(endTimestamp=endTimestamp, startTimestamp=startTimestamp, density=density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     location_constraints = []
     img_constraints = []
     request_constraints = []
@@ -498,86 +485,53 @@ def get_performance(project_id, startTimestamp=TimeUTC.now(delta_days=-1), endTi
     with pg_client.PostgresClient() as cur:
         pg_sub_query_subset = __get_constraints(project_id=project_id, time_constraint=True,
                                                 chart=False, data=args)
-        pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False, project=False,
-                                               chart=True, data=args, main_table="resources", time_column="timestamp",
-                                               duration=False)
         pg_sub_query_subset.append("resources.timestamp >= %(startTimestamp)s")
         pg_sub_query_subset.append("resources.timestamp < %(endTimestamp)s")
 
-        pg_query = f"""WITH resources AS (SELECT resources.duration, resources.timestamp 
-                                        FROM events.resources INNER JOIN public.sessions USING (session_id)
-                                        WHERE {" AND ".join(pg_sub_query_subset)}
-                                          AND resources.type = 'img' AND resources.duration>0
-                                          {(f' AND ({" OR ".join(img_constraints)})') if len(img_constraints) > 0 else ""}
-                        )
-                    SELECT 
-                             generated_timestamp AS timestamp,
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("resources.timestamp")} AS step,
                              COALESCE(AVG(resources.duration),0) AS avg_image_load_time 
-                      FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                        LEFT JOIN LATERAL ( 
-                                SELECT resources.duration
-                                FROM resources
-                                WHERE {" AND ".join(pg_sub_query_chart)}
-                        ) AS resources ON (TRUE)
-                      GROUP BY timestamp
-                      ORDER BY timestamp;"""
+                      FROM events.resources INNER JOIN public.sessions USING (session_id)
+                      WHERE {" AND ".join(pg_sub_query_subset)}
+                        AND resources.type = 'img' AND resources.duration>0
+                        {(f' AND ({" OR ".join(img_constraints)})') if len(img_constraints) > 0 else ""}
+                      GROUP BY step;"""
         cur.execute(cur.mogrify(pg_query, {**params, **img_constraints_vals, **__get_constraint_values(args)}))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size,
+                                             neutral={"avg_image_load_time": 0})
         images = helper.list_to_camel_case(rows)
 
         pg_sub_query_subset = __get_constraints(project_id=project_id, time_constraint=True,
                                                 chart=False, data=args)
-        pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False, project=False,
-                                               chart=True, data=args, main_table="resources", time_column="timestamp",
-                                               duration=False)
         pg_sub_query_subset.append("resources.timestamp >= %(startTimestamp)s")
         pg_sub_query_subset.append("resources.timestamp < %(endTimestamp)s")
 
-        pg_query = f"""WITH resources AS(SELECT resources.duration, resources.timestamp 
-                                            FROM events.resources INNER JOIN public.sessions USING (session_id)
-                                            WHERE {" AND ".join(pg_sub_query_subset)} 
-                                            AND resources.type = 'fetch' AND resources.duration>0  
-                                            {(f' AND ({" OR ".join(request_constraints)})') if len(request_constraints) > 0 else ""}
-                        )
-                        SELECT 
-                             generated_timestamp AS timestamp,
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("resources.timestamp")} AS step,
                              COALESCE(AVG(resources.duration),0) AS avg_request_load_time 
-                      FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                        LEFT JOIN LATERAL ( 
-                                SELECT resources.duration
-                                FROM resources
-                                WHERE {" AND ".join(pg_sub_query_chart)} 
-                        ) AS resources ON (TRUE)
-                      GROUP BY generated_timestamp
-                      ORDER BY generated_timestamp;"""
+                      FROM events.resources INNER JOIN public.sessions USING (session_id)
+                      WHERE {" AND ".join(pg_sub_query_subset)} 
+                        AND resources.type = 'fetch' AND resources.duration>0  
+                        {(f' AND ({" OR ".join(request_constraints)})') if len(request_constraints) > 0 else ""}
+                      GROUP BY step;"""
         cur.execute(cur.mogrify(pg_query, {**params, **request_constraints_vals, **__get_constraint_values(args)}))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size,
+                                             neutral={"avg_request_load_time": 0})
         requests = helper.list_to_camel_case(rows)
         pg_sub_query_subset = __get_constraints(project_id=project_id, time_constraint=True,
                                                 chart=False, data=args)
-        pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False, project=False,
-                                               chart=True, data=args, main_table="pages", time_column="timestamp",
-                                               duration=False)
         pg_sub_query_subset.append("pages.timestamp >= %(startTimestamp)s")
         pg_sub_query_subset.append("pages.timestamp < %(endTimestamp)s")
-        pg_query = f"""WITH pages AS(SELECT pages.load_time, timestamp 
-                                    FROM events.pages INNER JOIN public.sessions USING (session_id)
-                                    WHERE {" AND ".join(pg_sub_query_subset)} AND pages.load_time>0 AND pages.load_time IS NOT NULL
-                                      {(f' AND ({" OR ".join(location_constraints)})') if len(location_constraints) > 0 else ""}
-                        )
-                        SELECT 
-                             generated_timestamp AS timestamp,
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("pages.timestamp")} AS step,
                              COALESCE(AVG(pages.load_time),0) AS avg_page_load_time 
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                        LEFT JOIN LATERAL ( SELECT pages.load_time
-                                            FROM pages 
-                                            WHERE {" AND ".join(pg_sub_query_chart)}  
-                                              {(f' AND ({" OR ".join(location_constraints)})') if len(location_constraints) > 0 else ""}
-                                            ) AS pages ON (TRUE)
-                        GROUP BY generated_timestamp
-                        ORDER BY generated_timestamp;"""
+                        FROM events.pages INNER JOIN public.sessions USING (session_id)
+                        WHERE {" AND ".join(pg_sub_query_subset)} AND pages.load_time>0 AND pages.load_time IS NOT NULL
+                          {(f' AND ({" OR ".join(location_constraints)})') if len(location_constraints) > 0 else ""}
+                        GROUP BY step;"""
         cur.execute(cur.mogrify(pg_query, {**params, **location_constraints_vals, **__get_constraint_values(args)}))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size,
+                                             neutral={"avg_page_load_time": 0})
         pages = helper.list_to_camel_case(rows)
 
         rows = helper.merge_lists_by_key(helper.merge_lists_by_key(pages, requests, "timestamp"), images, "timestamp")
@@ -760,9 +714,9 @@ def search(text, resource_type, project_id, performance=False, pages_only=False,
 def get_missing_resources_trend(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                                 endTimestamp=TimeUTC.now(),
                                 density=7, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query = __get_constraints(project_id=project_id, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=True, chart=True, data=args)
+    pg_sub_query_chart = __get_constraints(project_id=project_id, data=args)
     pg_sub_query.append("resources.success = FALSE")
     pg_sub_query_chart.append("resources.success = FALSE")
     pg_sub_query.append("resources.type = 'img'")
@@ -785,17 +739,12 @@ def get_missing_resources_trend(project_id, startTimestamp=TimeUTC.now(delta_day
         if len(rows) == 0:
             return []
         pg_sub_query.append("resources.url_hostpath = %(value)s")
-        pg_query = f"""SELECT generated_timestamp AS timestamp,
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("sessions.start_ts")} AS step,
                               COUNT(resources.session_id) AS count,
                               MAX(resources.timestamp) AS max_datatime
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                             LEFT JOIN LATERAL ( SELECT resources.session_id,
-                                                        resources.timestamp
-                                                 FROM events.resources INNER JOIN public.sessions USING (session_id)
-                                                 WHERE {" AND ".join(pg_sub_query_chart)}
-                             ) AS resources ON (TRUE)
-                        GROUP BY generated_timestamp
-                        ORDER BY generated_timestamp;"""
+                        FROM events.resources INNER JOIN public.sessions USING (session_id)
+                        WHERE {" AND ".join(pg_sub_query_chart)}
+                        GROUP BY step;"""
         for e in rows:
             e["startedAt"] = startTimestamp
             e["startTimestamp"] = startTimestamp
@@ -806,7 +755,9 @@ def get_missing_resources_trend(project_id, startTimestamp=TimeUTC.now(delta_day
                                                "endTimestamp": endTimestamp,
                                                "value": e["url"],
                                                **__get_constraint_values(args)}))
-            r = cur.fetchall()
+            r = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                              endTimestamp=endTimestamp, step_size=step_size,
+                                              neutral={"count": 0, "max_datatime": None})
             e["endedAt"] = r[-1]["max_datatime"]
             e["chart"] = [{"timestamp": i["timestamp"], "count": i["count"]} for i in r]
     return rows
@@ -815,46 +766,25 @@ def get_missing_resources_trend(project_id, startTimestamp=TimeUTC.now(delta_day
 def get_network(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                 endTimestamp=TimeUTC.now(),
                 density=7, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query_subset = __get_constraints(project_id=project_id, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False,
-                                           chart=True, data=args, main_table="resources", time_column="timestamp",
-                                           project=False, duration=False)
     pg_sub_query_subset.append("resources.timestamp>=%(startTimestamp)s")
     pg_sub_query_subset.append("resources.timestamp<%(endTimestamp)s")
 
     with pg_client.PostgresClient() as cur:
-        pg_query = f"""WITH resources AS (SELECT resources.session_id,
-                                                  resources.url_hostpath,
-                                                  timestamp
-                                           FROM events.resources
-                                                    INNER JOIN public.sessions USING (session_id)
-                                           WHERE {" AND ".join(pg_sub_query_subset)}
-                        )
-                        SELECT generated_timestamp         AS timestamp,
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("resources.timestamp")} AS step,
                                resources.url_hostpath,
                                COUNT(resources.session_id) AS doc_count
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                                 LEFT JOIN LATERAL ( SELECT resources.session_id,
-                                                            resources.url_hostpath
-                                                     FROM resources
-                                                     WHERE {" AND ".join(pg_sub_query_chart)}
-                            ) AS resources ON (TRUE)
-                        GROUP BY generated_timestamp, resources.url_hostpath
-                        ORDER BY generated_timestamp;"""
+                        FROM events.resources
+                                 INNER JOIN public.sessions USING (session_id)
+                        WHERE {" AND ".join(pg_sub_query_subset)}
+                        GROUP BY step, resources.url_hostpath;"""
         cur.execute(cur.mogrify(pg_query, {"step_size": step_size, "project_id": project_id,
                                            "startTimestamp": startTimestamp,
                                            "endTimestamp": endTimestamp, **__get_constraint_values(args)}))
-        r = cur.fetchall()
-        results = []
-
-        i = 0
-        while i < len(r):
-            results.append({"timestamp": r[i]["timestamp"], "domains": []})
-            i += 1
-            while i < len(r) and r[i]["timestamp"] == results[-1]["timestamp"]:
-                results[-1]["domains"].append({r[i]["url_hostpath"]: r[i]["doc_count"]})
-                i += 1
+        results = [{"timestamp": t, "domains": []} for t in range(startTimestamp, endTimestamp + 1, step_size)]
+        for r in cur.fetchall():
+            results[min(r["step"], len(results) - 1)]["domains"].append({r["url_hostpath"]: r["doc_count"]})
 
     return {"startTimestamp": startTimestamp, "endTimestamp": endTimestamp, "chart": results}
 
@@ -880,11 +810,8 @@ def dashboard_args(params):
 def get_resources_loading_time(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                                endTimestamp=TimeUTC.now(),
                                density=19, type=None, url=None, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query_subset = __get_constraints(project_id=project_id, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False,
-                                           chart=True, data=args, main_table="resources", time_column="timestamp",
-                                           project=False, duration=False)
     pg_sub_query_subset.append("resources.timestamp>=%(startTimestamp)s")
     pg_sub_query_subset.append("resources.timestamp<%(endTimestamp)s")
     pg_sub_query_subset.append("resources.duration>0")
@@ -896,26 +823,19 @@ def get_resources_loading_time(project_id, startTimestamp=TimeUTC.now(delta_days
         pg_sub_query_subset.append(f"resources.url_hostpath = %(value)s")
 
     with pg_client.PostgresClient() as cur:
-        pg_query = f"""WITH resources AS (SELECT resources.duration, timestamp
-                                           FROM events.resources
-                                                    INNER JOIN public.sessions USING (session_id)
-                                           WHERE {" AND ".join(pg_sub_query_subset)}
-                        )
-                        SELECT generated_timestamp                  AS timestamp,
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("resources.timestamp")} AS step,
                                COALESCE(AVG(resources.duration), 0) AS avg
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                                 LEFT JOIN LATERAL ( SELECT resources.duration
-                                                     FROM resources
-                                                     WHERE {" AND ".join(pg_sub_query_chart)}
-                            ) AS resources ON (TRUE)
-                        GROUP BY generated_timestamp
-                        ORDER BY generated_timestamp;"""
+                        FROM events.resources
+                                 INNER JOIN public.sessions USING (session_id)
+                        WHERE {" AND ".join(pg_sub_query_subset)}
+                        GROUP BY step;"""
         params = {"step_size": step_size, "project_id": project_id,
                   "startTimestamp": startTimestamp,
                   "endTimestamp": endTimestamp,
                   "value": url, "type": type, **__get_constraint_values(args)}
         cur.execute(cur.mogrify(pg_query, params))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size, neutral={"avg": 0})
         pg_query = f"""SELECT COALESCE(AVG(resources.duration),0) AS avg 
                   FROM events.resources INNER JOIN sessions USING(session_id)
                   WHERE {" AND ".join(pg_sub_query_subset)};"""
@@ -927,11 +847,8 @@ def get_resources_loading_time(project_id, startTimestamp=TimeUTC.now(delta_days
 
 def get_pages_dom_build_time(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                              endTimestamp=TimeUTC.now(), density=19, url=None, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query_subset = __get_constraints(project_id=project_id, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False,
-                                           chart=True, data=args, main_table="pages", time_column="timestamp",
-                                           project=False, duration=False)
 
     if url is not None:
         pg_sub_query_subset.append(f"pages.path = %(value)s")
@@ -951,15 +868,10 @@ def get_pages_dom_build_time(project_id, startTimestamp=TimeUTC.now(delta_days=-
                                  LEFT JOIN
                              (SELECT jsonb_agg(chart) AS chart
                               FROM (
-                                       SELECT generated_timestamp                 AS timestamp,
+                                       SELECT {metrics_helper.get_step_expression("pages.timestamp")} AS step,
                                               COALESCE(AVG(dom_building_time), 0) AS value
-                                       FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                                                LEFT JOIN LATERAL ( SELECT pages.dom_building_time
-                                                                    FROM pages
-                                                                    WHERE {" AND ".join(pg_sub_query_chart)}
-                                           ) AS sessionsBD ON (TRUE)
-                                       GROUP BY generated_timestamp
-                                       ORDER BY generated_timestamp) AS chart) AS chart ON (TRUE);"""
+                                       FROM pages
+                                       GROUP BY step) AS chart) AS chart ON (TRUE);"""
         params = {"step_size": step_size, "project_id": project_id,
                   "startTimestamp": startTimestamp,
                   "endTimestamp": endTimestamp,
@@ -967,18 +879,18 @@ def get_pages_dom_build_time(project_id, startTimestamp=TimeUTC.now(delta_days=-
 
         cur.execute(cur.mogrify(pg_query, params))
         row = cur.fetchone()
+        row["chart"] = metrics_helper.complete_steps(rows=row["chart"] or [], startTimestamp=startTimestamp,
+                                                     endTimestamp=endTimestamp, step_size=step_size,
+                                                     neutral={"value": 0})
     helper.__time_value(row)
     return row
 
 
 def get_slowest_resources(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                           endTimestamp=TimeUTC.now(), type="all", density=19, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query = __get_constraints(project_id=project_id, data=args)
     pg_sub_query_subset = __get_constraints(project_id=project_id, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False,
-                                           chart=True, data=args, main_table="resources", time_column="timestamp",
-                                           project=False, duration=False)
 
     pg_sub_query_subset.append("resources.timestamp>=%(startTimestamp)s")
     pg_sub_query_subset.append("resources.timestamp<%(endTimestamp)s")
@@ -990,7 +902,6 @@ def get_slowest_resources(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
         sq = "resources.type != 'fetch'"
     pg_sub_query.append(sq)
     pg_sub_query_subset.append(sq)
-    pg_sub_query_chart.append("resources.url_hostpath ILIKE '%%' || main_list.name")
 
     with pg_client.PostgresClient() as cur:
         pg_query = f"""WITH resources AS (
@@ -1020,16 +931,11 @@ def get_slowest_resources(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                                  INNER JOIN LATERAL (
                             SELECT JSONB_AGG(chart_details) AS chart
                             FROM (
-                                     SELECT generated_timestamp                  AS timestamp,
+                                     SELECT {metrics_helper.get_step_expression("resources.timestamp")} AS step,
                                             COALESCE(AVG(resources.duration), 0) AS avg
-                                     FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                                              LEFT JOIN LATERAL (
-                                         SELECT resources.duration
-                                         FROM resources
-                                         WHERE {" AND ".join(pg_sub_query_chart)}
-                                         ) AS resources ON (TRUE)
-                                     GROUP BY generated_timestamp
-                                     ORDER BY generated_timestamp
+                                     FROM resources
+                                     WHERE resources.url_hostpath ILIKE '%%' || main_list.name
+                                     GROUP BY step
                                  ) AS chart_details
                             ) AS chart_details ON (TRUE);"""
 
@@ -1041,6 +947,9 @@ def get_slowest_resources(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
         rows = cur.fetchall()
         for r in rows:
             r["type"] = __get_resource_type_from_db_type(r["type"])
+            r["chart"] = metrics_helper.complete_steps(rows=r["chart"] or [], startTimestamp=startTimestamp,
+                                                       endTimestamp=endTimestamp, step_size=step_size,
+                                                       neutral={"avg": 0})
     return rows
 
 
@@ -1092,35 +1001,30 @@ def get_speed_index_location(project_id, startTimestamp=TimeUTC.now(delta_days=-
 
 def get_pages_response_time(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                             endTimestamp=TimeUTC.now(), density=7, url=None, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query = __get_constraints(project_id=project_id, data=args)
     pg_sub_query.append("pages.response_time IS NOT NULL")
     pg_sub_query.append("pages.response_time>0")
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=True, chart=True,
-                                           data=args)
+    pg_sub_query_chart = __get_constraints(project_id=project_id, data=args)
     pg_sub_query_chart.append("pages.response_time IS NOT NULL")
     pg_sub_query_chart.append("pages.response_time>0")
 
     if url is not None:
         pg_sub_query_chart.append(f"url = %(value)s")
     with pg_client.PostgresClient() as cur:
-        pg_query = f"""SELECT generated_timestamp AS timestamp,
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("sessions.start_ts")} AS step,
                                 COALESCE(AVG(pages.response_time),0) AS value
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                             LEFT JOIN LATERAL (
-                                    SELECT response_time
-                                    FROM events.pages INNER JOIN public.sessions USING (session_id)
-                                    WHERE {" AND ".join(pg_sub_query_chart)}
-                            ) AS pages ON (TRUE)
-                        GROUP BY generated_timestamp
-                        ORDER BY generated_timestamp;"""
+                        FROM events.pages INNER JOIN public.sessions USING (session_id)
+                        WHERE {" AND ".join(pg_sub_query_chart)}
+                        GROUP BY step;"""
         params = {"step_size": step_size,
                   "project_id": project_id,
                   "startTimestamp": startTimestamp,
                   "endTimestamp": endTimestamp,
                   "value": url, **__get_constraint_values(args)}
         cur.execute(cur.mogrify(pg_query, params))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size, neutral={"value": 0})
         pg_query = f"""SELECT COALESCE(AVG(pages.response_time),0) AS avg
                         FROM events.pages INNER JOIN public.sessions USING (session_id)
                         WHERE {" AND ".join(pg_sub_query)};"""
@@ -1320,11 +1224,11 @@ def get_top_metrics(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
 
 def get_time_to_render(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                        endTimestamp=TimeUTC.now(), density=7, url=None, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query_subset = __get_constraints(project_id=project_id, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False,
-                                           chart=True, data=args, main_table="pages", time_column="timestamp",
-                                           project=False, duration=False)
+    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=True, data=args,
+                                           main_table="pages", time_column="timestamp", project=False,
+                                           duration=False)
     pg_sub_query_subset.append("pages.visually_complete>0")
     if url is not None:
         pg_sub_query_subset.append("pages.path = %(value)s")
@@ -1336,31 +1240,29 @@ def get_time_to_render(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                         SELECT COALESCE((SELECT AVG(pages.visually_complete) FROM pages),0) AS value,
                             jsonb_agg(chart) AS chart
                         FROM  
-                        (SELECT generated_timestamp AS timestamp,
+                        (SELECT {metrics_helper.get_step_expression("pages.timestamp")} AS step,
                                 COALESCE(AVG(visually_complete), 0) AS value
-                         FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                                     LEFT JOIN LATERAL ( SELECT pages.visually_complete
-                                                         FROM pages
-                                                         WHERE {" AND ".join(pg_sub_query_chart)}
-                                     ) AS pages ON (TRUE)
-                                GROUP BY generated_timestamp
-                                ORDER BY generated_timestamp) AS chart;"""
+                         FROM pages
+                         WHERE {" AND ".join(pg_sub_query_chart)}
+                         GROUP BY step) AS chart;"""
         params = {"step_size": step_size,
                   "project_id": project_id,
                   "startTimestamp": startTimestamp,
                   "endTimestamp": endTimestamp, "value": url, **__get_constraint_values(args)}
         cur.execute(cur.mogrify(pg_query, params))
         row = cur.fetchone()
+        row["chart"] = metrics_helper.complete_steps(rows=row["chart"] or [], startTimestamp=startTimestamp,
+                                                     endTimestamp=endTimestamp, step_size=step_size,
+                                                     neutral={"value": 0})
     helper.__time_value(row)
     return row
 
 
 def get_impacted_sessions_by_slow_pages(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                                         endTimestamp=TimeUTC.now(), value=None, density=7, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query = __get_constraints(project_id=project_id, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=True, chart=True,
-                                           data=args)
+    pg_sub_query_chart = __get_constraints(project_id=project_id, data=args)
     pg_sub_query.append("pages.response_time IS NOT NULL")
     pg_sub_query_chart.append("pages.response_time IS NOT NULL")
     pg_sub_query.append("pages.response_time>0")
@@ -1371,52 +1273,44 @@ def get_impacted_sessions_by_slow_pages(project_id, startTimestamp=TimeUTC.now(d
     pg_sub_query_chart.append("avg_response_time>0")
     pg_sub_query_chart.append("pages.response_time>avg_response_time*2")
     with pg_client.PostgresClient() as cur:
-        pg_query = f"""SELECT generated_timestamp AS timestamp,
-                              COUNT(pages.session_id) AS count
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                             LEFT JOIN ( SELECT AVG(pages.response_time) AS avg_response_time
-                                         FROM events.pages INNER JOIN public.sessions USING (session_id)
-                                         WHERE {" AND ".join(pg_sub_query)}
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("sessions.start_ts")} AS step,
+                              COUNT(DISTINCT pages.session_id) AS count
+                        FROM events.pages INNER JOIN public.sessions USING (session_id)
+                             INNER JOIN ( SELECT AVG(pages.response_time) AS avg_response_time
+                                          FROM events.pages INNER JOIN public.sessions USING (session_id)
+                                          WHERE {" AND ".join(pg_sub_query)}
                              ) AS avg_response_time ON (avg_response_time>0)
-                        LEFT JOIN LATERAL ( SELECT DISTINCT pages.session_id
-                                             FROM events.pages INNER JOIN public.sessions USING (session_id)
-                                             WHERE {" AND ".join(pg_sub_query_chart)}
-                             ) AS pages ON (TRUE)
-                        GROUP BY generated_timestamp
-                        ORDER BY generated_timestamp;"""
+                        WHERE {" AND ".join(pg_sub_query_chart)}
+                        GROUP BY step;"""
         cur.execute(cur.mogrify(pg_query, {"step_size": step_size,
                                            "project_id": project_id,
                                            "startTimestamp": startTimestamp,
                                            "endTimestamp": endTimestamp,
                                            "value": value, **__get_constraint_values(args)}))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size, neutral={"count": 0})
     return rows
 
 
 def get_memory_consumption(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                            endTimestamp=TimeUTC.now(), density=7, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query = __get_constraints(project_id=project_id, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=True,
-                                           chart=True, data=args)
+    pg_sub_query_chart = __get_constraints(project_id=project_id, data=args)
 
     with pg_client.PostgresClient() as cur:
-        pg_query = f"""SELECT generated_timestamp AS timestamp,
-                            COALESCE(AVG(performance.avg_used_js_heap_size),0) AS value
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                             LEFT JOIN LATERAL (
-                                SELECT avg_used_js_heap_size 
-                                FROM events.performance INNER JOIN public.sessions USING (session_id)
-                                WHERE {" AND ".join(pg_sub_query_chart)}
-                            ) AS performance ON (TRUE) 
-                        GROUP BY generated_timestamp
-                        ORDER BY generated_timestamp ASC;"""
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("sessions.start_ts")} AS step,
+                              COALESCE(AVG(performance.avg_used_js_heap_size),0) AS value
+                        FROM events.performance INNER JOIN public.sessions USING (session_id)
+                        WHERE {" AND ".join(pg_sub_query_chart)}
+                        GROUP BY step;"""
         params = {"step_size": step_size,
                   "project_id": project_id,
                   "startTimestamp": startTimestamp,
                   "endTimestamp": endTimestamp, **__get_constraint_values(args)}
         cur.execute(cur.mogrify(pg_query, params))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size, neutral={"value": 0})
         pg_query = f"""SELECT COALESCE(AVG(performance.avg_used_js_heap_size),0) AS avg
                         FROM events.performance INNER JOIN public.sessions USING (session_id)
                         WHERE {" AND ".join(pg_sub_query)};"""
@@ -1427,28 +1321,23 @@ def get_memory_consumption(project_id, startTimestamp=TimeUTC.now(delta_days=-1)
 
 def get_avg_cpu(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                 endTimestamp=TimeUTC.now(), density=7, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query = __get_constraints(project_id=project_id, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=True,
-                                           chart=True, data=args)
+    pg_sub_query_chart = __get_constraints(project_id=project_id, data=args)
 
     with pg_client.PostgresClient() as cur:
-        pg_query = f"""SELECT generated_timestamp AS timestamp,
-                            COALESCE(AVG(performance.avg_cpu),0) AS value
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                             LEFT JOIN LATERAL (
-                                SELECT avg_cpu  
-                                FROM events.performance INNER JOIN public.sessions USING (session_id)
-                                WHERE {" AND ".join(pg_sub_query_chart)}
-                        ) AS performance ON (TRUE)
-                        GROUP BY generated_timestamp
-                        ORDER BY generated_timestamp ASC;"""
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("sessions.start_ts")} AS step,
+                              COALESCE(AVG(performance.avg_cpu),0) AS value
+                        FROM events.performance INNER JOIN public.sessions USING (session_id)
+                        WHERE {" AND ".join(pg_sub_query_chart)}
+                        GROUP BY step;"""
         params = {"step_size": step_size,
                   "project_id": project_id,
                   "startTimestamp": startTimestamp,
                   "endTimestamp": endTimestamp, **__get_constraint_values(args)}
         cur.execute(cur.mogrify(pg_query, params))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size, neutral={"value": 0})
         pg_query = f"""SELECT COALESCE(AVG(performance.avg_cpu),0) AS avg
                         FROM events.performance INNER JOIN public.sessions USING (session_id)
                         WHERE {" AND ".join(pg_sub_query)};"""
@@ -1460,29 +1349,24 @@ def get_avg_cpu(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
 
 def get_avg_fps(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                 endTimestamp=TimeUTC.now(), density=7, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query = __get_constraints(project_id=project_id, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=True,
-                                           chart=True, data=args)
+    pg_sub_query_chart = __get_constraints(project_id=project_id, data=args)
     pg_sub_query.append("performance.avg_fps>0")
     pg_sub_query_chart.append("performance.avg_fps>0")
     with pg_client.PostgresClient() as cur:
-        pg_query = f"""SELECT generated_timestamp AS timestamp,
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("sessions.start_ts")} AS step,
                               COALESCE(AVG(performance.avg_fps),0) AS value
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp 
-                            LEFT JOIN LATERAL (
-                                SELECT avg_fps 
-                                FROM events.performance INNER JOIN public.sessions USING (session_id)
-                                WHERE {" AND ".join(pg_sub_query_chart)}
-                        ) AS performance ON (TRUE)
-                        GROUP BY generated_timestamp
-                        ORDER BY generated_timestamp ASC;"""
+                        FROM events.performance INNER JOIN public.sessions USING (session_id)
+                        WHERE {" AND ".join(pg_sub_query_chart)}
+                        GROUP BY step;"""
         params = {"step_size": step_size,
                   "project_id": project_id,
                   "startTimestamp": startTimestamp,
                   "endTimestamp": endTimestamp, **__get_constraint_values(args)}
         cur.execute(cur.mogrify(pg_query, params))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size, neutral={"value": 0})
         pg_query = f"""SELECT COALESCE(AVG(performance.avg_fps),0) AS avg
                         FROM events.performance INNER JOIN public.sessions USING (session_id)
                         WHERE {" AND ".join(pg_sub_query)};"""
@@ -1493,31 +1377,24 @@ def get_avg_fps(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
 
 def get_crashes(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                 endTimestamp=TimeUTC.now(), density=7, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query = __get_constraints(project_id=project_id, data=args)
     pg_sub_query.append("m_issues.type = 'crash'")
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=True,
-                                           chart=True, data=args)
-    pg_sub_query_chart.append("m_issues.type = 'crash'")
     with pg_client.PostgresClient() as cur:
-        pg_query = f"""SELECT generated_timestamp AS timestamp,
-                               COUNT(sessions) AS value
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                                 LEFT JOIN LATERAL (
-                            SELECT sessions.session_id
-                            FROM public.sessions
-                                     INNER JOIN events_common.issues USING (session_id)
-                                     INNER JOIN public.issues AS m_issues USING (issue_id)
-                            WHERE {" AND ".join(pg_sub_query_chart)}
-                            ) AS sessions ON (TRUE)
-                        GROUP BY generated_timestamp
-                        ORDER BY generated_timestamp;"""
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("sessions.start_ts")} AS step,
+                               COUNT(sessions.session_id) AS value
+                        FROM public.sessions
+                                 INNER JOIN events_common.issues USING (session_id)
+                                 INNER JOIN public.issues AS m_issues USING (issue_id)
+                        WHERE {" AND ".join(pg_sub_query)}
+                        GROUP BY step;"""
         cur.execute(cur.mogrify(pg_query, {"step_size": step_size,
                                            "project_id": project_id,
                                            "startTimestamp": startTimestamp,
                                            "endTimestamp": endTimestamp,
                                            **__get_constraint_values(args)}))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size, neutral={"value": 0})
         pg_query = f"""SELECT b.user_browser AS browser,
                                 sum(bv.count) AS total,
                                 JSONB_AGG(bv) AS versions
@@ -1577,39 +1454,32 @@ def __merge_rows_with_neutral(rows, neutral):
 
 def get_domains_errors(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                        endTimestamp=TimeUTC.now(), density=6, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query_subset = __get_constraints(project_id=project_id, time_constraint=True, chart=False, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False, chart=True,
-                                           data=args, main_table="requests", time_column="timestamp", project=False,
-                                           duration=False)
     pg_sub_query_subset.append("requests.timestamp>=%(startTimestamp)s")
     pg_sub_query_subset.append("requests.timestamp<%(endTimestamp)s")
     pg_sub_query_subset.append("requests.status/100 = %(status_code)s")
 
     with pg_client.PostgresClient() as cur:
-        pg_query = f"""WITH requests AS(SELECT requests.host, timestamp 
-                                         FROM events_common.requests INNER JOIN public.sessions USING (session_id)
-                                         WHERE {" AND ".join(pg_sub_query_subset)}
-                                        )
-                        SELECT generated_timestamp AS timestamp,
-                              COALESCE(JSONB_AGG(requests) FILTER ( WHERE requests IS NOT NULL ), '[]'::JSONB) AS keys
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                        LEFT JOIN LATERAL ( SELECT requests.host, COUNT(*) AS count
-                                             FROM requests
-                                             WHERE {" AND ".join(pg_sub_query_chart)}
-                                             GROUP BY host
-                                             ORDER BY count DESC
-                                             LIMIT 5
-                             ) AS requests ON (TRUE)
-                        GROUP BY generated_timestamp
-                        ORDER BY generated_timestamp;"""
+        pg_query = f"""SELECT step,
+                              JSONB_AGG(JSONB_BUILD_OBJECT('host', host, 'count', count)) AS keys
+                        FROM (SELECT step, host, count,
+                                     ROW_NUMBER() OVER (PARTITION BY step ORDER BY count DESC) AS rank
+                              FROM (SELECT {metrics_helper.get_step_expression("requests.timestamp")} AS step,
+                                           requests.host, COUNT(*) AS count
+                                    FROM events_common.requests INNER JOIN public.sessions USING (session_id)
+                                    WHERE {" AND ".join(pg_sub_query_subset)}
+                                    GROUP BY step, requests.host) AS hosts) AS ranked_hosts
+                        WHERE rank <= 5
+                        GROUP BY step;"""
         params = {"project_id": project_id,
                   "startTimestamp": startTimestamp,
                   "endTimestamp": endTimestamp,
                   "step_size": step_size,
                   "status_code": 4, **__get_constraint_values(args)}
         cur.execute(cur.mogrify(pg_query, params))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size, neutral={"keys": []})
         rows = __nested_array_to_dict_array(rows, key="host")
         neutral = __get_neutral(rows)
         rows = __merge_rows_with_neutral(rows, neutral)
@@ -1617,7 +1487,8 @@ def get_domains_errors(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
         result = {"4xx": rows}
         params["status_code"] = 5
         cur.execute(cur.mogrify(pg_query, params))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size, neutral={"keys": []})
         rows = __nested_array_to_dict_array(rows, key="host")
         neutral = __get_neutral(rows)
         rows = __merge_rows_with_neutral(rows, neutral)
@@ -1627,37 +1498,32 @@ def get_domains_errors(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
 
 def __get_domains_errors_4xx_and_5xx(status, project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                                      endTimestamp=TimeUTC.now(), density=6, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query_subset = __get_constraints(project_id=project_id, time_constraint=True, chart=False, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False, chart=True,
-                                           data=args, main_table="requests", time_column="timestamp", project=False,
-                                           duration=False)
+    pg_sub_query_subset.append("requests.timestamp>=%(startTimestamp)s")
+    pg_sub_query_subset.append("requests.timestamp<%(endTimestamp)s")
     pg_sub_query_subset.append("requests.status_code/100 = %(status_code)s")
 
     with pg_client.PostgresClient() as cur:
-        pg_query = f"""WITH requests AS (SELECT host, timestamp 
-                                         FROM events_common.requests INNER JOIN public.sessions USING (session_id)
-                                         WHERE {" AND ".join(pg_sub_query_subset)}
-                     )
-                        SELECT generated_timestamp AS timestamp,
-                                      COALESCE(JSONB_AGG(requests) FILTER ( WHERE requests IS NOT NULL ), '[]'::JSONB) AS keys
-                                FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                                LEFT JOIN LATERAL ( SELECT requests.host, COUNT(*) AS count
-                                                     FROM requests
-                                                     WHERE {" AND ".join(pg_sub_query_chart)}
-                                                     GROUP BY host
-                                                     ORDER BY count DESC
-                                                     LIMIT 5
-                                     ) AS requests ON (TRUE)
-                                GROUP BY generated_timestamp
-                                ORDER BY generated_timestamp;"""
+        pg_query = f"""SELECT step,
+                              JSONB_AGG(JSONB_BUILD_OBJECT('host', host, 'count', count)) AS keys
+                        FROM (SELECT step, host, count,
+                                     ROW_NUMBER() OVER (PARTITION BY step ORDER BY count DESC) AS rank
+                              FROM (SELECT {metrics_helper.get_step_expression("requests.timestamp")} AS step,
+                                           requests.host, COUNT(*) AS count
+                                    FROM events_common.requests INNER JOIN public.sessions USING (session_id)
+                                    WHERE {" AND ".join(pg_sub_query_subset)}
+                                    GROUP BY step, requests.host) AS hosts) AS ranked_hosts
+                        WHERE rank <= 5
+                        GROUP BY step;"""
         params = {"project_id": project_id,
                   "startTimestamp": startTimestamp,
                   "endTimestamp": endTimestamp,
                   "step_size": step_size,
                   "status_code": status, **__get_constraint_values(args)}
         cur.execute(cur.mogrify(pg_query, params))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size, neutral={"keys": []})
         rows = __nested_array_to_dict_array(rows, key="host")
         neutral = __get_neutral(rows)
         rows = __merge_rows_with_neutral(rows, neutral)
@@ -1847,7 +1713,7 @@ def get_calls_errors_5xx(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
 
 def get_errors_per_type(project_id, startTimestamp=TimeUTC.now(delta_days=-1), endTimestamp=TimeUTC.now(),
                         platform=None, density=7, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
 
     pg_sub_query_subset = __get_constraints(project_id=project_id, data=args)
     pg_sub_query_subset.append("requests.timestamp>=%(startTimestamp)s")
@@ -1856,65 +1722,46 @@ def get_errors_per_type(project_id, startTimestamp=TimeUTC.now(delta_days=-1), e
 
     pg_sub_query_subset_e = __get_constraints(project_id=project_id, data=args, duration=False, main_table="m_errors",
                                               time_constraint=False)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False,
-                                           chart=True, data=args, main_table="", time_column="timestamp",
-                                           project=False, duration=False)
     pg_sub_query_subset_e.append("timestamp>=%(startTimestamp)s")
     pg_sub_query_subset_e.append("timestamp<%(endTimestamp)s")
 
     with pg_client.PostgresClient() as cur:
-        pg_query = f"""WITH requests AS (SELECT status_code AS status, timestamp
-                                       FROM events_common.requests
-                                                INNER JOIN public.sessions USING (session_id)
-                                       WHERE {" AND ".join(pg_sub_query_subset)}
-                            ),
-                         errors_integ AS (SELECT timestamp
-                                          FROM events.errors
-                                                   INNER JOIN public.errors AS m_errors USING (error_id)
-                                          WHERE {" AND ".join(pg_sub_query_subset_e)}
-                                            AND source != 'js_exception'
-                         ),
-                         errors_js AS (SELECT timestamp
-                                       FROM events.errors
-                                                INNER JOIN public.errors AS m_errors USING (error_id)
-                                       WHERE {" AND ".join(pg_sub_query_subset_e)}
-                                         AND source = 'js_exception'
-                         )
-                    SELECT generated_timestamp                                       AS timestamp,
-                           COALESCE(SUM(CASE WHEN status / 100 = 4 THEN 1 ELSE 0 END), 0) AS _4xx,
-                           COALESCE(SUM(CASE WHEN status / 100 = 5 THEN 1 ELSE 0 END), 0) AS _5xx,
-                           COALESCE((SELECT COUNT(*)
-                                     FROM errors_js
-                                     WHERE {" AND ".join(pg_sub_query_chart)}
-                                    ), 0)                                                 AS js,
-                           COALESCE((SELECT COUNT(*)
-                                     FROM errors_integ
-                                     WHERE {" AND ".join(pg_sub_query_chart)}
-                                    ), 0)                                                 AS integrations
-                    FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                             LEFT JOIN LATERAL (SELECT status
-                                                FROM requests
-                                                WHERE {" AND ".join(pg_sub_query_chart)}
-                        ) AS errors_partition ON (TRUE)
-                    GROUP BY timestamp
-                    ORDER BY timestamp;"""
+        pg_query = f"""SELECT step,
+                           COALESCE(_4xx, 0)         AS _4xx,
+                           COALESCE(_5xx, 0)         AS _5xx,
+                           COALESCE(js, 0)           AS js,
+                           COALESCE(integrations, 0) AS integrations
+                    FROM (SELECT {metrics_helper.get_step_expression("requests.timestamp")} AS step,
+                                 SUM(CASE WHEN requests.status_code / 100 = 4 THEN 1 ELSE 0 END) AS _4xx,
+                                 SUM(CASE WHEN requests.status_code / 100 = 5 THEN 1 ELSE 0 END) AS _5xx
+                          FROM events_common.requests
+                                   INNER JOIN public.sessions USING (session_id)
+                          WHERE {" AND ".join(pg_sub_query_subset)}
+                          GROUP BY step) AS requests
+                             FULL JOIN
+                         (SELECT {metrics_helper.get_step_expression("errors.timestamp")} AS step,
+                                 COUNT(1) FILTER (WHERE source = 'js_exception')  AS js,
+                                 COUNT(1) FILTER (WHERE source != 'js_exception') AS integrations
+                          FROM events.errors
+                                   INNER JOIN public.errors AS m_errors USING (error_id)
+                          WHERE {" AND ".join(pg_sub_query_subset_e)}
+                          GROUP BY step) AS errors USING (step);"""
         params = {"step_size": step_size,
                   "project_id": project_id,
                   "startTimestamp": startTimestamp,
                   "endTimestamp": endTimestamp, **__get_constraint_values(args)}
         cur.execute(cur.mogrify(pg_query, params))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size,
+                                             neutral={"_4xx": 0, "_5xx": 0, "js": 0, "integrations": 0})
         rows = helper.list_to_camel_case(rows)
     return rows
 
 
 def resource_type_vs_response_end(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                                   endTimestamp=TimeUTC.now(), density=7, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query_subset = __get_constraints(project_id=project_id, time_constraint=True, chart=False, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False, chart=True,
-                                           data=args, main_table="resources", time_column="timestamp", project=False,
-                                           duration=False)
     pg_sub_query_subset.append("resources.timestamp>=%(startTimestamp)s")
     pg_sub_query_subset.append("resources.timestamp<%(endTimestamp)s")
 
@@ -1923,65 +1770,38 @@ def resource_type_vs_response_end(project_id, startTimestamp=TimeUTC.now(delta_d
               "startTimestamp": startTimestamp,
               "endTimestamp": endTimestamp, **__get_constraint_values(args)}
     with pg_client.PostgresClient() as cur:
-        pg_query = f"""WITH resources AS(SELECT resources.type, resources.timestamp 
-                                        FROM events.resources INNER JOIN public.sessions USING (session_id)
-                                        WHERE {" AND ".join(pg_sub_query_subset)})
-                        SELECT generated_timestamp AS timestamp,
-                            COUNT(resources.*) AS total,
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("resources.timestamp")} AS step,
+                            COUNT(1) AS total,
                             SUM(CASE WHEN resources.type='fetch' THEN 1 ELSE 0 END) AS xhr
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                             LEFT JOIN LATERAL (SELECT resources.type 
-                                                FROM resources
-                                                WHERE {" AND ".join(pg_sub_query_chart)}) AS resources ON (TRUE)
-                        GROUP BY generated_timestamp
-                        ORDER BY generated_timestamp;"""
+                        FROM events.resources INNER JOIN public.sessions USING (session_id)
+                        WHERE {" AND ".join(pg_sub_query_subset)}
+                        GROUP BY step;"""
         cur.execute(cur.mogrify(pg_query, params))
-        actions = cur.fetchall()
+        actions = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                                endTimestamp=endTimestamp, step_size=step_size,
+                                                neutral={"total": 0, "xhr": 0})
         pg_sub_query_subset = __get_constraints(project_id=project_id, time_constraint=True, chart=False, data=args)
-        pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False, chart=True,
-                                               data=args, main_table="pages", time_column="timestamp",
-                                               project=False,
-                                               duration=False)
         pg_sub_query_subset.append("pages.timestamp>=%(startTimestamp)s")
         pg_sub_query_subset.append("pages.timestamp<%(endTimestamp)s")
         pg_sub_query_subset.append("pages.response_end IS NOT NULL")
         pg_sub_query_subset.append("pages.response_end>0")
-        pg_query = f"""WITH pages AS(SELECT pages.response_end, timestamp 
-                                    FROM events.pages INNER JOIN public.sessions USING (session_id)
-                                    WHERE {" AND ".join(pg_sub_query_subset)})
-                        SELECT generated_timestamp AS timestamp, 
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("pages.timestamp")} AS step, 
                             COALESCE(AVG(pages.response_end),0) AS avg_response_end
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                             LEFT JOIN LATERAL (SELECT pages.response_end 
-                                                FROM pages
-                                                WHERE {" AND ".join(pg_sub_query_chart)}) AS pages ON(TRUE)
-                        GROUP BY generated_timestamp
-                        ORDER BY generated_timestamp;"""
+                        FROM events.pages INNER JOIN public.sessions USING (session_id)
+                        WHERE {" AND ".join(pg_sub_query_subset)}
+                        GROUP BY step;"""
         cur.execute(cur.mogrify(pg_query, params))
-        response_end = cur.fetchall()
+        response_end = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                                     endTimestamp=endTimestamp, step_size=step_size,
+                                                     neutral={"avg_response_end": 0})
     return helper.list_to_camel_case(__merge_charts(response_end, actions))
 
 
 def get_impacted_sessions_by_js_errors(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                                        endTimestamp=TimeUTC.now(), density=7, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
-    pg_sub_query = __get_constraints(project_id=project_id, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=True,
-                                           chart=True, data=args)
-    pg_sub_query.append("m_errors.source = 'js_exception'")
-    pg_sub_query.append("m_errors.project_id = %(project_id)s")
-    pg_sub_query.append("errors.timestamp >= %(startTimestamp)s")
-    pg_sub_query.append("errors.timestamp <  %(endTimestamp)s")
-    pg_sub_query_chart.append("m_errors.source = 'js_exception'")
-    pg_sub_query_chart.append("m_errors.project_id = %(project_id)s")
-    pg_sub_query_chart.append("errors.timestamp >= generated_timestamp")
-    pg_sub_query_chart.append("errors.timestamp < generated_timestamp+ %(step_size)s")
-
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query_subset = __get_constraints(project_id=project_id, data=args, duration=False, main_table="m_errors",
                                             time_constraint=False)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False,
-                                           chart=True, data=args, main_table="errors", time_column="timestamp",
-                                           project=False, duration=False)
     pg_sub_query_subset.append("m_errors.source = 'js_exception'")
     pg_sub_query_subset.append("errors.timestamp>=%(startTimestamp)s")
     pg_sub_query_subset.append("errors.timestamp<%(endTimestamp)s")
@@ -1997,15 +1817,10 @@ def get_impacted_sessions_by_js_errors(project_id, startTimestamp=TimeUTC.now(de
                               FROM errors) AS counts
                                  LEFT JOIN
                              (SELECT jsonb_agg(chart) AS chart
-                              FROM (SELECT generated_timestamp            AS timestamp,
-                                           COALESCE(COUNT(session_id), 0) AS sessions_count
-                                    FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                                             LEFT JOIN LATERAL ( SELECT DISTINCT session_id
-                                                                 FROM errors
-                                                                 WHERE {" AND ".join(pg_sub_query_chart)}
-                                        ) AS sessions ON (TRUE)
-                                    GROUP BY generated_timestamp
-                                    ORDER BY generated_timestamp) AS chart) AS chart ON (TRUE);"""
+                              FROM (SELECT {metrics_helper.get_step_expression("errors.timestamp")} AS step,
+                                           COUNT(DISTINCT session_id) AS sessions_count
+                                    FROM errors
+                                    GROUP BY step) AS chart) AS chart ON (TRUE);"""
         cur.execute(cur.mogrify(pg_query, {"step_size": step_size,
                                            "project_id": project_id,
                                            "startTimestamp": startTimestamp,
@@ -2022,22 +1837,23 @@ def get_impacted_sessions_by_js_errors(project_id, startTimestamp=TimeUTC.now(de
                           FROM errors) AS counts
                              LEFT JOIN
                          (SELECT jsonb_agg(chart) AS chart
-                          FROM (SELECT generated_timestamp          AS timestamp,
-                                       COALESCE(COUNT(error_id), 0) AS errors_count
-                                FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                                         LEFT JOIN LATERAL ( SELECT DISTINCT errors.error_id
-                                                             FROM errors
-                                                             WHERE {" AND ".join(pg_sub_query_chart)}
-                                    ) AS errors ON (TRUE)
-                                GROUP BY generated_timestamp
-                                ORDER BY generated_timestamp) AS chart) AS chart ON (TRUE);"""
+                          FROM (SELECT {metrics_helper.get_step_expression("errors.timestamp")} AS step,
+                                       COUNT(DISTINCT errors.error_id) AS errors_count
+                                FROM errors
+                                GROUP BY step) AS chart) AS chart ON (TRUE);"""
         cur.execute(cur.mogrify(pg_query, {"step_size": step_size,
                                            "project_id": project_id,
                                            "startTimestamp": startTimestamp,
                                            "endTimestamp": endTimestamp,
                                            **__get_constraint_values(args)}))
         row_errors = cur.fetchone()
-        chart = __merge_charts(row_sessions.pop("chart"), row_errors.pop("chart"))
+        chart = __merge_charts(
+            metrics_helper.complete_steps(rows=row_sessions.pop("chart") or [], startTimestamp=startTimestamp,
+                                          endTimestamp=endTimestamp, step_size=step_size,
+                                          neutral={"sessions_count": 0}),
+            metrics_helper.complete_steps(rows=row_errors.pop("chart") or [], startTimestamp=startTimestamp,
+                                          endTimestamp=endTimestamp, step_size=step_size,
+                                          neutral={"errors_count": 0}))
         row_sessions = helper.dict_to_camel_case(row_sessions)
         row_errors = helper.dict_to_camel_case(row_errors)
     return {**row_sessions, **row_errors, "chart": chart}
@@ -2045,11 +1861,8 @@ def get_impacted_sessions_by_js_errors(project_id, startTimestamp=TimeUTC.now(de
 
 def get_resources_vs_visually_complete(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                                        endTimestamp=TimeUTC.now(), density=7, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query_subset = __get_constraints(project_id=project_id, time_constraint=True, chart=False, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False, chart=True,
-                                           data=args, main_table="", time_column="timestamp", project=False,
-                                           duration=False)
     pg_sub_query_subset.append("timestamp>=%(startTimestamp)s")
     pg_sub_query_subset.append("timestamp<%(endTimestamp)s")
     with pg_client.PostgresClient() as cur:
@@ -2061,32 +1874,37 @@ def get_resources_vs_visually_complete(project_id, startTimestamp=TimeUTC.now(de
                              pages AS (SELECT visually_complete, timestamp
                                        FROM events.pages
                                                 INNER JOIN public.sessions USING (session_id)
-                                       WHERE {" AND ".join(pg_sub_query_subset)} AND pages.visually_complete > 0) 
-                        SELECT generated_timestamp                                                             AS timestamp,
-                               COALESCE(jsonb_agg(resources_avg_count_by_type)
-                                        FILTER ( WHERE resources_avg_count_by_type IS NOT NULL ), '[]'::jsonb) AS types,
-                               COALESCE(AVG(total_count), 0)                                                   AS avg_count_resources,
-                               COALESCE(AVG(avg_time_to_render), 0)                                            AS avg_time_to_render
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                                 LEFT JOIN LATERAL (SELECT resources_count_by_session_by_type.type,
-                                                           avg(resources_count_by_session_by_type.count) AS avg_count,
-                                                           sum(resources_count_by_session_by_type.count) AS total_count
-                                                    FROM (SELECT resources.type, COUNT(*) AS count
-                                                          FROM resources
-                                                          WHERE {" AND ".join(pg_sub_query_chart)}
-                                                          GROUP BY resources.session_id, resources.type) AS resources_count_by_session_by_type
-                                                    GROUP BY resources_count_by_session_by_type.type) AS resources_avg_count_by_type ON (TRUE)
-                                 LEFT JOIN LATERAL (SELECT AVG(visually_complete) AS avg_time_to_render
-                                                    FROM pages
-                                                    WHERE {" AND ".join(pg_sub_query_chart)}
-                            ) AS time_to_render ON (TRUE)
-                        GROUP BY generated_timestamp
-                        ORDER BY generated_timestamp;"""
+                                       WHERE {" AND ".join(pg_sub_query_subset)} AND pages.visually_complete > 0),
+                             resources_avg_count_by_type AS (
+                                 SELECT step,
+                                        resources_count_by_session_by_type.type,
+                                        avg(resources_count_by_session_by_type.count) AS avg_count,
+                                        sum(resources_count_by_session_by_type.count) AS total_count
+                                 FROM (SELECT {metrics_helper.get_step_expression("resources.timestamp")} AS step,
+                                              resources.type, COUNT(*) AS count
+                                       FROM resources
+                                       GROUP BY step, resources.session_id, resources.type) AS resources_count_by_session_by_type
+                                 GROUP BY step, resources_count_by_session_by_type.type),
+                             time_to_render AS (SELECT {metrics_helper.get_step_expression("pages.timestamp")} AS step,
+                                                       AVG(visually_complete) AS avg_time_to_render
+                                                FROM pages
+                                                GROUP BY step)
+                        SELECT step,
+                               COALESCE(jsonb_agg(jsonb_build_object('type', type, 'avg_count', avg_count,
+                                                                     'total_count', total_count))
+                                        FILTER ( WHERE type IS NOT NULL ), '[]'::jsonb) AS types,
+                               COALESCE(AVG(total_count), 0)                            AS avg_count_resources,
+                               COALESCE(AVG(avg_time_to_render), 0)                     AS avg_time_to_render
+                        FROM resources_avg_count_by_type
+                                 FULL JOIN time_to_render USING (step)
+                        GROUP BY step;"""
         cur.execute(cur.mogrify(pg_query, {"step_size": step_size,
                                            "project_id": project_id,
                                            "startTimestamp": startTimestamp,
                                            "endTimestamp": endTimestamp, **__get_constraint_values(args)}))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size,
+                                             neutral={"types": [], "avg_count_resources": 0, "avg_time_to_render": 0})
     for r in rows:
         r["types"] = {t["type"]: t["avg_count"] for t in r["types"]}
 
@@ -2095,32 +1913,27 @@ def get_resources_vs_visually_complete(project_id, startTimestamp=TimeUTC.now(de
 
 def get_resources_count_by_type(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                                 endTimestamp=TimeUTC.now(), density=7, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query_subset = __get_constraints(project_id=project_id, time_constraint=True, chart=False, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False, chart=True,
-                                           data=args, main_table="resources", time_column="timestamp", project=False,
-                                           duration=False)
+    pg_sub_query_subset.append("resources.timestamp>=%(startTimestamp)s")
+    pg_sub_query_subset.append("resources.timestamp<%(endTimestamp)s")
 
     with pg_client.PostgresClient() as cur:
-        pg_query = f"""WITH resources AS (SELECT  resources.type, timestamp 
-                                            FROM events.resources INNER JOIN public.sessions USING (session_id)
-                                            WHERE {" AND ".join(pg_sub_query_subset)} 
-                        )
-                        SELECT generated_timestamp AS timestamp,
-                        COALESCE(JSONB_AGG(t) FILTER (WHERE t IS NOT NULL), '[]'::JSONB) AS types
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                            LEFT JOIN LATERAL (SELECT  resources.type, COUNT(*) AS count
-                                                FROM resources
-                                                WHERE {" AND ".join(pg_sub_query_chart)} 
-                                                GROUP BY resources.type
-                                            ) AS t ON(TRUE)
-                        GROUP BY timestamp
-                        ORDER BY timestamp;"""
+        pg_query = f"""SELECT step,
+                        JSONB_AGG(JSONB_BUILD_OBJECT('type', t.type, 'count', t.count)) AS types
+                        FROM (SELECT {metrics_helper.get_step_expression("resources.timestamp")} AS step,
+                                     resources.type, COUNT(*) AS count
+                              FROM events.resources INNER JOIN public.sessions USING (session_id)
+                              WHERE {" AND ".join(pg_sub_query_subset)} 
+                              GROUP BY step, resources.type
+                             ) AS t
+                        GROUP BY step;"""
         cur.execute(cur.mogrify(pg_query, {"step_size": step_size,
                                            "project_id": project_id,
                                            "startTimestamp": startTimestamp,
                                            "endTimestamp": endTimestamp, **__get_constraint_values(args)}))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size, neutral={"types": []})
         for r in rows:
             for t in r["types"]:
                 r[t["type"]] = t["count"]
@@ -2131,28 +1944,20 @@ def get_resources_count_by_type(project_id, startTimestamp=TimeUTC.now(delta_day
 
 def get_resources_by_party(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                            endTimestamp=TimeUTC.now(), density=7, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query_subset = __get_constraints(project_id=project_id, time_constraint=True,
                                             chart=False, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False, project=False,
-                                           chart=True, data=args, main_table="requests", time_column="timestamp",
-                                           duration=False)
     pg_sub_query_subset.append("requests.timestamp >= %(startTimestamp)s")
     pg_sub_query_subset.append("requests.timestamp < %(endTimestamp)s")
     # pg_sub_query_subset.append("resources.type IN ('fetch', 'script')")
     pg_sub_query_subset.append("requests.success = FALSE")
 
     with pg_client.PostgresClient() as cur:
-        pg_query = f"""WITH requests AS (
-                            SELECT requests.host, timestamp
-                            FROM events_common.requests
-                                     INNER JOIN public.sessions USING (session_id)
-                            WHERE {" AND ".join(pg_sub_query_subset)}
-                        )
-                        SELECT generated_timestamp                                                       AS timestamp,
-                               SUM(CASE WHEN first.host = sub_requests.host THEN 1 ELSE 0 END)  AS first_party,
-                               SUM(CASE WHEN first.host != sub_requests.host THEN 1 ELSE 0 END) AS third_party
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("requests.timestamp")} AS step,
+                               SUM(CASE WHEN first.host = requests.host THEN 1 ELSE 0 END)  AS first_party,
+                               SUM(CASE WHEN first.host != requests.host THEN 1 ELSE 0 END) AS third_party
+                        FROM events_common.requests
+                                 INNER JOIN public.sessions USING (session_id)
                                  LEFT JOIN (
                             SELECT requests.host,
                                    COUNT(requests.session_id) AS count
@@ -2168,19 +1973,16 @@ def get_resources_by_party(project_id, startTimestamp=TimeUTC.now(delta_days=-1)
                             ORDER BY count DESC
                             LIMIT 1
                         ) AS first ON (TRUE)
-                                 LEFT JOIN LATERAL (
-                            SELECT requests.host
-                            FROM requests
-                            WHERE {" AND ".join(pg_sub_query_chart)}
-                            ) AS sub_requests ON (TRUE)
-                        GROUP BY generated_timestamp
-                        ORDER BY generated_timestamp;"""
+                        WHERE {" AND ".join(pg_sub_query_subset)}
+                        GROUP BY step;"""
         cur.execute(cur.mogrify(pg_query, {"step_size": step_size,
                                            "project_id": project_id,
                                            "startTimestamp": startTimestamp,
                                            "endTimestamp": endTimestamp, **__get_constraint_values(args)}))
 
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size,
+                                             neutral={"first_party": 0, "third_party": 0})
     return rows
 
 
@@ -2217,7 +2019,7 @@ def get_application_activity_avg_image_load_time(project_id, startTimestamp=Time
 def get_performance_avg_image_load_time(cur, project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                                         endTimestamp=TimeUTC.now(),
                                         density=19, **args):
-    step_size = __get_step_size(endTimestamp=endTimestamp, startTimestamp=startTimestamp, density=density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     img_constraints = []
 
     img_constraints_vals = {}
@@ -2226,30 +2028,19 @@ def get_performance_avg_image_load_time(cur, project_id, startTimestamp=TimeUTC.
               "endTimestamp": endTimestamp}
     pg_sub_query_subset = __get_constraints(project_id=project_id, time_constraint=True,
                                             chart=False, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False, project=False,
-                                           chart=True, data=args, main_table="resources", time_column="timestamp",
-                                           duration=False)
     pg_sub_query_subset.append("resources.timestamp >= %(startTimestamp)s")
     pg_sub_query_subset.append("resources.timestamp < %(endTimestamp)s")
 
-    pg_query = f"""WITH resources AS (SELECT resources.duration, resources.timestamp 
-                                    FROM events.resources INNER JOIN public.sessions USING (session_id)
-                                    WHERE {" AND ".join(pg_sub_query_subset)}
-                                      AND resources.type = 'img' AND resources.duration>0
-                                      {(f' AND ({" OR ".join(img_constraints)})') if len(img_constraints) > 0 else ""}
-                    )
-                SELECT   generated_timestamp AS timestamp,
+    pg_query = f"""SELECT {metrics_helper.get_step_expression("resources.timestamp")} AS step,
                          COALESCE(AVG(resources.duration),0) AS value 
-                  FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                    LEFT JOIN LATERAL ( 
-                            SELECT resources.duration
-                            FROM resources
-                            WHERE {" AND ".join(pg_sub_query_chart)}
-                    ) AS resources ON (TRUE)
-                  GROUP BY timestamp
-                  ORDER BY timestamp;"""
+                  FROM events.resources INNER JOIN public.sessions USING (session_id)
+                  WHERE {" AND ".join(pg_sub_query_subset)}
+                    AND resources.type = 'img' AND resources.duration>0
+                    {(f' AND ({" OR ".join(img_constraints)})') if len(img_constraints) > 0 else ""}
+                  GROUP BY step;"""
     cur.execute(cur.mogrify(pg_query, {**params, **img_constraints_vals, **__get_constraint_values(args)}))
-    rows = cur.fetchall()
+    rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                         endTimestamp=endTimestamp, step_size=step_size, neutral={"value": 0})
     rows = helper.list_to_camel_case(rows)
 
     return rows
@@ -2258,7 +2049,7 @@ def get_performance_avg_image_load_time(cur, project_id, startTimestamp=TimeUTC.
 def __get_application_activity_avg_page_load_time(cur, project_id, startTimestamp, endTimestamp, **args):
     pg_sub_query = __get_constraints(project_id=project_id, data=args)
     pg_sub_query.append("pages.timestamp >= %(startTimestamp)s")
-    pg_sub_query.append("pages.timestamp > %(endTimestamp)s")
+    pg_sub_query.append("pages.timestamp < %(endTimestamp)s")
     pg_sub_query.append("pages.load_time > 0")
     pg_sub_query.append("pages.load_time IS NOT NULL")
     pg_query = f"""SELECT COALESCE(AVG(pages.load_time) ,0) AS value
@@ -2292,35 +2083,24 @@ def get_application_activity_avg_page_load_time(project_id, startTimestamp=TimeU
 def get_performance_avg_page_load_time(cur, project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                                        endTimestamp=TimeUTC.now(),
                                        density=19, **args):
-    step_size = __get_step_size(endTimestamp=endTimestamp, startTimestamp=startTimestamp, density=density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     location_constraints = []
     location_constraints_vals = {}
     params = {"step_size": step_size, "project_id": project_id, "startTimestamp": startTimestamp,
               "endTimestamp": endTimestamp}
     pg_sub_query_subset = __get_constraints(project_id=project_id, time_constraint=True,
                                             chart=False, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False, project=False,
-                                           chart=True, data=args, main_table="pages", time_column="timestamp",
-                                           duration=False)
     pg_sub_query_subset.append("pages.timestamp >= %(startTimestamp)s")
     pg_sub_query_subset.append("pages.timestamp < %(endTimestamp)s")
-    pg_query = f"""WITH pages AS(SELECT pages.load_time, timestamp 
-                                FROM events.pages INNER JOIN public.sessions USING (session_id)
-                                WHERE {" AND ".join(pg_sub_query_subset)} AND pages.load_time>0 AND pages.load_time IS NOT NULL
-                                  {(f' AND ({" OR ".join(location_constraints)})') if len(location_constraints) > 0 else ""}
-                    )
-                    SELECT generated_timestamp AS timestamp,
+    pg_query = f"""SELECT {metrics_helper.get_step_expression("pages.timestamp")} AS step,
                          COALESCE(AVG(pages.load_time),0) AS value 
-                    FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                    LEFT JOIN LATERAL ( SELECT pages.load_time
-                                        FROM pages 
-                                        WHERE {" AND ".join(pg_sub_query_chart)}  
-                                          {(f' AND ({" OR ".join(location_constraints)})') if len(location_constraints) > 0 else ""}
-                                        ) AS pages ON (TRUE)
-                    GROUP BY generated_timestamp
-                    ORDER BY generated_timestamp;"""
+                    FROM events.pages INNER JOIN public.sessions USING (session_id)
+                    WHERE {" AND ".join(pg_sub_query_subset)} AND pages.load_time>0 AND pages.load_time IS NOT NULL
+                      {(f' AND ({" OR ".join(location_constraints)})') if len(location_constraints) > 0 else ""}
+                    GROUP BY step;"""
     cur.execute(cur.mogrify(pg_query, {**params, **location_constraints_vals, **__get_constraint_values(args)}))
-    rows = cur.fetchall()
+    rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                         endTimestamp=endTimestamp, step_size=step_size, neutral={"value": 0})
     return rows
 
 
@@ -2361,7 +2141,7 @@ def get_application_activity_avg_request_load_time(project_id, startTimestamp=Ti
 def get_performance_avg_request_load_time(cur, project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                                           endTimestamp=TimeUTC.now(),
                                           density=19, **args):
-    step_size = __get_step_size(endTimestamp=endTimestamp, startTimestamp=startTimestamp, density=density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     request_constraints = []
     request_constraints_vals = {}
 
@@ -2370,30 +2150,19 @@ def get_performance_avg_request_load_time(cur, project_id, startTimestamp=TimeUT
 
     pg_sub_query_subset = __get_constraints(project_id=project_id, time_constraint=True,
                                             chart=False, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False, project=False,
-                                           chart=True, data=args, main_table="resources", time_column="timestamp",
-                                           duration=False)
     pg_sub_query_subset.append("resources.timestamp >= %(startTimestamp)s")
     pg_sub_query_subset.append("resources.timestamp < %(endTimestamp)s")
 
-    pg_query = f"""WITH resources AS(SELECT resources.duration, resources.timestamp 
-                                        FROM events.resources INNER JOIN public.sessions USING (session_id)
-                                        WHERE {" AND ".join(pg_sub_query_subset)} 
-                                        AND resources.type = 'fetch' AND resources.duration>0  
-                                        {(f' AND ({" OR ".join(request_constraints)})') if len(request_constraints) > 0 else ""}
-                    )
-                    SELECT generated_timestamp AS timestamp,
+    pg_query = f"""SELECT {metrics_helper.get_step_expression("resources.timestamp")} AS step,
                          COALESCE(AVG(resources.duration),0) AS value 
-                  FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                    LEFT JOIN LATERAL ( 
-                            SELECT resources.duration
-                            FROM resources
-                            WHERE {" AND ".join(pg_sub_query_chart)} 
-                    ) AS resources ON (TRUE)
-                  GROUP BY generated_timestamp
-                  ORDER BY generated_timestamp;"""
+                  FROM events.resources INNER JOIN public.sessions USING (session_id)
+                  WHERE {" AND ".join(pg_sub_query_subset)} 
+                    AND resources.type = 'fetch' AND resources.duration>0  
+                    {(f' AND ({" OR ".join(request_constraints)})') if len(request_constraints) > 0 else ""}
+                  GROUP BY step;"""
     cur.execute(cur.mogrify(pg_query, {**params, **request_constraints_vals, **__get_constraint_values(args)}))
-    rows = cur.fetchall()
+    rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                         endTimestamp=endTimestamp, step_size=step_size, neutral={"value": 0})
 
     return rows
 
@@ -2435,34 +2204,23 @@ def __get_page_metrics_avg_dom_content_load_start(cur, project_id, startTimestam
 
 def __get_page_metrics_avg_dom_content_load_start_chart(cur, project_id, startTimestamp, endTimestamp, density=19,
                                                         **args):
-    step_size = __get_step_size(endTimestamp=endTimestamp, startTimestamp=startTimestamp, density=density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     params = {"step_size": step_size, "project_id": project_id, "startTimestamp": startTimestamp,
               "endTimestamp": endTimestamp}
     pg_sub_query_subset = __get_constraints(project_id=project_id, time_constraint=True,
                                             chart=False, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False, project=False,
-                                           chart=True, data=args, main_table="pages", time_column="timestamp",
-                                           duration=False)
     pg_sub_query_subset.append("pages.timestamp >= %(startTimestamp)s")
     pg_sub_query_subset.append("pages.timestamp < %(endTimestamp)s")
     pg_sub_query_subset.append("pages.dom_content_loaded_time > 0")
 
-    pg_query = f"""WITH pages AS(SELECT pages.dom_content_loaded_time, pages.timestamp
-                                    FROM events.pages INNER JOIN public.sessions USING (session_id)
-                                    WHERE {" AND ".join(pg_sub_query_subset)}
-                    )
-                    SELECT generated_timestamp AS timestamp,
-                         COALESCE(AVG(pages.dom_content_loaded_time),0) AS value
-                      FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                        LEFT JOIN LATERAL (
-                                SELECT pages.dom_content_loaded_time
-                                FROM pages
-                                WHERE {" AND ".join(pg_sub_query_chart)}
-                        ) AS pages ON (TRUE)
-                      GROUP BY generated_timestamp
-                      ORDER BY generated_timestamp;"""
+    pg_query = f"""SELECT {metrics_helper.get_step_expression("pages.timestamp")} AS step,
+                          COALESCE(AVG(pages.dom_content_loaded_time),0) AS value
+                   FROM events.pages INNER JOIN public.sessions USING (session_id)
+                   WHERE {" AND ".join(pg_sub_query_subset)}
+                   GROUP BY step;"""
     cur.execute(cur.mogrify(pg_query, {**params, **__get_constraint_values(args)}))
-    rows = cur.fetchall()
+    rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                         endTimestamp=endTimestamp, step_size=step_size, neutral={"value": 0})
     return rows
 
 
@@ -2505,34 +2263,23 @@ def __get_page_metrics_avg_first_contentful_pixel(cur, project_id, startTimestam
 
 def __get_page_metrics_avg_first_contentful_pixel_chart(cur, project_id, startTimestamp, endTimestamp, density=20,
                                                         **args):
-    step_size = __get_step_size(endTimestamp=endTimestamp, startTimestamp=startTimestamp, density=density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     params = {"step_size": step_size, "project_id": project_id, "startTimestamp": startTimestamp,
               "endTimestamp": endTimestamp}
     pg_sub_query_subset = __get_constraints(project_id=project_id, time_constraint=True,
                                             chart=False, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False, project=False,
-                                           chart=True, data=args, main_table="pages", time_column="timestamp",
-                                           duration=False)
     pg_sub_query_subset.append("pages.timestamp >= %(startTimestamp)s")
     pg_sub_query_subset.append("pages.timestamp < %(endTimestamp)s")
     pg_sub_query_subset.append("pages.first_contentful_paint_time > 0")
 
-    pg_query = f"""WITH pages AS(SELECT pages.first_contentful_paint_time, pages.timestamp
-                                    FROM events.pages INNER JOIN public.sessions USING (session_id)
-                                    WHERE {" AND ".join(pg_sub_query_subset)}
-                    )
-                    SELECT generated_timestamp AS timestamp,
-                         COALESCE(AVG(pages.first_contentful_paint_time),0) AS value
-                      FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                        LEFT JOIN LATERAL (
-                                SELECT pages.first_contentful_paint_time
-                                FROM pages
-                                WHERE {" AND ".join(pg_sub_query_chart)}
-                        ) AS pages ON (TRUE)
-                      GROUP BY generated_timestamp
-                      ORDER BY generated_timestamp;"""
+    pg_query = f"""SELECT {metrics_helper.get_step_expression("pages.timestamp")} AS step,
+                          COALESCE(AVG(pages.first_contentful_paint_time),0) AS value
+                   FROM events.pages INNER JOIN public.sessions USING (session_id)
+                   WHERE {" AND ".join(pg_sub_query_subset)}
+                   GROUP BY step;"""
     cur.execute(cur.mogrify(pg_query, {**params, **__get_constraint_values(args)}))
-    rows = cur.fetchall()
+    rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                         endTimestamp=endTimestamp, step_size=step_size, neutral={"value": 0})
     return rows
 
 
@@ -2570,32 +2317,21 @@ def __get_user_activity_avg_visited_pages(cur, project_id, startTimestamp, endTi
 
 
 def __get_user_activity_avg_visited_pages_chart(cur, project_id, startTimestamp, endTimestamp, density=20, **args):
-    step_size = __get_step_size(endTimestamp=endTimestamp, startTimestamp=startTimestamp, density=density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     params = {"step_size": step_size, "project_id": project_id, "startTimestamp": startTimestamp,
               "endTimestamp": endTimestamp}
     pg_sub_query_subset = __get_constraints(project_id=project_id, time_constraint=True,
                                             chart=False, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False, project=False,
-                                           chart=True, data=args, main_table="sessions", time_column="start_ts",
-                                           duration=False)
     pg_sub_query_subset.append("sessions.duration IS NOT NULL")
 
-    pg_query = f"""WITH sessions AS(SELECT sessions.pages_count, sessions.start_ts
-                                    FROM public.sessions
-                                    WHERE {" AND ".join(pg_sub_query_subset)}
-                    )
-                    SELECT generated_timestamp AS timestamp,
+    pg_query = f"""SELECT {metrics_helper.get_step_expression("sessions.start_ts")} AS step,
                          COALESCE(AVG(sessions.pages_count),0) AS value
-                      FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                        LEFT JOIN LATERAL (
-                                SELECT sessions.pages_count
-                                FROM sessions
-                                WHERE {" AND ".join(pg_sub_query_chart)}
-                        ) AS sessions ON (TRUE)
-                      GROUP BY generated_timestamp
-                      ORDER BY generated_timestamp;"""
+                      FROM public.sessions
+                      WHERE {" AND ".join(pg_sub_query_subset)}
+                      GROUP BY step;"""
     cur.execute(cur.mogrify(pg_query, {**params, **__get_constraint_values(args)}))
-    rows = cur.fetchall()
+    rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                         endTimestamp=endTimestamp, step_size=step_size, neutral={"value": 0})
     return rows
 
 
@@ -2634,45 +2370,31 @@ def __get_user_activity_avg_session_duration(cur, project_id, startTimestamp, en
 
 
 def __get_user_activity_avg_session_duration_chart(cur, project_id, startTimestamp, endTimestamp, density=20, **args):
-    step_size = __get_step_size(endTimestamp=endTimestamp, startTimestamp=startTimestamp, density=density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     params = {"step_size": step_size, "project_id": project_id, "startTimestamp": startTimestamp,
               "endTimestamp": endTimestamp}
     pg_sub_query_subset = __get_constraints(project_id=project_id, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False, project=False,
-                                           chart=True, data=args, main_table="sessions", time_column="start_ts",
-                                           duration=False)
     pg_sub_query_subset.append("sessions.duration IS NOT NULL")
     pg_sub_query_subset.append("sessions.duration > 0")
 
-    pg_query = f"""WITH sessions AS(SELECT sessions.duration, sessions.start_ts
-                                        FROM public.sessions
-                                        WHERE {" AND ".join(pg_sub_query_subset)}
-                        )
-                        SELECT generated_timestamp AS timestamp,
+    pg_query = f"""SELECT {metrics_helper.get_step_expression("sessions.start_ts")} AS step,
                              COALESCE(AVG(sessions.duration),0) AS value
-                          FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                            LEFT JOIN LATERAL (
-                                    SELECT sessions.duration
-                                    FROM sessions
-                                    WHERE {" AND ".join(pg_sub_query_chart)}
-                            ) AS sessions ON (TRUE)
-                          GROUP BY generated_timestamp
-                          ORDER BY generated_timestamp;"""
+                          FROM public.sessions
+                          WHERE {" AND ".join(pg_sub_query_subset)}
+                          GROUP BY step;"""
     cur.execute(cur.mogrify(pg_query, {**params, **__get_constraint_values(args)}))
-    rows = cur.fetchall()
+    rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                         endTimestamp=endTimestamp, step_size=step_size, neutral={"value": 0})
     return rows
 
 
 def get_top_metrics_avg_response_time(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                                       endTimestamp=TimeUTC.now(), value=None, density=20, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query = __get_constraints(project_id=project_id, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=True,
-                                           chart=True, data=args)
 
     if value is not None:
         pg_sub_query.append("pages.path = %(value)s")
-        pg_sub_query_chart.append("pages.path = %(value)s")
     with pg_client.PostgresClient() as cur:
         pg_query = f"""SELECT COALESCE(AVG(pages.response_time), 0) AS value
                        FROM events.pages
@@ -2687,18 +2409,14 @@ def get_top_metrics_avg_response_time(project_id, startTimestamp=TimeUTC.now(del
                   "value": value, **__get_constraint_values(args)}
         cur.execute(cur.mogrify(pg_query, params))
         row = cur.fetchone()
-        pg_query = f"""SELECT generated_timestamp AS timestamp,
-                                              COALESCE(AVG(pages.response_time),0) AS value
-                                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp 
-                                            LEFT JOIN LATERAL (
-                                                SELECT response_time 
-                                                FROM events.pages INNER JOIN public.sessions USING (session_id)
-                                                WHERE {" AND ".join(pg_sub_query_chart)} AND pages.response_time > 0
-                                        ) AS pages ON (TRUE)
-                                        GROUP BY generated_timestamp
-                                        ORDER BY generated_timestamp ASC;"""
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("sessions.start_ts")} AS step,
+                              COALESCE(AVG(pages.response_time),0) AS value
+                        FROM events.pages INNER JOIN public.sessions USING (session_id)
+                        WHERE {" AND ".join(pg_sub_query)} AND pages.response_time > 0
+                        GROUP BY step;"""
         cur.execute(cur.mogrify(pg_query, params))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size, neutral={"value": 0})
         row["chart"] = helper.list_to_camel_case(rows)
     helper.__time_value(row)
     return helper.dict_to_camel_case(row)
@@ -2706,14 +2424,11 @@ def get_top_metrics_avg_response_time(project_id, startTimestamp=TimeUTC.now(del
 
 def get_top_metrics_avg_first_paint(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                                     endTimestamp=TimeUTC.now(), value=None, density=20, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query = __get_constraints(project_id=project_id, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=True,
-                                           chart=True, data=args)
 
     if value is not None:
         pg_sub_query.append("pages.path = %(value)s")
-        pg_sub_query_chart.append("pages.path = %(value)s")
     with pg_client.PostgresClient() as cur:
         pg_query = f"""SELECT COALESCE(AVG(pages.first_paint_time), 0) AS value
                        FROM events.pages
@@ -2728,18 +2443,14 @@ def get_top_metrics_avg_first_paint(project_id, startTimestamp=TimeUTC.now(delta
                   "value": value, **__get_constraint_values(args)}
         cur.execute(cur.mogrify(pg_query, params))
         row = cur.fetchone()
-        pg_query = f"""SELECT generated_timestamp AS timestamp,
-                                      COALESCE(AVG(pages.first_paint_time),0) AS value
-                                FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp 
-                                    LEFT JOIN LATERAL (
-                                        SELECT first_paint_time 
-                                        FROM events.pages INNER JOIN public.sessions USING (session_id)
-                                        WHERE {" AND ".join(pg_sub_query_chart)} AND pages.first_paint_time > 0
-                                ) AS pages ON (TRUE)
-                                GROUP BY generated_timestamp
-                                ORDER BY generated_timestamp ASC;"""
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("sessions.start_ts")} AS step,
+                              COALESCE(AVG(pages.first_paint_time),0) AS value
+                        FROM events.pages INNER JOIN public.sessions USING (session_id)
+                        WHERE {" AND ".join(pg_sub_query)} AND pages.first_paint_time > 0
+                        GROUP BY step;"""
         cur.execute(cur.mogrify(pg_query, params))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size, neutral={"value": 0})
         row["chart"] = helper.list_to_camel_case(rows)
     helper.__time_value(row)
     return helper.dict_to_camel_case(row)
@@ -2747,15 +2458,11 @@ def get_top_metrics_avg_first_paint(project_id, startTimestamp=TimeUTC.now(delta
 
 def get_top_metrics_avg_dom_content_loaded(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                                            endTimestamp=TimeUTC.now(), value=None, density=19, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query = __get_constraints(project_id=project_id, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=True,
-                                           chart=True, data=args)
     pg_sub_query.append("pages.dom_content_loaded_time>0")
-    pg_sub_query_chart.append("pages.dom_content_loaded_time>0")
     if value is not None:
         pg_sub_query.append("pages.path = %(value)s")
-        pg_sub_query_chart.append("pages.path = %(value)s")
     with pg_client.PostgresClient() as cur:
         pg_query = f"""SELECT COALESCE(AVG(pages.dom_content_loaded_time), 0) AS value
                        FROM events.pages
@@ -2772,18 +2479,14 @@ def get_top_metrics_avg_dom_content_loaded(project_id, startTimestamp=TimeUTC.no
         cur.execute(cur.mogrify(pg_query, params))
         row = cur.fetchone()
 
-        pg_query = f"""SELECT generated_timestamp AS timestamp,
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("sessions.start_ts")} AS step,
                               COALESCE(AVG(pages.dom_content_loaded_time),0) AS value
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp 
-                            LEFT JOIN LATERAL (
-                                SELECT dom_content_loaded_time 
-                                FROM events.pages INNER JOIN public.sessions USING (session_id)
-                                WHERE {" AND ".join(pg_sub_query_chart)}
-                        ) AS pages ON (TRUE)
-                        GROUP BY generated_timestamp
-                        ORDER BY generated_timestamp ASC;"""
+                        FROM events.pages INNER JOIN public.sessions USING (session_id)
+                        WHERE {" AND ".join(pg_sub_query)}
+                        GROUP BY step;"""
         cur.execute(cur.mogrify(pg_query, params))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size, neutral={"value": 0})
         row["chart"] = helper.list_to_camel_case(rows)
     helper.__time_value(row)
     return helper.dict_to_camel_case(row)
@@ -2791,14 +2494,11 @@ def get_top_metrics_avg_dom_content_loaded(project_id, startTimestamp=TimeUTC.no
 
 def get_top_metrics_avg_till_first_bit(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                                        endTimestamp=TimeUTC.now(), value=None, density=20, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query = __get_constraints(project_id=project_id, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=True,
-                                           chart=True, data=args)
 
     if value is not None:
         pg_sub_query.append("pages.path = %(value)s")
-        pg_sub_query_chart.append("pages.path = %(value)s")
     with pg_client.PostgresClient() as cur:
         pg_query = f"""SELECT COALESCE(AVG(pages.ttfb), 0) AS value
                        FROM events.pages
@@ -2813,18 +2513,14 @@ def get_top_metrics_avg_till_first_bit(project_id, startTimestamp=TimeUTC.now(de
                   "value": value, **__get_constraint_values(args)}
         cur.execute(cur.mogrify(pg_query, params))
         row = cur.fetchone()
-        pg_query = f"""SELECT generated_timestamp AS timestamp,
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("sessions.start_ts")} AS step,
                               COALESCE(AVG(pages.ttfb),0) AS value
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp 
-                            LEFT JOIN LATERAL (
-                                SELECT ttfb 
-                                FROM events.pages INNER JOIN public.sessions USING (session_id)
-                                WHERE {" AND ".join(pg_sub_query_chart)} AND pages.ttfb > 0
-                        ) AS pages ON (TRUE)
-                        GROUP BY generated_timestamp
-                        ORDER BY generated_timestamp ASC;"""
+                        FROM events.pages INNER JOIN public.sessions USING (session_id)
+                        WHERE {" AND ".join(pg_sub_query)} AND pages.ttfb > 0
+                        GROUP BY step;"""
         cur.execute(cur.mogrify(pg_query, params))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size, neutral={"value": 0})
         row["chart"] = helper.list_to_camel_case(rows)
     helper.__time_value(row)
     return helper.dict_to_camel_case(row)
@@ -2832,16 +2528,12 @@ def get_top_metrics_avg_till_first_bit(project_id, startTimestamp=TimeUTC.now(de
 
 def get_top_metrics_avg_time_to_interactive(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                                             endTimestamp=TimeUTC.now(), value=None, density=20, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query = __get_constraints(project_id=project_id, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=True,
-                                           chart=True, data=args)
 
     pg_sub_query.append("pages.time_to_interactive > 0")
-    pg_sub_query_chart.append("pages.time_to_interactive > 0")
     if value is not None:
         pg_sub_query.append("pages.path = %(value)s")
-        pg_sub_query_chart.append("pages.path = %(value)s")
     with pg_client.PostgresClient() as cur:
         pg_query = f"""SELECT COALESCE(AVG(pages.time_to_interactive), 0) AS value
                        FROM events.pages
@@ -2855,18 +2547,14 @@ def get_top_metrics_avg_time_to_interactive(project_id, startTimestamp=TimeUTC.n
                   "value": value, **__get_constraint_values(args)}
         cur.execute(cur.mogrify(pg_query, params))
         row = cur.fetchone()
-        pg_query = f"""SELECT generated_timestamp AS timestamp,
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("sessions.start_ts")} AS step,
                               COALESCE(AVG(pages.time_to_interactive),0) AS value
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp 
-                            LEFT JOIN LATERAL (
-                                SELECT time_to_interactive 
-                                FROM events.pages INNER JOIN public.sessions USING (session_id)
-                                WHERE {" AND ".join(pg_sub_query_chart)}
-                        ) AS pages ON (TRUE)
-                        GROUP BY generated_timestamp
-                        ORDER BY generated_timestamp ASC;"""
+                        FROM events.pages INNER JOIN public.sessions USING (session_id)
+                        WHERE {" AND ".join(pg_sub_query)}
+                        GROUP BY step;"""
         cur.execute(cur.mogrify(pg_query, params))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size, neutral={"value": 0})
         row["chart"] = helper.list_to_camel_case(rows)
     helper.__time_value(row)
     return helper.dict_to_camel_case(row)
@@ -2874,17 +2562,13 @@ def get_top_metrics_avg_time_to_interactive(project_id, startTimestamp=TimeUTC.n
 
 def get_top_metrics_count_requests(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                                    endTimestamp=TimeUTC.now(), value=None, density=20, **args):
-    step_size = __get_step_size(endTimestamp=endTimestamp, startTimestamp=startTimestamp, density=density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     params = {"step_size": step_size, "project_id": project_id, "startTimestamp": startTimestamp,
               "endTimestamp": endTimestamp}
     pg_sub_query = __get_constraints(project_id=project_id, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=False, project=False,
-                                           chart=True, data=args, main_table="pages", time_column="timestamp",
-                                           duration=False)
 
     if value is not None:
         pg_sub_query.append("pages.path = %(value)s")
-        pg_sub_query_chart.append("pages.path = %(value)s")
     with pg_client.PostgresClient() as cur:
         pg_query = f"""SELECT COUNT(pages.session_id) AS value
                         FROM events.pages INNER JOIN public.sessions USING (session_id)
@@ -2894,22 +2578,16 @@ def get_top_metrics_count_requests(project_id, startTimestamp=TimeUTC.now(delta_
                                            "endTimestamp": endTimestamp,
                                            "value": value, **__get_constraint_values(args)}))
         row = cur.fetchone()
-        pg_query = f"""WITH pages AS(SELECT pages.timestamp
-                                                FROM events.pages INNER JOIN public.sessions USING (session_id)
-                                                WHERE {" AND ".join(pg_sub_query)}
-                                )
-                    SELECT generated_timestamp AS timestamp,
-                         COUNT(pages.*) AS value
-                      FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                        LEFT JOIN LATERAL (
-                                SELECT 1
-                                FROM pages
-                                WHERE {" AND ".join(pg_sub_query_chart)}
-                        ) AS pages ON (TRUE)
-                      GROUP BY generated_timestamp
-                      ORDER BY generated_timestamp;"""
-        cur.execute(cur.mogrify(pg_query, {**params, **__get_constraint_values(args)}))
-        rows = cur.fetchall()
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("pages.timestamp")} AS step,
+                         COUNT(1) AS value
+                      FROM events.pages INNER JOIN public.sessions USING (session_id)
+                      WHERE {" AND ".join(pg_sub_query)}
+                        AND pages.timestamp >= %(startTimestamp)s
+                        AND pages.timestamp < %(endTimestamp)s
+                      GROUP BY step;"""
+        cur.execute(cur.mogrify(pg_query, {**params, "value": value, **__get_constraint_values(args)}))
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size, neutral={"value": 0})
         row["chart"] = rows
     row["unit"] = schemas.TemplatePredefinedUnits.count
     return helper.dict_to_camel_case(row)
@@ -2918,28 +2596,21 @@ def get_top_metrics_count_requests(project_id, startTimestamp=TimeUTC.now(delta_
 def get_unique_users(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
                      endTimestamp=TimeUTC.now(),
                      density=7, **args):
-    step_size = __get_step_size(startTimestamp, endTimestamp, density, factor=1)
+    step_size = __get_chart_step_size(startTimestamp, endTimestamp, density)
     pg_sub_query = __get_constraints(project_id=project_id, data=args)
-    pg_sub_query_chart = __get_constraints(project_id=project_id, time_constraint=True,
-                                           chart=True, data=args)
     pg_sub_query.append("user_id IS NOT NULL")
     pg_sub_query.append("user_id != ''")
-    pg_sub_query_chart.append("user_id IS NOT NULL")
-    pg_sub_query_chart.append("user_id != ''")
     with pg_client.PostgresClient() as cur:
-        pg_query = f"""SELECT generated_timestamp AS timestamp,
-                               COALESCE(COUNT(sessions), 0) AS value
-                        FROM generate_series(%(startTimestamp)s, %(endTimestamp)s, %(step_size)s) AS generated_timestamp
-                             LEFT JOIN LATERAL ( SELECT DISTINCT user_id
-                                                 FROM public.sessions
-                                                 WHERE {" AND ".join(pg_sub_query_chart)}
-                             ) AS sessions ON (TRUE)
-                        GROUP BY generated_timestamp
-                        ORDER BY generated_timestamp;"""
+        pg_query = f"""SELECT {metrics_helper.get_step_expression("sessions.start_ts")} AS step,
+                               COUNT(DISTINCT sessions.user_id) AS value
+                        FROM public.sessions
+                        WHERE {" AND ".join(pg_sub_query)}
+                        GROUP BY step;"""
         params = {"step_size": step_size, "project_id": project_id, "startTimestamp": startTimestamp,
                   "endTimestamp": endTimestamp, **__get_constraint_values(args)}
         cur.execute(cur.mogrify(pg_query, params))
-        rows = cur.fetchall()
+        rows = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=startTimestamp,
+                                             endTimestamp=endTimestamp, step_size=step_size, neutral={"value": 0})
         results = {
             "value": sum([r["value"] for r in rows]),
             "chart": rows
@@ -2962,3 +2633,142 @@ def get_unique_users(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
         results["progress"] = helper.__progress(old_val=count, new_val=results["value"])
     results["unit"] = schemas.TemplatePredefinedUnits.count
     return results
+
+
+# predefined metrics that can be computed by get_shared_scan, each one is bounded like the function computing it alone:
+# column: the averaged column, None counts the rows; condition: the averaged rows, chart_condition if the chart differs;
+# bounds: the columns limited to the period besides sessions.start_ts; chart_column: the bucketed column
+SHARED_SCAN_METRICS = {
+    schemas.MetricOfWebVitals.avg_response_time: {"table": "pages", "column": "response_time",
+                                                  "condition": "pages.response_time > 0",
+                                                  "bounds": ["pages.timestamp"], "chart_column": "sessions.start_ts",
+                                                  "density": 20},
+    schemas.MetricOfWebVitals.avg_first_paint: {"table": "pages", "column": "first_paint_time",
+                                                "condition": "pages.first_paint_time > 0",
+                                                "bounds": ["pages.timestamp"], "chart_column": "sessions.start_ts",
+                                                "density": 20},
+    schemas.MetricOfWebVitals.avg_dom_content_loaded: {"table": "pages", "column": "dom_content_loaded_time",
+                                                       "condition": "pages.dom_content_loaded_time > 0",
+                                                       "bounds": ["pages.timestamp"],
+                                                       "chart_column": "sessions.start_ts", "density": 19},
+    schemas.MetricOfWebVitals.avg_till_first_byte: {"table": "pages", "column": "ttfb",
+                                                    "condition": "pages.ttfb > 0",
+                                                    "bounds": ["pages.timestamp"], "chart_column": "sessions.start_ts",
+                                                    "density": 20},
+    schemas.MetricOfWebVitals.avg_time_to_interactive: {"table": "pages", "column": "time_to_interactive",
+                                                        "condition": "pages.time_to_interactive > 0",
+                                                        "bounds": ["pages.timestamp"],
+                                                        "chart_column": "sessions.start_ts", "density": 20},
+    schemas.MetricOfWebVitals.avg_page_load_time: {"table": "pages", "column": "load_time",
+                                                   "condition": "pages.load_time > 0",
+                                                   "bounds": ["pages.timestamp"], "chart_column": "pages.timestamp",
+                                                   "density": 19},
+    schemas.MetricOfWebVitals.avg_dom_content_load_start: {"table": "pages", "column": "dom_content_loaded_time",
+                                                           "condition": "pages.dom_content_loaded_time > 0",
+                                                           "bounds": ["pages.timestamp"],
+                                                           "chart_column": "pages.timestamp", "density": 19},
+    schemas.MetricOfWebVitals.avg_first_contentful_pixel: {"table": "pages", "column": "first_contentful_paint_time",
+                                                           "condition": "pages.first_contentful_paint_time > 0",
+                                                           "bounds": ["pages.timestamp"],
+                                                           "chart_column": "pages.timestamp", "density": 20},
+    schemas.MetricOfWebVitals.count_requests: {"table": "pages", "column": None, "condition": None, "bounds": [],
+                                               "chart_column": "pages.timestamp", "density": 20},
+    schemas.MetricOfWebVitals.avg_visited_pages: {"table": "sessions", "column": "pages_count",
+                                                  "condition": "sessions.pages_count > 0",
+                                                  "chart_condition": "sessions.duration IS NOT NULL",
+                                                  "bounds": [], "chart_column": "sessions.start_ts", "density": 20},
+    schemas.MetricOfWebVitals.avg_session_duration: {"table": "sessions", "column": "duration",
+                                                     "condition": "sessions.duration > 0",
+                                                     "bounds": [], "chart_column": "sessions.start_ts", "density": 20},
+    schemas.MetricOfWebVitals.count_sessions: {"table": "sessions", "column": None, "condition": None, "bounds": [],
+                                               "chart_column": "sessions.start_ts", "density": 7}
+}
+
+
+def __shared_scan_period(columns, start_key, end_key):
+    return [f"{c} >= %({start_key})s AND {c} < %({end_key})s" for c in dict.fromkeys(["sessions.start_ts", *columns])]
+
+
+def __shared_scan_aggregates(name, spec, conditions):
+    condition = " AND ".join([c for c in conditions if c is not None])
+    column = "1" if spec["column"] is None else f"{spec['table']}.{spec['column']}"
+    aggregate = "COUNT" if spec["column"] is None else "SUM"
+    return f"{aggregate}({column}) FILTER (WHERE {condition}) AS {name}_sum, " \
+           f"COUNT({column}) FILTER (WHERE {condition}) AS {name}_count"
+
+
+def get_shared_scan(project_id, table, keys, startTimestamp=TimeUTC.now(delta_days=-1),
+                    endTimestamp=TimeUTC.now(), density=None, previous=True, **args):
+    """
+    Computes the SUM&COUNT of every requested metric of the same table in a single scan, the value, the previous
+    period and the chart of each metric are filtered like the function computing it alone.
+    Returns {key: {"current": (sum, count), "previous": (sum, count), "chart": [{"timestamp", "value": (sum, count)}]}}
+    """
+    previous_start = startTimestamp - (endTimestamp - startTimestamp)
+    pg_sub_query = __get_constraints(project_id=project_id, time_constraint=False, data=args)
+    pg_sub_query.append("sessions.start_ts >= %(previousStartTimestamp)s" if previous
+                        else "sessions.start_ts >= %(startTimestamp)s")
+    pg_sub_query.append("sessions.start_ts < %(endTimestamp)s")
+    if table == "pages":
+        from_clause = "events.pages INNER JOIN public.sessions USING (session_id)"
+    else:
+        from_clause = "public.sessions"
+    params = {"project_id": project_id, "startTimestamp": startTimestamp,
+              "endTimestamp": endTimestamp, "previousStartTimestamp": previous_start,
+              **__get_constraint_values(args)}
+    # one GROUP BY column per chart bucketing, metrics with the same column and step share it
+    steps = {}
+    charts = {}
+    aggregates = []
+    for i, k in enumerate(keys):
+        spec = SHARED_SCAN_METRICS[k]
+        step_size = __get_chart_step_size(startTimestamp, endTimestamp,
+                                          spec["density"] if density is None else density)
+        step_key = steps.setdefault((spec["chart_column"], step_size), f"step_{len(steps)}")
+        params[f"{step_key}_size"] = step_size
+        charts[k] = (step_key, step_size)
+        aggregates.append(__shared_scan_aggregates(
+            f"value_{i}", spec,
+            __shared_scan_period(spec["bounds"], "startTimestamp", "endTimestamp") + [spec["condition"]]))
+        if previous:
+            aggregates.append(__shared_scan_aggregates(
+                f"previous_{i}", spec,
+                __shared_scan_period(spec["bounds"], "previousStartTimestamp", "startTimestamp") + [spec["condition"]]))
+        aggregates.append(__shared_scan_aggregates(
+            f"chart_{i}", spec, __shared_scan_period([spec["chart_column"]], "startTimestamp", "endTimestamp")
+                                + [spec.get("chart_condition", spec["condition"])]))
+    step_columns = [f"{metrics_helper.get_step_expression(column, step_key=step_key + '_size')} AS {step_key}"
+                    for (column, _), step_key in steps.items()]
+    pg_query = f"""SELECT {", ".join(step_columns)},
+                          {", ".join(aggregates)}
+                   FROM {from_clause}
+                   WHERE {" AND ".join(pg_sub_query)}
+                   GROUP BY {", ".join(steps.values())};"""
+    with pg_client.PostgresClient() as cur:
+        cur.execute(cur.mogrify(pg_query, params))
+        rows = cur.fetchall()
+    return __shared_scan_result(rows=rows, keys=keys, charts=charts,
+                                startTimestamp=startTimestamp, endTimestamp=endTimestamp)
+
+
+def __shared_scan_result(rows, keys, charts, startTimestamp, endTimestamp):
+    results = {}
+    for i, k in enumerate(keys):
+        step_key, step_size = charts[k]
+        timestamps = range(startTimestamp, endTimestamp + 1, step_size)
+        chart = [[0, 0] for _ in timestamps]
+        current = [0, 0]
+        previous = [0, 0]
+        for r in rows:
+            current[0] += r[f"value_{i}_sum"] or 0
+            current[1] += r[f"value_{i}_count"] or 0
+            previous[0] += r.get(f"previous_{i}_sum") or 0
+            previous[1] += r.get(f"previous_{i}_count") or 0
+            # rows out of the chart period have nothing to count
+            if r[f"chart_{i}_count"]:
+                step = chart[min(max(r[step_key], 0), len(chart) - 1)]
+                step[0] += r[f"chart_{i}_sum"] or 0
+                step[1] += r[f"chart_{i}_count"]
+        results[k] = {"current": tuple(current), "previous": tuple(previous),
+                      "chart": [{"timestamp": t, "value": tuple(c)} for t, c in zip(timestamps, chart)]}
+    return results
@@ -7,68 +7,13 @@ from chalicelib.utils import helper, dev
 from chalicelib.utils import pg_client
 from chalicelib.utils.TimeUTC import TimeUTC
 from chalicelib.utils import sql_helper as sh
+from chalicelib.utils.journey_graph import build_journey
 from time import time
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-def __transform_journey(rows, reverse_path=False):
-    total_100p = 0
-    number_of_step1 = 0
-    for r in rows:
-        if r["event_number_in_session"] > 1:
-            break
-        number_of_step1 += 1
-        total_100p += r["sessions_count"]
-    # for i in range(number_of_step1):
-    #     rows[i]["value"] = 100 / number_of_step1
-
-    # for i in range(number_of_step1, len(rows)):
-    for i in range(len(rows)):
-        rows[i]["value"] = rows[i]["sessions_count"] * 100 / total_100p
-
-    nodes = []
-    nodes_values = []
-    links = []
-    for r in rows:
-        source = f"{r['event_number_in_session']}_{r['event_type']}_{r['e_value']}"
-        if source not in nodes:
-            nodes.append(source)
-            nodes_values.append({"name": r['e_value'], "eventType": r['event_type'],
-                                 "avgTimeFromPrevious": 0, "sessionsCount": 0})
-        if r['next_value']:
-            target = f"{r['event_number_in_session'] + 1}_{r['next_type']}_{r['next_value']}"
-            if target not in nodes:
-                nodes.append(target)
-                nodes_values.append({"name": r['next_value'], "eventType": r['next_type'],
-                                     "avgTimeFromPrevious": 0, "sessionsCount": 0})
-
-            sr_idx = nodes.index(source)
-            tg_idx = nodes.index(target)
-            if r["avg_time_from_previous"] is not None:
-                nodes_values[tg_idx]["avgTimeFromPrevious"] += r["avg_time_from_previous"] * r["sessions_count"]
-                nodes_values[tg_idx]["sessionsCount"] += r["sessions_count"]
-            link = {"eventType": r['event_type'], "sessionsCount": r["sessions_count"],
-                    "value": r["value"], "avgTimeFromPrevious": r["avg_time_from_previous"]}
-            if not reverse_path:
-                link["source"] = sr_idx
-                link["target"] = tg_idx
-            else:
-                link["source"] = tg_idx
-                link["target"] = sr_idx
-            links.append(link)
-    for n in nodes_values:
-        if n["sessionsCount"] > 0:
-            n["avgTimeFromPrevious"] = n["avgTimeFromPrevious"] / n["sessionsCount"]
-        else:
-            n["avgTimeFromPrevious"] = None
-        n.pop("sessionsCount")
-
-    return {"nodes": nodes_values,
-            "links": sorted(links, key=lambda x: (x["source"], x["target"]), reverse=False)}
-
-
 JOURNEY_TYPES = {
     schemas.ProductAnalyticsSelectedEventType.location: {"table": "events.pages", "column": "path"},
     schemas.ProductAnalyticsSelectedEventType.click: {"table": "events.clicks", "column": "label"},
@@ -419,9 +364,11 @@ WITH sub_sessions AS (SELECT session_id {sub_sessions_extra_projection}
             logger.warning("----------------------")
             logger.warning(query)
             logger.warning("----------------------")
-        rows = cur.fetchall()
+        # the builder iterates the cursor instead of a fetchall() list of rows, it still keeps one node per
+        # distinct (step, event) and one link per row in its interned tables
+        journey = build_journey(rows=cur, reverse_path=reverse)
 
-    return __transform_journey(rows=rows, reverse_path=reverse)
+    return journey
 
 #
 # def __compute_weekly_percentage(rows):
@@ -1,13 +1,28 @@
+import hashlib
+import json
 import logging
+import math
 from typing import List, Union
 
+from decouple import config
+
 import schemas
 from chalicelib.core import events, metadata, projects, performance_event, sessions_favorite
-from chalicelib.utils import pg_client, helper, metrics_helper
+from chalicelib.utils import pg_client, helper, metrics_helper, export_helper
 from chalicelib.utils import sql_helper as sh
+from chalicelib.utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# structural hash of the search -> (full_args, query_part), the time window is bound on each call
+QUERY_PARTS_CACHE = TTLCache(maxsize=config("SEARCH_QUERY_PARTS_CACHE_SIZE", cast=int, default=2000),
+                             ttl=config("SEARCH_QUERY_PARTS_CACHE_TTL", cast=int, default=5 * 60))
+# approximate counts: only the sessions/users whose hash falls in the first SAMPLE_RATE of the buckets are counted
+SAMPLE_BUCKETS = 65536
+SAMPLE_RATE = config("SEARCH_SAMPLE_RATE", cast=float, default=0.1)
+# below this number of sampled sessions the estimate is too coarse, the matching sessions are few and counted exactly
+MIN_SAMPLE_SIZE = config("SEARCH_MIN_SAMPLE_SIZE", cast=int, default=1000)
+
 SESSION_PROJECTION_BASE_COLS = """s.project_id,
 s.session_id::text AS session_id,
 s.user_uuid,
@@ -38,6 +53,51 @@ COALESCE((SELECT TRUE
    AND fs.user_id = %(userId)s LIMIT 1), FALSE) AS viewed """
 
 
+def __get_sampling_error(sampled, rate):
+    # 95% margin of the estimate of a bernoulli sample: 1.96 * sqrt(k * (1 - p)) / p
+    return round(1.96 * math.sqrt(sampled * (1 - rate)) / rate)
+
+
+def __count_sessions_approximate(query_part, full_args):
+    """
+    Estimates the distinct sessions and users matching the search in a single pass: the sample predicate is
+    part of the WHERE clause so only the sampled sessions are joined and made distinct.
+    The response contains the 95% error margin of each estimate. A sample smaller than MIN_SAMPLE_SIZE means
+    few matching sessions, they are counted exactly by a second query.
+    """
+    threshold = max(int(SAMPLE_RATE * SAMPLE_BUCKETS), 1)
+    rate = threshold / SAMPLE_BUCKETS
+    with pg_client.PostgresClient() as cur:
+        if rate < 1:
+            sample = __count_sample(cur, query_part=query_part, full_args=full_args, threshold=threshold)
+            if sample["count_sessions"] >= MIN_SAMPLE_SIZE:
+                return {"count_sessions": round(sample["count_sessions"] / rate),
+                        "count_users": round(sample["count_users"] / rate),
+                        "approximate": True,
+                        "count_sessions_error": __get_sampling_error(sample["count_sessions"], rate),
+                        "count_users_error": __get_sampling_error(sample["count_users"], rate)}
+        main_query = cur.mogrify(f"""SELECT COUNT(DISTINCT s.session_id) AS count_sessions, 
+                                            COUNT(DISTINCT s.user_uuid) AS count_users
+                                    {query_part};""", full_args)
+        cur.execute(main_query)
+        counts = cur.fetchone()
+    return {**counts, "approximate": False, "count_sessions_error": 0, "count_users_error": 0}
+
+
+def __count_sample(cur, query_part, full_args, threshold):
+    # query_part ends with its WHERE constraints
+    main_query = cur.mogrify(f"""SELECT COUNT(DISTINCT s.session_id) 
+                                        FILTER ( WHERE (hashint8(s.session_id) & 65535) < %(sample_threshold)s ) AS count_sessions,
+                                        COUNT(DISTINCT s.user_uuid)
+                                        FILTER ( WHERE (hashtext(s.user_uuid::text) & 65535) < %(sample_threshold)s ) AS count_users
+                                {query_part}
+                                  AND ((hashint8(s.session_id) & 65535) < %(sample_threshold)s
+                                       OR (hashtext(s.user_uuid::text) & 65535) < %(sample_threshold)s);""",
+                             {**full_args, "sample_threshold": threshold})
+    cur.execute(main_query)
+    return cur.fetchone()
+
+
 # This function executes the query and return result
 def search_sessions(data: schemas.SessionsSearchPayloadSchema, project_id, user_id, errors_only=False,
                     error_status=schemas.ErrorStatus.all, count_only=False, issue=None, ids_only=False,
@@ -57,6 +117,11 @@ def search_sessions(data: schemas.SessionsSearchPayloadSchema, project_id, user_
         full_args["sessions_limit_s"] = 0
         full_args["sessions_limit_e"] = 200
 
+    # only a count is sampled, a search page already evaluates all the matching sessions,
+    # its exact total costs nothing more
+    if data.approximate_count and count_only and not errors_only and not ids_only and not data.group_by_user:
+        return helper.dict_to_camel_case(__count_sessions_approximate(query_part=query_part, full_args=full_args))
+
     meta_keys = []
     with pg_client.PostgresClient() as cur:
         if errors_only:
@@ -169,12 +234,64 @@ def search_sessions(data: schemas.SessionsSearchPayloadSchema, project_id, user_
     }
 
 
+EXPORT_COLUMNS = ["projectId", "sessionId", "userUuid", "userId", "userOs", "userBrowser", "userDevice",
+                  "userDeviceType", "userCountry", "userCity", "userState", "startTs", "duration", "eventsCount",
+                  "pagesCount", "errorsCount", "userAnonymousId", "platform", "issueScore", "timezone", "issueTypes",
+                  "favorite", "viewed"]
+
+
+def search_sessions_stream(data: schemas.SessionsSearchPayloadSchema, project_id, user_id,
+                           fmt: schemas.ExportFormat = schemas.ExportFormat.ndjson, platform="web"):
+    """
+    Runs the search once, without pagination, through a server-side cursor
+    and returns a generator of encoded NDJSON/CSV chunks of all the matching sessions.
+    """
+    if data.bookmarked:
+        data.startTimestamp, data.endTimestamp = sessions_favorite.get_start_end_timestamp(project_id, user_id)
+
+    full_args, query_part = search_query_parts(data=data, error_status=schemas.ErrorStatus.all, errors_only=False,
+                                               favorite_only=data.bookmarked, issue=None, project_id=project_id,
+                                               user_id=user_id, platform=platform)
+    if data.order is None:
+        data.order = schemas.SortOrderType.desc.value
+    sort = 'session_id'
+    if data.sort is not None and data.sort != "session_id":
+        sort = helper.key_to_snake_case(data.sort)
+    meta_keys = metadata.get(project_id=project_id)
+
+    def rows():
+        with pg_client.PostgresClient(unlimited_query=True) as cur:
+            main_query = cur.mogrify(f"""SELECT *
+                                        FROM (SELECT DISTINCT ON(s.session_id) {SESSION_PROJECTION_COLS}
+                                                            {"," if len(meta_keys) > 0 else ""}{",".join([f'metadata_{m["index"]}' for m in meta_keys])}
+                                        {query_part}
+                                        ORDER BY s.session_id desc) AS filtred_sessions
+                                        ORDER BY {sort} {data.order}, issue_score DESC;""",
+                                     full_args)
+            logging.debug("--------------------")
+            logging.debug(main_query)
+            logging.debug("--------------------")
+            with cur.server_side(name=f"sessions_export_{project_id}",
+                                 itersize=export_helper.EXPORT_BATCH_SIZE) as ss_cur:
+                ss_cur.execute(main_query)
+                for s in ss_cur:
+                    s["metadata"] = {k["key"]: s.pop(f'metadata_{k["index"]}') for k in meta_keys}
+                    s["metadata"] = {k: v for k, v in s["metadata"].items() if v is not None}
+                    yield helper.dict_to_camel_case(s, ignore_keys=["metadata"])
+
+    return export_helper.stream_rows(rows=rows(), fmt=fmt, name=f"sessions export project:{project_id}",
+                                     columns=EXPORT_COLUMNS + [f"metadata.{k['key']}" for k in meta_keys])
+
+
 # TODO: remove "table of" search from this function
 def search2_series(data: schemas.SessionsSearchPayloadSchema, project_id: int, density: int,
                    view_type: schemas.MetricTimeseriesViewType, metric_type: schemas.MetricType,
                    metric_of: schemas.MetricOfTable, metric_value: List):
-    step_size = int(metrics_helper.__get_step_size(endTimestamp=data.endTimestamp, startTimestamp=data.startTimestamp,
-                                                   density=density, factor=1, decimal=True))
+    density = metrics_helper.get_adaptive_density(startTimestamp=data.startTimestamp,
+                                                  endTimestamp=data.endTimestamp, density=density)
+    step_size = max(int(metrics_helper.__get_step_size(endTimestamp=data.endTimestamp,
+                                                       startTimestamp=data.startTimestamp,
+                                                       density=density, factor=1, decimal=True)), 1)
     extra_event = None
     if metric_of == schemas.MetricOfTable.visited_url:
         extra_event = "events.pages"
@@ -189,33 +306,24 @@ def search2_series(data: schemas.SessionsSearchPayloadSchema, project_id: int, d
     with pg_client.PostgresClient() as cur:
         if metric_type == schemas.MetricType.timeseries:
             if view_type == schemas.MetricTimeseriesViewType.line_chart:
+                # one GROUP BY pass over the matching sessions, empty steps are filled by complete_steps
+                step_expression = metrics_helper.get_step_expression(column="start_ts", start_key="startDate")
                 if metric_of == schemas.MetricOfTimeseries.session_count:
-                    # main_query = cur.mogrify(f"""WITH full_sessions AS (SELECT DISTINCT ON(s.session_id) s.session_id, s.start_ts
                     main_query = cur.mogrify(f"""WITH full_sessions AS (SELECT s.session_id, s.start_ts
                                                                     {query_part})
-                                                SELECT generated_timestamp AS timestamp,
-                                                       COUNT(s)            AS count
-                                                FROM generate_series(%(startDate)s, %(endDate)s, %(step_size)s) AS generated_timestamp
-                                                         LEFT JOIN LATERAL ( SELECT 1 AS s
-                                                                             FROM full_sessions
-                                                                             WHERE start_ts >= generated_timestamp
-                                                                               AND start_ts <= generated_timestamp + %(step_size)s) AS sessions ON (TRUE)
-                                                GROUP BY generated_timestamp
-                                                ORDER BY generated_timestamp;""", full_args)
+                                                SELECT {step_expression} AS step,
+                                                       COUNT(1)          AS count
+                                                FROM full_sessions
+                                                GROUP BY step;""", full_args)
                 elif metric_of == schemas.MetricOfTimeseries.user_count:
                     main_query = cur.mogrify(f"""WITH full_sessions AS (SELECT s.user_id, s.start_ts
                                                                     {query_part}
                                                                     AND s.user_id IS NOT NULL
                                                                     AND s.user_id != '')
-                                                SELECT generated_timestamp AS timestamp,
-                                                       COUNT(s)            AS count
-                                                FROM generate_series(%(startDate)s, %(endDate)s, %(step_size)s) AS generated_timestamp
-                                                         LEFT JOIN LATERAL ( SELECT DISTINCT user_id AS s
-                                                                             FROM full_sessions
-                                                                             WHERE start_ts >= generated_timestamp
-                                                                               AND start_ts <= generated_timestamp + %(step_size)s) AS sessions ON (TRUE)
-                                                GROUP BY generated_timestamp
-                                                ORDER BY generated_timestamp;""", full_args)
+                                                SELECT {step_expression}       AS step,
+                                                       COUNT(DISTINCT user_id) AS count
+                                                FROM full_sessions
+                                                GROUP BY step;""", full_args)
                 else:
                     raise Exception(f"Unsupported metricOf:{metric_of}")
             else:
@@ -235,7 +343,9 @@ def search2_series(data: schemas.SessionsSearchPayloadSchema, project_id: int, d
                 logging.warning("--------------------")
                 raise err
             if view_type == schemas.MetricTimeseriesViewType.line_chart:
-                sessions = cur.fetchall()
+                sessions = metrics_helper.complete_steps(rows=cur.fetchall(), startTimestamp=data.startTimestamp,
+                                                         endTimestamp=data.endTimestamp, step_size=step_size,
+                                                         neutral={"count": 0})
             else:
                 sessions = cur.fetchone()["count"]
         elif metric_type == schemas.MetricType.table:
@@ -460,9 +570,46 @@ def __is_valid_event(is_any: bool, event: schemas.SessionSearchEventSchema2):
                         event.filters is None or len(event.filters) == 0))
 
 
+def __get_query_parts_key(data: schemas.SessionsSearchPayloadSchema, error_status, errors_only, favorite_only, issue,
+                          project_id, user_id, platform, extra_event, extra_conditions):
+    # everything that shapes the generated SQL except the time window, which is only used through
+    # %(startDate)s/%(endDate)s, so searches sliding over time (alerts, dashboards) share the same entry
+    tree = {"filters": [f.model_dump(mode="json") for f in data.filters],
+            "events": [e.model_dump(mode="json") for e in data.events],
+            "events_order": data.events_order,
+            "window": (data.startTimestamp is not None, data.endTimestamp is not None),
+            "error_status": error_status, "errors_only": errors_only, "favorite_only": favorite_only,
+            "issue": issue, "project_id": project_id, "user_id": user_id, "platform": platform,
+            "extra_event": extra_event,
+            "extra_conditions": [c.model_dump(mode="json") for c in extra_conditions]
+            if extra_conditions is not None else None}
+    # metadata filters are resolved to metadata_N columns, the current mapping is part of the key
+    # so an added/deleted/renamed metadata key is never served from a stale entry (in any worker)
+    if any(f.type == events.EventType.METADATA.ui_type for f in data.filters):
+        tree["metadata"] = {m["key"]: m["index"] for m in metadata.get(project_id=project_id)}
+    return hashlib.sha1(json.dumps(tree, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
 # this function generates the query and return the generated-query with the dict of query arguments
 def search_query_parts(data: schemas.SessionsSearchPayloadSchema, error_status, errors_only, favorite_only, issue,
                        project_id, user_id, platform="web", extra_event=None, extra_conditions=None):
+    key = __get_query_parts_key(data=data, error_status=error_status, errors_only=errors_only,
+                                favorite_only=favorite_only, issue=issue, project_id=project_id, user_id=user_id,
+                                platform=platform, extra_event=extra_event, extra_conditions=extra_conditions)
+    cached = QUERY_PARTS_CACHE.get(key)
+    if cached is None:
+        cached = __build_query_parts(data=data, error_status=error_status, errors_only=errors_only,
+                                     favorite_only=favorite_only, issue=issue, project_id=project_id,
+                                     user_id=user_id, platform=platform, extra_event=extra_event,
+                                     extra_conditions=extra_conditions)
+        QUERY_PARTS_CACHE.set(key, cached)
+    full_args, query_part = cached
+    # callers add their own arguments, they get a copy of the cached ones
+    return {**full_args, "startDate": data.startTimestamp, "endDate": data.endTimestamp}, query_part
+
+
+def __build_query_parts(data: schemas.SessionsSearchPayloadSchema, error_status, errors_only, favorite_only, issue,
+                        project_id, user_id, platform="web", extra_event=None, extra_conditions=None):
     ss_constraints = []
     full_args = {"project_id": project_id, "startDate": data.startTimestamp, "endDate": data.endTimestamp,
                  "projectId": project_id, "userId": user_id}
@@ -1,3 +1,6 @@
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
 from urllib.parse import urlparse
 
 import requests
@@ -5,6 +8,17 @@ from decouple import config
 
 from chalicelib.core import sourcemaps_parser
 from chalicelib.utils.storage import StorageClient, generators
+from chalicelib.utils.ttl_cache import TTLCache
+
+SOURCEMAPS_WORKERS = config("SOURCEMAPS_WORKERS", cast=int, default=4)
+# (project_id, file key, line, column) -> resolved frame, a bundle redeployed under the same URL
+# can resolve differently, the TTL bounds how long a stale frame is served
+RESOLVED_FRAMES_CACHE = TTLCache(maxsize=config("SOURCEMAPS_CACHE_SIZE", cast=int, default=10000),
+                                 ttl=config("SOURCEMAPS_CACHE_TTL", cast=int, default=3600))
+# (project_id, file key) of the files without sourcemap (i.e. third-party scripts), kept for a shorter time
+# so an uploaded sourcemap is picked up soon
+MISSING_SOURCEMAPS_CACHE = TTLCache(maxsize=config("SOURCEMAPS_CACHE_SIZE", cast=int, default=10000),
+                                    ttl=config("SOURCEMAPS_MISSING_CACHE_TTL", cast=int, default=300))
 
 
 def presign_share_urls(project_id, urls):
@@ -77,61 +91,85 @@ def url_exists(url):
         return False
 
 
+def __is_js_file(file_url):
+    params_idx = file_url.find("?")
+    return (file_url[:params_idx] if params_idx > -1 else file_url).endswith(".js")
+
+
+def __resolve_file(key, frames):
+    """
+    Looks for the sourcemap of a single file (S3 then server) and resolves all its frames in one call.
+    Returns (resolved frames or None, sourcemap exists), the frames are None without the sourcemap or if the
+    parser failed (i.e. timeout) to read an existing one.
+    """
+    file_url = frames[0]["absPath"]
+    if file_url and len(file_url) > 0 and not __is_js_file(file_url):
+        print(f"{file_url} sourcemap is not a JS file")
+        return None, True
+    file_exists_in_server = False
+    file_exists_in_bucket = len(file_url) > 0 and StorageClient.exists(config('sourcemaps_bucket'), key)
+    if len(file_url) > 0 and not file_exists_in_bucket:
+        print(f"{file_url} sourcemap (key '{key}') doesn't exist in S3 looking in server")
+        if not file_url.endswith(".map"):
+            file_url += '.map'
+        file_exists_in_server = url_exists(file_url)
+        file_exists_in_bucket = file_exists_in_server
+    if not file_exists_in_bucket:
+        print(f"{frames[0]['absPath']} sourcemap (key '{key}') doesn't exist in S3 nor server")
+        return None, False
+    key_results = sourcemaps_parser.get_original_trace(
+        key=file_url if file_exists_in_server else key,
+        positions=[{"line": f["lineNo"], "column": f["colNo"]} for f in frames],
+        is_url=file_exists_in_server)
+    return key_results, True
+
+
 def get_traces_group(project_id, payload):
     frames = format_payload(payload)
 
     results = [{}] * len(frames)
+    # file key -> indexes of the frames that still need to be resolved
     payloads = {}
     all_exists = True
     for i, u in enumerate(frames):
-        file_exists_in_bucket = False
-        file_exists_in_server = False
-        file_url = u["absPath"]
-        key = generators.generate_file_key_from_url(project_id, file_url)  # use filename instead?
-        params_idx = file_url.find("?")
-        if file_url and len(file_url) > 0 \
-                and not (file_url[:params_idx] if params_idx > -1 else file_url).endswith(".js"):
-            print(f"{u['absPath']} sourcemap is not a JS file")
-            payloads[key] = None
-
-        if key not in payloads:
-            file_exists_in_bucket = len(file_url) > 0 and StorageClient.exists(config('sourcemaps_bucket'), key)
-            if len(file_url) > 0 and not file_exists_in_bucket:
-                print(f"{u['absPath']} sourcemap (key '{key}') doesn't exist in S3 looking in server")
-                if not file_url.endswith(".map"):
-                    file_url += '.map'
-                file_exists_in_server = url_exists(file_url)
-                file_exists_in_bucket = file_exists_in_server
-            all_exists = all_exists and file_exists_in_bucket
-            if not file_exists_in_bucket and not file_exists_in_server:
-                print(f"{u['absPath']} sourcemap (key '{key}') doesn't exist in S3 nor server")
-                payloads[key] = None
-            else:
-                payloads[key] = []
+        key = generators.generate_file_key_from_url(project_id, u["absPath"])  # use filename instead?
+        cached = RESOLVED_FRAMES_CACHE.get((project_id, key, u["lineNo"], u["colNo"]))
+        if cached is not None:
+            results[i] = deepcopy(cached)
+            if u.get("function") is not None:
+                results[i]["function"] = u["function"]
+            results[i]["frame"] = dict(u)
+            continue
         results[i] = dict(u)
         results[i]["frame"] = dict(u)
-        if payloads[key] is not None:
-            payloads[key].append({"resultIndex": i, "frame": dict(u), "URL": file_url,
-                                  "position": {"line": u["lineNo"], "column": u["colNo"]},
-                                  "isURL": file_exists_in_server})
-
-    for key in payloads.keys():
-        if payloads[key] is None:
+        if MISSING_SOURCEMAPS_CACHE.get((project_id, key)) is not None:
+            all_exists = False
             continue
-        key_results = sourcemaps_parser.get_original_trace(
-            key=payloads[key][0]["URL"] if payloads[key][0]["isURL"] else key,
-            positions=[o["position"] for o in payloads[key]],
-            is_url=payloads[key][0]["isURL"])
+        if key not in payloads:
+            payloads[key] = []
+        payloads[key].append(i)
+
+    if len(payloads) == 0:
+        return fetch_missed_contexts(results), all_exists
+    # distinct files are resolved concurrently, each one costs up to 2 HEAD requests and 1 call to the parser
+    with ThreadPoolExecutor(max_workers=min(SOURCEMAPS_WORKERS, len(payloads))) as executor:
+        resolutions = {key: executor.submit(__resolve_file, key, [frames[i] for i in indexes])
+                       for key, indexes in payloads.items()}
+    for key, indexes in payloads.items():
+        key_results, exists = resolutions[key].result()
+        if not exists:
+            # only a sourcemap found neither in S3 nor in server is remembered, a failure of the parser is retried
+            MISSING_SOURCEMAPS_CACHE.set((project_id, key), True)
         if key_results is None:
             all_exists = False
             continue
-        for i, r in enumerate(key_results):
-            res_index = payloads[key][i]["resultIndex"]
+        for i, r in zip(indexes, key_results):
+            RESOLVED_FRAMES_CACHE.set((project_id, key, frames[i]["lineNo"], frames[i]["colNo"]), deepcopy(r))
             # function name search  by frontend lib is better than sourcemaps' one in most cases
-            if results[res_index].get("function") is not None:
-                r["function"] = results[res_index]["function"]
-            r["frame"] = payloads[key][i]["frame"]
-            results[res_index] = r
+            if results[i].get("function") is not None:
+                r["function"] = results[i]["function"]
+            r["frame"] = dict(frames[i])
+            results[i] = r
     return fetch_missed_contexts(results), all_exists
 
 
@@ -141,25 +179,107 @@ def get_js_cache_path(fullURL):
 
 
 MAX_COLUMN_OFFSET = 60
+# files up to this size are downloaded in a single request, bigger ones without line break
+# in their first and last bytes are kept as single-line bundles read by ranges
+RANGED_SOURCE_SIZE = config("SOURCES_RANGED_SIZE_MB", cast=int, default=2) * 1024 * 1024
+RANGED_SOURCE_PROBE_SIZE = 64 * 1024
+
+
+class IndexedSource:
+    """
+    Source file kept with the offset of every line, a context is a slice of the text instead of a split of the file.
+    """
+
+    def __init__(self, text):
+        if isinstance(text, bytes):
+            text = text.decode()
+        self.text = text
+        # 8 bytes per offset, a list would hold a boxed int for each line
+        self.offsets = array("q", [0])
+        i = text.find("\n")
+        while i > -1:
+            self.offsets.append(i + 1)
+            i = text.find("\n", i + 1)
+        self.size = len(text) + self.offsets.itemsize * len(self.offsets)
+
+    @property
+    def lines_count(self):
+        return len(self.offsets)
+
+    def get_line_slice(self, line, start, end):
+        line_start = self.offsets[line]
+        line_end = self.offsets[line + 1] - 1 if line + 1 < len(self.offsets) else len(self.text)
+        return self.text[min(line_start + start, line_end):min(line_start + end, line_end)]
+
+
+class RangedSource:
+    """
+    Huge single-line bundle, only the requested window is downloaded (ranged GET).
+    Columns are used as byte offsets, which is exact for the ASCII content of minified bundles.
+    """
+    lines_count = 1
+    size = 64
+
+    def __init__(self, bucket, key, file_size):
+        self.bucket = bucket
+        self.key = key
+        self.file_size = file_size
+
+    def get_line_slice(self, line, start, end):
+        end = min(end, self.file_size)
+        if line > 0 or start >= end:
+            return ""
+        return StorageClient.get_file_range(self.bucket, self.key, start, end - 1) or ""
+
+
+__MISSING_SOURCE = RangedSource(bucket=None, key=None, file_size=0)
+# absPath -> IndexedSource/RangedSource, bounded by the total size of the cached sources
+SOURCES_CACHE = TTLCache(maxsize=config("SOURCES_CACHE_SIZE_MB", cast=int, default=128) * 1024 * 1024,
+                         ttl=config("SOURCES_CACHE_TTL", cast=int, default=3600),
+                         getsizeof=lambda s: s.size)
+
+
+def __get_source(file_abs_path, ranged=True):
+    source = SOURCES_CACHE.get(file_abs_path)
+    if source is not None and (ranged or not isinstance(source, RangedSource)):
+        return None if source is __MISSING_SOURCE else source
+    source = None
+    bucket = config('js_cache_bucket')
+    file_path = get_js_cache_path(file_abs_path)
+    head = StorageClient.get_file_head(bucket, file_path, RANGED_SOURCE_SIZE)
+    if head is not None:
+        text, file_size = head
+        if file_size <= RANGED_SOURCE_SIZE:
+            source = IndexedSource(text)
+        elif ranged and "\n" not in text:
+            tail = StorageClient.get_file_range(bucket, file_path, file_size - RANGED_SOURCE_PROBE_SIZE, file_size - 1)
+            if tail is not None and "\n" not in tail:
+                source = RangedSource(bucket=bucket, key=file_path, file_size=file_size)
+        if source is None:
+            file = StorageClient.get_file(bucket, file_path)
+            if file is not None:
+                source = IndexedSource(file)
+    if source is None:
+        print(f"Missing abs_path: {file_abs_path}, file {file_path} not found in {bucket}")
+        # the file can be uploaded later, don't remember it for long
+        SOURCES_CACHE.set(file_abs_path, __MISSING_SOURCE, ttl=60)
+        return None
+    SOURCES_CACHE.set(file_abs_path, source)
+    return source
 
 
 def fetch_missed_contexts(frames):
-    source_cache = {}
     for i in range(len(frames)):
         if frames[i] and frames[i].get("context") and len(frames[i]["context"]) > 0:
             continue
-        file_abs_path = frames[i]["frame"]["absPath"]
-        if file_abs_path in source_cache:
-            file = source_cache[file_abs_path]
-        else:
-            file_path = get_js_cache_path(file_abs_path)
-            file = StorageClient.get_file(config('js_cache_bucket'), file_path)
-            if file is None:
-                print(f"Missing abs_path: {file_abs_path}, file {file_path} not found in {config('js_cache_bucket')}")
-            source_cache[file_abs_path] = file
-        if file is None:
+        source = __get_source(frames[i]["frame"]["absPath"])
+        if source is None:
             continue
-        lines = file.split("\n")
+        if isinstance(source, RangedSource) and (frames[i]["frame"].get("lineNo") or 0) > 1:
+            # the probes missed the line breaks of the file, it is not a single-line bundle
+            source = __get_source(frames[i]["frame"]["absPath"], ranged=False)
+            if source is None:
+                continue
 
         if frames[i]["lineNo"] is None:
             print("no original-source found for frame in sourcemap results")
@@ -168,17 +288,17 @@ def fetch_missed_contexts(frames):
 
         l = frames[i]["lineNo"] - 1  # starts from 1
         c = frames[i]["colNo"] - 1  # starts from 1
-        if len(lines) == 1:
+        if source.lines_count == 1:
             print(f"minified asset")
             l = frames[i]["frame"]["lineNo"] - 1  # starts from 1
             c = frames[i]["frame"]["colNo"] - 1  # starts from 1
-        elif l >= len(lines):
-            print(f"line number {l} greater than file length {len(lines)}")
+        elif l >= source.lines_count:
+            print(f"line number {l} greater than file length {source.lines_count}")
             continue
 
-        line = lines[l]
         offset = c - MAX_COLUMN_OFFSET
         if offset < 0:  # if the line is short
             offset = 0
-        frames[i]["context"].append([frames[i]["lineNo"], line[offset: c + MAX_COLUMN_OFFSET + 1]])
+        frames[i]["context"].append([frames[i]["lineNo"],
+                                     source.get_line_slice(line=l, start=offset, end=c + MAX_COLUMN_OFFSET + 1)])
     return frames
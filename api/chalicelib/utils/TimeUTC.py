@@ -137,3 +137,10 @@ class TimeUTC:
         return TimeUTC.datetime_to_timestamp(start
                                              .replace(hour=0, minute=0, second=0, microsecond=0)
                                              .astimezone(UTC_ZI))
+
+    @staticmethod
+    def closed_days(start, end, margin=0):
+        # indexes (timestamp // MS_DAY) of the whole UTC days of [start, end] that are over since margin ms at least
+        now = TimeUTC.now()
+        return [d for d in range(-(-start // TimeUTC.MS_DAY), (end + 1) // TimeUTC.MS_DAY)
+                if (d + 1) * TimeUTC.MS_DAY + margin <= now]
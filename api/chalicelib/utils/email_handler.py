@@ -1,5 +1,6 @@
 import logging
 import re
+from functools import lru_cache
 from email.header import Header
 from email.mime.image import MIMEImage
 from email.mime.multipart import MIMEMultipart
@@ -12,16 +13,24 @@ from chalicelib.utils import smtp
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=32)
+def __get_template(source):
+    with open(source, "r") as body:
+        return re.sub(r"%(?![(])", "%%", body.read())
+
+
+@lru_cache(maxsize=64)
+def __get_image(source):
+    with open(source, "rb") as image_file:
+        return image_file.read()
+
+
 def __get_html_from_file(source, formatting_variables):
     if formatting_variables is None:
         formatting_variables = {}
     formatting_variables["frontend_url"] = config("SITE_URL")
-    with open(source, "r") as body:
-        BODY_HTML = body.read()
-        if formatting_variables is not None and len(formatting_variables.keys()) > 0:
-            BODY_HTML = re.sub(r"%(?![(])", "%%", BODY_HTML)
-            BODY_HTML = BODY_HTML % {**formatting_variables}
-    return BODY_HTML
+    # templates are read and escaped once, only the formatting is done per email
+    return __get_template(source) % {**formatting_variables}
 
 
 def __replace_images(HTML):
@@ -36,18 +45,13 @@ def __replace_images(HTML):
             swap.append(sub)
             cid = f"img-{len(mime_img)}"
             HTML = HTML.replace(sub, f"cid:{cid}")
-            sub = "chalicelib/utils/html/" + sub
-            with open(sub, "rb") as image_file:
-                img_data = image_file.read()
-            mime_img.append(MIMEImage(img_data))
+            mime_img.append(MIMEImage(__get_image("chalicelib/utils/html/" + sub)))
             mime_img[-1].add_header('Content-ID', f'<{cid}>')
     return HTML, mime_img
 
 
-def send_html(BODY_HTML, SUBJECT, recipient):
+def __build_html_message(BODY_HTML, SUBJECT):
     BODY_HTML, mime_img = __replace_images(BODY_HTML)
-    if not isinstance(recipient, list):
-        recipient = [recipient]
     msg = MIMEMultipart('related')
     msg['Subject'] = Header(SUBJECT, 'utf-8')
     msg['From'] = config("EMAIL_FROM")
@@ -56,16 +60,36 @@ def send_html(BODY_HTML, SUBJECT, recipient):
     msg.attach(body)
     for m in mime_img:
         msg.attach(m)
+    return msg
 
+
+def __send_message(s, msg, recipient):
+    if not isinstance(recipient, list):
+        recipient = [recipient]
+    for r in recipient:
+        del msg["To"]
+        msg["To"] = r
+        try:
+            logging.info(f"Email sending to: {r}")
+            s.send_message(msg)
+        except Exception as e:
+            logging.error("!!! Email error!")
+            logging.error(e)
+
+
+def send_html(BODY_HTML, SUBJECT, recipient):
+    msg = __build_html_message(BODY_HTML=BODY_HTML, SUBJECT=SUBJECT)
     with smtp.SMTPClient() as s:
-        for r in recipient:
-            msg["To"] = r
-            try:
-                logging.info(f"Email sending to: {r}")
-                s.send_message(msg)
-            except Exception as e:
-                logging.error("!!! Email error!")
-                logging.error(e)
+        __send_message(s=s, msg=msg, recipient=recipient)
+
+
+def send_html_batch(emails, batch_size=config("EMAIL_BATCH_SIZE", cast=int, default=50)):
+    # emails: list of {"BODY_HTML", "SUBJECT", "recipient"}, sent over one SMTP connection per batch
+    for i in range(0, len(emails), batch_size):
+        with smtp.SMTPClient() as s:
+            for e in emails[i:i + batch_size]:
+                msg = __build_html_message(BODY_HTML=e["BODY_HTML"], SUBJECT=e["SUBJECT"])
+                __send_message(s=s, msg=msg, recipient=e["recipient"])
 
 
 def send_text(recipients, text, subject):
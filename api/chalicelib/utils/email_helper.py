@@ -1,5 +1,5 @@
 from chalicelib.utils.TimeUTC import TimeUTC
-from chalicelib.utils.email_handler import __get_html_from_file, send_html
+from chalicelib.utils.email_handler import __get_html_from_file, send_html, send_html_batch
 
 
 def send_team_invitation(recipient, client_id, sender_name, invitation_link):
@@ -36,7 +36,7 @@ def __get_color(idx):
     return "#3EAAAF" if idx == 0 else "#77C3C7" if idx == 1 else "#9ED4D7" if idx == 2 else "#99d59a"
 
 
-def weekly_report2(recipients, data):
+def __weekly_report_html(data):
     data["o_tr_u"] = ""
     data["o_tr_d"] = ""
     for d in data["days_partition"]:
@@ -114,6 +114,17 @@ def weekly_report2(recipients, data):
                 <tbody>{sup_partition}</tbody>
             </table>
           </td>"""
-    BODY_HTML = __get_html_from_file("chalicelib/utils/html/Project-Weekly-Report.html", formatting_variables=data)
-    SUBJECT = "OpenReplay Project Weekly Report"
-    send_html(BODY_HTML=BODY_HTML, SUBJECT=SUBJECT, recipient=recipients)
+    return __get_html_from_file("chalicelib/utils/html/Project-Weekly-Report.html", formatting_variables=data)
+
+
+WEEKLY_REPORT_SUBJECT = "OpenReplay Project Weekly Report"
+
+
+def weekly_report2(recipients, data):
+    send_html(BODY_HTML=__weekly_report_html(data), SUBJECT=WEEKLY_REPORT_SUBJECT, recipient=recipients)
+
+
+def weekly_report_batch(reports):
+    # reports: list of {"email": recipients, "data": report data}
+    send_html_batch([{"BODY_HTML": __weekly_report_html(r["data"]), "SUBJECT": WEEKLY_REPORT_SUBJECT,
+                      "recipient": r["email"]} for r in reports])
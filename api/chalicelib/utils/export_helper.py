@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+import logging
+from time import monotonic
+from typing import Iterable, List
+
+from decouple import config
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = config("EXPORT_BATCH_SIZE", cast=int, default=2000)
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def __to_csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=str)
+    return value
+
+
+def __flatten(row):
+    # nested dicts (metadata) become prefixed columns: {"metadata": {"plan": "x"}} -> {"metadata.plan": "x"}
+    flat = {}
+    for k, v in row.items():
+        if isinstance(v, dict):
+            for sk, sv in v.items():
+                flat[f"{k}.{sk}"] = sv
+        else:
+            flat[k] = v
+    return flat
+
+
+def stream_rows(rows: Iterable[dict], fmt: str, columns: List[str] = None, name: str = "export",
+                batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Encodes rows as NDJSON or CSV and yields one chunk of bytes per batch_size rows,
+    so only a single batch is in memory whatever the size of the export.
+    columns is required for CSV, nested dicts are flattened as 'key.sub_key' columns.
+    The throughput is logged once the stream is done or interrupted.
+    """
+    start = monotonic()
+    count = 0
+    buffer = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+    try:
+        for r in rows:
+            if writer is not None:
+                writer.writerow({k: __to_csv_value(v) for k, v in __flatten(r).items()})
+            else:
+                buffer.write(json.dumps(r, default=str))
+                buffer.write("\n")
+            count += 1
+            if count % batch_size == 0:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate(0)
+        if buffer.tell() > 0:
+            yield buffer.getvalue().encode("utf-8")
+    finally:
+        elapsed = monotonic() - start
+        logger.info(f"{name}: {count} rows in {elapsed:.2f}s "
+                    f"({count / elapsed if elapsed > 0 else count:.0f} rows/s)")
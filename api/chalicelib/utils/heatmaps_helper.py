@@ -0,0 +1,106 @@
+import numpy as np
+from decouple import config
+
+from chalicelib.utils.TimeUTC import TimeUTC
+from chalicelib.utils.ttl_cache import TTLCache
+
+DAY_MS = TimeUTC.MS_DAY
+MAX_SELECTORS = 20
+# (project_id, url, day, grid_size, click_rage, selectors) -> counts of a closed day, each day is queried on its own
+# bounds so its counts don't depend on the requested window
+DAYS_CACHE = TTLCache(maxsize=config("HEATMAPS_CACHE_SIZE", cast=int, default=2000),
+                      ttl=config("HEATMAPS_CACHE_TTL", cast=int, default=6 * 60 * 60))
+# a day is cached only once it is over since this number of seconds, late clicks are ingested meanwhile
+CACHE_LAG = config("HEATMAPS_CACHE_LAG", cast=int, default=60 * 60)
+
+
+def get_cell_expression(column, grid_size_key="grid_size"):
+    # normalized coordinates are percentages, a click on the right/bottom edge belongs to the last cell
+    return f"LEAST(GREATEST(FLOOR({column} * %({grid_size_key})s / 100), 0), %({grid_size_key})s - 1)"
+
+
+def __gaussian_kernel(sigma):
+    radius = max(int(3 * sigma), 1)
+    x = np.arange(-radius, radius + 1)
+    kernel = np.exp(-(x ** 2) / (2 * sigma ** 2))
+    return kernel / kernel.sum()
+
+
+def smooth(grid, sigma):
+    # separable gaussian blur, the total number of clicks is kept except for what falls off the edges
+    if sigma <= 0:
+        return grid
+    kernel = __gaussian_kernel(sigma)
+    radius = len(kernel) // 2
+    padded = np.pad(grid, ((0, 0), (radius, radius)))
+    grid = sum(kernel[i] * padded[:, i:i + grid.shape[1]] for i in range(len(kernel)))
+    padded = np.pad(grid, ((radius, radius), (0, 0)))
+    return sum(kernel[i] * padded[i:i + grid.shape[0], :] for i in range(len(kernel)))
+
+
+def __covers_window(start, end, days):
+    return len(days) > 0 and start == days[0] * DAY_MS and end == (days[-1] + 1) * DAY_MS - 1
+
+
+def __fetch_days(fetch_cells, fetch_selectors, days, excluded_days):
+    fetched = {}
+    for r in fetch_cells(days=days, excluded_days=excluded_days):
+        if r["day"] not in fetched:
+            fetched[r["day"]] = {"cells": [], "selectors": {}}
+        fetched[r["day"]]["cells"].append((int(r["x"]), int(r["y"]), r["count"]))
+    if fetch_selectors is not None:
+        for r in fetch_selectors(days=days, excluded_days=excluded_days):
+            if r["day"] not in fetched:
+                fetched[r["day"]] = {"cells": [], "selectors": {}}
+            fetched[r["day"]]["selectors"][r["selector"]] = r["count"]
+    return fetched
+
+
+def get_density_grid(project_id, data, fetch_cells, fetch_selectors=None):
+    """
+    Builds the density grid of all the clicks of the range.
+    fetch_cells(days, excluded_days) must return rows of {"day", "x", "y", "count"}: with days, only these days each
+    bounded to itself (its clicks of sessions started that day), otherwise the requested window except excluded_days.
+    fetch_selectors(days, excluded_days) returns rows of {"day", "selector", "count"} the same way.
+    The days over since CACHE_LAG are cached, only the ones missing from the cache and the rest of the window
+    (partial, current and recent days) are queried.
+    """
+    with_selectors = data.selectors and fetch_selectors is not None
+    fetch_selectors = fetch_selectors if with_selectors else None
+    closed_days = TimeUTC.closed_days(data.startTimestamp, data.endTimestamp, margin=CACHE_LAG * 1000)
+    days = {}
+    missing_days = []
+    for d in closed_days:
+        cached = DAYS_CACHE.get((project_id, data.url, d, data.grid_size, data.click_rage, with_selectors))
+        if cached is not None:
+            days[d] = cached
+        else:
+            missing_days.append(d)
+    if len(missing_days) > 0:
+        fetched = __fetch_days(fetch_cells, fetch_selectors, days=missing_days, excluded_days=[])
+        for d in missing_days:
+            days[d] = fetched.get(d, {"cells": [], "selectors": {}})
+            DAYS_CACHE.set((project_id, data.url, d, data.grid_size, data.click_rage, with_selectors), days[d])
+    if not __covers_window(data.startTimestamp, data.endTimestamp, closed_days):
+        days = {**days, **__fetch_days(fetch_cells, fetch_selectors, days=None, excluded_days=closed_days)}
+
+    grid = np.zeros((data.grid_size, data.grid_size), dtype=np.float64)
+    selectors = {}
+    for d in days.values():
+        if len(d["cells"]) > 0:
+            x, y, count = zip(*d["cells"])
+            np.add.at(grid, (np.array(y), np.array(x)), np.array(count, dtype=np.float64))
+        for s, c in d["selectors"].items():
+            selectors[s] = selectors.get(s, 0) + c
+    total = int(grid.sum())
+    grid = smooth(grid, data.smoothing)
+    y, x = np.nonzero(grid > 1e-4)
+    result = {"gridSize": data.grid_size,
+              "total": total,
+              "max": round(float(grid.max()), 4) if total > 0 else 0,
+              # sparse grid: [x, y, value] of every non-empty cell
+              "cells": [[int(i), int(j), round(float(v), 4)] for i, j, v in zip(x, y, grid[y, x])]}
+    if with_selectors:
+        result["selectors"] = [{"selector": s, "count": c}
+                               for s, c in sorted(selectors.items(), key=lambda i: i[1], reverse=True)[:MAX_SELECTORS]]
+    return result
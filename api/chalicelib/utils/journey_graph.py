@@ -0,0 +1,74 @@
+from typing import Iterable
+
+
+class JourneyGraphBuilder:
+    """
+    Builds the path-analysis Sankey graph ({"nodes", "links"}) in a single pass over the journey rows.
+    Nodes are interned in a dict (key -> index), so each row costs O(1) instead of O(nodes).
+    Rows are expected to be ordered by event_number_in_session, they can be fed straight from a cursor.
+    """
+
+    def __init__(self, reverse_path: bool = False):
+        self.reverse_path = reverse_path
+        self.total_100p = 0
+        self.__first_step = True
+        self.__nodes_idx = {}
+        self.__nodes = []
+        self.__links = []
+
+    def __intern(self, key, name, event_type) -> int:
+        idx = self.__nodes_idx.get(key)
+        if idx is None:
+            idx = len(self.__nodes)
+            self.__nodes_idx[key] = idx
+            self.__nodes.append({"name": name, "eventType": event_type,
+                                 "avgTimeFromPrevious": 0, "sessionsCount": 0})
+        return idx
+
+    def add_row(self, r):
+        if self.__first_step:
+            if r["event_number_in_session"] > 1:
+                self.__first_step = False
+            else:
+                self.total_100p += r["sessions_count"]
+
+        sr_idx = self.__intern(key=(r['event_number_in_session'], r['event_type'], r['e_value']),
+                               name=r['e_value'], event_type=r['event_type'])
+        if not r['next_value']:
+            return
+        tg_idx = self.__intern(key=(r['event_number_in_session'] + 1, r['next_type'], r['next_value']),
+                               name=r['next_value'], event_type=r['next_type'])
+        if r["avg_time_from_previous"] is not None:
+            self.__nodes[tg_idx]["avgTimeFromPrevious"] += r["avg_time_from_previous"] * r["sessions_count"]
+            self.__nodes[tg_idx]["sessionsCount"] += r["sessions_count"]
+        # the value depends on the total of the 1st step, it is computed in build()
+        link = {"eventType": r['event_type'], "sessionsCount": r["sessions_count"],
+                "value": None, "avgTimeFromPrevious": r["avg_time_from_previous"]}
+        if not self.reverse_path:
+            link["source"] = sr_idx
+            link["target"] = tg_idx
+        else:
+            link["source"] = tg_idx
+            link["target"] = sr_idx
+        self.__links.append(link)
+
+    def add_rows(self, rows: Iterable):
+        for r in rows:
+            self.add_row(r)
+        return self
+
+    def build(self):
+        for l in self.__links:
+            l["value"] = l["sessionsCount"] * 100 / self.total_100p if self.total_100p > 0 else 0
+        for n in self.__nodes:
+            if n["sessionsCount"] > 0:
+                n["avgTimeFromPrevious"] = n["avgTimeFromPrevious"] / n["sessionsCount"]
+            else:
+                n["avgTimeFromPrevious"] = None
+            n.pop("sessionsCount")
+        self.__links.sort(key=lambda x: (x["source"], x["target"]))
+        return {"nodes": self.__nodes, "links": self.__links}
+
+
+def build_journey(rows: Iterable, reverse_path: bool = False):
+    return JourneyGraphBuilder(reverse_path=reverse_path).add_rows(rows).build()
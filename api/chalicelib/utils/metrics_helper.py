@@ -1,5 +1,37 @@
+from decouple import config
+
+# smallest chart step, denser charts over short ranges only produce empty buckets
+MIN_STEP_SIZE = config("CHART_MIN_STEP_MS", cast=int, default=60 * 1000)
+MAX_DENSITY = config("CHART_MAX_DENSITY", cast=int, default=200)
+
+
 def __get_step_size(startTimestamp, endTimestamp, density, decimal=False, factor=1000):
     step_size = (endTimestamp // factor - startTimestamp // factor)
     if decimal:
         return step_size / density
     return step_size // (density - 1)
+
+
+def get_adaptive_density(startTimestamp, endTimestamp, density):
+    """
+    Caps the requested density by the time range: a step can't be smaller than MIN_STEP_SIZE.
+    """
+    density = min(density, MAX_DENSITY, max((endTimestamp - startTimestamp) // MIN_STEP_SIZE + 1, 2))
+    return max(density, 2)
+
+
+def get_step_expression(column, start_key="startTimestamp", step_key="step_size"):
+    # bucket index of a row, to be used in a single GROUP BY pass instead of a generate_series LATERAL join
+    return f"(({column} - %({start_key})s) / %({step_key})s)"
+
+
+def complete_steps(rows, startTimestamp, endTimestamp, step_size, neutral, step_key="step", time_key="timestamp"):
+    """
+    Turns the rows of a GROUP BY step query into the same series generate_series(start, end, step) would produce,
+    empty steps are filled with a copy of neutral.
+    """
+    steps = [{time_key: t, **neutral} for t in range(startTimestamp, endTimestamp + 1, step_size)]
+    for r in rows:
+        i = min(max(r.pop(step_key), 0), len(steps) - 1)
+        steps[i] = {time_key: steps[i][time_key], **r}
+    return steps
@@ -114,6 +114,7 @@ class PostgresClient:
             self.cursor.cursor_execute = self.cursor.execute
             self.cursor.execute = self.__execute
             self.cursor.recreate = self.recreate_cursor
+            self.cursor.server_side = self.server_side_cursor
         return self.cursor
 
     def __exit__(self, *args):
@@ -151,6 +152,13 @@ class PostgresClient:
             raise error
         return result
 
+    def server_side_cursor(self, name, itersize=2000):
+        # named cursor: rows are kept on the server and fetched by batches of itersize,
+        # use it with a long_query/unlimited_query client to not hold a pooled connection
+        cursor = self.connection.cursor(name=name, cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.itersize = itersize
+        return cursor
+
     def recreate_cursor(self, rollback=False):
         if rollback:
             try:
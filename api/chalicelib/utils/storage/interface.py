@@ -12,6 +12,17 @@ class ObjectStorage(ABC):
         # Download and returns the file contents as bytes
         pass
 
+    @abstractmethod
+    def get_file_head(self, bucket, key, size):
+        # Download the first `size` bytes of the file in a single request,
+        # returns (decoded bytes, total size of the object in bytes), None if it doesn't exist
+        pass
+
+    @abstractmethod
+    def get_file_range(self, bucket, key, start, end):
+        # Download and returns the decoded bytes [start, end] (inclusive) of the file, None if it doesn't exist
+        pass
+
     @abstractmethod
     def get_presigned_url_for_sharing(self, bucket, expires_in, key, check_exists=False):
         # Returns a pre-signed URL for downloading the file from the object storage
@@ -92,6 +92,39 @@ class AmazonS3Storage(ObjectStorage):
                 raise ex
         return result["Body"].read().decode()
 
+    def get_file_head(self, bucket, key, size):
+        try:
+            result = self.client.get_object(
+                Bucket=bucket,
+                Key=key,
+                Range=f"bytes=0-{size - 1}"
+            )
+        except ClientError as ex:
+            if ex.response['Error']['Code'] == 'NoSuchKey':
+                return None
+            elif ex.response['Error']['Code'] == 'InvalidRange':
+                # empty object
+                return "", 0
+            else:
+                raise ex
+        # ContentRange: bytes 0-{end}/{total size}
+        return result["Body"].read().decode(errors="ignore"), int(result["ContentRange"].split("/")[-1])
+
+    def get_file_range(self, bucket, key, start, end):
+        try:
+            result = self.client.get_object(
+                Bucket=bucket,
+                Key=key,
+                Range=f"bytes={start}-{end}"
+            )
+        except ClientError as ex:
+            if ex.response['Error']['Code'] == 'NoSuchKey':
+                return None
+            else:
+                raise ex
+        # the range can cut a multibyte character
+        return result["Body"].read().decode(errors="ignore")
+
     def tag_for_deletion(self, bucket, key):
         if not self.exists(bucket, key):
             return False
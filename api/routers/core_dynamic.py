@@ -3,7 +3,7 @@ from typing import Optional, Union
 from decouple import config
 from fastapi import Body, Depends, BackgroundTasks
 from fastapi import HTTPException, status
-from starlette.responses import RedirectResponse, FileResponse, JSONResponse, Response
+from starlette.responses import RedirectResponse, FileResponse, JSONResponse, Response, StreamingResponse
 
 import schemas
 from chalicelib.core import sessions, errors, errors_viewed, errors_favorite, sessions_assignments, heatmaps, \
@@ -14,6 +14,7 @@ from chalicelib.core import webhook
 from chalicelib.core.collaboration_slack import Slack
 from chalicelib.utils import captcha, smtp
 from chalicelib.utils import helper
+from chalicelib.utils.export_helper import MEDIA_TYPES
 from chalicelib.utils.TimeUTC import TimeUTC
 from or_dependencies import OR_context, OR_role
 from routers.base import get_routers
@@ -253,6 +254,16 @@ def session_ids_search(projectId: int, data: schemas.SessionsSearchPayloadSchema
     return {'data': data}
 
 
+@app.post('/{projectId}/sessions/search/export', tags=["sessions"])
+def sessions_search_export(projectId: int, data: schemas.SessionsSearchPayloadSchema = Body(...),
+                           format: schemas.ExportFormat = schemas.ExportFormat.ndjson,
+                           context: schemas.CurrentContext = Depends(OR_context)):
+    content = sessions.search_sessions_stream(data=data, project_id=projectId, user_id=context.user_id,
+                                              fmt=format, platform=context.project.platform)
+    return StreamingResponse(content, media_type=MEDIA_TYPES[format],
+                             headers={"Content-Disposition": f'attachment; filename="sessions-{projectId}.{format.value}"'})
+
+
 @app.get('/{projectId}/sessions/{sessionId}/first-mob', tags=["sessions", "replay"])
 def get_first_mob_file(projectId: int, sessionId: Union[int, str], background_tasks: BackgroundTasks,
                        context: schemas.CurrentContext = Depends(OR_context)):
@@ -726,6 +726,11 @@ class SortOrderType(str, Enum):
     desc = "DESC"
 
 
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
 def add_missing_is_event(values: dict):
     if values.get("isEvent") is None:
         values["isEvent"] = (EventType.has_value(values["type"])
@@ -747,6 +752,8 @@ class SessionsSearchPayloadSchema(_TimedSchema, _PaginatedSchema):
     events_order: Optional[SearchEventOrder] = Field(default=SearchEventOrder._then)
     group_by_user: bool = Field(default=False)
     bookmarked: bool = Field(default=False)
+    # estimate the totals from a sample instead of counting them
+    approximate_count: bool = Field(default=False)
 
     @model_validator(mode="before")
     def transform_order(cls, values):
@@ -1265,6 +1272,11 @@ class CardWebVital(__CardSchema):
         return values
 
 
+class CardPredefinedBatchSchema(CardSessionsSchema):
+    metrics_of: List[Union[MetricOfWebVitals, MetricOfErrors, MetricOfPerformance, MetricOfResources]] = \
+        Field(..., min_length=1)
+
+
 class CardHeatMap(__CardSchema):
     metric_type: Literal[MetricType.heat_map]
     metric_of: MetricOfHeatMap = Field(default=MetricOfHeatMap.heat_map_url)
@@ -1575,10 +1587,20 @@ class HeatMapFilterSchema(BaseModel):
     operator: Literal[SearchEventOperator._is, MathOperator._equal] = Field(...)
 
 
+class HeatMapMode(str, Enum):
+    points = "points"
+    density = "density"
+
+
 class GetHeatMapPayloadSchema(_TimedSchema):
     url: str = Field(...)
     filters: List[HeatMapFilterSchema] = Field(default=[])
     click_rage: bool = Field(default=False)
+    mode: HeatMapMode = Field(default=HeatMapMode.points)
+    # density mode: number of cells per axis, gaussian smoothing radius in cells, hot-spots by selector
+    grid_size: int = Field(default=100, ge=10, le=400)
+    smoothing: float = Field(default=1, ge=0, le=10)
+    selectors: bool = Field(default=False)
 
 
 class GetClickMapPayloadSchema(GetHeatMapPayloadSchema):
@@ -0,0 +1,92 @@
+import random
+from time import time
+
+from chalicelib.utils.journey_graph import build_journey
+
+
+def _legacy_transform_journey(rows, reverse_path=False):
+    total_100p = 0
+    for r in rows:
+        if r["event_number_in_session"] > 1:
+            break
+        total_100p += r["sessions_count"]
+    for i in range(len(rows)):
+        rows[i]["value"] = rows[i]["sessions_count"] * 100 / total_100p
+
+    nodes = []
+    nodes_values = []
+    links = []
+    for r in rows:
+        source = f"{r['event_number_in_session']}_{r['event_type']}_{r['e_value']}"
+        if source not in nodes:
+            nodes.append(source)
+            nodes_values.append({"name": r['e_value'], "eventType": r['event_type'],
+                                 "avgTimeFromPrevious": 0, "sessionsCount": 0})
+        if r['next_value']:
+            target = f"{r['event_number_in_session'] + 1}_{r['next_type']}_{r['next_value']}"
+            if target not in nodes:
+                nodes.append(target)
+                nodes_values.append({"name": r['next_value'], "eventType": r['next_type'],
+                                     "avgTimeFromPrevious": 0, "sessionsCount": 0})
+
+            sr_idx = nodes.index(source)
+            tg_idx = nodes.index(target)
+            if r["avg_time_from_previous"] is not None:
+                nodes_values[tg_idx]["avgTimeFromPrevious"] += r["avg_time_from_previous"] * r["sessions_count"]
+                nodes_values[tg_idx]["sessionsCount"] += r["sessions_count"]
+            link = {"eventType": r['event_type'], "sessionsCount": r["sessions_count"],
+                    "value": r["value"], "avgTimeFromPrevious": r["avg_time_from_previous"]}
+            if not reverse_path:
+                link["source"] = sr_idx
+                link["target"] = tg_idx
+            else:
+                link["source"] = tg_idx
+                link["target"] = sr_idx
+            links.append(link)
+    for n in nodes_values:
+        if n["sessionsCount"] > 0:
+            n["avgTimeFromPrevious"] = n["avgTimeFromPrevious"] / n["sessionsCount"]
+        else:
+            n["avgTimeFromPrevious"] = None
+        n.pop("sessionsCount")
+
+    return {"nodes": nodes_values,
+            "links": sorted(links, key=lambda x: (x["source"], x["target"]), reverse=False)}
+
+
+def _generate_rows(steps, values_per_step, seed=0):
+    rnd = random.Random(seed)
+    types = ["LOCATION", "CLICK", "INPUT", "CUSTOM"]
+    rows = []
+    for step in range(1, steps + 1):
+        for v in range(values_per_step):
+            has_next = step < steps and rnd.random() > 0.1
+            rows.append({"event_number_in_session": step,
+                         "event_type": rnd.choice(types),
+                         "e_value": f"/path/{v}",
+                         "next_type": rnd.choice(types) if has_next else None,
+                         "next_value": f"/path/{rnd.randrange(values_per_step)}" if has_next else None,
+                         "sessions_count": rnd.randint(1, 500),
+                         "avg_time_from_previous": rnd.choice([None, rnd.randint(0, 60000)])})
+    return rows
+
+
+class TestJourneyGraph:
+    def test_same_output_as_legacy(self):
+        for reverse in (False, True):
+            rows = _generate_rows(steps=6, values_per_step=40, seed=7)
+            expected = _legacy_transform_journey([dict(r) for r in rows], reverse_path=reverse)
+            assert build_journey(rows=iter(rows), reverse_path=reverse) == expected
+
+    def test_empty_rows(self):
+        assert build_journey(rows=[]) == {"nodes": [], "links": []}
+
+    def test_benchmark_100k_rows(self):
+        rows = _generate_rows(steps=10, values_per_step=10_000, seed=42)
+        assert len(rows) == 100_000
+        start = time()
+        result = build_journey(rows=rows)
+        elapsed = time() - start
+        assert len(result["links"]) > 0
+        # the quadratic implementation takes minutes on this input
+        assert elapsed < 10
@@ -0,0 +1,105 @@
+import re
+import sqlite3
+
+import pytest
+
+import schemas
+from chalicelib.core import custom_metrics_predefined, metrics
+
+START = 1700000000000
+END = START + 24 * 3600 * 1000
+HOUR = 3600 * 1000
+
+
+class SQLiteCursor:
+    # runs the metrics queries on sqlite, the SQL they use is understood by both
+    def __init__(self, db):
+        self.cursor = db.cursor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def mogrify(self, query, args):
+        return re.sub(r"%\((\w+)\)s", r":\1", query), args
+
+    def execute(self, query):
+        self.cursor.execute(*query)
+
+    def fetchall(self):
+        return [dict(r) for r in self.cursor.fetchall()]
+
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        return dict(row) if row is not None else None
+
+
+def session(session_id, start_ts, duration=500, pages_count=3, project_id=1):
+    return session_id, project_id, start_ts, duration, pages_count
+
+
+def page(session_id, timestamp, value=100):
+    # response_time, first_paint_time, dom_content_loaded_time, ttfb, time_to_interactive, load_time, fcp
+    return session_id, timestamp, "/", value, value + 1, value + 2, value + 3, value + 4, value + 5, value + 6
+
+
+SESSIONS = [session(1, START - 20 * HOUR, duration=300, pages_count=2),
+            session(2, START + HOUR, duration=700, pages_count=5),
+            session(3, START + 2 * HOUR, duration=400, pages_count=4),
+            session(4, START + 9 * HOUR, duration=900, pages_count=0),
+            session(5, START + 23 * HOUR, duration=200, pages_count=1),
+            session(6, START + 2 * HOUR, project_id=2),
+            session(7, END + HOUR),
+            session(8, START + 6 * HOUR, duration=None, pages_count=4)]
+PAGES = [page(1, START - 20 * HOUR, 50), page(1, START - 2 * HOUR, 70),
+         page(2, START + HOUR, 200), page(2, START + 3 * HOUR, 0), page(2, START + 4 * HOUR, 400),
+         page(4, START + 10 * HOUR, 300),
+         # a page of a current session after the end of the period
+         page(5, END + 2 * HOUR, 900),
+         page(6, START + 2 * HOUR, 800)]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    connection = sqlite3.connect(":memory:")
+    connection.row_factory = sqlite3.Row
+    connection.execute("ATTACH ':memory:' AS public")
+    connection.execute("ATTACH ':memory:' AS events")
+    connection.execute("""CREATE TABLE public.sessions (session_id INTEGER, project_id INTEGER, start_ts INTEGER,
+                                                         duration INTEGER, pages_count INTEGER)""")
+    connection.execute("""CREATE TABLE events.pages (session_id INTEGER, timestamp INTEGER, path TEXT,
+                                                      response_time INTEGER, first_paint_time INTEGER,
+                                                      dom_content_loaded_time INTEGER, ttfb INTEGER,
+                                                      time_to_interactive INTEGER, load_time INTEGER,
+                                                      first_contentful_paint_time INTEGER)""")
+    connection.executemany("INSERT INTO public.sessions VALUES (?,?,?,?,?)", SESSIONS)
+    connection.executemany("INSERT INTO events.pages VALUES (?,?,?,?,?,?,?,?,?,?)", PAGES)
+    monkeypatch.setattr(metrics.pg_client, "PostgresClient", lambda: SQLiteCursor(connection))
+    monkeypatch.setattr(metrics.metadata, "get", lambda project_id: [])
+    return connection
+
+
+@pytest.mark.parametrize("density", [7, 20])
+def test_shared_scan_matches_dedicated_functions(db, density):
+    keys = list(metrics.SHARED_SCAN_METRICS)
+    data = {"startTimestamp": START, "endTimestamp": END, "density": density}
+    batched = custom_metrics_predefined.get_metrics(keys=keys, project_id=1, data=dict(data))
+    for k in keys:
+        single = custom_metrics_predefined.get_metric(key=k, project_id=1, data=dict(data))
+        assert batched[k].keys() == single.keys(), k
+        assert batched[k]["value"] == pytest.approx(single["value"]), k
+        assert batched[k].get("progress") == pytest.approx(single.get("progress")), k
+        assert batched[k]["unit"] == single["unit"], k
+        assert [c["timestamp"] for c in batched[k]["chart"]] == [c["timestamp"] for c in single["chart"]], k
+        assert [c["value"] for c in batched[k]["chart"]] == pytest.approx([c["value"] for c in single["chart"]]), k
+
+
+def test_visited_pages_value_is_rounded_up_but_not_its_chart(db):
+    data = {"startTimestamp": START, "endTimestamp": END, "density": 7}
+    key = schemas.MetricOfWebVitals.avg_visited_pages
+    result = custom_metrics_predefined.get_metrics(keys=[key], project_id=1, data=data)[key]
+    # (5 + 4 + 1) / 3 sessions with pages, the chart has 4 hours steps
+    assert result["value"] == 4
+    assert [c["value"] for c in result["chart"]] == [4.5, 0, 0, 0, 0, 1, 0]
@@ -0,0 +1,80 @@
+import math
+
+import pytest
+
+from chalicelib.core import sessions
+
+QUERY_PART = "FROM public.sessions AS s WHERE s.project_id = %(project_id)s"
+RESPONSE_KEYS = {"count_sessions", "count_users", "approximate", "count_sessions_error", "count_users_error"}
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.queries = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def mogrify(self, query, args):
+        return query
+
+    def execute(self, query):
+        self.queries.append(query)
+
+    def fetchone(self):
+        return self.rows.pop(0)
+
+
+@pytest.fixture
+def cursor(monkeypatch):
+    def use(rows, sample_rate=0.25, min_sample_size=1000):
+        cur = FakeCursor(rows)
+        monkeypatch.setattr(sessions.pg_client, "PostgresClient", lambda: cur)
+        monkeypatch.setattr(sessions, "SAMPLE_RATE", sample_rate)
+        monkeypatch.setattr(sessions, "MIN_SAMPLE_SIZE", min_sample_size)
+        return cur
+
+    return use
+
+
+def count():
+    return sessions.__count_sessions_approximate(query_part=QUERY_PART, full_args={"project_id": 1})
+
+
+def test_large_sample_is_extrapolated_in_one_pass(cursor):
+    cur = cursor([{"count_sessions": 2000, "count_users": 300}])
+    result = count()
+    assert set(result.keys()) == RESPONSE_KEYS
+    assert result["approximate"] is True
+    assert result["count_sessions"] == 8000 and result["count_users"] == 1200
+    assert result["count_sessions_error"] == round(1.96 * math.sqrt(2000 * 0.75) / 0.25)
+    assert result["count_users_error"] == round(1.96 * math.sqrt(300 * 0.75) / 0.25)
+    # the sample predicate is part of the WHERE clause of the single query
+    assert len(cur.queries) == 1
+    assert "AND ((hashint8(s.session_id) & 65535) <" in cur.queries[0]
+
+
+def test_small_sample_is_counted_exactly(cursor):
+    cur = cursor([{"count_sessions": 2, "count_users": 1}, {"count_sessions": 8, "count_users": 5}])
+    result = count()
+    assert set(result.keys()) == RESPONSE_KEYS
+    assert result == {"count_sessions": 8, "count_users": 5, "approximate": False,
+                      "count_sessions_error": 0, "count_users_error": 0}
+    assert len(cur.queries) == 2
+    assert "hashint8" not in cur.queries[1]
+
+
+def test_empty_sample_is_never_reported_as_exact_zero(cursor):
+    cursor([{"count_sessions": 0, "count_users": 0}, {"count_sessions": 3, "count_users": 3}])
+    assert count()["count_sessions"] == 3
+
+
+def test_full_rate_counts_exactly(cursor):
+    cur = cursor([{"count_sessions": 42, "count_users": 7}], sample_rate=1)
+    result = count()
+    assert result["approximate"] is False and result["count_sessions"] == 42
+    assert len(cur.queries) == 1 and "hashint8" not in cur.queries[0]
@@ -0,0 +1,68 @@
+import pytest
+
+import schemas
+from chalicelib.core import sessions
+from chalicelib.utils.ttl_cache import TTLCache
+
+
+def payload(start=1700000000000, end=1700086400000, browser="Chrome", plan="free"):
+    return schemas.SessionsSearchPayloadSchema.model_validate(
+        {"startTimestamp": start, "endTimestamp": end,
+         "filters": [{"type": "userBrowser", "value": [browser], "operator": "is"},
+                     {"type": "metadata", "source": "plan", "value": [plan], "operator": "is"}]})
+
+
+@pytest.fixture
+def builder(monkeypatch):
+    mapping = [{"key": "plan", "index": 1}]
+    builds = []
+    build = getattr(sessions, "__build_query_parts")
+
+    def counting_build(**kwargs):
+        builds.append(kwargs)
+        return build(**kwargs)
+
+    monkeypatch.setattr(sessions, "QUERY_PARTS_CACHE", TTLCache(maxsize=100, ttl=60))
+    monkeypatch.setattr(sessions, "__build_query_parts", counting_build)
+    monkeypatch.setattr(sessions.metadata, "get", lambda project_id: list(mapping))
+    return builds, mapping
+
+
+def parts(data, favorite_only=False):
+    return sessions.search_query_parts(data=data, error_status=schemas.ErrorStatus.all, errors_only=False,
+                                       favorite_only=favorite_only, issue=None, project_id=1, user_id=1)
+
+
+def test_searches_differing_only_in_window_share_sql(builder):
+    builds, _ = builder
+    args1, sql1 = parts(payload())
+    args2, sql2 = parts(payload(start=1700100000000, end=1700200000000))
+    assert len(builds) == 1
+    assert sql1 == sql2
+    assert (args1["startDate"], args1["endDate"]) == (1700000000000, 1700086400000)
+    assert (args2["startDate"], args2["endDate"]) == (1700100000000, 1700200000000)
+
+
+def test_searches_differing_in_value_are_built_separately(builder):
+    builds, _ = builder
+    args1, _ = parts(payload(browser="Chrome"))
+    args2, _ = parts(payload(browser="Firefox"))
+    assert len(builds) == 2
+    assert "Chrome" in args1.values() and "Firefox" in args2.values()
+
+
+def test_metadata_mapping_change_is_not_served_from_cache(builder):
+    builds, mapping = builder
+    _, sql1 = parts(payload())
+    mapping[0] = {"key": "plan", "index": 2}
+    _, sql2 = parts(payload())
+    assert len(builds) == 2
+    assert "metadata_1" in sql1 and "metadata_2" in sql2
+
+
+def test_favorites_are_built_separately(builder):
+    builds, _ = builder
+    _, sql1 = parts(payload())
+    _, sql2 = parts(payload(), favorite_only=True)
+    assert len(builds) == 2
+    assert sql1 != sql2
@@ -1,5 +1,4 @@
 import logging
-import queue
 import time
 from contextlib import asynccontextmanager
 
@@ -47,12 +46,11 @@ async def lifespan(app: FastAPI):
     ap_logger.setLevel(loglevel)
 
     app.schedule = AsyncIOScheduler()
-    app.queue_system = queue.Queue()
     await pg_client.init()
     await events_queue.init()
     app.schedule.start()
 
-    for job in core_crons.cron_jobs + core_dynamic_crons.cron_jobs + traces.cron_jobs + ee_crons.ee_cron_jobs:
+    for job in core_crons.cron_jobs + core_dynamic_crons.cron_jobs + ee_crons.ee_cron_jobs:
         app.schedule.add_job(id=job["func"].__name__, **job)
 
     ap_logger.info(">Scheduled jobs:")
@@ -72,15 +70,16 @@ async def lifespan(app: FastAPI):
                                                 min_size=config("PG_AIO_MINCONN", cast=int, default=1),
                                                 max_size=config("PG_AIO_MAXCONN", cast=int, default=5), )
     app.state.postgresql = database
+    await traces.init(pool=database)
 
     # App listening
     yield
 
     # Shutdown
-    await database.close()
     logging.info(">>>>> shutting down <<<<<")
     app.schedule.shutdown(wait=True)
-    await traces.process_traces_queue()
+    await traces.terminate()
+    await database.close()
     await events_queue.terminate()
     await pg_client.terminate()
 
@@ -1,6 +1,7 @@
 import logging
 from datetime import datetime
 
+from decouple import config
 from fastapi import HTTPException
 
 from chalicelib.utils import pg_client, helper
@@ -13,89 +14,68 @@ event_type_mapping = {
     "controlDuration": "control"
 }
 
+HOUR = 60 * 60 * 1000
+AGGREGATION_WINDOW = config("ASSIST_STATS_AGGREGATION_WINDOW_HOURS", cast=int, default=24) * HOUR
+
 
 def insert_aggregated_data():
     try:
         logging.debug("Assist Stats: Inserting aggregated data")
-        end_timestamp = int(datetime.timestamp(datetime.now())) * 1000
+        # only the complete hours are aggregated, so each hour of each agent is inserted once
+        end_timestamp = int(datetime.timestamp(datetime.now())) * 1000 // HOUR * HOUR - 1
         start_timestamp = __last_run_end_timestamp_from_aggregates()
 
         if start_timestamp is None:  # first run
             logging.debug("Assist Stats: First run, inserting data for last 7 days")
             start_timestamp = end_timestamp - (7 * 24 * 60 * 60 * 1000)
 
-        offset = 0
-        chunk_size = 1000
-
-        while True:
-            constraints = [
-                "timestamp BETWEEN %(start_timestamp)s AND %(end_timestamp)s"
-            ]
-
-            params = {
-                "limit": chunk_size,
-                "offset": offset,
-                "start_timestamp": start_timestamp + 1,
-                "end_timestamp": end_timestamp,
-                "step_size": f"{60} seconds",
-            }
-
-            logging.debug(f"Assist Stats: Fetching data from {start_timestamp} to {end_timestamp}")
-            aggregated_data = __get_all_events_hourly_averages(constraints, params)
-
-            if not aggregated_data:  # No more data to insert
-                logging.debug("Assist Stats: No more data to insert")
-                break
-
-            logging.debug(f"Assist Stats: Inserting {len(aggregated_data)} rows")
-
-            for data in aggregated_data:
-                sql = """
-                    INSERT INTO assist_events_aggregates 
-                    (timestamp, project_id, agent_id, assist_avg, call_avg, control_avg, assist_total, call_total, control_total)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                params = (
-                    data['time'],
-                    data['project_id'],
-                    data['agent_id'],
-                    data['assist_avg'],
-                    data['call_avg'],
-                    data['control_avg'],
-                    data['assist_total'],
-                    data['call_total'],
-                    data['control_total']
-                )
-
-                with pg_client.PostgresClient() as cur:
-                    cur.execute(sql, params)
-
-            offset += chunk_size
-
-        # get the first timestamp from the table assist_events based on start_timestamp
-        sql = f"""
-            SELECT MAX(timestamp) as first_timestamp
-                FROM assist_events
-            WHERE timestamp > %(start_timestamp)s AND duration > 0
-            GROUP BY timestamp
-            ORDER BY timestamp DESC LIMIT 1
-        """
-        with pg_client.PostgresClient() as cur:
-            cur.execute(sql, params)
-            result = cur.fetchone()
-            first_timestamp = result['first_timestamp'] if result else None
-
-        # insert the first timestamp into assist_events_aggregates_logs
-        if first_timestamp is not None:
-            sql = "INSERT INTO assist_events_aggregates_logs (time) VALUES (%s)"
-            params = (first_timestamp,)
-            with pg_client.PostgresClient() as cur:
-                cur.execute(sql, params)
+        # after a downtime the missing hours are aggregated by windows, one statement per window
+        while start_timestamp < end_timestamp:
+            window_end = min((start_timestamp + 1) // HOUR * HOUR + AGGREGATION_WINDOW - 1, end_timestamp)
+            logging.debug(f"Assist Stats: Aggregating data from {start_timestamp} to {window_end}")
+            rows_count = __aggregate_window(start_timestamp=start_timestamp, end_timestamp=window_end)
+            logging.debug(f"Assist Stats: Inserted {rows_count} rows")
+            start_timestamp = window_end
 
     except Exception as e:
         logging.error(f"Error inserting aggregated data -: {e}")
 
 
+def __aggregate_window(start_timestamp, end_timestamp):
+    # the aggregates and the new watermark (last aggregated timestamp) are inserted by the same statement,
+    # a failed window is aggregated again on the next run
+    sql = """
+        WITH aggregated AS (
+            INSERT INTO assist_events_aggregates
+                (timestamp, project_id, agent_id, assist_avg, call_avg, control_avg, assist_total, call_total, control_total)
+            SELECT
+                EXTRACT(epoch FROM DATE_TRUNC('hour', to_timestamp(timestamp/1000)))::bigint * 1000 as time,
+                project_id,
+                agent_id,
+                ROUND(AVG(CASE WHEN event_type = 'assist' THEN duration ELSE 0 END)) as assist_avg,
+                ROUND(AVG(CASE WHEN event_type = 'call' THEN duration ELSE 0 END)) as call_avg,
+                ROUND(AVG(CASE WHEN event_type = 'control' THEN duration ELSE 0 END)) as control_avg,
+                ROUND(SUM(CASE WHEN event_type = 'assist' THEN duration ELSE 0 END)) as assist_total,
+                ROUND(SUM(CASE WHEN event_type = 'call' THEN duration ELSE 0 END)) as call_total,
+                ROUND(SUM(CASE WHEN event_type = 'control' THEN duration ELSE 0 END)) as control_total
+            FROM assist_events
+            WHERE timestamp > %(start_timestamp)s
+              AND timestamp <= %(end_timestamp)s
+              AND agent_id IS NOT NULL
+            GROUP BY time, project_id, agent_id
+            RETURNING 1
+        )
+        INSERT INTO assist_events_aggregates_logs (time)
+        SELECT %(end_timestamp)s
+        RETURNING (SELECT COUNT(1) FROM aggregated) AS rows_count;
+    """
+    with pg_client.PostgresClient() as cur:
+        query = cur.mogrify(sql, {"start_timestamp": start_timestamp, "end_timestamp": end_timestamp})
+        cur.execute(query)
+        result = cur.fetchone()
+    return result["rows_count"]
+
+
 def __last_run_end_timestamp_from_aggregates():
     sql = "SELECT MAX(time) as last_run_time FROM assist_events_aggregates_logs;"
     with pg_client.PostgresClient() as cur:
@@ -113,42 +93,6 @@ def __last_run_end_timestamp_from_aggregates():
     return last_run_time
 
 
-def __get_all_events_hourly_averages(constraints, params):
-    sql = f"""
-        WITH time_series AS (
-            SELECT
-                EXTRACT(epoch FROM generate_series(
-                    date_trunc('hour', to_timestamp(%(start_timestamp)s/1000)),
-                    date_trunc('hour', to_timestamp(%(end_timestamp)s/1000)) + interval '1 hour',
-                    interval %(step_size)s
-                ))::bigint as unix_time
-        )
-        SELECT
-            time_series.unix_time * 1000 as time,
-            project_id,
-            agent_id,
-            ROUND(AVG(CASE WHEN event_type = 'assist' THEN duration ELSE 0 END)) as assist_avg,
-            ROUND(AVG(CASE WHEN event_type = 'call' THEN duration ELSE 0 END)) as call_avg,
-            ROUND(AVG(CASE WHEN event_type = 'control' THEN duration ELSE 0 END)) as control_avg,
-            ROUND(SUM(CASE WHEN event_type = 'assist' THEN duration ELSE 0 END)) as assist_total,
-            ROUND(SUM(CASE WHEN event_type = 'call' THEN duration ELSE 0 END)) as call_total,
-            ROUND(SUM(CASE WHEN event_type = 'control' THEN duration ELSE 0 END)) as control_total
-        FROM
-            time_series
-            LEFT JOIN assist_events ON time_series.unix_time = EXTRACT(epoch FROM DATE_TRUNC('hour', to_timestamp(assist_events.timestamp/1000)))
-        WHERE
-            {' AND '.join(f'{constraint}' for constraint in constraints)}
-        GROUP BY time, project_id, agent_id
-        ORDER BY time
-        LIMIT %(limit)s OFFSET %(offset)s;
-    """
-    with pg_client.PostgresClient() as cur:
-        query = cur.mogrify(sql, params)
-        cur.execute(query)
-        rows = cur.fetchall()
-    return rows
-
-
 def get_averages(
         project_id: int,
         start_timestamp: int,
@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from time import time
 from urllib.parse import urlparse
 
 import redis
@@ -7,6 +9,12 @@ from decouple import config
 
 from chalicelib.utils import pg_client, ch_client
 from chalicelib.utils.TimeUTC import TimeUTC
+from chalicelib.utils.ttl_cache import TTLCache
+
+HEALTH_TIMEOUT = config("HEALTH_TIMEOUT", cast=int, default=2)
+# all probes run concurrently, the ones still running after this many seconds are reported as failed
+HEALTH_DEADLINE = config("HEALTH_DEADLINE", cast=int, default=5)
+HEALTH_CACHE = TTLCache(maxsize=1000, ttl=config("HEALTH_CACHE_TTL", cast=int, default=10))
 
 
 def app_connection_string(name, port, path):
@@ -86,7 +94,7 @@ def __check_be_service(service_name):
             }
         }
         try:
-            results = requests.get(HEALTH_ENDPOINTS.get(service_name), timeout=2)
+            results = requests.get(HEALTH_ENDPOINTS.get(service_name), timeout=HEALTH_TIMEOUT)
             if results.status_code != 200:
                 print(f"!! issue with the {service_name}-health code:{results.status_code}")
                 print(results.text)
@@ -125,7 +133,7 @@ def __check_redis(*_):
 
     try:
         u = urlparse(config("REDIS_STRING"))
-        r = redis.Redis(host=u.hostname, port=u.port, socket_timeout=2)
+        r = redis.Redis(host=u.hostname, port=u.port, socket_timeout=HEALTH_TIMEOUT)
         r.ping()
     except Exception as e:
         print("!! Issue getting redis-health response")
@@ -149,7 +157,7 @@ def __check_SSL(*_):
         }
     }
     try:
-        requests.get(config("SITE_URL"), verify=True, allow_redirects=True)
+        requests.get(config("SITE_URL"), verify=True, allow_redirects=True, timeout=HEALTH_TIMEOUT)
     except Exception as e:
         print("!! health failed: SSL Certificate")
         print(str(e))
@@ -180,6 +188,9 @@ def __get_sessions_stats(tenant_id, *_):
 
 
 def get_health(tenant_id=None):
+    cached = HEALTH_CACHE.get(tenant_id)
+    if cached is not None:
+        return cached
     health_map = {
         "databases": {
             "postgres": __check_database_pg,
@@ -212,22 +223,55 @@ def get_health(tenant_id=None):
         "details": __get_sessions_stats,
         "ssl": __check_SSL
     }
-    return __process_health(tenant_id=tenant_id, health_map=health_map)
+    response = __process_health(tenant_id=tenant_id, health_map=health_map)
+    HEALTH_CACHE.set(tenant_id, response)
+    return response
+
+
+def __timed_probe(fn, *args):
+    start = time()
+    result = fn(*args)
+    if isinstance(result, dict) and "health" in result:
+        result["latency"] = round((time() - start) * 1000)
+    return result
 
 
 def __process_health(tenant_id, health_map):
     response = dict(health_map)
+    probes = {}
     for parent_key in health_map.keys():
         if config(f"SKIP_H_{parent_key.upper()}", cast=bool, default=False):
             response.pop(parent_key)
         elif isinstance(health_map[parent_key], dict):
+            response[parent_key] = {}
             for element_key in health_map[parent_key]:
-                if config(f"SKIP_H_{parent_key.upper()}_{element_key.upper()}", cast=bool, default=False):
-                    response[parent_key].pop(element_key)
-                else:
-                    response[parent_key][element_key] = health_map[parent_key][element_key](tenant_id)
+                if not config(f"SKIP_H_{parent_key.upper()}_{element_key.upper()}", cast=bool, default=False):
+                    probes[(parent_key, element_key)] = health_map[parent_key][element_key]
+        else:
+            probes[(parent_key,)] = health_map[parent_key]
+    if len(probes) == 0:
+        return response
+
+    # the response time is the slowest probe's (bounded by HEALTH_DEADLINE) instead of the sum of all probes
+    executor = ThreadPoolExecutor(max_workers=len(probes))
+    futures = {k: executor.submit(__timed_probe, fn, tenant_id) for k, fn in probes.items()}
+    done, _ = wait(futures.values(), timeout=HEALTH_DEADLINE)
+    executor.shutdown(wait=False, cancel_futures=True)
+    for k, future in futures.items():
+        if future not in done:
+            print(f"!! health failed: {'.'.join(k)} didn't respond in {HEALTH_DEADLINE}s")
+            result = {"health": False, "details": {"errors": ["health-check timeout"]},
+                      "latency": HEALTH_DEADLINE * 1000}
+        elif future.exception() is not None:
+            print(f"!! health failed: {'.'.join(k)}")
+            print(str(future.exception()))
+            result = {"health": False, "details": {"errors": ["health-check failed"]}}
+        else:
+            result = future.result()
+        if len(k) == 2:
+            response[k[0]][k[1]] = result
         else:
-            response[parent_key] = health_map[parent_key](tenant_id)
+            response[k[0]] = result
     return response
 
 
@@ -12,7 +12,7 @@ if config("EXP_SESSIONS_SEARCH", cast=bool, default=False):
 else:
     from chalicelib.core import sessions
 
-from chalicelib.utils import pg_client, helper, ch_client, exp_ch_helper
+from chalicelib.utils import pg_client, helper, ch_client, exp_ch_helper, heatmaps_helper
 
 logger = logging.getLogger(__name__)
 
@@ -67,6 +67,9 @@ def get_by_url(project_id, data: schemas.GetHeatMapPayloadSchema):
                                     AND mis.type='click_rage'))""")
         query_from += """ LEFT JOIN experimental.events AS issues_t ON (main_events.session_id=issues_t.session_id)
                        LEFT JOIN experimental.issues AS mis ON (issues_t.issue_id=mis.issue_id)"""
+    if data.mode == schemas.HeatMapMode.density:
+        return __get_density_grid(project_id=project_id, data=data, args=args,
+                                  query_from=query_from, constraints=constraints)
     with ch_client.ClickHouseClient() as cur:
         query = cur.format(f"""SELECT main_events.normalized_x AS normalized_x, 
                                             main_events.normalized_y AS normalized_y
@@ -90,6 +93,69 @@ def get_by_url(project_id, data: schemas.GetHeatMapPayloadSchema):
         return helper.list_to_camel_case(rows)
 
 
+def __get_cell_expression(column):
+    # normalized coordinates are percentages, a click on the right/bottom edge belongs to the last cell
+    return f"least(greatest(toInt32(floor({column} * %(grid_size)s / 100)), 0), %(grid_size)s - 1)"
+
+
+def __get_density_grid(project_id, data: schemas.GetHeatMapPayloadSchema, args, query_from, constraints):
+    args = {**args, "grid_size": data.grid_size}
+    day_expression = "intDiv(toUnixTimestamp(main_events.datetime), 86400)"
+
+    def __day_constraints(days, excluded_days):
+        if days is not None:
+            # each day is bounded to itself whatever the requested window, click-rage issues included
+            day_constraints = constraints + [f"{day_expression} IN %(days)s"]
+            if data.click_rage:
+                day_constraints.append(f"(issues_t.session_id IS NULL "
+                                       f"OR intDiv(toUnixTimestamp(issues_t.datetime), 86400) = {day_expression})")
+            return day_constraints, {**args, "days": tuple(days), "startDate": days[0] * heatmaps_helper.DAY_MS,
+                                     "endDate": (days[-1] + 1) * heatmaps_helper.DAY_MS - 1}
+        if len(excluded_days) == 0:
+            return constraints, args
+        return constraints + [f"{day_expression} NOT IN %(excluded_days)s"], \
+            {**args, "excluded_days": tuple(excluded_days)}
+
+    def fetch_cells(days, excluded_days):
+        day_constraints, day_args = __day_constraints(days, excluded_days)
+        return __execute(f"""SELECT {day_expression} AS day,
+                                    {__get_cell_expression("main_events.normalized_x")} AS x,
+                                    {__get_cell_expression("main_events.normalized_y")} AS y,
+                                    COUNT(1) AS count
+                             FROM {query_from}
+                             WHERE {" AND ".join(day_constraints)}
+                             GROUP BY day, x, y;""", day_args, data)
+
+    def fetch_selectors(days, excluded_days):
+        day_constraints, day_args = __day_constraints(days, excluded_days)
+        return __execute(f"""SELECT {day_expression} AS day,
+                                    main_events.selector AS selector,
+                                    COUNT(1) AS count
+                             FROM {query_from}
+                             WHERE {" AND ".join(day_constraints)}
+                             GROUP BY day, selector;""", day_args, data)
+
+    return heatmaps_helper.get_density_grid(project_id=project_id, data=data,
+                                            fetch_cells=fetch_cells, fetch_selectors=fetch_selectors)
+
+
+def __execute(query, args, data):
+    with ch_client.ClickHouseClient() as cur:
+        query = cur.format(query, args)
+        logger.debug("---------")
+        logger.debug(query)
+        logger.debug("---------")
+        try:
+            return cur.execute(query)
+        except Exception as err:
+            logger.warning("--------- HEATMAP DENSITY QUERY EXCEPTION CH -----------")
+            logger.warning(query)
+            logger.warning("--------- PAYLOAD -----------")
+            logger.warning(data)
+            logger.warning("--------------------")
+            raise err
+
+
 def get_x_y_by_url_and_session_id(project_id, session_id, data: schemas.GetHeatMapPayloadSchema):
     args = {"project_id": project_id, "session_id": session_id, "url": data.url}
     constraints = ["main_events.project_id = toUInt16(%(project_id)s)",
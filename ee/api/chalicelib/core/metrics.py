@@ -2849,3 +2849,133 @@ def get_unique_users(project_id, startTimestamp=TimeUTC.now(delta_days=-1),
         results["progress"] = helper.__progress(old_val=count, new_val=results["value"])
     results["unit"] = schemas.TemplatePredefinedUnits.count
     return results
+
+
+# predefined metrics that can be computed by get_shared_scan, each one is bounded like the function computing it alone:
+# column: the averaged column, None counts the rows; condition: the averaged rows; density: the chart density;
+# chart_value: the value is the sum of the chart
+SHARED_SCAN_METRICS = {
+    schemas.MetricOfWebVitals.avg_response_time: {"table": "pages", "column": "response_time",
+                                                  "condition": "pages.response_time>0", "density": 20},
+    schemas.MetricOfWebVitals.avg_first_paint: {"table": "pages", "column": "first_paint",
+                                                "condition": "pages.first_paint>0", "density": 20},
+    schemas.MetricOfWebVitals.avg_dom_content_loaded: {"table": "pages", "column": "dom_content_loaded_event_time",
+                                                       "condition": "pages.dom_content_loaded_event_time>0",
+                                                       "density": 19},
+    schemas.MetricOfWebVitals.avg_till_first_byte: {"table": "pages", "column": "ttfb",
+                                                    "condition": "pages.ttfb>0", "density": 20},
+    schemas.MetricOfWebVitals.avg_time_to_interactive: {"table": "pages", "column": "time_to_interactive",
+                                                        "condition": "pages.time_to_interactive>0", "density": 20},
+    schemas.MetricOfWebVitals.avg_page_load_time: {"table": "pages", "column": "load_event_end",
+                                                   "condition": "pages.load_event_end>0", "density": 19},
+    schemas.MetricOfWebVitals.avg_dom_content_load_start: {"table": "pages", "column": "dom_content_loaded_event_end",
+                                                           "condition": "pages.dom_content_loaded_event_end>0",
+                                                           "density": 19},
+    schemas.MetricOfWebVitals.avg_first_contentful_pixel: {"table": "pages", "column": "first_contentful_paint_time",
+                                                           "condition": "pages.first_contentful_paint_time>0",
+                                                           "density": 20},
+    schemas.MetricOfWebVitals.count_requests: {"table": "pages", "column": None, "condition": None, "density": 20},
+    schemas.MetricOfWebVitals.avg_session_duration: {"table": "sessions", "column": "duration",
+                                                     "condition": "sessions.duration>0", "density": 20},
+    schemas.MetricOfWebVitals.count_sessions: {"table": "sessions", "column": None, "condition": None, "density": 7,
+                                               "chart_value": True}
+}
+
+
+def __shared_scan_aggregates(name, spec, conditions, distinct=False):
+    if spec["column"] is not None:
+        conditions = [f"isNotNull({spec['table']}.{spec['column']})", spec["condition"], *conditions]
+        condition = " AND ".join(conditions)
+        return f"sumIf({spec['table']}.{spec['column']}, {condition}) AS {name}_sum, " \
+               f"countIf({condition}) AS {name}_count"
+    condition = " AND ".join(conditions)
+    if distinct:
+        count = f"uniqExactIf({spec['table']}.session_id, {condition})"
+    else:
+        count = f"countIf({condition})"
+    return f"{count} AS {name}_sum, {count} AS {name}_count"
+
+
+def get_shared_scan(project_id, table, keys, startTimestamp=TimeUTC.now(delta_days=-1),
+                    endTimestamp=TimeUTC.now(), density=None, previous=True, **args):
+    """
+    Computes the SUM&COUNT of every requested metric of the same table in a single scan, the value, the previous
+    period and the chart of each metric are filtered like the function computing it alone.
+    Returns {key: {"current": (sum, count), "previous": (sum, count), "chart": [{"timestamp", "value": (sum, count)}]}}
+    """
+    previous_start = startTimestamp - (endTimestamp - startTimestamp)
+    scan_start = previous_start if previous else startTimestamp
+    ch_sub_query = __get_basic_constraints(table_name=table, time_constraint=False, data=args)
+    ch_sub_query.append(f"{table}.datetime >= toDateTime(%(scanStartTimestamp)s/1000)")
+    ch_sub_query.append(f"{table}.datetime < toDateTime(%(endTimestamp)s/1000)")
+    ch_sub_query += __get_meta_constraint(args)
+    if table == "pages":
+        ch_sub_query.append("pages.event_type='LOCATION'")
+        main_table = exp_ch_helper.get_main_events_table(scan_start)
+    else:
+        main_table = exp_ch_helper.get_main_sessions_table(scan_start)
+    params = {"project_id": project_id, "startTimestamp": startTimestamp, "endTimestamp": endTimestamp,
+              "previousStartTimestamp": previous_start, "scanStartTimestamp": scan_start,
+              **__get_constraint_values(args)}
+    current_period = [f"{table}.datetime >= toDateTime(%(startTimestamp)s/1000)",
+                      f"{table}.datetime < toDateTime(%(endTimestamp)s/1000)"]
+    previous_period = [f"{table}.datetime >= toDateTime(%(previousStartTimestamp)s/1000)",
+                       f"{table}.datetime < toDateTime(%(startTimestamp)s/1000)"]
+    # one GROUP BY column per chart step size, metrics with the same step share it
+    steps = {}
+    charts = {}
+    aggregates = []
+    for i, k in enumerate(keys):
+        spec = SHARED_SCAN_METRICS[k]
+        chart_density = spec["density"] if density is None else density
+        step_size = __get_step_size(startTimestamp, endTimestamp, chart_density)
+        step_key = steps.setdefault(step_size, f"step_{len(steps)}")
+        params[f"{step_key}_size"] = step_size
+        charts[k] = (step_key, chart_density)
+        chart_period = [f"toStartOfInterval({table}.datetime, INTERVAL %({step_key}_size)s second)"
+                        f" >= toDateTime(%(startTimestamp)s/1000)",
+                        f"{table}.datetime < toDateTime(%(endTimestamp)s/1000)"]
+        # the current sessions are counted distinct by the dedicated functions, the previous ones aren't
+        distinct = table == "sessions"
+        aggregates.append(__shared_scan_aggregates(f"value_{i}", spec,
+                                                   chart_period if spec.get("chart_value") else current_period,
+                                                   distinct=distinct))
+        if previous:
+            aggregates.append(__shared_scan_aggregates(f"previous_{i}", spec, previous_period))
+        aggregates.append(__shared_scan_aggregates(f"chart_{i}", spec, chart_period, distinct=distinct))
+    step_columns = [f"toUnixTimestamp(toStartOfInterval({table}.datetime, INTERVAL %({step_key}_size)s second))"
+                    f" * 1000 AS {step_key}" for step_key in steps.values()]
+    ch_query = f"""SELECT {", ".join(step_columns)},
+                          {", ".join(aggregates)}
+                   FROM {main_table} AS {table}
+                   WHERE {" AND ".join(ch_sub_query)}
+                   GROUP BY {", ".join(steps.values())};"""
+    with ch_client.ClickHouseClient() as ch:
+        rows = ch.execute(query=ch_query, params=params)
+    return __shared_scan_result(rows=rows, keys=keys, charts=charts,
+                                startTimestamp=startTimestamp, endTimestamp=endTimestamp)
+
+
+def __shared_scan_result(rows, keys, charts, startTimestamp, endTimestamp):
+    results = {}
+    for i, k in enumerate(keys):
+        step_key, density = charts[k]
+        chart = {}
+        current = [0, 0]
+        previous = [0, 0]
+        for r in rows:
+            current[0] += r[f"value_{i}_sum"] or 0
+            current[1] += r[f"value_{i}_count"] or 0
+            previous[0] += r.get(f"previous_{i}_sum") or 0
+            previous[1] += r.get(f"previous_{i}_count") or 0
+            # rows out of the chart period have nothing to count
+            if r[f"chart_{i}_count"]:
+                step = chart.setdefault(r[step_key], [0, 0])
+                step[0] += r[f"chart_{i}_sum"] or 0
+                step[1] += r[f"chart_{i}_count"]
+        results[k] = {"current": tuple(current), "previous": tuple(previous),
+                      "chart": __complete_missing_steps(rows=[{"timestamp": t, "value": tuple(chart[t])}
+                                                              for t in sorted(chart)],
+                                                        start_time=startTimestamp, end_time=endTimestamp,
+                                                        density=density, neutral={"value": (0, 0)})}
+    return results
@@ -8,6 +8,10 @@ import schemas
 from chalicelib.core import users
 from chalicelib.utils import pg_client, helper
 from chalicelib.utils.TimeUTC import TimeUTC
+from chalicelib.utils.ttl_cache import TTLCache
+
+# project_id -> project_key, the key of a project never changes, the TTL only bounds deleted projects
+PROJECT_KEYS_CACHE = TTLCache(maxsize=10000, ttl=5 * 60)
 
 
 def __exists_by_name(tenant_id: int, name: str, exclude_id: Optional[int]) -> bool:
@@ -206,6 +210,7 @@ def delete(tenant_id, user_id, project_id):
                                WHERE project_id = %(project_id)s;""",
                             {"project_id": project_id})
         cur.execute(query=query)
+    PROJECT_KEYS_CACHE.delete(project_id)
     return {"data": {"state": "success"}}
 
 
@@ -255,6 +260,9 @@ def get_by_project_key(project_key):
 
 
 def get_project_key(project_id):
+    project_key = PROJECT_KEYS_CACHE.get(project_id)
+    if project_key is not None:
+        return project_key
     with pg_client.PostgresClient() as cur:
         query = cur.mogrify("""SELECT project_key
                                FROM public.projects
@@ -263,7 +271,10 @@ def get_project_key(project_id):
                             {"project_id": project_id})
         cur.execute(query=query)
         project = cur.fetchone()
-        return project["project_key"] if project is not None else None
+    if project is None:
+        return None
+    PROJECT_KEYS_CACHE.set(project_id, project["project_key"])
+    return project["project_key"]
 
 
 def get_capture_status(project_id):
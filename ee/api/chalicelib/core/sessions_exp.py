@@ -1,10 +1,11 @@
 import ast
 import logging
+import math
 from typing import List, Union
 
 import schemas
 from chalicelib.core import events, metadata, projects, performance_event, metrics, sessions_favorite, sessions_legacy
-from chalicelib.utils import pg_client, helper, metrics_helper, ch_client, exp_ch_helper
+from chalicelib.utils import pg_client, helper, metrics_helper, ch_client, exp_ch_helper, export_helper
 
 logger = logging.getLogger(__name__)
 SESSION_PROJECTION_COLS_CH = """\
@@ -106,6 +107,22 @@ def _isUndefined_operator(op: schemas.SearchEventOperator):
     return op in [schemas.SearchEventOperator._is_undefined]
 
 
+# 95% margin of uniqHLL12: HyperLogLog of 2^12 registers, relative standard error of 1.04/sqrt(2^12)
+HLL_ERROR = 1.96 * 1.04 / math.sqrt(2 ** 12)
+
+
+def __count_sessions_approximate(query_part, full_args):
+    with ch_client.ClickHouseClient() as cur:
+        main_query = cur.format(f"""SELECT uniqHLL12(s.session_id) AS count_sessions,
+                                           uniqHLL12(s.user_uuid)  AS count_users
+                                    {query_part};""", full_args)
+        counts = cur.execute(main_query)[0]
+    return {**counts,
+            "approximate": True,
+            "count_sessions_error": round(counts["count_sessions"] * HLL_ERROR),
+            "count_users_error": round(counts["count_users"] * HLL_ERROR)}
+
+
 # This function executes the query and return result
 def search_sessions(data: schemas.SessionsSearchPayloadSchema, project_id, user_id, errors_only=False,
                     error_status=schemas.ErrorStatus.all, count_only=False, issue=None, ids_only=False,
@@ -126,6 +143,11 @@ def search_sessions(data: schemas.SessionsSearchPayloadSchema, project_id, user_
         full_args["sessions_limit_s"] = 0
         full_args["sessions_limit_e"] = 200
 
+    # only a count is approximated, a search page already evaluates all the matching sessions,
+    # its exact total costs nothing more
+    if data.approximate_count and count_only and not errors_only and not ids_only and not data.group_by_user:
+        return helper.dict_to_camel_case(__count_sessions_approximate(query_part=query_part, full_args=full_args))
+
     meta_keys = []
     with ch_client.ClickHouseClient() as cur:
         if errors_only:
@@ -245,6 +267,52 @@ def search_sessions(data: schemas.SessionsSearchPayloadSchema, project_id, user_
     }
 
 
+def search_sessions_stream(data: schemas.SessionsSearchPayloadSchema, project_id, user_id,
+                           fmt: schemas.ExportFormat = schemas.ExportFormat.ndjson, platform="web"):
+    """
+    Runs the search once, without pagination, and streams the result block by block
+    as a generator of encoded NDJSON/CSV chunks of all the matching sessions.
+    """
+    if data.bookmarked:
+        data.startTimestamp, data.endTimestamp = sessions_favorite.get_start_end_timestamp(project_id, user_id)
+    full_args, query_part = search_query_parts_ch(data=data, error_status=schemas.ErrorStatus.all, errors_only=False,
+                                                  favorite_only=data.bookmarked, issue=None, project_id=project_id,
+                                                  user_id=user_id, platform=platform)
+    if data.sort == "startTs":
+        data.sort = "datetime"
+    if data.order is None:
+        data.order = schemas.SortOrderType.desc.value
+    sort = 'session_id'
+    if data.sort is not None and data.sort != "session_id":
+        sort = helper.key_to_snake_case(data.sort)
+    meta_keys = metadata.get(project_id=project_id)
+
+    def rows():
+        with ch_client.ClickHouseClient() as cur:
+            main_query = cur.format(f"""SELECT {SESSION_PROJECTION_COLS_CH},
+                                               viewed_sessions.session_id > 0 AS viewed
+                                               {"," if len(meta_keys) > 0 else ""}{",".join([f's.metadata_{m["index"]} AS metadata_{m["index"]}' for m in meta_keys])}
+                                        {query_part}
+                                        LEFT JOIN (SELECT DISTINCT session_id
+                                                   FROM experimental.user_viewed_sessions
+                                                   WHERE user_id = %(userId)s AND project_id=%(project_id)s
+                                                     AND _timestamp >= toDateTime(%(startDate)s / 1000)) AS viewed_sessions
+                                                  ON (viewed_sessions.session_id = s.session_id)
+                                        ORDER BY s.{sort} {data.order};""",
+                                    full_args)
+            logging.debug("--------------------")
+            logging.debug(main_query)
+            logging.debug("--------------------")
+            for s in cur.execute_iter(main_query, max_block_size=export_helper.EXPORT_BATCH_SIZE):
+                s["metadata"] = {k["key"]: s.pop(f'metadata_{k["index"]}') for k in meta_keys}
+                s["metadata"] = {k: v for k, v in s["metadata"].items() if v is not None}
+                yield helper.dict_to_camel_case(s, ignore_keys=["metadata"])
+
+    return export_helper.stream_rows(rows=rows(), fmt=fmt, name=f"sessions-ch export project:{project_id}",
+                                     columns=[c for c in sessions_legacy.EXPORT_COLUMNS if c != "favorite"]
+                                             + [f"metadata.{k['key']}" for k in meta_keys])
+
+
 def search2_series(data: schemas.SessionsSearchPayloadSchema, project_id: int, density: int,
                    view_type: schemas.MetricTimeseriesViewType, metric_type: schemas.MetricType,
                    metric_of: schemas.MetricOfTable, metric_value: List):
@@ -1,5 +1,7 @@
-from typing import Optional
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
 import schemas
 from chalicelib.core import metrics
 from chalicelib.core import sessions_exp
@@ -8,82 +10,67 @@ from chalicelib.utils import ch_client
 logger = logging.getLogger(__name__)
 
 
-def _table_slice(table, index):
-    col = list()
-    for row in table:
-        col.append(row[index])
-    return col
+def __get_two_periods(response, time_index='hh'):
+    # rows are ordered by time DESC, returns the rows of the current period and the rows of the previous one
+    periods = []
+    current = None
+    for r in response:
+        if r[time_index] != current:
+            if len(periods) == 2:
+                break
+            current = r[time_index]
+            periods.append([])
+        periods[-1].append(r)
+    while len(periods) < 2:
+        periods.append([])
+    return periods[0], periods[1]
+
+
+def __group_by_name(rows, name_index, value_index):
+    # single pass: name -> [sum of non-null values, number of rows], names are kept in order of appearance
+    groups = {}
+    for r in rows:
+        g = groups.get(r[name_index])
+        if g is None:
+            g = groups[r[name_index]] = [0, 0]
+        if r[value_index] is not None:
+            g[0] += r[value_index]
+        g[1] += 1
+    return groups
+
 
+def __sum(rows, index):
+    return sum(r[index] for r in rows if r[index] is not None)
 
-def _table_where(table, index, value):
-    new_table = list()
-    for row in table:
-        if row[index] == value:
-            new_table.append(row)
-    return new_table
 
+def __mean(rows, index):
+    return __sum(rows, index) / len(rows)
 
-def _sum_table_index(table, index):
-    s = 0
-    count = 0
-    for row in table:
-        v = row[index]
-        if v is None:
+
+def __build_insights(category, names, ratio, increase, new_values, total):
+    # ratio: [(name, value)] sorted DESC, only the 1st value of each name is used
+    ratio_by_name = {}
+    for n, v in ratio:
+        if n not in ratio_by_name:
+            ratio_by_name[n] = v
+    results = list()
+    for n in names:
+        if n is None:
             continue
-        s += v
-        count += 1
-    return s
-
-
-def _mean_table_index(table, index):
-    s = _sum_table_index(table, index)
-    c = len(table)
-    return s / c
-
-
-def _sort_table_index(table, index, reverse=False):
-    return sorted(table, key=lambda k: k[index], reverse=reverse)
-
-
-def _select_rec(l, selector):
-    if len(selector) == 1:
-        return l[selector[0]]
-    else:
-        s = selector[0]
-        L = l[s]
-        type_ = type(s)
-        if type_ == slice:
-            return [_select_rec(l_, selector[1:]) for l_ in L]
-        elif type_ == int:
-            return [_select_rec(L, selector[1:])]
-
-
-def __get_two_values(response, time_index='hh', name_index='name'):
-    columns = list(response[0].keys())
-    name_index_val = columns.index(name_index)
-    time_index_value = columns.index(time_index)
-
-    table = [list(r.values()) for r in response]
-    table_hh1 = list()
-    table_hh2 = list()
-    hh_vals = list()
-    names_hh1 = list()
-    names_hh2 = list()
-    for e in table:
-        if e[time_index_value] not in hh_vals and len(hh_vals) == 2:
-            break
-        elif e[time_index_value] not in hh_vals:
-            hh_vals.append(e[time_index_value])
-
-        if len(hh_vals) == 1:
-            table_hh1.append(e)
-            if e[name_index_val] not in names_hh1:
-                names_hh1.append(e[name_index_val])
-        elif len(hh_vals) == 2:
-            table_hh2.append(e)
-            if e[name_index_val] not in names_hh2:
-                names_hh2.append(e[name_index_val])
-    return table_hh1, table_hh2, columns, names_hh1, names_hh2
+        data_ = {'category': category, 'name': n,
+                 'value': None, 'oldValue': None, 'ratio': None, 'change': None, 'isNew': True}
+        if n in ratio_by_name:
+            if n in new_values:
+                data_['value'] = new_values[n]
+            data_['ratio'] = 100 * ratio_by_name[n] / total
+        if n in increase:
+            v = increase[n]
+            data_['value'] = v[0]
+            data_['oldValue'] = v[1]
+            data_['change'] = 100 * v[2]
+            data_['isNew'] = False
+        results.append(data_)
+    return results
 
 
 def query_requests_by_period(project_id, start_time, end_time, filters: Optional[schemas.SessionsSearchPayloadSchema]):
@@ -114,67 +101,31 @@ def query_requests_by_period(project_id, start_time, end_time, filters: Optional
         if res is None or sum([r.get("sessions") for r in res]) == 0:
             return []
 
-    table_hh1, table_hh2, columns, this_period_hosts, last_period_hosts = __get_two_values(res, time_index='hh',
-                                                                                           name_index='source')
-    test = [k[4] for k in table_hh1]
+    table_hh1, table_hh2 = __get_two_periods(res, time_index='hh')
     del res
+    this_period = __group_by_name(table_hh1, name_index='source', value_index='avg_duration')
+    last_period = __group_by_name(table_hh2, name_index='source', value_index='avg_duration')
 
-    new_hosts = [x for x in this_period_hosts if x not in last_period_hosts]
-    common_names = [x for x in this_period_hosts if x not in new_hosts]
-
-    source_idx = columns.index('source')
-    duration_idx = columns.index('avg_duration')
-    # success_idx = columns.index('success_rate')
-    # delta_duration = dict()
-    # delta_success = dict()
     new_duration_values = dict()
     duration_values = dict()
-    for n in common_names:
-        d1_tmp = _table_where(table_hh1, source_idx, n)
-        d2_tmp = _table_where(table_hh2, source_idx, n)
-        old_duration = _mean_table_index(d2_tmp, duration_idx)
-        new_duration = _mean_table_index(d1_tmp, duration_idx)
+    for n, (s, c) in this_period.items():
+        new_duration = s / c
+        if n not in last_period:
+            new_duration_values[n] = new_duration
+            continue
+        old_duration = last_period[n][0] / last_period[n][1]
         if old_duration == 0:
             continue
         duration_values[n] = new_duration, old_duration, (new_duration - old_duration) / old_duration
-        # delta_duration[n] = (_mean_table_index(d1_tmp, duration_idx) - _duration1) / _duration1
-        # delta_success[n] = _mean_table_index(d1_tmp, success_idx) - _mean_table_index(d2_tmp, success_idx)
-    for n in new_hosts:
-        d1_tmp = _table_where(table_hh1, source_idx, n)
-        new_duration_values[n] = _mean_table_index(d1_tmp, duration_idx)
-
-        # names_idx = columns.index('names')
-    total = _sum_table_index(table_hh1, duration_idx)
-    d1_tmp = _sort_table_index(table_hh1, duration_idx, reverse=True)
-    _tmp = _table_slice(d1_tmp, duration_idx)
-    _tmp2 = _table_slice(d1_tmp, source_idx)
 
+    total = __sum(table_hh1, 'avg_duration')
     increase = sorted(duration_values.items(), key=lambda k: k[1][-1], reverse=True)
-    ratio = sorted(zip(_tmp2, _tmp), key=lambda k: k[1], reverse=True)
+    ratio = sorted([(r['source'], r['avg_duration']) for r in table_hh1], key=lambda k: k[1], reverse=True)
     # names_ = set([k[0] for k in increase[:3]+ratio[:3]]+new_hosts[:3])
     names_ = set([k[0] for k in increase[:3] + ratio[:3]])  # we took out new hosts since they dont give much info
 
-    results = list()
-    for n in names_:
-        if n is None:
-            continue
-        data_ = {'category': schemas.InsightCategories.network, 'name': n,
-                 'value': None, 'oldValue': None, 'ratio': None, 'change': None, 'isNew': True}
-        for n_, v in ratio:
-            if n == n_:
-                if n in new_hosts:
-                    data_['value'] = new_duration_values[n]
-                data_['ratio'] = 100 * v / total
-                break
-        for n_, v in increase:
-            if n == n_:
-                data_['value'] = v[0]
-                data_['oldValue'] = v[1]
-                data_['change'] = 100 * v[2]
-                data_['isNew'] = False
-                break
-        results.append(data_)
-    return results
+    return __build_insights(category=schemas.InsightCategories.network, names=names_, ratio=ratio,
+                            increase=dict(increase), new_values=new_duration_values, total=total)
 
 
 def __filter_subquery(project_id: int, filters: Optional[schemas.SessionsSearchPayloadSchema], params: dict):
@@ -223,59 +174,33 @@ def query_most_errors_by_period(project_id, start_time, end_time,
         if res is None or sum([r.get("sessions") for r in res]) == 0:
             return []
 
-    table_hh1, table_hh2, columns, this_period_errors, last_period_errors = __get_two_values(res, time_index='hh',
-                                                                                             name_index='names')
+    table_hh1, table_hh2 = __get_two_periods(res, time_index='hh')
     del res
-    new_errors = [x for x in this_period_errors if x not in last_period_errors]
-    common_errors = [x for x in this_period_errors if x not in new_errors]
-
-    sessions_idx = columns.index('sessions')
-    names_idx = columns.index('names')
+    this_period = __group_by_name(table_hh1, name_index='names', value_index='sessions')
+    last_period = __group_by_name(table_hh2, name_index='names', value_index='sessions')
+    new_errors = [x for x in this_period if x not in last_period]
 
     percentage_errors = dict()
-    total = _sum_table_index(table_hh1, sessions_idx)
-    # error_increase = dict()
+    total = __sum(table_hh1, 'sessions')
     new_error_values = dict()
     error_values = dict()
-    for n in this_period_errors:
+    for n, (sum_new_errors, _) in this_period.items():
         if n is None:
             continue
-        percentage_errors[n] = _sum_table_index(_table_where(table_hh1, names_idx, n), sessions_idx)
-        new_error_values[n] = _sum_table_index(_table_where(table_hh1, names_idx, n), sessions_idx)
-    for n in common_errors:
-        if n is None:
+        percentage_errors[n] = sum_new_errors
+        if n not in last_period:
+            new_error_values[n] = sum_new_errors
             continue
-        sum_old_errors = _sum_table_index(_table_where(table_hh2, names_idx, n), sessions_idx)
+        sum_old_errors = last_period[n][0]
         if sum_old_errors == 0:
             continue
-        sum_new_errors = _sum_table_index(_table_where(table_hh1, names_idx, n), sessions_idx)
-        # error_increase[n] = (new_errors - old_errors) / old_errors
         error_values[n] = sum_new_errors, sum_old_errors, (sum_new_errors - sum_old_errors) / sum_old_errors
     ratio = sorted(percentage_errors.items(), key=lambda k: k[1], reverse=True)
     increase = sorted(error_values.items(), key=lambda k: k[1][-1], reverse=True)
     names_ = set([k[0] for k in increase[:3] + ratio[:3]] + new_errors[:3])
 
-    results = list()
-    for n in names_:
-        if n is None:
-            continue
-        data_ = {'category': schemas.InsightCategories.errors, 'name': n,
-                 'value': None, 'oldValue': None, 'ratio': None, 'change': None, 'isNew': True}
-        for n_, v in ratio:
-            if n == n_:
-                if n in new_errors:
-                    data_['value'] = new_error_values[n]
-                data_['ratio'] = 100 * v / total
-                break
-        for n_, v in increase:
-            if n == n_:
-                data_['value'] = v[0]
-                data_['oldValue'] = v[1]
-                data_['change'] = 100 * v[2]
-                data_['isNew'] = False
-                break
-        results.append(data_)
-    return results
+    return __build_insights(category=schemas.InsightCategories.errors, names=names_, ratio=ratio,
+                            increase=dict(increase), new_values=new_error_values, total=total)
 
 
 def query_cpu_memory_by_period(project_id, start_time, end_time,
@@ -307,20 +232,16 @@ def query_cpu_memory_by_period(project_id, start_time, end_time,
         if res is None or sum([r.get("sessions") for r in res]) == 0:
             return []
 
-    table_hh1, table_hh2, columns, this_period_resources, last_period_resources = __get_two_values(res, time_index='hh',
-                                                                                                   name_index='names')
+    table_hh1, table_hh2 = __get_two_periods(res, time_index='hh')
 
     logging.debug(f'TB1\n{table_hh1}')
     logging.debug(f'TB2\n{table_hh2}')
     del res
 
-    memory_idx = columns.index('memory_used')
-    cpu_idx = columns.index('cpu_used')
-
-    mem_newvalue = _mean_table_index(table_hh1, memory_idx)
-    mem_oldvalue = _mean_table_index(table_hh2, memory_idx)
-    cpu_newvalue = _mean_table_index(table_hh2, cpu_idx)
-    cpu_oldvalue = _mean_table_index(table_hh2, cpu_idx)
+    mem_newvalue = __mean(table_hh1, 'memory_used')
+    mem_oldvalue = __mean(table_hh2, 'memory_used')
+    cpu_newvalue = __mean(table_hh1, 'cpu_used')
+    cpu_oldvalue = __mean(table_hh2, 'cpu_used')
 
     cpu_ratio = 0
     mem_ratio = 0
@@ -386,61 +307,32 @@ def query_click_rage_by_period(project_id, start_time, end_time,
         if res is None or sum([r.get("sessions") for r in res]) == 0:
             return []
 
-    table_hh1, table_hh2, columns, this_period_rage, last_period_rage = __get_two_values(res, time_index='hh',
-                                                                                         name_index='sources')
+    table_hh1, table_hh2 = __get_two_periods(res, time_index='hh')
     del res
+    this_period = __group_by_name(table_hh1, name_index='sources', value_index='sessions')
+    last_period = __group_by_name(table_hh2, name_index='sources', value_index='sessions')
+    new_names = [x for x in this_period if x not in last_period]
 
-    new_names = [x for x in this_period_rage if x not in last_period_rage]
-    common_names = [x for x in this_period_rage if x not in new_names]
-
-    sessions_idx = columns.index('sessions')
-    names_idx = columns.index('sources')
-
-    # raged_increment = dict()
     raged_values = dict()
     new_raged_values = dict()
-    # TODO verify line (188) _tmp = table_hh2[:, sessions_idx][n].sum()
-    for n in common_names:
+    for n, (_newvalue, _) in this_period.items():
         if n is None:
             continue
-        _oldvalue = _sum_table_index(_table_where(table_hh2, names_idx, n), sessions_idx)
-        _newvalue = _sum_table_index(_table_where(table_hh1, names_idx, n), sessions_idx)
-        # raged_increment[n] = (_newvalue - _oldvalue) / _oldvalue
-        raged_values[n] = _newvalue, _oldvalue, (_newvalue - _oldvalue) / _oldvalue
-
-    for n in new_names:
-        if n is None:
+        if n not in last_period:
+            new_raged_values[n] = _newvalue
+            continue
+        _oldvalue = last_period[n][0]
+        if _oldvalue == 0:
             continue
-        _newvalue = _sum_table_index(_table_where(table_hh1, names_idx, n), sessions_idx)
-        new_raged_values[n] = _newvalue
+        raged_values[n] = _newvalue, _oldvalue, (_newvalue - _oldvalue) / _oldvalue
 
-    total = _sum_table_index(table_hh1, sessions_idx)
-    names, ratio = _table_slice(table_hh1, names_idx), _table_slice(table_hh1, sessions_idx)
-    ratio = sorted(zip(names, ratio), key=lambda k: k[1], reverse=True)
+    total = __sum(table_hh1, 'sessions')
+    ratio = sorted([(r['sources'], r['sessions']) for r in table_hh1], key=lambda k: k[1], reverse=True)
     increase = sorted(raged_values.items(), key=lambda k: k[1][-1], reverse=True)
     names_ = set([k[0] for k in increase[:3] + ratio[:3]] + new_names[:3])
 
-    results = list()
-    for n in names_:
-        if n is None:
-            continue
-        data_ = {'category': schemas.InsightCategories.rage, 'name': n,
-                 'value': None, 'oldValue': None, 'ratio': None, 'change': None, 'isNew': True}
-        for n_, v in ratio:
-            if n == n_:
-                if n in new_names:
-                    data_['value'] = new_raged_values[n]
-                data_['ratio'] = 100 * v / total
-                break
-        for n_, v in increase:
-            if n == n_:
-                data_['value'] = v[0]
-                data_['oldValue'] = v[1]
-                data_['change'] = 100 * v[2]
-                data_['isNew'] = False
-                break
-        results.append(data_)
-    return results
+    return __build_insights(category=schemas.InsightCategories.rage, names=names_, ratio=ratio,
+                            increase=dict(increase), new_values=new_raged_values, total=total)
 
 
 def fetch_selected(project_id, data: schemas.GetInsightsSchema):
@@ -453,16 +345,17 @@ def fetch_selected(project_id, data: schemas.GetInsightsSchema):
     if len(data.series) > 0:
         filters = data.series[0].filter
 
-    if schemas.InsightCategories.errors in data.metricValue:
-        output += query_most_errors_by_period(project_id=project_id, start_time=data.startTimestamp,
-                                              end_time=data.endTimestamp, filters=filters)
-    if schemas.InsightCategories.network in data.metricValue:
-        output += query_requests_by_period(project_id=project_id, start_time=data.startTimestamp,
-                                           end_time=data.endTimestamp, filters=filters)
-    if schemas.InsightCategories.rage in data.metricValue:
-        output += query_click_rage_by_period(project_id=project_id, start_time=data.startTimestamp,
-                                             end_time=data.endTimestamp, filters=filters)
-    if schemas.InsightCategories.resources in data.metricValue:
-        output += query_cpu_memory_by_period(project_id=project_id, start_time=data.startTimestamp,
-                                             end_time=data.endTimestamp, filters=filters)
+    # the categories are independent queries, they are evaluated concurrently
+    categories = {schemas.InsightCategories.errors: query_most_errors_by_period,
+                  schemas.InsightCategories.network: query_requests_by_period,
+                  schemas.InsightCategories.rage: query_click_rage_by_period,
+                  schemas.InsightCategories.resources: query_cpu_memory_by_period}
+    selected = [fn for c, fn in categories.items() if c in data.metricValue]
+    if len(selected) == 0:
+        return output
+    with ThreadPoolExecutor(max_workers=len(selected)) as executor:
+        futures = [executor.submit(fn, project_id=project_id, start_time=data.startTimestamp,
+                                   end_time=data.endTimestamp, filters=filters) for fn in selected]
+    for f in futures:
+        output += f.result()
     return output
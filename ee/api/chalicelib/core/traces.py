@@ -1,9 +1,10 @@
+import asyncio
 import json
-import queue
+import logging
 import re
+import time
 from typing import Optional, List
 
-from apscheduler.triggers.interval import IntervalTrigger
 from decouple import config
 from fastapi import Request, Response, BackgroundTasks
 from pydantic import BaseModel, Field
@@ -15,6 +16,8 @@ from chalicelib.utils import pg_client, helper
 from chalicelib.utils.TimeUTC import TimeUTC
 from schemas import CurrentContext
 
+logger = logging.getLogger(__name__)
+
 IGNORE_ROUTES = [
     {"method": ["*"], "path": "/notifications"},
     {"method": ["*"], "path": "/announcements"},
@@ -71,36 +74,126 @@ def __process_trace(trace: TraceSchema):
     return data
 
 
-async def write_trace(trace: TraceSchema):
-    data = __process_trace(trace)
-    with pg_client.PostgresClient() as cur:
-        cur.execute(
-            cur.mogrify(
-                f"""INSERT INTO traces(user_id, tenant_id, created_at, auth, action, method, path_format, endpoint, payload, parameters, status)
-                    VALUES (%(user_id)s, %(tenant_id)s, %(created_at)s, %(auth)s, %(action)s, %(method)s, %(path_format)s, %(endpoint)s, %(payload)s::jsonb, %(parameters)s::jsonb, %(status)s);""",
-                data)
-        )
+TRACES_COLUMNS = ["user_id", "tenant_id", "created_at", "auth", "action", "method", "path_format", "endpoint",
+                  "payload", "parameters", "status"]
+
+
+class TracesWriter:
+    def __init__(self, pool, max_size=config("TRACE_QUEUE_MAX", cast=int, default=10_000),
+                 batch_size=config("TRACE_BATCH_SIZE", cast=int, default=500),
+                 flush_interval=config("TRACE_PERIOD", cast=int, default=60),
+                 put_timeout=config("TRACE_PUT_TIMEOUT", cast=float, default=2)):
+        self.pool = pool
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.__task: Optional[asyncio.Task] = None
+        self.__pending: List[TraceSchema] = []
+        self.stats = {"enqueued": 0, "written": 0, "dropped": 0, "lost": 0, "flushes": 0,
+                      "lastFlushSize": 0, "lastFlushLatency": 0, "maxFlushLatency": 0}
+
+    def get_stats(self):
+        return {"queueDepth": self.queue.qsize(), "queueMaxSize": self.queue.maxsize, **self.stats}
+
+    async def put(self, trace: TraceSchema):
+        # backpressure: wait for the writer to free some space, drop the trace if it is still full
+        try:
+            await asyncio.wait_for(self.queue.put(trace), timeout=self.put_timeout)
+            self.stats["enqueued"] += 1
+        except asyncio.TimeoutError:
+            self.stats["dropped"] += 1
+            logger.warning(f"traces queue is full ({self.queue.qsize()}), dropping trace; "
+                           f"total dropped: {self.stats['dropped']}")
+
+    async def __collect(self):
+        # the batch being built is kept on the instance, so it is not lost if the writer is cancelled
+        self.__pending.append(await self.queue.get())
+        deadline = time.monotonic() + self.flush_interval
+        while len(self.__pending) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                self.__pending.append(await asyncio.wait_for(self.queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                break
+
+    def __drain(self) -> List[TraceSchema]:
+        batch = []
+        while not self.queue.empty() and len(batch) < self.batch_size:
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def flush(self, traces: List[TraceSchema]):
+        if len(traces) == 0:
+            return
+        start = time.monotonic()
+        try:
+            await write_traces_batch(traces=traces, pool=self.pool)
+        except Exception as e:
+            self.stats["lost"] += len(traces)
+            logger.error(f"failed to write {len(traces)} traces, total lost: {self.stats['lost']}")
+            logger.exception(e)
+            return
+        latency = time.monotonic() - start
+        self.stats["written"] += len(traces)
+        self.stats["flushes"] += 1
+        self.stats["lastFlushSize"] = len(traces)
+        self.stats["lastFlushLatency"] = latency
+        self.stats["maxFlushLatency"] = max(self.stats["maxFlushLatency"], latency)
+        logger.debug(f"flushed {len(traces)} traces in {latency:.3f}s, queue depth: {self.queue.qsize()}")
+        if latency > 2:
+            logger.warning(f"slow traces flush: {len(traces)} traces in {latency:.3f}s")
+
+    async def __run(self):
+        while True:
+            await self.__collect()
+            await self.flush(self.__pending)
+            self.__pending = []
 
+    def start(self):
+        self.__task = asyncio.create_task(self.__run())
 
-async def write_traces_batch(traces: List[TraceSchema]):
+    async def stop(self, timeout=config("TRACE_SHUTDOWN_TIMEOUT", cast=int, default=10)):
+        if self.__task is not None:
+            self.__task.cancel()
+            try:
+                await self.__task
+            except asyncio.CancelledError:
+                pass
+            self.__task = None
+        pending, self.__pending = self.__pending, []
+        await self.flush(pending)
+        deadline = time.monotonic() + timeout
+        while not self.queue.empty() and time.monotonic() < deadline:
+            await self.flush(self.__drain())
+        remaining = self.queue.qsize()
+        if remaining > 0:
+            self.stats["lost"] += remaining
+        if self.stats["lost"] > 0 or self.stats["dropped"] > 0:
+            logger.error(f"traces lost: {self.stats['lost']}, dropped: {self.stats['dropped']}")
+        logger.info(f"traces writer stopped: {self.get_stats()}")
+
+
+writer: Optional[TracesWriter] = None
+
+
+async def write_traces_batch(traces: List[TraceSchema], pool=None):
     if len(traces) == 0:
         return
-    params = {}
-    values = []
-    for i, t in enumerate(traces):
-        data = __process_trace(t)
-        for key in data.keys():
-            params[f"{key}_{i}"] = data[key]
-        values.append(
-            f"(%(user_id_{i})s, %(tenant_id_{i})s, %(created_at_{i})s, %(auth_{i})s, %(action_{i})s, %(method_{i})s, %(path_format_{i})s, %(endpoint_{i})s, %(payload_{i})s::jsonb, %(parameters_{i})s::jsonb, %(status_{i})s)")
+    if pool is None:
+        pool = main_app.app.state.postgresql
+    async with pool.connection() as cnx:
+        async with cnx.cursor() as cur:
+            async with cur.copy(f"COPY traces({', '.join(TRACES_COLUMNS)}) FROM STDIN") as copy:
+                for t in traces:
+                    data = __process_trace(t)
+                    await copy.write_row([data[c] for c in TRACES_COLUMNS])
 
-    with pg_client.PostgresClient() as cur:
-        cur.execute(
-            cur.mogrify(
-                f"""INSERT INTO traces(user_id, tenant_id, created_at, auth, action, method, path_format, endpoint, payload, parameters, status)
-                    VALUES {" , ".join(values)};""",
-                params)
-        )
+
+async def write_trace(trace: TraceSchema):
+    await write_traces_batch([trace])
 
 
 async def process_trace(action: str, path_format: str, request: Request, response: Response):
@@ -128,10 +221,10 @@ async def process_trace(action: str, path_format: str, request: Request, respons
                                 status=response.status_code,
                                 path_format=path_format,
                                 created_at=TimeUTC.now())
-    if not hasattr(main_app.app, "queue_system"):
-        main_app.app.queue_system = queue.Queue()
-    q: queue.Queue = main_app.app.queue_system
-    q.put(current_trace)
+    if writer is None:
+        logger.warning("traces writer is not initialized, dropping trace")
+        return
+    await writer.put(current_trace)
 
 
 def trace(action: str, path_format: str, request: Request, response: Response):
@@ -148,14 +241,24 @@ def trace(action: str, path_format: str, request: Request, response: Response):
     response.background.add_task(background_task)
 
 
-async def process_traces_queue():
-    queue_system: queue.Queue = main_app.app.queue_system
-    traces = []
-    while not queue_system.empty():
-        obj = queue_system.get_nowait()
-        traces.append(obj)
-    if len(traces) > 0:
-        await write_traces_batch(traces)
+async def init(pool):
+    global writer
+    writer = TracesWriter(pool=pool)
+    writer.start()
+    logger.info(">traces writer started")
+
+
+async def terminate():
+    global writer
+    if writer is not None:
+        await writer.stop()
+        writer = None
+
+
+def get_stats():
+    if writer is None:
+        return None
+    return writer.get_stats()
 
 
 def get_all(tenant_id, data: schemas.TrailSearchPayloadSchema):
@@ -204,8 +307,3 @@ def get_available_actions(tenant_id):
         rows = cur.fetchall()
     return [r["action"] for r in rows]
 
-
-cron_jobs = [
-    {"func": process_traces_queue, "trigger": IntervalTrigger(seconds=config("TRACE_PERIOD", cast=int, default=60)),
-     "misfire_grace_time": 20, "max_instances": 1}
-]
@@ -1,8 +1,20 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from decouple import config
+
 from chalicelib.utils import pg_client, helper, email_helper, smtp
 from chalicelib.utils.TimeUTC import TimeUTC
 from chalicelib.utils.helper import get_issue_title
 
+logger = logging.getLogger(__name__)
+
 LOWEST_BAR_VALUE = 3
+# keep it below PG_MAXCONN, every worker holds a pooled connection
+WORKERS = config("WEEKLY_REPORT_WORKERS", cast=int, default=4)
+BATCH_SIZE = config("WEEKLY_REPORT_BATCH_SIZE", cast=int, default=20)
 
 
 def get_config(user_id):
@@ -28,28 +40,22 @@ def edit_config(user_id, weekly_report):
     return helper.dict_to_camel_case(result)
 
 
-def cron():
-    if not smtp.has_smtp():
-        print("!!! No SMTP configuration found, ignoring weekly report")
-        return
-    _now = TimeUTC.now()
-    with pg_client.PostgresClient(unlimited_query=True) as cur:
-        params = {"tomorrow": TimeUTC.midnight(delta_days=1),
-                  "3_days_ago": TimeUTC.midnight(delta_days=-3),
-                  "1_week_ago": TimeUTC.midnight(delta_days=-7),
-                  "2_week_ago": TimeUTC.midnight(delta_days=-14),
-                  "5_week_ago": TimeUTC.midnight(delta_days=-35)}
+def __get_params():
+    return {"tomorrow": TimeUTC.midnight(delta_days=1),
+            "3_days_ago": TimeUTC.midnight(delta_days=-3),
+            "1_week_ago": TimeUTC.midnight(delta_days=-7),
+            "2_week_ago": TimeUTC.midnight(delta_days=-14),
+            "5_week_ago": TimeUTC.midnight(delta_days=-35)}
+
+
+def __get_recently_active_projects(params):
+    with pg_client.PostgresClient() as cur:
         cur.execute(cur.mogrify("""\
             SELECT project_id,
-               name                                                                     AS project_name,
-               users.emails                                                             AS emails,
-               TO_CHAR(DATE_TRUNC('day', now()) - INTERVAL '1 week', 'Mon. DDth, YYYY') AS period_start,
-               TO_CHAR(DATE_TRUNC('day', now()), 'Mon. DDth, YYYY')                     AS period_end,
-               COALESCE(week_0_issues.count, 0)                                         AS this_week_issues_count,
-               COALESCE(week_1_issues.count, 0)                                         AS past_week_issues_count,
-               COALESCE(month_1_issues.count, 0)                                        AS past_month_issues_count
+                   name         AS project_name,
+                   users.emails AS emails
             FROM (SELECT tenant_id, project_id, name FROM public.projects WHERE projects.deleted_at ISNULL) AS projects
-                    INNER JOIN LATERAL (
+                     INNER JOIN LATERAL (
                              SELECT sessions.project_id
                              FROM public.sessions
                              WHERE sessions.project_id = projects.project_id
@@ -63,199 +69,252 @@ def cron():
                               AND users.deleted_at ISNULL
                               AND users.weekly_report
                      ) AS users ON (TRUE)
-                     LEFT JOIN LATERAL (
-                            SELECT COUNT(1) AS count
-                            FROM events_common.issues
-                                     INNER JOIN public.sessions USING (session_id)
-                            WHERE sessions.project_id = projects.project_id
-                              AND issues.timestamp >= %(1_week_ago)s
-                              AND issues.timestamp < %(tomorrow)s
-                     ) AS week_0_issues ON (TRUE)
-                     LEFT JOIN LATERAL (
-                            SELECT COUNT(1) AS count
-                            FROM events_common.issues
-                                     INNER JOIN public.sessions USING (session_id)
-                            WHERE sessions.project_id = projects.project_id
-                              AND issues.timestamp <= %(1_week_ago)s
-                              AND issues.timestamp >= %(2_week_ago)s
-                     ) AS week_1_issues ON (TRUE)
-                     LEFT JOIN LATERAL (
-                            SELECT COUNT(1) AS count
-                            FROM events_common.issues
-                                     INNER JOIN public.sessions USING (session_id)
-                            WHERE sessions.project_id = projects.project_id
-                              AND issues.timestamp <= %(1_week_ago)s
-                              AND issues.timestamp >= %(5_week_ago)s
-                     ) AS month_1_issues ON (TRUE);"""), params)
-        projects_data = cur.fetchall()
-        _now2 = TimeUTC.now()
-        print(f">> Weekly report query: {_now2 - _now} ms")
-        _now = _now2
-        emails_to_send = []
-        for p in projects_data:
-            params["project_id"] = p["project_id"]
-            print(f"checking {p['project_name']} : {p['project_id']}")
-            if len(p["emails"]) == 0 \
-                    or p["this_week_issues_count"] + p["past_week_issues_count"] + p["past_month_issues_count"] == 0:
-                print('ignore')
-                continue
-            print("valid")
-            p["past_week_issues_evolution"] = helper.__decimal_limit(
-                helper.__progress(p["this_week_issues_count"], p["past_week_issues_count"]), 1)
-            p["past_month_issues_evolution"] = helper.__decimal_limit(
-                helper.__progress(p["this_week_issues_count"], p["past_month_issues_count"]), 1)
-            cur.execute(cur.mogrify("""
-                SELECT LEFT(TO_CHAR(timestamp_i, 'Dy'),1) AS day_short,
-                       TO_CHAR(timestamp_i, 'Mon. DD, YYYY') AS day_long,
-                       (
-                           SELECT COUNT(*)
-                           FROM events_common.issues INNER JOIN public.issues USING (issue_id)
-                           WHERE project_id = %(project_id)s
-                             AND timestamp >= (EXTRACT(EPOCH FROM timestamp_i) * 1000)::BIGINT
-                             AND timestamp <= (EXTRACT(EPOCH FROM timestamp_i + INTERVAL '1 day') * 1000)::BIGINT
-                       )                             AS issues_count
-                FROM generate_series(
-                             DATE_TRUNC('day', now()) - INTERVAL '7 days',
-                             DATE_TRUNC('day', now()) - INTERVAL '1 day',
-                             '1 day'::INTERVAL
-                         ) AS timestamp_i
-                ORDER BY timestamp_i;""", params))
-            days_partition = cur.fetchall()
-            _now2 = TimeUTC.now()
-            print(f">> Weekly report s-query-1: {_now2 - _now} ms project_id: {p['project_id']}")
-            _now = _now2
-            max_days_partition = max(x['issues_count'] for x in days_partition)
-            for d in days_partition:
+            WHERE CARDINALITY(users.emails) > 0
+            ORDER BY project_id;""", params))
+        return cur.fetchall()
+
+
+def __get_project_report(project, params):
+    params = {**params, "project_id": project["project_id"]}
+    p = dict(project)
+    # each work unit uses its own pooled connection
+    with pg_client.PostgresClient() as cur:
+        cur.execute(cur.mogrify("""\
+            SELECT TO_CHAR(DATE_TRUNC('day', now()) - INTERVAL '1 week', 'Mon. DDth, YYYY') AS period_start,
+                   TO_CHAR(DATE_TRUNC('day', now()), 'Mon. DDth, YYYY')                     AS period_end,
+                   COUNT(1) FILTER ( WHERE issues.timestamp >= %(1_week_ago)s
+                                         AND issues.timestamp < %(tomorrow)s )              AS this_week_issues_count,
+                   COUNT(1) FILTER ( WHERE issues.timestamp <= %(1_week_ago)s
+                                         AND issues.timestamp >= %(2_week_ago)s )           AS past_week_issues_count,
+                   COUNT(1) FILTER ( WHERE issues.timestamp <= %(1_week_ago)s
+                                         AND issues.timestamp >= %(5_week_ago)s )           AS past_month_issues_count
+            FROM events_common.issues
+                     INNER JOIN public.sessions USING (session_id)
+            WHERE sessions.project_id = %(project_id)s
+              AND issues.timestamp >= %(5_week_ago)s
+              AND issues.timestamp < %(tomorrow)s;""", params))
+        p = {**p, **cur.fetchone()}
+        if p["this_week_issues_count"] + p["past_week_issues_count"] + p["past_month_issues_count"] == 0:
+            logger.debug(f"ignoring {p['project_name']} : {p['project_id']}")
+            return None
+        p["past_week_issues_evolution"] = helper.__decimal_limit(
+            helper.__progress(p["this_week_issues_count"], p["past_week_issues_count"]), 1)
+        p["past_month_issues_evolution"] = helper.__decimal_limit(
+            helper.__progress(p["this_week_issues_count"], p["past_month_issues_count"]), 1)
+        cur.execute(cur.mogrify("""
+            SELECT LEFT(TO_CHAR(timestamp_i, 'Dy'),1) AS day_short,
+                   TO_CHAR(timestamp_i, 'Mon. DD, YYYY') AS day_long,
+                   (
+                       SELECT COUNT(*)
+                       FROM events_common.issues INNER JOIN public.issues USING (issue_id)
+                       WHERE project_id = %(project_id)s
+                         AND timestamp >= (EXTRACT(EPOCH FROM timestamp_i) * 1000)::BIGINT
+                         AND timestamp <= (EXTRACT(EPOCH FROM timestamp_i + INTERVAL '1 day') * 1000)::BIGINT
+                   )                             AS issues_count
+            FROM generate_series(
+                         DATE_TRUNC('day', now()) - INTERVAL '7 days',
+                         DATE_TRUNC('day', now()) - INTERVAL '1 day',
+                         '1 day'::INTERVAL
+                     ) AS timestamp_i
+            ORDER BY timestamp_i;""", params))
+        days_partition = cur.fetchall()
+        max_days_partition = max(x['issues_count'] for x in days_partition)
+        for d in days_partition:
+            if max_days_partition <= 0:
+                d["value"] = LOWEST_BAR_VALUE
+            else:
+                d["value"] = d["issues_count"] * 100 / max_days_partition
+                d["value"] = d["value"] if d["value"] > LOWEST_BAR_VALUE else LOWEST_BAR_VALUE
+        cur.execute(cur.mogrify("""\
+        SELECT type, COUNT(*) AS count
+        FROM events_common.issues INNER JOIN public.issues USING (issue_id)
+        WHERE project_id = %(project_id)s
+          AND timestamp >= (EXTRACT(EPOCH FROM DATE_TRUNC('day', now()) - INTERVAL '7 days') * 1000)::BIGINT
+        GROUP BY type
+        ORDER BY count DESC, type
+        LIMIT 4;""", params))
+        issues_by_type = cur.fetchall()
+        max_issues_by_type = sum(i["count"] for i in issues_by_type)
+        for i in issues_by_type:
+            i["type"] = get_issue_title(i["type"])
+            if max_issues_by_type <= 0:
+                i["value"] = LOWEST_BAR_VALUE
+            else:
+                i["value"] = i["count"] * 100 / max_issues_by_type
+        cur.execute(cur.mogrify("""\
+            SELECT TO_CHAR(timestamp_i, 'Dy')             AS day_short,
+                   TO_CHAR(timestamp_i, 'Mon. DD, YYYY')  AS day_long,
+                   COALESCE((SELECT JSONB_AGG(sub)
+                             FROM (
+                                      SELECT type, COUNT(*) AS count
+                                      FROM events_common.issues
+                                               INNER JOIN public.issues USING (issue_id)
+                                      WHERE project_id = %(project_id)s
+                                        AND timestamp >= (EXTRACT(EPOCH FROM timestamp_i) * 1000)::BIGINT
+                                        AND timestamp <= (EXTRACT(EPOCH FROM timestamp_i + INTERVAL '1 day') * 1000)::BIGINT
+                                      GROUP BY type
+                                      ORDER BY count
+                                  ) AS sub), '[]'::JSONB) AS partition
+            FROM generate_series(
+                         DATE_TRUNC('day', now()) - INTERVAL '7 days',
+                         DATE_TRUNC('day', now()) - INTERVAL '1 day',
+                         '1 day'::INTERVAL
+                     ) AS timestamp_i
+            GROUP BY timestamp_i
+            ORDER BY timestamp_i;""", params))
+        issues_breakdown_by_day = cur.fetchall()
+        for i in issues_breakdown_by_day:
+            i["sum"] = sum(x["count"] for x in i["partition"])
+            for j in i["partition"]:
+                j["type"] = get_issue_title(j["type"])
+        max_days_partition = max(i["sum"] for i in issues_breakdown_by_day)
+        for i in issues_breakdown_by_day:
+            for j in i["partition"]:
                 if max_days_partition <= 0:
-                    d["value"] = LOWEST_BAR_VALUE
+                    j["value"] = LOWEST_BAR_VALUE
                 else:
-                    d["value"] = d["issues_count"] * 100 / max_days_partition
-                    d["value"] = d["value"] if d["value"] > LOWEST_BAR_VALUE else LOWEST_BAR_VALUE
-            cur.execute(cur.mogrify("""\
-            SELECT type, COUNT(*) AS count
-            FROM events_common.issues INNER JOIN public.issues USING (issue_id)
-            WHERE project_id = %(project_id)s
-              AND timestamp >= (EXTRACT(EPOCH FROM DATE_TRUNC('day', now()) - INTERVAL '7 days') * 1000)::BIGINT
+                    j["value"] = j["count"] * 100 / max_days_partition
+                    j["value"] = j["value"] if j["value"] > LOWEST_BAR_VALUE else LOWEST_BAR_VALUE
+        cur.execute(cur.mogrify("""
+            SELECT type,
+                   COUNT(*)                   AS issue_count,
+                   COUNT(DISTINCT session_id) AS sessions_count,
+                   (SELECT COUNT(DISTINCT sessions.session_id)
+                    FROM public.sessions
+                             INNER JOIN events_common.issues AS sci USING (session_id)
+                             INNER JOIN public.issues AS si USING (issue_id)
+                    WHERE si.project_id = %(project_id)s
+                      AND sessions.project_id = %(project_id)s
+                      AND sessions.start_ts <= (EXTRACT(EPOCH FROM DATE_TRUNC('day', now()) - INTERVAL '1 week') * 1000)::BIGINT
+                      AND sessions.start_ts >= (EXTRACT(EPOCH FROM DATE_TRUNC('day', now()) - INTERVAL '2 weeks') * 1000)::BIGINT
+                      AND si.type = mi.type
+                      AND sessions.duration IS NOT NULL
+                   )                          AS last_week_sessions_count,
+                   (SELECT COUNT(DISTINCT sci.session_id)
+                    FROM public.sessions
+                             INNER JOIN events_common.issues AS sci USING (session_id)
+                             INNER JOIN public.issues AS si USING (issue_id)
+                    WHERE si.project_id = %(project_id)s
+                      AND sessions.project_id = %(project_id)s
+                      AND sessions.start_ts <= (EXTRACT(EPOCH FROM DATE_TRUNC('day', now()) - INTERVAL '1 week') * 1000)::BIGINT
+                      AND sessions.start_ts >= (EXTRACT(EPOCH FROM DATE_TRUNC('day', now()) - INTERVAL '5 weeks') * 1000)::BIGINT
+                      AND si.type = mi.type
+                      AND sessions.duration IS NOT NULL
+                   )                          AS last_month_sessions_count
+            FROM events_common.issues
+                     INNER JOIN public.issues AS mi USING (issue_id)
+                     INNER JOIN public.sessions USING (session_id)
+            WHERE mi.project_id = %(project_id)s AND sessions.project_id = %(project_id)s AND sessions.duration IS NOT NULL
+                AND sessions.start_ts >= (EXTRACT(EPOCH FROM DATE_TRUNC('day', now()) - INTERVAL '1 week') * 1000)::BIGINT
             GROUP BY type
-            ORDER BY count DESC, type
-            LIMIT 4;""", params))
-            issues_by_type = cur.fetchall()
-            _now2 = TimeUTC.now()
-            print(f">> Weekly report s-query-1: {_now2 - _now} ms project_id: {p['project_id']}")
-            _now = _now2
-            max_issues_by_type = sum(i["count"] for i in issues_by_type)
-            for i in issues_by_type:
-                i["type"] = get_issue_title(i["type"])
-                if max_issues_by_type <= 0:
-                    i["value"] = LOWEST_BAR_VALUE
-                else:
-                    i["value"] = i["count"] * 100 / max_issues_by_type
-            cur.execute(cur.mogrify("""\
-                SELECT TO_CHAR(timestamp_i, 'Dy')             AS day_short,
-                       TO_CHAR(timestamp_i, 'Mon. DD, YYYY')  AS day_long,
-                       COALESCE((SELECT JSONB_AGG(sub)
-                                 FROM (
-                                          SELECT type, COUNT(*) AS count
-                                          FROM events_common.issues
-                                                   INNER JOIN public.issues USING (issue_id)
-                                          WHERE project_id = %(project_id)s
-                                            AND timestamp >= (EXTRACT(EPOCH FROM timestamp_i) * 1000)::BIGINT
-                                            AND timestamp <= (EXTRACT(EPOCH FROM timestamp_i + INTERVAL '1 day') * 1000)::BIGINT
-                                          GROUP BY type
-                                          ORDER BY count
-                                      ) AS sub), '[]'::JSONB) AS partition
-                FROM generate_series(
-                             DATE_TRUNC('day', now()) - INTERVAL '7 days',
-                             DATE_TRUNC('day', now()) - INTERVAL '1 day',
-                             '1 day'::INTERVAL
-                         ) AS timestamp_i
-                GROUP BY timestamp_i
-                ORDER BY timestamp_i;""", params))
-            issues_breakdown_by_day = cur.fetchall()
-            _now2 = TimeUTC.now()
-            print(f">> Weekly report s-query-1: {_now2 - _now} ms project_id: {p['project_id']}")
-            _now = _now2
-            for i in issues_breakdown_by_day:
-                i["sum"] = sum(x["count"] for x in i["partition"])
-                for j in i["partition"]:
-                    j["type"] = get_issue_title(j["type"])
-            max_days_partition = max(i["sum"] for i in issues_breakdown_by_day)
-            for i in issues_breakdown_by_day:
-                for j in i["partition"]:
-                    if max_days_partition <= 0:
-                        j["value"] = LOWEST_BAR_VALUE
-                    else:
-                        j["value"] = j["count"] * 100 / max_days_partition
-                        j["value"] = j["value"] if j["value"] > LOWEST_BAR_VALUE else LOWEST_BAR_VALUE
-            cur.execute(cur.mogrify("""
-                SELECT type,
-                       COUNT(*)                   AS issue_count,
-                       COUNT(DISTINCT session_id) AS sessions_count,
-                       (SELECT COUNT(DISTINCT sessions.session_id)
-                        FROM public.sessions
-                                 INNER JOIN events_common.issues AS sci USING (session_id)
-                                 INNER JOIN public.issues AS si USING (issue_id)
-                        WHERE si.project_id = %(project_id)s
-                          AND sessions.project_id = %(project_id)s
-                          AND sessions.start_ts <= (EXTRACT(EPOCH FROM DATE_TRUNC('day', now()) - INTERVAL '1 week') * 1000)::BIGINT
-                          AND sessions.start_ts >= (EXTRACT(EPOCH FROM DATE_TRUNC('day', now()) - INTERVAL '2 weeks') * 1000)::BIGINT
-                          AND si.type = mi.type
-                          AND sessions.duration IS NOT NULL
-                       )                          AS last_week_sessions_count,
-                       (SELECT COUNT(DISTINCT sci.session_id)
-                        FROM public.sessions
-                                 INNER JOIN events_common.issues AS sci USING (session_id)
-                                 INNER JOIN public.issues AS si USING (issue_id)
-                        WHERE si.project_id = %(project_id)s
-                          AND sessions.project_id = %(project_id)s
-                          AND sessions.start_ts <= (EXTRACT(EPOCH FROM DATE_TRUNC('day', now()) - INTERVAL '1 week') * 1000)::BIGINT
-                          AND sessions.start_ts >= (EXTRACT(EPOCH FROM DATE_TRUNC('day', now()) - INTERVAL '5 weeks') * 1000)::BIGINT
-                          AND si.type = mi.type
-                          AND sessions.duration IS NOT NULL
-                       )                          AS last_month_sessions_count
-                FROM events_common.issues
-                         INNER JOIN public.issues AS mi USING (issue_id)
-                         INNER JOIN public.sessions USING (session_id)
-                WHERE mi.project_id = %(project_id)s AND sessions.project_id = %(project_id)s AND sessions.duration IS NOT NULL
-                    AND sessions.start_ts >= (EXTRACT(EPOCH FROM DATE_TRUNC('day', now()) - INTERVAL '1 week') * 1000)::BIGINT
-                GROUP BY type
-                ORDER BY issue_count DESC;""", params))
-            issues_breakdown_list = cur.fetchall()
-            _now2 = TimeUTC.now()
-            print(f">> Weekly report s-query-1: {_now2 - _now} ms project_id: {p['project_id']}")
-            _now = _now2
-            if len(issues_breakdown_list) > 4:
-                others = {"type": "Others",
-                          "sessions_count": sum(i["sessions_count"] for i in issues_breakdown_list[4:]),
-                          "issue_count": sum(i["issue_count"] for i in issues_breakdown_list[4:]),
-                          "last_week_sessions_count": sum(
-                              i["last_week_sessions_count"] for i in issues_breakdown_list[4:]),
-                          "last_month_sessions_count": sum(
-                              i["last_month_sessions_count"] for i in issues_breakdown_list[4:])}
-                issues_breakdown_list = issues_breakdown_list[:4]
-                issues_breakdown_list.append(others)
-            for i in issues_breakdown_list:
-                i["type"] = get_issue_title(i["type"])
-                i["last_week_sessions_evolution"] = helper.__decimal_limit(
-                    helper.__progress(i["sessions_count"], i["last_week_sessions_count"]), 1)
-                i["last_month_sessions_evolution"] = helper.__decimal_limit(
-                    helper.__progress(i["sessions_count"], i["last_month_sessions_count"]), 1)
-                i["sessions_count"] = f'{i["sessions_count"]:,}'
-            keep_types = [i["type"] for i in issues_breakdown_list]
-            for i in issues_breakdown_by_day:
-                keep = []
-                for j in i["partition"]:
-                    if j["type"] in keep_types:
-                        keep.append(j)
-                i["partition"] = keep
-            emails_to_send.append({"email": p.pop("emails"),
-                                   "data": {
-                                       **p,
-                                       "days_partition": days_partition,
-                                       "issues_by_type": issues_by_type,
-                                       "issues_breakdown_by_day": issues_breakdown_by_day,
-                                       "issues_breakdown_list": issues_breakdown_list
-                                   }})
-        print(f">>> Sending weekly report to {len(emails_to_send)} email-group")
-        for e in emails_to_send:
-            email_helper.weekly_report2(recipients=e["email"], data=e["data"])
+            ORDER BY issue_count DESC;""", params))
+        issues_breakdown_list = cur.fetchall()
+        if len(issues_breakdown_list) > 4:
+            others = {"type": "Others",
+                      "sessions_count": sum(i["sessions_count"] for i in issues_breakdown_list[4:]),
+                      "issue_count": sum(i["issue_count"] for i in issues_breakdown_list[4:]),
+                      "last_week_sessions_count": sum(
+                          i["last_week_sessions_count"] for i in issues_breakdown_list[4:]),
+                      "last_month_sessions_count": sum(
+                          i["last_month_sessions_count"] for i in issues_breakdown_list[4:])}
+            issues_breakdown_list = issues_breakdown_list[:4]
+            issues_breakdown_list.append(others)
+        for i in issues_breakdown_list:
+            i["type"] = get_issue_title(i["type"])
+            i["last_week_sessions_evolution"] = helper.__decimal_limit(
+                helper.__progress(i["sessions_count"], i["last_week_sessions_count"]), 1)
+            i["last_month_sessions_evolution"] = helper.__decimal_limit(
+                helper.__progress(i["sessions_count"], i["last_month_sessions_count"]), 1)
+            i["sessions_count"] = f'{i["sessions_count"]:,}'
+        keep_types = [i["type"] for i in issues_breakdown_list]
+        for i in issues_breakdown_by_day:
+            keep = []
+            for j in i["partition"]:
+                if j["type"] in keep_types:
+                    keep.append(j)
+            i["partition"] = keep
+    return {"email": p.pop("emails"),
+            "data": {
+                **p,
+                "days_partition": days_partition,
+                "issues_by_type": issues_by_type,
+                "issues_breakdown_by_day": issues_breakdown_by_day,
+                "issues_breakdown_list": issues_breakdown_list
+            }}
+
+
+def __load_checkpoint(run_key):
+    # the checkpoint is kept in PG so a restarted container resumes the run
+    with pg_client.PostgresClient() as cur:
+        cur.execute(cur.mogrify("""\
+            SELECT checkpoint
+            FROM public.weekly_report_runs
+            WHERE run_key = %(run_key)s;""", {"run_key": run_key}))
+        row = cur.fetchone()
+    if row is not None:
+        return {"done": [], "failed": [], **row["checkpoint"], "runKey": run_key}
+    return {"runKey": run_key, "done": [], "failed": [], "completed": False}
+
+
+def __save_checkpoint(checkpoint):
+    with pg_client.PostgresClient() as cur:
+        cur.execute(cur.mogrify("""\
+            INSERT INTO public.weekly_report_runs (run_key, checkpoint)
+            VALUES (%(run_key)s, %(checkpoint)s::jsonb)
+            ON CONFLICT (run_key) DO UPDATE SET checkpoint  = EXCLUDED.checkpoint,
+                                                updated_at = timezone('utc'::text, now());""",
+                                {"run_key": checkpoint["runKey"], "checkpoint": json.dumps(checkpoint)}))
+
+
+def cron():
+    if not smtp.has_smtp():
+        logger.warning("!!! No SMTP configuration found, ignoring weekly report")
+        return
+    _now = TimeUTC.now()
+    # one run per ISO week, a crashed run resumes from the last checkpoint instead of re-sending everything
+    run_key = datetime.now(tz=timezone.utc).strftime("%G-W%V")
+    checkpoint = __load_checkpoint(run_key)
+    if checkpoint["completed"]:
+        logger.info(f">> Weekly report {run_key} already sent")
+        return
+    done = set(checkpoint["done"])
+    params = __get_params()
+    projects = [p for p in __get_recently_active_projects(params) if p["project_id"] not in done]
+    logger.info(f">> Weekly report {run_key}: {len(projects)} projects to process, {len(done)} already done")
+
+    to_send = []
+    to_send_projects = []
+    failed = []
+
+    def flush():
+        if len(to_send) > 0:
+            email_helper.weekly_report_batch(to_send)
+        checkpoint["done"] += to_send_projects
+        __save_checkpoint(checkpoint)
+        to_send.clear()
+        to_send_projects.clear()
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        futures = {executor.submit(__get_project_report, project=p, params=params): p for p in projects}
+        for future in as_completed(futures):
+            p = futures[future]
+            try:
+                report = future.result()
+            except Exception as e:
+                logger.error(f"!!! Weekly report failed for project_id: {p['project_id']}")
+                logger.exception(e)
+                failed.append(p["project_id"])
+                continue
+            if report is not None:
+                to_send.append(report)
+            to_send_projects.append(p["project_id"])
+            if len(to_send_projects) >= BATCH_SIZE:
+                flush()
+    flush()
+    # failed projects are not in done, the next run of the same week retries them
+    checkpoint["failed"] = failed
+    checkpoint["completed"] = len(failed) == 0
+    __save_checkpoint(checkpoint)
+    if len(failed) > 0:
+        logger.warning(f">>> Weekly report {run_key}: {len(failed)} projects failed, they will be retried")
+    logger.info(f">>> Weekly report {run_key} done in {TimeUTC.now() - _now} ms")
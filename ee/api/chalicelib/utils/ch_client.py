@@ -51,6 +51,19 @@ class ClickHouseClient:
             logging.error("--------------------")
             raise err
 
+    def execute_iter(self, query, params=None, max_block_size=None, **args):
+        # rows are streamed block by block instead of loading the whole result in memory
+        if max_block_size is not None:
+            args["settings"] = {**args.get("settings", {}), "max_block_size": max_block_size}
+        rows = self.__client.execute_iter(query=query, params=params, with_column_types=True, **args)
+        # the first item is the list of (name, type) of the columns
+        columns = next(rows, None)
+        if columns is None:
+            return
+        keys = tuple(x for x, y in columns)
+        for r in rows:
+            yield dict(zip(keys, r))
+
     def insert(self, query, params=None, **args):
         return self.__client.execute(query=query, params=params, **args)
 
@@ -1,6 +1,7 @@
 from decouple import config
 from datetime import datetime, timedelta
 from chalicelib.utils.storage.interface import ObjectStorage
+from azure.core.exceptions import ResourceNotFoundError
 from azure.storage.blob import BlobServiceClient, BlobSasPermissions, generate_blob_sas
 
 
@@ -45,6 +46,23 @@ class AzureBlobStorage(ObjectStorage):
         blob_client = self.client.get_blob_client(source_bucket, source_key)
         return blob_client.download_blob().readall()
 
+    def get_file_head(self, bucket, key, size):
+        blob_client = self.client.get_blob_client(bucket, key)
+        try:
+            downloader = blob_client.download_blob(offset=0, length=size)
+        except ResourceNotFoundError:
+            return None
+        head = downloader.readall()
+        # content_range: bytes 0-{end}/{total size}, not set for an empty blob
+        content_range = downloader.properties.content_range
+        return head.decode(errors="ignore"), int(content_range.split("/")[-1]) if content_range else len(head)
+
+    def get_file_range(self, bucket, key, start, end):
+        blob_client = self.client.get_blob_client(bucket, key)
+        if not blob_client.exists():
+            return None
+        return blob_client.download_blob(offset=start, length=end - start + 1).readall().decode(errors="ignore")
+
     def tag_for_deletion(self, bucket, key):
         blob_client = self.client.get_blob_client(bucket, key)
         if not blob_client.exists():
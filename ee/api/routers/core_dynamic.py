@@ -3,7 +3,7 @@ from typing import Optional, Union
 from decouple import config
 from fastapi import Body, Depends, BackgroundTasks, Request
 from fastapi import HTTPException, status
-from starlette.responses import RedirectResponse, FileResponse, JSONResponse, Response
+from starlette.responses import RedirectResponse, FileResponse, JSONResponse, Response, StreamingResponse
 
 import schemas
 from chalicelib.core import sessions, assist, heatmaps, sessions_favorite, sessions_assignments, errors, errors_viewed, \
@@ -16,6 +16,7 @@ from chalicelib.core.users import get_user_settings
 from chalicelib.utils import SAML2_helper, smtp
 from chalicelib.utils import captcha
 from chalicelib.utils import helper
+from chalicelib.utils.export_helper import MEDIA_TYPES
 from chalicelib.utils.TimeUTC import TimeUTC
 from or_dependencies import OR_context, OR_scope, OR_role
 from routers.base import get_routers
@@ -272,6 +273,17 @@ def session_ids_search(projectId: int, data: schemas.SessionsSearchPayloadSchema
     return {'data': data}
 
 
+@app.post('/{projectId}/sessions/search/export', tags=["sessions"],
+          dependencies=[OR_scope(Permissions.session_replay)])
+def sessions_search_export(projectId: int, data: schemas.SessionsSearchPayloadSchema = Body(...),
+                           format: schemas.ExportFormat = schemas.ExportFormat.ndjson,
+                           context: schemas.CurrentContext = Depends(OR_context)):
+    content = sessions.search_sessions_stream(data=data, project_id=projectId, user_id=context.user_id,
+                                              fmt=format, platform=context.project.platform)
+    return StreamingResponse(content, media_type=MEDIA_TYPES[format],
+                             headers={"Content-Disposition": f'attachment; filename="sessions-{projectId}.{format.value}"'})
+
+
 @app.get('/{projectId}/sessions/{sessionId}/first-mob', tags=["sessions", "replay"],
          dependencies=[OR_scope(Permissions.session_replay, ServicePermissions.session_replay)])
 def get_first_mob_file(projectId: int, sessionId: Union[int, str], background_tasks: BackgroundTasks,
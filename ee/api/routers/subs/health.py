@@ -2,7 +2,7 @@ from fastapi import Depends
 from fastapi import HTTPException, status
 
 import schemas
-from chalicelib.core import health, tenants
+from chalicelib.core import health, tenants, traces
 from or_dependencies import OR_context
 from routers.base import get_routers
 
@@ -14,6 +14,12 @@ def get_global_health_status(context: schemas.CurrentContext = Depends(OR_contex
     return {"data": health.get_health(tenant_id=context.tenant_id)}
 
 
+@app.get('/healthz/traces', tags=["health-check"])
+def get_traces_writer_stats(context: schemas.CurrentContext = Depends(OR_context)):
+    # queue depth and flush latencies of the traces writer, None if it is not started
+    return {"data": traces.get_stats()}
+
+
 if not tenants.tenants_exists_sync(use_pool=False):
     @public_app.get('/health', tags=["health-check"])
     async def get_public_health_status():
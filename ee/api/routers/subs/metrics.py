@@ -3,7 +3,7 @@ from typing import Union
 from fastapi import Body, Depends, Request
 
 import schemas
-from chalicelib.core import dashboards, custom_metrics, funnels
+from chalicelib.core import dashboards, custom_metrics, custom_metrics_predefined, funnels
 from or_dependencies import OR_context, OR_scope
 from routers.base import get_routers
 
@@ -98,6 +98,13 @@ def try_card_issues(projectId: int, data: schemas.CardSchema = Body(...),
     return {"data": custom_metrics.get_issues(project_id=projectId, user_id=context.user_id, data=data)}
 
 
+@app.post('/{projectId}/cards/predefined', tags=["cards"])
+def get_predefined_cards(projectId: int, data: schemas.CardPredefinedBatchSchema = Body(...),
+                         context: schemas.CurrentContext = Depends(OR_context)):
+    return {"data": custom_metrics_predefined.get_metrics(keys=data.metrics_of, project_id=projectId,
+                                                          data=data.model_dump(exclude={"metrics_of"}))}
+
+
 @app.get('/{projectId}/cards', tags=["cards"])
 def get_cards(projectId: int, context: schemas.CurrentContext = Depends(OR_context)):
     return {"data": custom_metrics.get_all(project_id=projectId, user_id=context.user_id)}
@@ -1,6 +1,8 @@
 import logging
 from fastapi import FastAPI, HTTPException, Depends
-from sqlalchemy import Column, Integer, String, create_engine
+from typing import List
+from sqlalchemy import Column, Integer, String, create_engine, text
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.declarative import declarative_base
 from pydantic import BaseModel, Field
 from decouple import config
@@ -23,6 +25,9 @@ POOL_SIZE = config("POOL_SIZE", default=20, cast=int)
 MAX_OVERFLOW = config("MAX_OVERFLOW", default=10, cast=int)
 POOL_TIMEOUT = config("POOL_TIMEOUT", default=30, cast=int)
 POOL_RECYCLE = config("POOL_RECYCLE", default=3600, cast=int)
+# logging every statement is for debugging only, it is too slow for the ingestion path
+SQL_ECHO = config("SQL_ECHO", default=False, cast=bool)
+MAX_BATCH_SIZE = config("MAX_BATCH_SIZE", default=1000, cast=int)
 
 app = FastAPI(root_path=config("root_path", default="/assist-stats"))
 
@@ -30,7 +35,7 @@ engine = create_engine(
     DATABASE_URL,
     pool_size=POOL_SIZE,
     max_overflow=MAX_OVERFLOW,
-    echo=True,
+    echo=SQL_ECHO,
 )
 
 SessionLocal = sessionmaker(
@@ -89,6 +94,10 @@ class EventCreate(BaseModel):
     timestamp: int = Field(..., description="The timestamp of the event")
 
 
+class EventsBatch(BaseModel):
+    events: List[EventCreate] = Field(..., description="Start and end events, in the order they happened")
+
+
 def update_duration(event_id, timestamp, db):
     try:
         existing_event = db.query(Event).filter(Event.event_id == event_id).first()
@@ -146,6 +155,61 @@ def create_event(event: EventCreate, db: Session = Depends(get_db)):
         insert_event(event, db)
 
 
+def insert_events(events: List[EventCreate], db: Session):
+    """Inserts all the start events with a single statement, returns the ids of the inserted ones
+    (the others already existed)."""
+    rows = [{"event_id": e.event_id,
+             "session_id": e.session_id,
+             "project_id": e.project_id,
+             "event_type": e.event_type,
+             "agent_id": e.agent_id,
+             "timestamp": e.timestamp} for e in events]
+    query = insert(Event).values(rows) \
+        .on_conflict_do_nothing(index_elements=[Event.event_id]) \
+        .returning(Event.event_id)
+    return [r[0] for r in db.execute(query)]
+
+
+def update_durations(events: List[EventCreate], db: Session):
+    """Sets the duration of all the ended events with a single statement, returns the ids of the updated ones
+    (the others don't exist or end before their start)."""
+    values = ", ".join([f"(:event_id_{i}, :timestamp_{i})" for i in range(len(events))])
+    params = {}
+    for i, e in enumerate(events):
+        params[f"event_id_{i}"] = e.event_id
+        params[f"timestamp_{i}"] = e.timestamp
+    query = text(f"""UPDATE assist_events
+                     SET duration = ended.timestamp - assist_events.timestamp
+                     FROM (VALUES {values}) AS ended(event_id, timestamp)
+                     WHERE assist_events.event_id = ended.event_id
+                       AND ended.timestamp >= assist_events.timestamp
+                     RETURNING assist_events.event_id;""")
+    return [r[0] for r in db.execute(query, params)]
+
+
+@app.post("/events/batch", dependencies=[Depends(api_key_auth)])
+def create_events(batch: EventsBatch, db: Session = Depends(get_db)):
+    if len(batch.events) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"A batch can't have more than {MAX_BATCH_SIZE} events")
+    # the last state of an event wins, the starts are inserted before the ends are applied
+    # so an event that started and ended in the same batch gets its duration
+    starts = {e.event_id: e for e in batch.events if e.event_state == EventStateEnum.start}
+    ends = {e.event_id: e for e in batch.events if e.event_state == EventStateEnum.end}
+    try:
+        inserted = insert_events(list(starts.values()), db) if len(starts) > 0 else []
+        updated = update_durations(list(ends.values()), db) if len(ends) > 0 else []
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        logging.error(f"Error creating events batch -: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    inserted, updated = set(inserted), set(updated)
+    return {"inserted": len(inserted),
+            "updated": len(updated),
+            "duplicates": [i for i in starts if i not in inserted],
+            "notUpdated": [i for i in ends if i not in updated]}
+
+
 @app.get("/", tags=["health"])
 def health_check():
     return {"status": "ok"}
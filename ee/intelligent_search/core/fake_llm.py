@@ -0,0 +1,20 @@
+from hashlib import md5
+from time import sleep
+
+
+class FakeLlama:
+
+    def __init__(self, latency: float = 0.1, latency_per_prompt: float = 0.01):
+        """
+        Deterministic stand-in of Llama for load-tests on CPU.
+        A batch costs latency seconds plus latency_per_prompt seconds per prompt, like a batched forward pass.
+        """
+        self.latency = latency
+        self.latency_per_prompt = latency_per_prompt
+        self.batches = []
+
+    def text_completion(self, prompts, temperature=0.6, top_p=0.9, max_gen_len=None, **params):
+        self.batches.append(len(prompts))
+        sleep(self.latency + self.latency_per_prompt * len(prompts))
+        return [{"generation": f"```sql\nSELECT * FROM sessions WHERE prompt = '{md5(p.encode()).hexdigest()}'\n```"}
+                for p in prompts]
@@ -1,80 +1,191 @@
 from utils.ch_client import ClickHouseClient
-from core.llm_api import LLM_Model
-from threading import Semaphore
+from functools import partial
+from queue import Queue, Empty, Full
+from threading import Thread, Lock, Event
+from time import monotonic, sleep
 from decouple import config
+import asyncio
 import logging
 
 
-FEEDBACK_LLAMA_TABLE_NAME = config('FEEDBACK_LLAMA_TABLE_NAME')
+FEEDBACK_LLAMA_TABLE_NAME = config('FEEDBACK_LLAMA_TABLE_NAME', default=None)
+COLUMNS = ("projectId", "userId", "userQuestion", "llamaResponse")
+
 
 class QnA:
     user_question: str
     llama_response: str
     user_identifier: int
     project_identifier: int
-    
+
     def __init__(self, question: str, answer: str, user_id: int, project_id: int):
         self.user_question = question
         self.llama_response = answer
         self.user_identifier = user_id
         self.project_identifier = project_id
 
-    def __preprocess_value(**args):
-        processed = {}
-        for k,v in args.values():
-            if __annotations__[k] == str:
-                v = v.replace("'", "''")
-                processed[k] = f"'{v}'"
-            else:
-                processed[k] = str(v)
-        return processed
-
-    def to_sql(self):
-        processed = __preproces_value({'user_question': self.user_question,
-                           'llama_response': self.llama_response,
-                           'user_identifier': self.user_identifier,
-                           'project_identifier': self.project_identifier
-                           })
-        return "({project_id}, {user_id}, {user_question}, {llama_response})".format(processed)
+
+class ClickHouseSink:
+
+    def __init__(self, table_name: str = FEEDBACK_LLAMA_TABLE_NAME):
+        """
+        Bulk insert of the Q&A pairs in ClickHouse, the connection is kept between flushes.
+        """
+        self.table_name = table_name
+        self.__conn = None
+
+    def insert(self, batch: list[QnA]):
+        if self.__conn is None:
+            self.__conn = ClickHouseClient()
+        # columnar insert: one list of values per column, the values are sent as parameters
+        columns = [[q.project_identifier for q in batch],
+                   [q.user_identifier for q in batch],
+                   [q.user_question for q in batch],
+                   [q.llama_response for q in batch]]
+        try:
+            self.__conn.insert(f"INSERT INTO {self.table_name} ({', '.join(COLUMNS)}) VALUES", columns,
+                               columnar=True)
+        except Exception:
+            # a new connection is made on the next flush
+            self.__conn = None
+            raise
+
+
+class MemorySink:
+
+    def __init__(self, latency: float = 0):
+        """Keeps the inserted batches in memory, for tests."""
+        self.latency = latency
+        self.batches = []
+
+    def insert(self, batch: list[QnA]):
+        if self.latency > 0:
+            sleep(self.latency)
+        self.batches.append(batch)
 
 
 class RequestsQueue:
-    __q_n_a_queue: list[QnA] = list()
-    queue_current_size = 0
 
-    def __init__(self, size: int = 100, max_wait_time: int = 1):
+    def __init__(self, size: int = 100, max_wait_time: float = 1, max_queue_size: int = 10000,
+                 put_timeout: float = 0, sink=None):
+        """
+        Bounded queue of Q&A pairs flushed to a sink by a worker thread.
+        Args:
+            size (int): number of pairs that triggers a flush.
+            max_wait_time (float): maximum seconds a pair waits before being flushed.
+            max_queue_size (int): pairs waiting for a flush, when the sink is too slow new pairs wait for
+                put_timeout seconds and are dropped after that.
+            sink: object with an insert(batch) method, ClickHouseSink by default.
+        """
         self.queue_size = size
         self.max_wait_time = max_wait_time
-        self.semaphore = Semaphore(1)
-
-    def add_to_queue(self, question: str, answer: str, user_id: int, project_id: int):
-        self.__q_n_a_queue.append(
-                QnA(question=question,
-                    answer=answer,
-                    user_id=user_id,
-                    project_id=project_id)
-                )
-        self.queue_current_size += 1
-
-    def flush_queue(self):
-        replace_sql = ', '.join([question_and_answer.to_sql() for question_and_answer in self.__q_n_a_queue])
-        query = "INSERT INTO {table_name} (projectId, userId, userQuestion, llamaResponse) VALUES {replace_sql}".format(
-                table_name=FEEDBACK_LLAMA_TABLE_NAME,
-                replace_sql=replace_sql)
+        self.put_timeout = put_timeout
+        self.sink = sink if sink is not None else ClickHouseSink()
+        self.__q_n_a_queue = Queue(maxsize=max_queue_size)
+        self.__flush_lock = Lock()
+        self.__force = Event()
+        self.__worker = None
+        self.__stopping = False
+        self.flushes_count = 0
+        self.flushed_count = 0
+        self.dropped_count = 0
+        self.errors_count = 0
+        self.last_flush_latency = 0
+        self.total_flush_latency = 0
 
+    def add_to_queue(self, question: str, answer: str, user_id: int, project_id: int) -> bool:
         try:
-            with ClickHouseClient() as conn:
-                conn.execute(query)
-        except Exception as e:
-            logging.error(f'[Flush Queue Error] {repr(e)}')
+            self.__q_n_a_queue.put(QnA(question=question,
+                                       answer=answer,
+                                       user_id=user_id,
+                                       project_id=project_id),
+                                   block=self.put_timeout > 0, timeout=self.put_timeout or None)
+            if self.__q_n_a_queue.qsize() >= self.queue_size:
+                self.__force.set()
+            return True
+        except Full:
+            self.dropped_count += 1
+            return False
+
+    async def add_to_queue_async(self, question: str, answer: str, user_id: int, project_id: int) -> bool:
+        # a put that may wait for space runs in the default executor, the event loop is never blocked
+        add = partial(self.add_to_queue, question=question, answer=answer, user_id=user_id, project_id=project_id)
+        if self.put_timeout > 0:
+            return await asyncio.get_running_loop().run_in_executor(None, add)
+        return add()
+
+    def __take(self, limit: int):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self.__q_n_a_queue.get_nowait())
+            except Empty:
+                break
+        return batch
+
+    def flush_queue(self) -> bool:
+        """Sends all the waiting pairs by batches of size, a failed batch is put back in the queue."""
+        with self.__flush_lock:
+            while True:
+                batch = self.__take(self.queue_size)
+                if len(batch) == 0:
+                    return True
+                t1 = monotonic()
+                try:
+                    self.sink.insert(batch)
+                except Exception as e:
+                    self.errors_count += 1
+                    logging.error(f'[Flush Queue Error] {repr(e)}')
+                    for q in batch:
+                        try:
+                            self.__q_n_a_queue.put_nowait(q)
+                        except Full:
+                            self.dropped_count += 1
+                    return False
+                self.last_flush_latency = monotonic() - t1
+                self.total_flush_latency += self.last_flush_latency
+                self.flushes_count += 1
+                self.flushed_count += len(batch)
+                if len(batch) < self.queue_size:
+                    return True
 
-    def start(self, llm_model: LLM_Model):
-        ...
+    def start(self):
+        if self.__worker is None:
+            self.__stopping = False
+            self.__worker = Thread(target=self.recurrent_flush, name="feedback-flush", daemon=True)
+            self.__worker.start()
+
+    def stop(self):
+        if self.__worker is not None:
+            self.__stopping = True
+            self.__force.set()
+            self.__worker.join()
+            self.__worker = None
+        self.flush_queue()
+
+    def force_flush(self):
+        self.__force.set()
 
     def recurrent_flush(self):
-        if self.semaphore.aquire(timeout=10):
-            # TODO: Process requests
-            self.semaphore.release()
-        else:
-            raise TimeoutError('LLM model overloaded with requests')
+        # flushes every max_wait_time, or as soon as size pairs are waiting
+        while not self.__stopping:
+            self.__force.wait(timeout=self.max_wait_time)
+            self.__force.clear()
+            if not self.flush_queue():
+                # the sink is failing, the pairs wait in the queue until the next attempt
+                sleep(self.max_wait_time)
+
+    def get_stats(self):
+        return {"queueDepth": self.__q_n_a_queue.qsize(),
+                "flushes": self.flushes_count,
+                "flushed": self.flushed_count,
+                "dropped": self.dropped_count,
+                "errors": self.errors_count,
+                "lastFlushLatency": self.last_flush_latency,
+                "avgFlushLatency": self.total_flush_latency / self.flushes_count if self.flushes_count > 0 else 0}
+
 
+requests_queue = RequestsQueue(size=config('FEEDBACK_BATCH_SIZE', cast=int, default=100),
+                               max_wait_time=config('FEEDBACK_MAX_WAIT_TIME', cast=float, default=1),
+                               max_queue_size=config('FEEDBACK_MAX_QUEUE_SIZE', cast=int, default=10000),
+                               put_timeout=config('FEEDBACK_PUT_TIMEOUT', cast=float, default=0))
@@ -1,25 +1,33 @@
-from llama import Llama, Dialog
 from decouple import config
-from utils.contexts import search_context_v2
 from threading import Semaphore
 
+from core.scheduler import BatchScheduler
+
 
 class LLM_Model:
 
-    def __init__(self, **params):
+    def __init__(self, generator=None, max_latency: float = 0.05, **params):
         """
         Initialization of pre-trained model.
         Args:
+            generator (optional): object with a text_completion method used instead of Llama (i.e. core.fake_llm.FakeLlama).
+            max_latency (float, optional): seconds to wait for more prompts to fill a batch. Defaults to 0.05.
             ckpt_dirckpt_dir (str): The directory containing checkpoint files for the pretrained model.
             tokenizer_path (str): The path to the tokenizer model used for text encoding/decoding.
             max_seq_len (int, optional): The maximum sequence length for input prompts. Defaults to 128.
             max_batch_size (int, optional): The maximum batch size for generating sequences. Defaults to 4.
         """
-        self.generator = Llama.build(**params)
-        self.max_queue_size = config('LLM_MAX_QUEUE_SIZE', cast=int, default=1)
+        if generator is None:
+            from llama import Llama
+            generator = Llama.build(**params)
+        self.generator = generator
+        self.max_queue_size = config('LLM_MAX_QUEUE_SIZE', cast=int, default=64)
         self.semaphore = Semaphore(config('LLM_MAX_BATCH_SIZE', cast=int, default=1))
-        self.queue = list()
-        self.responses = list()
+        self.scheduler = BatchScheduler(generate=self.execute_prompts,
+                                        max_batch_size=params.get("max_batch_size", 4),
+                                        max_latency=max_latency,
+                                        max_queue_size=self.max_queue_size)
+        self.scheduler.start()
 
     def __execute_prompts(self, prompts, **params):
         """
@@ -35,21 +43,20 @@ class LLM_Model:
                 prompts, **params)
 
     def execute_prompts(self, prompts, **params):
-        if self.semaphore.acquire(timeout=10):
-            results = self.__execute_prompts(prompts, **params)
-            self.semaphore.release()
-            return results
-        else:
+        if not self.semaphore.acquire(timeout=10):
             raise TimeoutError("[Error] LLM is over-requested")
-
-    async def queue_prompt(self, prompt, force=False, **params):
-        if self.semaphore.acquire(timeout=10):
-            if force:
-                self.responses = execute_prompts(self.queue + [prompt])
-            else:
-                self.queue.append(prompt)
-                # Wait until response exists
+        try:
+            return self.__execute_prompts(prompts, **params)
+        finally:
+            # a failed batch (i.e. CUDA OOM) must not block the next ones
             self.semaphore.release()
-        else:
-            raise TimeoutError("[Error] LLM is over-requested")
 
+    async def queue_prompt(self, prompt, **params):
+        """
+        Generates a single prompt as part of a batch, the batch is sent once it has max_batch_size prompts
+        or max_latency after its first prompt. Awaiting it doesn't block the event loop.
+        """
+        return await self.scheduler.submit(prompt, **params)
+
+    def close(self):
+        self.scheduler.stop()
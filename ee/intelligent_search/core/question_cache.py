@@ -0,0 +1,56 @@
+import re
+from hashlib import md5
+
+from utils.ttl_cache import TTLCache
+
+# words that only make the request polite or explicit, they are dropped only at the start of the question
+# as they can be values elsewhere (i.e. "me" is the country code of Montenegro)
+STOP_WORDS = {"please", "show", "me", "give", "find", "list", "display", "can", "could", "would", "you", "i",
+              "want", "see", "the", "a", "an"}
+NUMBERS = {"zero": "0", "one": "1", "two": "2", "three": "3", "four": "4", "five": "5", "six": "6", "seven": "7",
+           "eight": "8", "nine": "9", "ten": "10", "eleven": "11", "twelve": "12", "fifteen": "15", "twenty": "20",
+           "thirty": "30", "fourty": "40", "forty": "40", "fifty": "50", "hundred": "100"}
+# quoted values are kept as they are
+__TOKENS = re.compile(r"""'[^']*'|"[^"]*"|[^\s'"]+""")
+__PUNCTUATION = re.compile(r"^[,.;:!?()]+|[,.;:!?()]+$")
+
+
+def normalize_question(question: str) -> str:
+    tokens = []
+    for t in __TOKENS.findall(question):
+        if t[0] in ("'", '"'):
+            tokens.append(t)
+            continue
+        t = __PUNCTUATION.sub("", t)
+        # only the stop-words and numbers are matched regardless of case, other tokens can be
+        # case-sensitive values (user ids, urls)
+        lower = t.lower()
+        if len(t) == 0 or (len(tokens) == 0 and lower in STOP_WORDS):
+            continue
+        tokens.append(NUMBERS.get(lower, t))
+    return " ".join(tokens)
+
+
+def context_version(name: str, context: str) -> str:
+    # a change of the prompt's text invalidates the entries even if its name is the same
+    return f"{name}:{md5(context.encode()).hexdigest()[:8]}"
+
+
+class QuestionCache:
+
+    def __init__(self, maxsize: int = 5000, ttl: int = 24 * 60 * 60):
+        """
+        LRU/TTL cache of the LLM responses keyed by (prompt-context version, normalized question).
+        """
+        self.__cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, version: str, question: str):
+        return self.__cache.get((version, normalize_question(question)))
+
+    def set(self, version: str, question: str, response):
+        self.__cache.set((version, normalize_question(question)), response)
+
+    def get_stats(self):
+        stats = self.__cache.get_stats()
+        total = stats["hits"] + stats["misses"]
+        return {**stats, "hitRate": stats["hits"] / total if total > 0 else 0}
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from collections import deque
+from queue import Queue, Empty, Full
+from threading import Thread
+from time import monotonic
+
+
+class PromptRequest:
+    prompt: str
+    params: dict
+
+    def __init__(self, prompt: str, params: dict, loop: asyncio.AbstractEventLoop):
+        self.prompt = prompt
+        self.params = params
+        # prompts can only share a batch if they are generated with the same parameters
+        self.params_key = tuple(sorted(params.items()))
+        self.loop = loop
+        self.future = loop.create_future()
+
+
+class BatchScheduler:
+
+    def __init__(self, generate, max_batch_size: int = 4, max_latency: float = 0.05, max_queue_size: int = 64):
+        """
+        Micro-batching of prompts, batches are generated one at a time by a single worker thread.
+        Args:
+            generate: function(prompts, **params) returning one result per prompt (i.e. Llama.text_completion).
+            max_batch_size (int): maximum number of prompts generated together.
+            max_latency (float): seconds to wait for more prompts once the first prompt of a batch is received.
+            max_queue_size (int): maximum number of waiting prompts, new prompts are rejected beyond it.
+        """
+        self.generate = generate
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_latency = max_latency
+        self.batches_count = 0
+        self.prompts_count = 0
+        self.__queue = Queue(maxsize=max_queue_size)
+        # prompts received while building a batch with different parameters
+        self.__pending = deque()
+        self.__worker = None
+        self.__stopping = False
+
+    def start(self):
+        if self.__worker is None:
+            self.__stopping = False
+            self.__worker = Thread(target=self.__run, name="llm-batch-scheduler", daemon=True)
+            self.__worker.start()
+
+    def stop(self):
+        if self.__worker is not None:
+            self.__stopping = True
+            self.__queue.put(None)
+            self.__worker.join()
+            self.__worker = None
+
+    async def submit(self, prompt: str, **params):
+        """Enqueues the prompt and waits for its generation without blocking the event loop."""
+        request = PromptRequest(prompt=prompt, params=params, loop=asyncio.get_running_loop())
+        try:
+            self.__queue.put_nowait(request)
+        except Full:
+            raise TimeoutError("[Error] LLM is over-requested")
+        return await request.future
+
+    def __next_batch(self):
+        if len(self.__pending) > 0:
+            first = self.__pending.popleft()
+        else:
+            first = self.__queue.get()
+            if first is None:
+                return None
+        batch = [first]
+        deadline = monotonic() + self.max_latency
+        waiting = deque()
+        for r in self.__pending:
+            if r.params_key == first.params_key and len(batch) < self.max_batch_size:
+                batch.append(r)
+            else:
+                waiting.append(r)
+        self.__pending = waiting
+        while len(batch) < self.max_batch_size and not self.__stopping:
+            timeout = deadline - monotonic()
+            if timeout <= 0:
+                break
+            try:
+                r = self.__queue.get(timeout=timeout)
+            except Empty:
+                break
+            if r is None:
+                self.__stopping = True
+            elif r.params_key == first.params_key:
+                batch.append(r)
+            else:
+                self.__pending.append(r)
+        return batch
+
+    def __run(self):
+        while True:
+            if self.__stopping and len(self.__pending) == 0 and self.__queue.empty():
+                break
+            batch = self.__next_batch()
+            if batch is None:
+                continue
+            # requests cancelled by their caller while waiting are not generated
+            batch = [r for r in batch if not r.future.cancelled()]
+            if len(batch) == 0:
+                continue
+            try:
+                results = self.generate([r.prompt for r in batch], **batch[0].params)
+                error = None
+            except Exception as e:
+                logging.error(f"[Batch Scheduler Error] {repr(e)}")
+                results, error = [None] * len(batch), e
+            self.batches_count += 1
+            self.prompts_count += len(batch)
+            for r, result in zip(batch, results):
+                r.loop.call_soon_threadsafe(self.__resolve, r.future, result, error)
+
+    @staticmethod
+    def __resolve(future, result, error):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def get_stats(self):
+        return {"queueSize": self.__queue.qsize() + len(self.__pending),
+                "batches": self.batches_count,
+                "prompts": self.prompts_count,
+                "avgBatchSize": self.prompts_count / self.batches_count if self.batches_count > 0 else 0}
@@ -7,25 +7,36 @@ from contextlib import asynccontextmanager
 
 from utils.contexts import search_context_v2, search_context_v3
 from utils.contexts_charts import chart_context_v2, formatable_end
-from utils.sql_to_filters import filter_sql_where_statement
+from utils.sql_to_filters import filter_sql_where_statement, is_chart_response
 from utils import parameters, declarations
 from core.llm_api import LLM_Model
+from core.fake_llm import FakeLlama
+from core.question_cache import QuestionCache, context_version
+from core.feedback import requests_queue, FEEDBACK_LLAMA_TABLE_NAME
 from auth.auth_key import api_key_auth
 
+SEARCH_CONTEXT_VERSION = context_version("search_context_v3", search_context_v3)
+CHART_CONTEXT_VERSION = context_version("chart_context_v2", chart_context_v2 + formatable_end)
+
 
 class FastAPI_with_LLM(FastAPI):
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.llm_model = None
+        self.questions_cache = QuestionCache(maxsize=parameters.cache_size, ttl=parameters.cache_ttl)
 
-    def build_llm(self, ckpt_dir: str, tokenizer_path: str, max_seq_len: int, max_batch_size: int):
-        self.llm_model = LLM_Model(ckpt_dir=ckpt_dir,
+    def build_llm(self, ckpt_dir: str, tokenizer_path: str, max_seq_len: int, max_batch_size: int,
+                  max_latency: float, generator=None):
+        self.llm_model = LLM_Model(generator=generator,
+                                max_latency=max_latency,
+                                ckpt_dir=ckpt_dir,
                                 tokenizer_path=tokenizer_path,
                                 max_seq_len=max_seq_len,
                                 max_batch_size=max_batch_size)
 
     def clear(self):
+        self.llm_model.close()
         del self.llm_model
 
 
@@ -34,8 +45,13 @@ async def lifespan(app: FastAPI_with_LLM):
     app.build_llm(ckpt_dir=parameters.ckpt_dir,
                   tokenizer_path=parameters.tokenizer_path,
                   max_seq_len=parameters.max_seq_len,
-                  max_batch_size=parameters.max_batch_size)
+                  max_batch_size=parameters.max_batch_size,
+                  max_latency=parameters.max_batch_latency,
+                  generator=FakeLlama() if parameters.fake_llm else None)
+    if FEEDBACK_LLAMA_TABLE_NAME is not None:
+        requests_queue.start()
     yield
+    requests_queue.stop()
     app.clear()
 
 
@@ -45,30 +61,45 @@ app = FastAPI_with_LLM(lifespan=lifespan)
 @app.post("/llm/completion", dependencies=[Depends(api_key_auth)])
 async def predict(msg: declarations.LLMQuestion):
     question = msg.question
+    cached = app.questions_cache.get(version=SEARCH_CONTEXT_VERSION, question=question)
+    if cached is not None:
+        return {**cached, "inference_time": 0}
     t1 = time()
-    result = app.llm_model.execute_prompts([search_context_v3.format(user_question=question)],
-                                            temperature=parameters.temperature,
-                                            top_p=parameters.top_p,
-                                            max_gen_len=parameters.max_gen_len)
+    result = [await app.llm_model.queue_prompt(search_context_v3.format(user_question=question),
+                                               temperature=parameters.temperature,
+                                               top_p=parameters.top_p,
+                                               max_gen_len=parameters.max_gen_len)]
     t2 = time()
     processed = filter_sql_where_statement(result[0]['generation'])
+    if FEEDBACK_LLAMA_TABLE_NAME is not None:
+        await requests_queue.add_to_queue_async(question=question, answer=result[0]['generation'],
+                                                user_id=msg.userId, project_id=msg.projectId)
     if processed is None:
         return {"content": None, "raw_response": result, "inference_time": t2-t1}
+    app.questions_cache.set(version=SEARCH_CONTEXT_VERSION, question=question,
+                            response={"content": processed, "raw_response": result})
     return {"content": processed, "raw_response": result, "inference_time": t2-t1}
 
 
 @app.post("/llm/completion/charts", dependencies=[Depends(api_key_auth)])
 async def chart_predict(msg: declarations.LLMQuestion):
      question = msg.question
+     cached = app.questions_cache.get(version=CHART_CONTEXT_VERSION, question=question)
+     if cached is not None:
+         return {**cached, "inference_time": 0}
      t1 = time()
-     result = app.llm_model.execute_prompts([chart_context_v2+formatable_end.format(user_question=question)],
-                                             temperature=parameters.temperature,
-                                             top_p=parameters.top_p,
-                                             max_gen_len=parameters.max_gen_len)
+     result = [await app.llm_model.queue_prompt(chart_context_v2+formatable_end.format(user_question=question),
+                                                temperature=parameters.temperature,
+                                                top_p=parameters.top_p,
+                                                max_gen_len=parameters.max_gen_len)]
      t2 = time()
      processed = result[0]['generation']
      if processed is None:
          return {"content": None, "raw_response": result, "inference_time": t2-t1}
+     # an unusable generation is returned as before but not cached, the next equivalent question asks the LLM again
+     if is_chart_response(processed):
+         app.questions_cache.set(version=CHART_CONTEXT_VERSION, question=question,
+                                 response={"content": processed, "raw_response": result})
      return {"content": processed, "raw_response": result, "inference_time": t2-t1}
 
 
@@ -76,3 +107,10 @@ async def chart_predict(msg: declarations.LLMQuestion):
 async def health():
     return {'status': 200}
 
+
+@app.get('/llm/stats', dependencies=[Depends(api_key_auth)])
+async def stats():
+    return {"scheduler": app.llm_model.scheduler.get_stats(),
+            "cache": app.questions_cache.get_stats(),
+            "feedback": requests_queue.get_stats()}
+
@@ -0,0 +1,58 @@
+import asyncio
+from time import sleep
+
+from core.feedback import RequestsQueue, MemorySink
+
+
+def test_size_triggered_flush():
+    sink = MemorySink()
+    queue = RequestsQueue(size=10, max_wait_time=5, sink=sink)
+    queue.start()
+    for i in range(25):
+        queue.add_to_queue(question=f"question {i}", answer="answer", user_id=1, project_id=1)
+    sleep(0.2)
+    assert sum(len(b) for b in sink.batches) >= 20
+    queue.stop()
+    assert sum(len(b) for b in sink.batches) == 25
+    assert all(len(b) <= 10 for b in sink.batches)
+
+
+def test_time_triggered_flush():
+    sink = MemorySink()
+    queue = RequestsQueue(size=100, max_wait_time=0.1, sink=sink)
+    queue.start()
+    queue.add_to_queue(question="question", answer="answer", user_id=1, project_id=1)
+    sleep(0.3)
+    assert len(sink.batches) == 1
+    queue.stop()
+
+
+def test_backpressure_drops_when_full():
+    sink = MemorySink()
+    queue = RequestsQueue(size=100, max_wait_time=10, max_queue_size=5, sink=sink)
+    accepted = [queue.add_to_queue(question="q", answer="a", user_id=1, project_id=1) for _ in range(8)]
+    assert accepted.count(True) == 5
+    assert queue.get_stats()["dropped"] == 3
+    queue.flush_queue()
+    assert queue.get_stats()["queueDepth"] == 0
+
+
+def test_blocking_put_does_not_block_the_event_loop():
+    queue = RequestsQueue(size=100, max_wait_time=10, max_queue_size=1, put_timeout=0.3, sink=MemorySink())
+    queue.add_to_queue(question="q", answer="a", user_id=1, project_id=1)
+    ticks = []
+
+    async def tick():
+        for _ in range(5):
+            ticks.append(1)
+            await asyncio.sleep(0.02)
+
+    async def run():
+        accepted, _ = await asyncio.gather(
+            queue.add_to_queue_async(question="q", answer="a", user_id=1, project_id=1), tick())
+        return accepted
+
+    # the full queue makes the put wait for put_timeout, meanwhile the loop keeps running
+    assert asyncio.run(run()) is False
+    assert len(ticks) == 5
+    assert queue.get_stats()["dropped"] == 1
@@ -0,0 +1,29 @@
+from core.question_cache import normalize_question, QuestionCache
+from utils.sql_to_filters import is_chart_response
+
+
+def test_equivalent_questions_share_an_entry():
+    assert normalize_question("Please show me sessions from Chrome!") == normalize_question("sessions from Chrome")
+    assert normalize_question("sessions longer than five minutes") == normalize_question("sessions longer than 5 minutes")
+
+
+def test_values_do_not_collide():
+    for first, second in (("sessions of user JohnDoe", "sessions of user johndoe"),
+                          ("sessions with url like /checkout", "sessions with url /checkout"),
+                          ("sessions of all users", "sessions of users"),
+                          ("sessions with GET requests", "sessions with requests"),
+                          ("sessions from ME", "sessions from")):
+        assert normalize_question(first) != normalize_question(second)
+
+
+def test_cache_is_keyed_by_context_version():
+    cache = QuestionCache(maxsize=10, ttl=60)
+    cache.set(version="v1", question="sessions from Chrome", response={"content": 1})
+    assert cache.get(version="v1", question="Show me sessions from Chrome") == {"content": 1}
+    assert cache.get(version="v2", question="sessions from Chrome") is None
+
+
+def test_only_chart_responses_are_cacheable():
+    assert is_chart_response("```{\n    'type': 'Funnel',\n    'filters': [],\n    'events': []\n}```")
+    assert not is_chart_response("```{\n    'type': 'Visited_URL',\n    'location': '/home'\n}```")
+    assert not is_chart_response("I don't know which chart to build")
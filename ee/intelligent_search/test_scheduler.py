@@ -0,0 +1,56 @@
+import asyncio
+from time import time
+
+import pytest
+
+from core.fake_llm import FakeLlama
+from core.llm_api import LLM_Model
+from core.scheduler import BatchScheduler
+
+
+def test_prompts_are_batched():
+    model = FakeLlama(latency=0.05, latency_per_prompt=0)
+    scheduler = BatchScheduler(generate=model.text_completion, max_batch_size=4, max_latency=0.05)
+    scheduler.start()
+
+    async def ask_all():
+        return await asyncio.gather(*[scheduler.submit(f"question {i}", temperature=0.6) for i in range(8)])
+
+    t1 = time()
+    results = asyncio.run(ask_all())
+    elapsed = time() - t1
+    scheduler.stop()
+    assert results == [model.text_completion([f"question {i}"])[0] for i in range(8)]
+    assert model.batches[:2] == [4, 4]
+    # 2 batches instead of 8 sequential generations
+    assert elapsed < 8 * 0.05
+
+
+def test_different_parameters_are_not_batched_together():
+    model = FakeLlama(latency=0, latency_per_prompt=0)
+    scheduler = BatchScheduler(generate=model.text_completion, max_batch_size=4, max_latency=0.05)
+    scheduler.start()
+
+    async def ask_all():
+        return await asyncio.gather(*[scheduler.submit(f"question {i}", temperature=i % 2) for i in range(4)])
+
+    asyncio.run(ask_all())
+    scheduler.stop()
+    assert model.batches == [2, 2]
+
+
+def test_failed_batch_releases_the_llm():
+    class FailingOnce(FakeLlama):
+        def text_completion(self, prompts, **params):
+            if len(self.batches) == 0:
+                self.batches.append(len(prompts))
+                raise MemoryError("CUDA out of memory")
+            return super().text_completion(prompts, **params)
+
+    model = LLM_Model(generator=FailingOnce(latency=0, latency_per_prompt=0))
+    with pytest.raises(MemoryError):
+        model.execute_prompts(["question 0"])
+    t1 = time()
+    assert model.execute_prompts(["question 1"]) == FakeLlama().text_completion(["question 1"])
+    assert time() - t1 < 1
+    model.close()
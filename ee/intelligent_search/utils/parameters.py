@@ -3,9 +3,16 @@ from typing import Optional
 
 ckpt_dir: str = config('CHECKPOINT_DIR')
 tokenizer_path: str = config('TOKENIZER_PATH')
-temperature: float = config('TEMPERATURE', default=0.6)
-top_p: float = config('TOP_P', default=0.9)
-max_seq_len: int = config('MAX_SEQ_LEN', default=4098)
-max_gen_len: int = config('MAX_GEN_LEN', default=256)
-max_batch_size: int = config('MAX_BATCH_SIZE', default=4)
+temperature: float = config('TEMPERATURE', cast=float, default=0.6)
+top_p: float = config('TOP_P', cast=float, default=0.9)
+max_seq_len: int = config('MAX_SEQ_LEN', cast=int, default=4098)
+max_gen_len: int = config('MAX_GEN_LEN', cast=int, default=256)
+max_batch_size: int = config('MAX_BATCH_SIZE', cast=int, default=4)
+# seconds to wait for more prompts once a batch has its first prompt
+max_batch_latency: float = config('MAX_BATCH_LATENCY', cast=float, default=0.05)
+# deterministic CPU model instead of Llama, for load-tests
+fake_llm: bool = config('FAKE_LLM', cast=bool, default=False)
 
+# cache of the responses by normalized question
+cache_size: int = config('LLM_CACHE_SIZE', cast=int, default=5000)
+cache_ttl: int = config('LLM_CACHE_TTL', cast=int, default=24 * 60 * 60)
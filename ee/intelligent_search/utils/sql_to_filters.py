@@ -42,6 +42,18 @@ def filter_code_markdown(text_response):
     except Exception:
         return None
 
+CHART_TYPES = ('Time Series', 'ClickMap', 'Table', 'Funnel', 'ErrorTracking', 'PerformanceTracking',
+               'ResourceMonitoring', 'WebVitals', 'Insights')
+
+
+def is_chart_response(text_response):
+    # the 1st type of the code block is the chart's one, the next ones are its filters and events
+    chart = filter_code_markdown(text_response)
+    if chart is None:
+        return False
+    m = re.search(r"""['"]type['"]\s*:\s*['"]([^'"]+)['"]""", chart)
+    return m is not None and m.group(1) in CHART_TYPES
+
 def filter_sql_where_statement(sql_query):
     sql_query = sql_query.replace('\n','  ')
     m = re.search('[S,s][E,e][L,l][E,e][C,c][T,t]', sql_query)
@@ -0,0 +1,65 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache bounded by a number of entries (least recently used entries are evicted first)
+    and by a time to live in seconds.
+    If getsizeof is provided, maxsize bounds the sum of getsizeof(value) instead of the number of entries.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, getsizeof=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.__getsizeof = getsizeof if getsizeof is not None else lambda v: 1
+        self.__currsize = 0
+        self.__data = OrderedDict()
+        self.__lock = Lock()
+
+    def get(self, key, default=None):
+        with self.__lock:
+            item = self.__data.get(key)
+            if item is None or item[0] < monotonic():
+                if item is not None:
+                    self.__pop(key)
+                self.misses += 1
+                return default
+            self.__data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def __pop(self, key):
+        item = self.__data.pop(key, None)
+        if item is not None:
+            self.__currsize -= item[2]
+
+    def set(self, key, value, ttl: float = None):
+        size = self.__getsizeof(value)
+        with self.__lock:
+            self.__pop(key)
+            if size > self.maxsize:
+                return
+            self.__data[key] = (monotonic() + (self.ttl if ttl is None else ttl), value, size)
+            self.__currsize += size
+            while self.__currsize > self.maxsize:
+                self.__pop(next(iter(self.__data)))
+
+    def delete(self, key):
+        with self.__lock:
+            self.__pop(key)
+
+    def clear(self):
+        with self.__lock:
+            self.__data.clear()
+            self.__currsize = 0
+
+    def __len__(self):
+        return len(self.__data)
+
+    def get_stats(self):
+        return {"size": len(self.__data), "currsize": self.__currsize, "maxsize": self.maxsize, "ttl": self.ttl,
+                "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,133 @@
+"""
+Ingestion throughput of consumer.KafkaFilter against a local stub of quickwit's ingest API.
+The stub acknowledges every request after a fixed latency, the kafka consumer is replaced by
+generated fetch/graphql/page events.
+
+    python3 benchmark.py --messages 50000 --latency 0.005
+"""
+import argparse
+import json
+import os
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import time, sleep
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0
+    documents = 0
+    requests_count = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.latency > 0:
+            sleep(self.latency)
+        with self.lock:
+            StubHandler.requests_count += 1
+            StubHandler.documents += body.count(b'\n') + 1
+        response = b'{"num_docs_for_processing": 1}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args):
+        pass
+
+
+def fetch_event(i):
+    return {'message_id': i, 'timestamp': i, 'method': 'GET', 'url': f'https://app.example.com/api/{i}',
+            'request': json.dumps({'headers': {'accept': 'application/json'}, 'body': ''}),
+            'response': json.dumps({'headers': {}, 'body': json.dumps({'id': i, 'items': list(range(10))})}),
+            'status': 200, 'duration': random.randint(1, 500)}
+
+
+def graphql_event(i):
+    return {'operation_kind': 'query', 'operation_name': f'operation{i % 10}',
+            'variables': json.dumps({'id': i}), 'response': json.dumps({'data': {'id': i}})}
+
+
+def page_event(i):
+    return {'message_id': i, 'timestamp': i, 'url': f'https://app.example.com/page/{i}', 'referrer': '',
+            'loaded': True, 'request_start': 1, 'response_start': 2, 'response_end': 3,
+            'dom_content_loaded_event_start': 4, 'dom_content_loaded_event_end': 5, 'load_event_start': 6,
+            'load_event_end': 7, 'first_paint': 8, 'first_contentful_paint': 9, 'speed_index': 10,
+            'visually_complete': 11, 'time_to_interactive': 12}
+
+
+class StubMessage:
+
+    def __init__(self, value):
+        self.__value = value
+
+    def error(self):
+        return None
+
+    def value(self):
+        return self.__value
+
+
+class StubConsumer:
+
+    def __init__(self, messages, on_end):
+        self.messages = messages
+        self.position = 0
+        self.commits = 0
+        self.paused = False
+        self.on_end = on_end
+
+    def consume(self, num_messages, timeout):
+        if self.paused:
+            sleep(timeout)
+            return []
+        batch = self.messages[self.position:self.position + num_messages]
+        self.position += len(batch)
+        if len(batch) == 0:
+            self.on_end()
+        return [StubMessage(m) for m in batch]
+
+    def commit(self, asynchronous=True):
+        self.commits += 1
+
+    def assignment(self):
+        return []
+
+    def pause(self, partitions):
+        self.paused = True
+
+    def resume(self, partitions):
+        self.paused = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Quickwit ingestion benchmark')
+    parser.add_argument('--messages', type=int, default=50000)
+    parser.add_argument('--latency', type=float, default=0.005, help='stub response time in seconds')
+    parser.add_argument('--port', type=int, default=17280)
+    args = parser.parse_args()
+
+    StubHandler.latency = args.latency
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['QUICKWIT_HOST'] = '127.0.0.1'
+    os.environ['QUICKWIT_PORT'] = str(args.port)
+    import consumer
+
+    generators = (fetch_event, graphql_event, page_event)
+    messages = [json.dumps(generators[i % 3](i)).encode('utf-8') for i in range(args.messages)]
+    layer = consumer.KafkaFilter(consumer=StubConsumer(messages, on_end=lambda: layer.stop()))
+    start = time()
+    layer.run()
+    duration = time() - start
+    server.shutdown()
+    print(f'codec: {"orjson" if consumer.orjson is not None else "json"}')
+    print(f'{layer.flushed_count} messages in {duration:.2f}s: {layer.flushed_count / duration:.0f} messages/s')
+    print(f'{StubHandler.requests_count} ingest requests, {layer.consumer.commits} commits')
+
+
+if __name__ == '__main__':
+    main()
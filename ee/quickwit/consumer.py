@@ -1,14 +1,20 @@
 from decouple import config
-from confluent_kafka import Consumer
+from confluent_kafka import Consumer, KafkaException
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import os as _os
-import queue
 import requests
+from requests.adapters import HTTPAdapter
 import json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 from time import time, sleep
 QUICKWIT_PORT = config('QUICKWIT_PORT', default=7280, cast=int)
+QUICKWIT_HOST = config('QUICKWIT_HOST', default='localhost')
 
 #decryption = config('encrypted', cast=bool)
 decryption = False
@@ -20,33 +26,53 @@ if decryption:
     from msgcodec.messages import Fetch, FetchEvent, PageEvent, GraphQL
     print("Enabled decryption mode")
 
+if orjson is not None:
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+else:
+    _loads = json.loads
+
+    def _dumps(data):
+        return json.dumps(data).encode('utf-8')
+
+# keep-alive connection to quickwit, one session per index so the indexes can be flushed concurrently
+sessions = dict()
+
+
+def _get_session(index):
+    if index not in sessions:
+        sessions[index] = requests.Session()
+        sessions[index].mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+    return sessions[index]
+
+
 def _quickwit_ingest(index, data_list, retry=0):
     try:
-        res = requests.post(f'http://localhost:{QUICKWIT_PORT}/api/v1/{index}/ingest', data=__jsonify_data(data_list, index))
+        res = _get_session(index).post(f'http://{QUICKWIT_HOST}:{QUICKWIT_PORT}/api/v1/{index}/ingest',
+                           data=__jsonify_data(data_list, index))
     except requests.exceptions.ConnectionError as e:
         retry += 1
-        assert retry <= max_retry, f'[ENDPOINT CONNECTION FAIL] Failed to connect to endpoint http://localhost:{QUICKWIT_PORT}/api/v1/{index}/ingest\n{e}\n'
+        assert retry <= max_retry, f'[ENDPOINT CONNECTION FAIL] Failed to connect to endpoint http://{QUICKWIT_HOST}:{QUICKWIT_PORT}/api/v1/{index}/ingest\n{e}\n'
         sleep(5*retry)
-        print(f"[ENDPOINT ERROR] Failed to connect to endpoint http://localhost:{QUICKWIT_PORT}/api/v1/{index}/ingest, retrying in {5*retry} seconds..\n")
+        print(f"[ENDPOINT ERROR] Failed to connect to endpoint http://{QUICKWIT_HOST}:{QUICKWIT_PORT}/api/v1/{index}/ingest, retrying in {5*retry} seconds..\n")
         return _quickwit_ingest(index, data_list, retry=retry)
     return res
 
 def __jsonify_data(data_list, msg_type):
     res = list()
-    i = 0
     for data in data_list:
         if msg_type == 'fetchevent':
             try:
                 _tmp = data['request']
                 if _tmp != '':
-                    data['request'] = json.loads(_tmp)
+                    data['request'] = _loads(_tmp)
                 else:
                     data['request'] = {}
                 _tmp = data['response']
                 if _tmp != '':
-                    data['response'] = json.loads(_tmp)
+                    data['response'] = _loads(_tmp)
                     if data['response']['body'][:1] == '{' or data['response']['body'][:2] == '[{':
-                        data['response']['body'] = json.loads(data['response']['body'])
+                        data['response']['body'] = _loads(data['response']['body'])
                 else:
                     data['response'] = {}
             except Exception as e:
@@ -55,19 +81,18 @@ def __jsonify_data(data_list, msg_type):
             try:
                 _tmp = data['variables']
                 if _tmp != '':
-                    data['variables'] = json.loads(_tmp)
+                    data['variables'] = _loads(_tmp)
                 else:
                     data['variables'] = {}
                 _tmp = data['response']
                 if _tmp != '':
-                    data['response'] = json.loads(_tmp)
+                    data['response'] = _loads(_tmp)
                 else:
                     data['response'] = {}
             except Exception as e:
                 print(f'Error {e}\tWhile decoding graphql\nEvent: {data}\n')
-        i += 1
-        res.append(json.dumps(data))
-    return '\n'.join(res)
+        res.append(_dumps(data))
+    return b'\n'.join(res)
 
 def message_type(message):
     if decryption:
@@ -90,99 +115,173 @@ def message_type(message):
             return 'default'
 
 
-class KafkaFilter():
+class IndexBuffer():
+
+    def __init__(self, max_size, max_wait):
+        """Messages waiting to be sent to an index, they are due once max_size messages are waiting
+        or max_wait seconds after the first one was received."""
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.messages = list()
+        self.first_time = None
+
+    def append(self, message):
+        if len(self.messages) == 0:
+            self.first_time = time()
+        self.messages.append(message)
 
-    def __init__(self):
-        kafka_sources = config('KAFKA_SERVER')
-        topic = config('QUICKWIT_TOPIC')
+    def is_due(self, now):
+        return len(self.messages) >= self.max_size \
+            or (len(self.messages) > 0 and now - self.first_time >= self.max_wait)
 
+    def take(self):
+        messages, self.messages, self.first_time = self.messages, list(), None
+        return messages
+
+
+class KafkaFilter():
+
+    def __init__(self, consumer=None):
         fetchevent_maxsize = config('fetch_maxsize', default=100, cast=int)
         graphql_maxsize = config('graphql_maxsize', default=100, cast=int)
         pageevent_maxsize = config('pageevent_maxsize', default=100, cast=int)
+        # seconds a message can wait in a buffer before all the buffers are flushed
+        flush_interval = config('flush_interval', default=5, cast=float)
+        self.consume_size = config('consume_size', default=500, cast=int)
+        self.max_pending_factor = config('max_pending_factor', default=10, cast=int)
 
         if decryption:
             self.codec = MessageCodec()
-            self.consumer = Consumer({
+        if consumer is None:
+            consumer = Consumer({
                 "security.protocol": "SSL",
-                "bootstrap.servers": kafka_sources,
+                "bootstrap.servers": config('KAFKA_SERVER'),
                 "group.id": config("group_id"),
                 "auto.offset.reset": "earliest",
-                "enable.auto.commit":False
-            })
-        else:
-            self.consumer = Consumer({
-                "security.protocol": "SSL",
-                "bootstrap.servers": kafka_sources,
-                "group.id": config("group_id"),
-                "auto.offset.reset": "earliest",
-                #value_deserializer=lambda m: json.loads(m.decode('utf-8')),
                 "enable.auto.commit": False
             })
-        self.consumer.subscribe([topic])
-        self.queues = {'fetchevent': queue.Queue(fetchevent_maxsize),
-                'graphql': queue.Queue(graphql_maxsize),
-                'pageevent': queue.Queue(pageevent_maxsize)
-                }
+            consumer.subscribe([config('QUICKWIT_TOPIC')])
+        self.consumer = consumer
+        self.buffers = {'fetchevent': IndexBuffer(fetchevent_maxsize, flush_interval),
+                        'graphql': IndexBuffer(graphql_maxsize, flush_interval),
+                        'pageevent': IndexBuffer(pageevent_maxsize, flush_interval)
+                        }
+        self.executor = ThreadPoolExecutor(max_workers=len(self.buffers))
+        self.running = False
+        self.paused = False
+        self.retry_time = 0
+        self.flushed_count = 0
 
     def add_to_queue(self, message):
         associated_queue = message_type(message)
         if associated_queue == 'default':
             return
-        if self.queues[associated_queue].full():
-            self.flush_to_quickwit()
-        self.queues[associated_queue].put(message)
+        self.buffers[associated_queue].append(message)
+
+    def __prepare(self, queue_name, messages):
+        _list = list()
+        unix_timestamp = int(datetime.now().timestamp())
+        for msg in messages:
+            if decryption:
+                value = dict(msg.__dict__)
+            else:
+                value = dict(msg)
+            value['insertion_timestamp'] = unix_timestamp
+            if queue_name == 'fetchevent' and 'message_id' not in value.keys():
+                value['message_id'] = 0
+            _list.append(value)
+        return _list
+
+    def __ingest(self, queue_name, messages):
+        try:
+            res = _quickwit_ingest(queue_name, self.__prepare(queue_name, messages))
+        except (AssertionError, requests.exceptions.RequestException) as e:
+            print(f'[INGEST ERROR] {queue_name}: {e}')
+            return False
+        if not res.ok:
+            print(f'[INGEST ERROR] {queue_name}: {res.status_code} {res.text[:200]}')
+            return False
+        return True
 
     def flush_to_quickwit(self):
-        for queue_name, _queue in self.queues.items():
-            _list = list()
-            unix_timestamp = int(datetime.now().timestamp())
-            while not _queue.empty():
-                msg = _queue.get()
-                if decryption:
-                    value = msg.__dict__
-                else:
-                    value = dict(msg)
-                value['insertion_timestamp'] = unix_timestamp
-                if queue_name == 'fetchevent' and 'message_id' not in value.keys():
-                    value['message_id'] = 0
-                _list.append(value)
-            if len(_list) > 0:
-                _quickwit_ingest(queue_name, _list)
-        self.consumer.commit()
+        """Sends all the buffers concurrently, the consumed offsets are committed only once every index
+        acknowledged its messages. The messages of a failed index are kept for the next flush."""
+        pending = {name: buffer.take() for name, buffer in self.buffers.items() if len(buffer.messages) > 0}
+        if len(pending) == 0:
+            return True
+        futures = {name: self.executor.submit(self.__ingest, name, messages) for name, messages in pending.items()}
+        failed = False
+        for name, future in futures.items():
+            if future.result():
+                self.flushed_count += len(pending[name])
+            else:
+                failed = True
+                for message in pending[name]:
+                    self.buffers[name].append(message)
+        if failed:
+            return False
+        try:
+            self.consumer.commit(asynchronous=False)
+        except KafkaException as e:
+            # i.e. the partitions were reassigned, the messages are consumed again by their new owner
+            print(f'[COMMIT ERROR] {e}')
+        return True
+
+    def flush_if_due(self):
+        now = time()
+        if now >= self.retry_time and any(buffer.is_due(now) for buffer in self.buffers.values()):
+            if self.flush_to_quickwit():
+                if self.paused:
+                    self.consumer.resume(self.consumer.assignment())
+                    self.paused = False
+                return
+            # quickwit is failing, the messages wait in the buffers until the next attempt in a second
+            self.retry_time = now + 1
+        # consuming is paused once a buffer holds max_pending_factor times its size, the consumer keeps polling
+        # so it stays in its group
+        if not self.paused and any(len(b.messages) >= b.max_size * self.max_pending_factor
+                                   for b in self.buffers.values()):
+            self.consumer.pause(self.consumer.assignment())
+            self.paused = True
+
+    def stop(self):
+        self.running = False
 
     def run(self):
         _tmp_previous = None
         repeated = False
-        while True:
-            msg = self.consumer.poll(1.0)
-            if msg is None:
-                continue
-            if msg.error():
-                print(f'[Consumer error] {msg.error()}')
-                continue
-            value = json.loads(msg.value().decode('utf-8'))
-            if decryption:
-                messages = self.codec.decode_detailed(value)
-            else:
-                messages = [value]
-
-            if _tmp_previous is None:
-                _tmp_previous = messages
-                if type(messages)==list:
-                    for message in messages:
-                        self.add_to_queue(message)
-                else:
-                    self.add_to_queue(messages)
-            elif _tmp_previous != messages:
-                if type(messages)==list:
-                    for message in messages:
-                        self.add_to_queue(message)
+        self.running = True
+        while self.running:
+            for msg in self.consumer.consume(num_messages=self.consume_size, timeout=1.0):
+                if msg.error():
+                    print(f'[Consumer error] {msg.error()}')
+                    continue
+                value = _loads(msg.value())
+                if decryption:
+                    messages = self.codec.decode_detailed(value)
                 else:
-                    self.add_to_queue(messages)
-                _tmp_previous = messages
-                repeated = False
-            elif not repeated:
-                repeated = True
+                    messages = [value]
+
+                if _tmp_previous is None:
+                    _tmp_previous = messages
+                    if type(messages)==list:
+                        for message in messages:
+                            self.add_to_queue(message)
+                    else:
+                        self.add_to_queue(messages)
+                elif _tmp_previous != messages:
+                    if type(messages)==list:
+                        for message in messages:
+                            self.add_to_queue(message)
+                    else:
+                        self.add_to_queue(messages)
+                    _tmp_previous = messages
+                    repeated = False
+                elif not repeated:
+                    repeated = True
+            self.flush_if_due()
+        self.flush_to_quickwit()
+        self.executor.shutdown()
 
 
 if __name__ == '__main__':
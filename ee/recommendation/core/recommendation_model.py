@@ -3,6 +3,8 @@ import random
 import numpy as np
 from sklearn import metrics
 from sklearn.svm import SVC
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
 from sklearn.feature_selection import SequentialFeatureSelector as sfs
 from sklearn.preprocessing import normalize
 from sklearn.decomposition import PCA
@@ -57,6 +59,20 @@ def preprocess(X):
     return x, transform
 
 
+def confusion_matrix(y, pred):
+    """
+    Normalized confusion matrix and score (accuracy) of predictions.
+    Output: Tuple (confusion_matrix, score).
+    """
+    z = y + 2 * pred
+    n = len(z)
+    false_pos = np.count_nonzero(z == 1) / n
+    false_neg = np.count_nonzero(z == 2) / n
+    true_pos = np.count_nonzero(z == 3) / n
+    true_neg = 1 - false_neg - false_pos - true_pos
+    return np.array([[true_neg, false_pos], [false_neg, true_pos]]), true_pos + true_neg
+
+
 class RecommendationSystem(mlflow.pyfunc.PythonModel):
     def __init__(self):
         ...
@@ -94,16 +110,7 @@ class SVM_recommendation(mlflow.pyfunc.PythonModel):
         t2, X = select_features(X, y)
         self.transforms = [t1, t2]
         self.svm.fit(X, y)
-        pred = self.svm.predict(X)
-        z = y + 2 * pred
-        n = len(z)
-        false_pos = np.count_nonzero(z == 1) / n
-        false_neg = np.count_nonzero(z == 2) / n
-        true_pos = np.count_nonzero(z == 3) / n
-        true_neg = 1 - false_neg - false_pos - true_pos
-        self.confusion_matrix = np.array([[true_neg, false_pos], [false_neg, true_pos]])
-        self.score = true_pos + true_neg
-
+        self.confusion_matrix, self.score = confusion_matrix(y, self.svm.predict(X))
 
     def predict(self, x):
         """
@@ -137,3 +144,72 @@ class SVM_recommendation(mlflow.pyfunc.PythonModel):
         """
         display = metrics.ConfusionMatrixDisplay(confusion_matrix=self.confusion_matrix, display_labels=[False, True])
         return {'confusion_matrix': display.plot().figure_}
+
+
+class SGD_recommendation(mlflow.pyfunc.PythonModel):
+
+    def __init__(self, batch_size=10000, epochs=5, **params):
+        """
+        Linear model (logistic regression) trained by mini-batches, its training time is linear in the number of
+        samples where the SVM's one is cubic-ish, it is used for the projects with many samples.
+        Params:
+            batch_size: number of samples of each partial_fit.
+            epochs: number of passes over the samples.
+            params: SGDClassifier parameters.
+        """
+        params.setdefault('loss', 'log_loss')
+        self.sgd = SGDClassifier(**params)
+        self.scaler = StandardScaler()
+        self.batch_size = batch_size
+        self.epochs = epochs
+        self.score = 0
+        self.confusion_matrix = None
+
+    def fit(self, X, y):
+        """
+        Train scaler and linear model by batches of batch_size samples.
+        Params:
+            X: Array of features.
+            y: Array of labels.
+        """
+        assert X.shape[0] == y.shape[0], 'X and y must have same length'
+        assert len(X.shape) == 2, 'X must be a two dimension vector'
+        for i in range(0, len(y), self.batch_size):
+            self.scaler.partial_fit(X[i:i + self.batch_size])
+        classes = np.array([0, 1])
+        for _ in range(self.epochs):
+            for i in range(0, len(y), self.batch_size):
+                self.sgd.partial_fit(self.scaler.transform(X[i:i + self.batch_size]), y[i:i + self.batch_size],
+                                     classes=classes)
+        pred = np.concatenate([self.sgd.predict(self.scaler.transform(X[i:i + self.batch_size]))
+                               for i in range(0, len(y), self.batch_size)])
+        self.confusion_matrix, self.score = confusion_matrix(y, pred)
+
+    def predict(self, x):
+        """
+            Prediction of input features
+            Params:
+                X: Array of features.
+            Output: prediction probability for True (1).
+            """
+        return self.sgd.predict_proba(self.scaler.transform(x))[:, 1]
+
+    def recommendation_order(self, x):
+        """
+        Prediction of input features and sorting of each by probability
+        Params:
+            X: Array of features.
+        Output: Tuple (sorted_features, predictions).
+        """
+        pred = self.sgd.predict_proba(self.scaler.transform(x))
+        return sorted(range(len(pred)), key=lambda k: pred[k][1], reverse=True), pred
+
+    def plots(self):
+        """
+        Returns the plots in a dict format.
+            {
+                'confusion_matrix': confusion matrix figure,
+            }
+        """
+        display = metrics.ConfusionMatrixDisplay(confusion_matrix=self.confusion_matrix, display_labels=[False, True])
+        return {'confusion_matrix': display.plot().figure_}
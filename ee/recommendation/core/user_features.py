@@ -1,8 +1,26 @@
 from utils.pg_client import PostgresClient
 from decouple import config
-from utils.df_utils import _process_pg_response
+from utils.df_utils import encode_categorical, COUNTRY_CODES, DEVICE_CODES
 import numpy as np
 
+# Columns of the features matrix in this order, each one is read into an array of its dtype.
+# The order is the one expected by the served models (see ml_service.core.model_handler).
+FEATURES = (('viewer_id', np.int64),
+            ('events_count', np.int32),
+            ('errors_count', np.int32),
+            ('duration', np.int64),
+            ('country', np.int16),
+            ('issue_score', np.int64),
+            ('device_type', np.int8))
+IDS = (('project_id', np.int32),
+       ('session_id', np.int64),
+       ('user_id', object))
+CATEGORICAL = {'country': (COUNTRY_CODES, COUNTRY_CODES['UN']),
+               'device_type': (DEVICE_CODES, DEVICE_CODES['other'])}
+# rows fetched at once from the server-side cursor, and maximum number of rows of a training database
+fetch_size = config('training_fetch_size', default=10000, cast=int)
+max_rows = config('training_max_rows', default=2000000, cast=int)
+
 
 def get_training_database(projectId, max_timestamp=None, favorites=False):
     """
@@ -11,36 +29,66 @@ def get_training_database(projectId, max_timestamp=None, favorites=False):
         projectId: project id of all sessions to be selected.
         max_timestamp: max timestamp that a not seen session can have in order to be considered not interesting.
         favorites: True to use favorite sessions as interesting sessions reference.
-    Output: Tuple (Set of features, set of labels, dict of indexes of each project_id, session_id, user_id in the set)
+    Output: Tuple (Set of features, set of labels, dict of the project_id, session_id, user_id of each row in the set)
     """
     args = {"projectId": projectId, "max_timestamp": max_timestamp, "limit": 20}
-    with PostgresClient() as conn:
-        x1 = signals_features(conn, **args)
+    blocks = list()
+    with PostgresClient(long_query=True) as conn:
+        blocks += _read_features(conn, signals_features(conn, **args), label=None, limit=max_rows)
         if favorites:
-            x2 = user_favorite_sessions(args['projectId'], conn)
+            blocks += _read_features(conn, user_favorite_sessions(args['projectId'], conn), label=1,
+                                     limit=max_rows - sum(len(b['label']) for b in blocks))
         if max_timestamp is not None:
-            x3 = user_not_seen_sessions(args['projectId'], args['limit'], conn)
+            blocks += _read_features(conn, user_not_seen_sessions(args['projectId'], args['limit'], conn), label=0,
+                                     limit=max_rows - sum(len(b['label']) for b in blocks))
+
+    columns = {c: np.concatenate([b[c] for b in blocks]) if len(blocks) > 0 else np.empty(0, dtype=dtype)
+               for c, dtype in FEATURES + IDS + (('label', np.int8),)}
+    X = np.empty((len(columns['label']), len(FEATURES)), dtype=np.int64)
+    for i, (c, _) in enumerate(FEATURES):
+        X[:, i] = columns.pop(c)
+    return X, columns.pop('label'), columns
 
-    X_project_ids = dict()
-    X_users_ids = dict()
-    X_sessions_ids = dict()
 
-    _X = list()
-    _Y = list()
-    _process_pg_response(x1, _X, _Y, X_project_ids, X_users_ids, X_sessions_ids, label=None)
-    if favorites:
-        _process_pg_response(x2, _X, _Y, X_project_ids, X_users_ids, X_sessions_ids, label=1)
-    if max_timestamp:
-        _process_pg_response(x3, _X, _Y, X_project_ids, X_users_ids, X_sessions_ids, label=0)
-    return np.array(_X), np.array(_Y), \
-           {'project_id': X_project_ids,
-            'user_id': X_users_ids,
-            'session_id': X_sessions_ids}
+def _read_features(conn, query, label, limit):
+    """
+    Runs the query in a server-side cursor and converts each block of rows into typed arrays, one per column
+    of the schema, so the memory used doesn't depend on python objects per row.
+    label=None reads the label from the train_label column.
+    """
+    if limit <= 0:
+        return []
+    columns = [c for c, _ in IDS + FEATURES] + (['train_label'] if label is None else [])
+    cursor = conn.server_side(name=f"training_features_{label}", itersize=fetch_size)
+    cursor.execute(f"SELECT {', '.join(columns)} FROM ({query.decode('UTF-8')}) AS features LIMIT {int(limit)};")
+    blocks = list()
+    try:
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if len(rows) == 0:
+                break
+            values = dict(zip(columns, zip(*rows)))
+            block = dict()
+            for c, dtype in IDS + FEATURES:
+                if c in CATEGORICAL:
+                    block[c] = encode_categorical(values[c], *CATEGORICAL[c], dtype=dtype)
+                elif dtype is object:
+                    block[c] = np.array(values[c], dtype=object)
+                else:
+                    block[c] = np.nan_to_num(np.array(values[c], dtype=np.float64)).astype(dtype)
+            if label is None:
+                block['label'] = np.array(values['train_label'], dtype=np.int8)
+            else:
+                block['label'] = np.full(len(rows), label, dtype=np.int8)
+            blocks.append(block)
+    finally:
+        cursor.close()
+    return blocks
 
 
 def signals_features(conn, **kwargs):
     """
-    Selects features from frontend_signals table and mark as interesting given the following conditions:
+    Query selecting features from frontend_signals table and marking as interesting given the following conditions:
         * If number of events is greater than events_threshold (default=10). (env value)
         * If session has been replayed more than once.
     """
@@ -79,16 +127,14 @@ def signals_features(conn, **kwargs):
                                                  FROM sessions
                                                  WHERE project_id = %(projectId)s
                                                    AND duration IS NOT NULL) as T
-                                                USING (session_id);""",
+                                                USING (session_id)""",
                          {"projectId": projectId, "events_threshold": events_threshold})
-    conn.execute(query)
-    res = conn.fetchall()
-    return res
+    return query
 
 
 def user_favorite_sessions(projectId, conn):
     """
-    Selects features from user_favorite_sessions table.
+    Query selecting features from user_favorite_sessions table.
     """
     query = """SELECT project_id,
                        session_id,
@@ -103,17 +149,13 @@ def user_favorite_sessions(projectId, conn):
                 FROM sessions AS T1
                          INNER JOIN user_favorite_sessions as T2
                                     USING (session_id)
-                WHERE project_id = %(projectId)s;"""
-    conn.execute(
-        conn.mogrify(query, {"projectId": projectId})
-    )
-    res = conn.fetchall()
-    return res
+                WHERE project_id = %(projectId)s"""
+    return conn.mogrify(query, {"projectId": projectId})
 
 
 def user_not_seen_sessions(projectId, limit, conn):
     """
-    Selects features from user_viewed_sessions table.
+    Query selecting features from user_viewed_sessions table.
     """
     # TODO: fetch un-viewed sessions alone, and the users list alone, then cross join them in python
     # and ignore deleted users (WHERE users.deleted_at ISNULL)
@@ -130,8 +172,4 @@ FROM (
          FROM users
          WHERE tenant_id = (SELECT tenant_id FROM projects WHERE project_id = %(projectId)s)) AS T2 ON true
      )"""
-    conn.execute(
-        conn.mogrify(query, {"projectId": projectId, "limit": limit})
-    )
-    res = conn.fetchall()
-    return res
+    return conn.mogrify(query, {"projectId": projectId, "limit": limit})
@@ -57,7 +57,7 @@ app.add_middleware(
 
 @app.get('/recommendations/{user_id}/{project_id}', dependencies=[Depends(api_key_auth)])
 async def get_recommended_sessions(user_id: int, project_id: int):
-    recommendations = recommendation_model.get_recommendations(user_id, project_id)
+    recommendations = await recommendation_model.get_recommendations(user_id, project_id)
     return {'userId': user_id,
             'projectId': project_id,
             'recommendations': recommendations
@@ -73,6 +73,7 @@ async def already_gave_feedback(projectId: int, viewerId: int, sessionId: int):
 async def get_feedback(data: FeedbackRecommendation):
     try:
         feedback.global_queue.put(tuple(data.dict().values()))
+        recommendation_model.discard(data.projectId, data.viewerId, data.sessionId)
     except Exception as e:
         return {'error': e}
     return {'success': 1}
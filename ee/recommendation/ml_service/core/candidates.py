@@ -0,0 +1,91 @@
+import heapq
+from time import time
+
+
+class CandidateStore:
+    def __init__(self, k=50, viewer_ttl=24 * 60 * 60, max_viewers=10000):
+        """Precomputed recommendations per (projectId, viewerId).
+        Each viewer keeps a min-heap of its k best (score, sessionId) so the worst candidate is replaced in O(log k)
+        when a better session is scored; reading the recommendations doesn't need any query nor prediction.
+        Properties:
+            * k [int]: number of candidates kept per viewer.
+            * viewer_ttl [int]: seconds after the last request of a viewer before its candidates are dropped.
+            * max_viewers [int]: maximum number of viewers kept, the least recently active ones are dropped first.
+            * watermarks [dict]: keyset (start_ts, session_id) of the newest scored session per project.
+            * checked [dict]: time (ms) of the last refresh per project, the sessions that ended since are checked
+              again.
+        """
+        self.k = k
+        self.viewer_ttl = viewer_ttl
+        self.max_viewers = max_viewers
+        self.watermarks = dict()
+        self.checked = dict()
+        self.__heaps = dict()
+        self.__members = dict()
+        self.__last_request = dict()
+
+    def __contains__(self, key):
+        return key in self.__heaps
+
+    def get(self, projectId, viewerId):
+        """Returns the sessions ordered by relevance, None if the viewer has no precomputed candidates."""
+        key = (projectId, viewerId)
+        if key not in self.__heaps:
+            return None
+        self.__last_request[key] = time()
+        return [s for _, s in sorted(self.__heaps[key], reverse=True)]
+
+    def seed(self, projectId, viewerId, sessions, scores):
+        key = (projectId, viewerId)
+        self.__heaps[key] = list()
+        self.__members[key] = set()
+        self.__last_request[key] = time()
+        self.push(projectId, viewerId, sessions, scores)
+        if len(self.__heaps) > self.max_viewers:
+            oldest = min(self.__last_request, key=self.__last_request.get)
+            self.__drop(oldest)
+
+    def push(self, projectId, viewerId, sessions, scores):
+        key = (projectId, viewerId)
+        heap, members = self.__heaps[key], self.__members[key]
+        for sessionId, score in zip(sessions, scores):
+            sessionId, score = int(sessionId), float(score)
+            if sessionId in members:
+                continue
+            if len(heap) < self.k:
+                heapq.heappush(heap, (score, sessionId))
+                members.add(sessionId)
+            elif score > heap[0][0]:
+                _, removed = heapq.heapreplace(heap, (score, sessionId))
+                members.discard(removed)
+                members.add(sessionId)
+
+    def discard(self, projectId, viewerId, sessions):
+        """Removes sessions seen (or rated) by the viewer from its candidates."""
+        key = (projectId, viewerId)
+        if key not in self.__heaps:
+            return
+        sessions = set(int(s) for s in sessions) & self.__members[key]
+        if len(sessions) == 0:
+            return
+        self.__heaps[key] = [c for c in self.__heaps[key] if c[1] not in sessions]
+        heapq.heapify(self.__heaps[key])
+        self.__members[key] -= sessions
+
+    def candidates(self, projectId, viewerId):
+        return self.__members.get((projectId, viewerId), set())
+
+    def active_viewers(self):
+        """Drops inactive viewers and returns the remaining viewers grouped by project."""
+        now = time()
+        for key in [k for k, t in self.__last_request.items() if now - t > self.viewer_ttl]:
+            self.__drop(key)
+        viewers = dict()
+        for projectId, viewerId in self.__heaps.keys():
+            viewers[projectId] = viewers.get(projectId, []) + [viewerId]
+        return viewers
+
+    def __drop(self, key):
+        self.__heaps.pop(key, None)
+        self.__members.pop(key, None)
+        self.__last_request.pop(key, None)
@@ -1,9 +1,12 @@
 import mlflow
+import asyncio
 import hashlib
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from decouple import config
 from utils import pg_client
 from utils.df_utils import _process_pg_response
+from core.candidates import CandidateStore
 from time import time
 
 host = config('pg_host_ml')
@@ -15,6 +18,18 @@ password = config('pg_password_ml')
 tracking_uri = f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{dbname}"
 mlflow.set_tracking_uri(tracking_uri)
 batch_download_size = config('batch_download_size', default=10, cast=int)
+# models are downloaded and deserialized out of the event loop
+loading_pool = ThreadPoolExecutor(max_workers=config('loading_workers', default=2, cast=int))
+# candidates queries and predictions
+scoring_pool = ThreadPoolExecutor(max_workers=config('scoring_workers', default=4, cast=int))
+# concurrent requests of the same model received within this window (seconds) are scored with a single predict
+scoring_batch_window = config('scoring_batch_window', default=0.01, cast=float)
+scoring_max_batch_rows = config('scoring_max_batch_rows', default=4096, cast=int)
+# new sessions are scored for the active viewers every candidates_refresh_interval seconds (see crons),
+# sessions started up to candidates_overlap ms before the last scored one are checked again once they end
+# as their duration is only known then
+candidates_overlap = config('candidates_overlap', default=30 * 60 * 1000, cast=int)
+candidates_refresh_limit = config('candidates_refresh_limit', default=1000, cast=int)
 
 
 def get_latest_uri(projectId, tenantId):
@@ -45,6 +60,9 @@ class ServedModel:
     def __init__(self):
         """Handler of mlflow model."""
         self.model = None
+        self.__pending = list()
+        self.__pending_rows = 0
+        self.__flush_handle = None
 
     def load_model(self, model_name, model_version=1):
         """Load model from mlflow given the model version.
@@ -58,9 +76,45 @@ class ServedModel:
         assert self.model is not None, 'Model has to be loaded before predicting. See load_model.__doc__'
         return self.model.predict(X)
 
-    def _sort_by_recommendation(self, sessions, sessions_features) -> np.ndarray:
-        """Make prediction for sessions_features and sort them by relevance."""
-        pred = self.predict(sessions_features)
+    async def predict_batched(self, X) -> np.ndarray:
+        """Make prediction for X together with the other requests received within scoring_batch_window:
+        the features are stacked into a single matrix and the predictions are split back for each caller."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.__pending.append((X, future))
+        self.__pending_rows += len(X)
+        if self.__pending_rows >= scoring_max_batch_rows:
+            self.__flush()
+        elif self.__flush_handle is None:
+            self.__flush_handle = loop.call_later(scoring_batch_window, self.__flush)
+        return await future
+
+    def __flush(self):
+        if self.__flush_handle is not None:
+            self.__flush_handle.cancel()
+            self.__flush_handle = None
+        pending, self.__pending, self.__pending_rows = self.__pending, list(), 0
+        if len(pending) > 0:
+            asyncio.get_running_loop().create_task(self.__predict_pending(pending))
+
+    async def __predict_pending(self, pending):
+        try:
+            stacked = np.vstack([X for X, _ in pending])
+            pred = await asyncio.get_running_loop().run_in_executor(scoring_pool, self.predict, stacked)
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        offset = 0
+        for X, future in pending:
+            if not future.done():
+                future.set_result(np.asarray(pred[offset:offset + len(X)]))
+            offset += len(X)
+
+    @staticmethod
+    def _sort_by_recommendation(sessions, pred) -> np.ndarray:
+        """Sort sessions by the relevance of their prediction, keep only the ones over the threshold."""
         threshold = config('threshold_prediction', default=0.6, cast=float)
         over_threshold = pred > threshold
         pred = pred[over_threshold]
@@ -69,17 +123,80 @@ class ServedModel:
         sorted_idx = np.argsort(pred)[::-1]
         return sessions[over_threshold][sorted_idx]
 
-    def get_recommendations(self, userId, projectId):
-        """Gets recommendations for userId for a given projectId.
-        Selects last unseen_selection_limit non seen sessions (env value, default 100)
-        and sort them by pertinence using ML model"""
+    @staticmethod
+    def get_new_sessions(projectId, after, checked):
+        """Selects the sessions after the keyset after=(start_ts, session_id) ordered by start_ts, session_id,
+        and the sessions of the overlap before it that ended since checked (ms), both bounded.
+        Returns the sessions ids, their features matrix with a viewer_id column to fill, and the keyset of the
+        last new session (None if there is none)."""
+        with pg_client.PostgresClient() as conn:
+            query = conn.mogrify(
+                """SELECT project_id, session_id, user_id, 0 as viewer_id, events_count, errors_count, duration, user_country as country, issue_score, user_device_type as device_type, start_ts
+                    FROM sessions
+                    WHERE project_id = %(projectId)s AND duration > 10000
+                      AND (start_ts, session_id) > (%(start_ts)s, %(sessionId)s)
+                    ORDER BY start_ts, session_id LIMIT %(limit)s""",
+                {'projectId': projectId, 'start_ts': after[0], 'sessionId': after[1],
+                 'limit': candidates_refresh_limit}
+            )
+            conn.execute(query)
+            res = conn.fetchall()
+            # sessions already passed by the keyset while they were running
+            query = conn.mogrify(
+                """SELECT project_id, session_id, user_id, 0 as viewer_id, events_count, errors_count, duration, user_country as country, issue_score, user_device_type as device_type, start_ts
+                    FROM sessions
+                    WHERE project_id = %(projectId)s AND duration > 10000
+                      AND start_ts >= %(start_ts)s - %(overlap)s
+                      AND (start_ts, session_id) <= (%(start_ts)s, %(sessionId)s)
+                      AND start_ts + duration >= %(checked)s
+                    ORDER BY start_ts DESC LIMIT %(limit)s""",
+                {'projectId': projectId, 'start_ts': after[0], 'sessionId': after[1], 'checked': checked,
+                 'overlap': candidates_overlap, 'limit': candidates_refresh_limit}
+            )
+            conn.execute(query)
+            ended = conn.fetchall()
+        last = (res[-1]['start_ts'], res[-1]['session_id']) if len(res) > 0 else None
+        res += ended
+        for r in res:
+            r.pop('start_ts')
+        _X = list()
+        _Y = list()
+        X_project_ids = dict()
+        X_users_ids = dict()
+        X_sessions_ids = dict()
+        _process_pg_response(res, _X, _Y, X_project_ids, X_users_ids, X_sessions_ids, label=0)
+        return np.array(list(X_sessions_ids.keys())), np.array(_X), last
+
+    @staticmethod
+    def get_viewed(viewers_sessions):
+        """Returns the (viewerId, sessionId) already viewed among the given candidates of each viewer."""
+        pairs = [(v, s) for v, sessions in viewers_sessions.items() for s in sessions]
+        if len(pairs) == 0:
+            return []
+        with pg_client.PostgresClient() as conn:
+            query = conn.mogrify(
+                """SELECT user_id, session_id
+                    FROM user_viewed_sessions
+                    WHERE (user_id, session_id) IN %(pairs)s""",
+                {'pairs': tuple(pairs)}
+            )
+            conn.execute(query)
+            res = conn.fetchall()
+        return [(r['user_id'], r['session_id']) for r in res]
+
+    @staticmethod
+    def get_candidates(userId, projectId):
+        """Selects last unseen_selection_limit non seen sessions (env value, default 100).
+        Returns the sessions ids and their features matrix."""
         limit = config('unseen_selection_limit', default=100, cast=int)
         oldest_limit = 1000*(time() - config('unseen_max_days_ago_selection', default=30, cast=int)*60*60*24)
         with pg_client.PostgresClient() as conn:
             query = conn.mogrify(
                 """SELECT project_id, session_id, user_id, %(userId)s as viewer_id, events_count, errors_count, duration, user_country as country, issue_score, user_device_type as device_type
                     FROM sessions
-                    WHERE project_id = %(projectId)s AND session_id NOT IN (SELECT session_id FROM user_viewed_sessions WHERE user_id = %(userId)s) AND duration > 10000 AND start_ts > %(oldest_limit)s LIMIT %(limit)s""",
+                    WHERE project_id = %(projectId)s
+                      AND NOT EXISTS (SELECT 1 FROM user_viewed_sessions WHERE user_viewed_sessions.user_id = %(userId)s AND user_viewed_sessions.session_id = sessions.session_id)
+                      AND duration > 10000 AND start_ts > %(oldest_limit)s LIMIT %(limit)s""",
                 {'userId': userId, 'projectId': projectId, 'limit': limit, 'oldest_limit': oldest_limit}
             )
             conn.execute(query)
@@ -90,8 +207,23 @@ class ServedModel:
         X_users_ids = dict()
         X_sessions_ids = dict()
         _process_pg_response(res, _X, _Y, X_project_ids, X_users_ids, X_sessions_ids, label=0)
+        return np.array(list(X_sessions_ids.keys())), np.array(_X)
 
-        return self._sort_by_recommendation(np.array(list(X_sessions_ids.keys())), _X).tolist()
+    async def score_candidates(self, userId, projectId):
+        """Scores the unseen sessions of userId for a given projectId using ML model."""
+        loop = asyncio.get_running_loop()
+        sessions, X = await loop.run_in_executor(scoring_pool, self.get_candidates, userId, projectId)
+        if len(sessions) == 0:
+            return sessions, np.array([])
+        return sessions, await self.predict_batched(X)
+
+    async def get_recommendations(self, userId, projectId):
+        """Gets recommendations for userId for a given projectId.
+        The unseen sessions are sorted by pertinence using ML model"""
+        sessions, pred = await self.score_candidates(userId, projectId)
+        if len(sessions) == 0:
+            return []
+        return self._sort_by_recommendation(sessions, pred).tolist()
 
 
 class Recommendations:
@@ -105,10 +237,15 @@ class Recommendations:
         self.names = dict()
         self.models = dict()
         self.to_download = list()
+        # a project never changes of tenant
+        self.tenants = dict()
+        self.candidates = CandidateStore(k=config('candidates_per_viewer', default=50, cast=int),
+                                         viewer_ttl=config('candidates_viewer_ttl', default=24 * 60 * 60, cast=int),
+                                         max_viewers=config('candidates_max_viewers', default=10000, cast=int))
 
     async def update(self):
         """Fill to_download list with new models or new version for saved models."""
-        r_models = mlflow.search_registered_models()
+        r_models = await asyncio.get_running_loop().run_in_executor(loading_pool, mlflow.search_registered_models)
         new_names = {m.name: max(m.latest_versions).version for m in r_models}
         for name, version in new_names.items():
             if (name, version) in self.names.items():
@@ -118,27 +255,33 @@ class Recommendations:
         self.names = new_names
 
     async def download_next(self):
-        """Pop element from to_download, download and add it into models."""
-        download_loop_number = 0
-        if self.to_download:
-            while download_loop_number < batch_download_size:
-                try:
-                    name, version = self.to_download.pop(0)
-                    s_model = ServedModel()
-                    s_model.load_model(name, version)
-                    self.models[name] = s_model
-                    download_loop_number += 1
-                except IndexError:
-                    break
-                except Exception as e:
-                    print('[Error] Found exception')
-                    print(repr(e))
-                    break
+        """Pop up to batch_download_size elements from to_download, download them in loading_pool
+        and add them into models."""
+        to_download = self.to_download[:batch_download_size]
+        self.to_download = self.to_download[batch_download_size:]
+        if len(to_download) == 0:
+            return
+        loop = asyncio.get_running_loop()
+        loaded = await asyncio.gather(*[loop.run_in_executor(loading_pool, self.__load, name, version)
+                                        for name, version in to_download], return_exceptions=True)
+        new_models = dict()
+        for (name, version), s_model in zip(to_download, loaded):
+            if isinstance(s_model, Exception):
+                print(f'[Error] Found exception while loading {name}:{version}')
+                print(repr(s_model))
+                continue
+            new_models[name] = s_model
+        # hot-swap: requests in progress keep the dict they already read
+        self.models = {**self.models, **new_models}
+
+    @staticmethod
+    def __load(name, version):
+        s_model = ServedModel()
+        s_model.load_model(name, version)
+        return s_model
 
     def download_model(self, name, version):
-        model = ServedModel()
-        model.load_model(name, version)
-        self.models[name] = model
+        self.models = {**self.models, name: self.__load(name, version)}
 
     def info(self):
         """Show current loaded models."""
@@ -147,18 +290,75 @@ class Recommendations:
             print('Name:', model_name)
             print(model.model)
 
-    def get_recommendations(self, userId, projectId, n_recommendations=5):
-        """Gets recommendation for userId given the projectId.
-        This method selects the corresponding model and gets recommended sessions ordered by relevance."""
-        tenantId = get_tenant(projectId)
+    def get_tenant(self, projectId):
+        if projectId not in self.tenants:
+            self.tenants[projectId] = get_tenant(projectId)
+        return self.tenants[projectId]
+
+    async def get_model(self, projectId):
+        """Returns the model of the project, None if it is not loaded."""
+        tenantId = await asyncio.get_running_loop().run_in_executor(scoring_pool, self.get_tenant, projectId)
         hashed = hashlib.sha256(bytes(f'{projectId}-{tenantId}'.encode('utf-8'))).hexdigest()
-        model_name = f'{hashed}-RecModel'
+        return self.models.get(f'{hashed}-RecModel')
+
+    async def get_recommendations(self, userId, projectId, n_recommendations=5):
+        """Gets recommendation for userId given the projectId.
+        The precomputed candidates are returned if the viewer has some, otherwise the unseen sessions are scored
+        by the corresponding model and kept as the viewer's candidates."""
         n_recommendations = config('number_of_recommendations', default=5, cast=int)
-        try:
-            model = self.models[model_name]
-        except KeyError:
+        recommendations = self.candidates.get(projectId, userId)
+        if recommendations is not None:
+            return recommendations[:n_recommendations]
+        model = await self.get_model(projectId)
+        if model is None:
             return []
-        return model.get_recommendations(userId, projectId)[:n_recommendations]
+        sessions, pred = await model.score_candidates(userId, projectId)
+        threshold = config('threshold_prediction', default=0.6, cast=float)
+        over_threshold = pred > threshold if len(pred) > 0 else []
+        self.candidates.seed(projectId, userId, sessions[over_threshold], pred[over_threshold])
+        if projectId not in self.candidates.watermarks:
+            now = int(time() * 1000)
+            self.candidates.watermarks[projectId] = (now, 0)
+            self.candidates.checked[projectId] = now
+        return self.candidates.get(projectId, userId)[:n_recommendations]
+
+    def discard(self, projectId, viewerId, sessionId):
+        """The viewer gave a feedback about the session, it is not recommended anymore."""
+        self.candidates.discard(projectId, viewerId, [sessionId])
+
+    async def refresh_candidates(self):
+        """Scores the sessions received since the last refresh for all the active viewers and removes the
+        candidates they viewed in the meantime. The predictions of all the viewers of a project are stacked
+        into a single predict by the model's micro-batching."""
+        loop = asyncio.get_running_loop()
+        threshold = config('threshold_prediction', default=0.6, cast=float)
+        for projectId, viewers in self.candidates.active_viewers().items():
+            model = await self.get_model(projectId)
+            if model is None:
+                continue
+            now = int(time() * 1000)
+            after = self.candidates.watermarks.get(projectId, (now, 0))
+            checked = self.candidates.checked.get(projectId, now)
+            sessions, X, last = await loop.run_in_executor(scoring_pool, model.get_new_sessions,
+                                                           projectId, after, checked)
+            # a full page moves the keyset to its last session, the rest is read by the next refresh
+            if last is not None:
+                self.candidates.watermarks[projectId] = last
+            self.candidates.checked[projectId] = now
+            if len(sessions) > 0:
+                viewers_X = list()
+                for viewerId in viewers:
+                    _X = X.copy()
+                    _X[:, 0] = viewerId
+                    viewers_X.append(_X)
+                preds = await asyncio.gather(*[model.predict_batched(_X) for _X in viewers_X])
+                for viewerId, pred in zip(viewers, preds):
+                    if (projectId, viewerId) in self.candidates:
+                        self.candidates.push(projectId, viewerId, sessions[pred > threshold], pred[pred > threshold])
+            viewed = await loop.run_in_executor(scoring_pool, model.get_viewed,
+                                                {v: self.candidates.candidates(projectId, v) for v in viewers})
+            for viewerId, sessionId in viewed:
+                self.candidates.discard(projectId, viewerId, [sessionId])
 
 
 recommendation_model = Recommendations()
@@ -1,5 +1,6 @@
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
+from decouple import config
 from core.model_handler import recommendation_model
 
 
@@ -12,7 +13,13 @@ async def download_model():
     """Download next model in list."""
     await recommendation_model.download_next()
 
+async def refresh_candidates():
+    """Score new sessions for the viewers with precomputed recommendations."""
+    await recommendation_model.refresh_candidates()
+
 cron_jobs = [
     {"func": update_model, "trigger": CronTrigger(hour=0), "misfire_grace_time": 60, "max_instances": 1},
     {"func": download_model, "trigger": IntervalTrigger(seconds=10), "misfire_grace_time": 60, "max_instances": 1},
+    {"func": refresh_candidates, "trigger": IntervalTrigger(seconds=config('candidates_refresh_interval', default=60, cast=int)),
+     "misfire_grace_time": 60, "max_instances": 1},
 ]
@@ -8,7 +8,7 @@ async def main():
     R = Recommendations()
     R.to_download = [('****************************************************************-RecModel', 1)]
     await R.download_next()
-    L = R.get_recommendations(000000000, 000000000)
+    L = await R.get_recommendations(000000000, 000000000)
     print(L)
 
 
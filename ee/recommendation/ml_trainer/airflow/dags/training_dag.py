@@ -15,14 +15,15 @@ sys.path.insert(1, _work_dir)
 from utils import pg_client
 
 
+training_workers = config('training_workers', default=os.cpu_count() or 1, cast=int)
 client = mlflow.MlflowClient()
 models = [model.name for model in client.search_registered_models()]
 
 
 def split_training(ti):
     global models
-    projects = ti.xcom_pull(key='project_data').split(' ')
-    tenants = ti.xcom_pull(key='tenant_data').split(' ')
+    projects = ti.xcom_pull(key='project_data')
+    tenants = ti.xcom_pull(key='tenant_data')
     new_projects = list()
     old_projects = list()
     new_tenants = list()
@@ -36,10 +37,10 @@ def split_training(ti):
         else:
             new_projects.append(projects[i])
             new_tenants.append(tenants[i])
-    ti.xcom_push(key='new_project_data', value=' '.join(new_projects))
-    ti.xcom_push(key='new_tenant_data', value=' '.join(new_tenants))
-    ti.xcom_push(key='old_project_data', value=' '.join(old_projects))
-    ti.xcom_push(key='old_tenant_data', value=' '.join(old_tenants))
+    ti.xcom_push(key='new_project_data', value=new_projects)
+    ti.xcom_push(key='new_tenant_data', value=new_tenants)
+    ti.xcom_push(key='old_project_data', value=old_projects)
+    ti.xcom_push(key='old_tenant_data', value=old_tenants)
 
 
 def continue_new(ti):
@@ -66,11 +67,11 @@ def select_from_db(ti):
     projects = list()
     tenants = list()
     for e in res:
-        projects.append(str(e['project_id']))
-        tenants.append(str(e['tenant_id']))
+        projects.append(e['project_id'])
+        tenants.append(e['tenant_id'])
     asyncio.run(pg_client.terminate())
-    ti.xcom_push(key='project_data', value=' '.join(projects))
-    ti.xcom_push(key='tenant_data', value=' '.join(tenants))
+    ti.xcom_push(key='project_data', value=projects)
+    ti.xcom_push(key='tenant_data', value=tenants)
 
 
 dag = DAG(
@@ -113,14 +114,16 @@ with dag:
 
     new_models = BashOperator(
         task_id='Create_Models',
-        bash_command=f"python {_work_dir}/main.py " + "--projects {{task_instance.xcom_pull(task_ids='Split_Create_and_Retrain', key='new_project_data')}} " +
-                     "--tenants {{task_instance.xcom_pull(task_ids='Split_Create_and_Retrain', key='new_tenant_data')}}",
+        bash_command=f"python {_work_dir}/main.py " + "--projects {{task_instance.xcom_pull(task_ids='Split_Create_and_Retrain', key='new_project_data') | join(' ')}} " +
+                     "--tenants {{task_instance.xcom_pull(task_ids='Split_Create_and_Retrain', key='new_tenant_data') | join(' ')}} " +
+                     f"--workers {training_workers} " + "--run-key {{ ds_nodash }}",
     )
 
     old_models = BashOperator(
         task_id='Retrain_Models',
-        bash_command=f"python {_work_dir}/main.py " + "--projects {{task_instance.xcom_pull(task_ids='Split_Create_and_Retrain', key='old_project_data')}} " +
-                     "--tenants {{task_instance.xcom_pull(task_ids='Split_Create_and_Retrain', key='old_tenant_data')}}",
+        bash_command=f"python {_work_dir}/main.py " + "--projects {{task_instance.xcom_pull(task_ids='Split_Create_and_Retrain', key='old_project_data') | join(' ')}} " +
+                     "--tenants {{task_instance.xcom_pull(task_ids='Split_Create_and_Retrain', key='old_tenant_data') | join(' ')}} " +
+                     f"--workers {training_workers} " + "--run-key {{ ds_nodash }}",
     )
 
     select_vp >> split >> [dag_split1, dag_split2]
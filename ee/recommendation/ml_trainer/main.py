@@ -1,14 +1,31 @@
+import os
 import mlflow
 import hashlib
 import argparse
 import numpy as np
+from glob import glob
+from time import time
 from decouple import config
 from datetime import datetime,timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from core.user_features import get_training_database
-from core.recommendation_model import SVM_recommendation, sort_database
+from core.recommendation_model import SVM_recommendation, SGD_recommendation, sort_database
 
 mlflow.set_tracking_uri(config('MLFLOW_TRACKING_URI'))
 
+# above this number of samples the SVM (cubic-ish in samples) is replaced by an incremental linear model
+linear_model_threshold = config('linear_model_threshold', default=20000, cast=int)
+# extracted features are kept per run (--run-key) for features_cache_ttl seconds, only a retry of the same run
+# reuses them, the next scheduled run extracts the new sessions
+features_cache_dir = config('features_cache_dir', default='/tmp/recommendation_features')
+features_cache_ttl = config('features_cache_ttl', default=12 * 60 * 60, cast=int)
+# resource limits of each training process
+training_workers = config('training_workers', default=os.cpu_count() or 1, cast=int)
+worker_memory_limit = config('worker_memory_limit', default=0, cast=int)
+worker_threads = config('worker_threads', default=1, cast=int)
+# limits applied by init_worker, kept for the lifetime of the training process
+_threadpool_limits = None
+
 
 def handle_database(x_train, y_train):
     """
@@ -44,16 +61,39 @@ def handle_database(x_train, y_train):
         return x_train, y_train
 
 
-def main(experiment_name, projectId, tenantId):
+def get_features(projectId, hashed, run_key):
+    """
+    Training database of the project, read from the cache if it was extracted by the same run less than
+    features_cache_ttl ago.
+    """
+    path = os.path.join(features_cache_dir, f'{run_key}-{hashed}.npz')
+    if os.path.exists(path) and time() - os.path.getmtime(path) < features_cache_ttl:
+        with np.load(path) as cached:
+            return cached['x'], cached['y']
+    x_, y_, _ = get_training_database(projectId, max_timestamp=int((datetime.now() - timedelta(days=1)).timestamp()), favorites=True)
+    os.makedirs(features_cache_dir, exist_ok=True)
+    # written then renamed so a concurrent reader never loads a partial file
+    tmp_path = os.path.join(features_cache_dir, f'{hashed}.{os.getpid()}.npz')
+    np.savez(tmp_path, x=x_, y=y_)
+    os.replace(tmp_path, path)
+    # the features of the previous runs are never read again
+    for previous in glob(os.path.join(features_cache_dir, f'*-{hashed}.npz')):
+        if previous != path:
+            os.remove(previous)
+    return x_, y_
+
+
+def main(experiment_name, projectId, tenantId, run_key):
     """
     Main training method using mlflow for tracking and s3 for stocking.
     Params:
         experiment_name: experiment name for mlflow repo.
         projectId: project id of sessions.
         tenantId: tenant of the project id (used mainly as salt for hashing).
+        run_key: identifier of the scheduled run, its retries reuse the extracted features.
     """
     hashed = hashlib.sha256(bytes(f'{projectId}-{tenantId}'.encode('utf-8'))).hexdigest()
-    x_, y_, d = get_training_database(projectId, max_timestamp=int((datetime.now() - timedelta(days=1)).timestamp()), favorites=True)
+    x_, y_ = get_features(projectId, hashed, run_key)
 
     x, y = handle_database(x_, y_)
     if x is None:
@@ -69,14 +109,20 @@ def main(experiment_name, projectId, tenantId):
     with mlflow.start_run(run_name=f'{hashed}-{datetime.now().strftime("%Y-%M-%d_%H:%m")}'):
         reg_model_name = f"{hashed}-RecModel"
         best_meta = {'score': 0, 'model': None, 'name': 'NoName'}
-        for kernel in ['linear', 'poly', 'rbf', 'sigmoid']:
-            with mlflow.start_run(run_name=f'sub_run_with_{kernel}', nested=True):
+        if len(y) > linear_model_threshold:
+            candidates = {'sgd': lambda: SGD_recommendation()}
+        else:
+            candidates = {kernel: lambda kernel=kernel: SVM_recommendation(kernel=kernel, test=True)
+                          for kernel in ['linear', 'poly', 'rbf', 'sigmoid']}
+        for name, build_model in candidates.items():
+            with mlflow.start_run(run_name=f'sub_run_with_{name}', nested=True):
                 print("--")
-                model = SVM_recommendation(kernel=kernel, test=True)
+                model = build_model()
                 model.fit(x, y)
                 mlflow.sklearn.log_model(model, "sk_learn",
                                          serialization_format="cloudpickle")
-                mlflow.log_param("kernel", kernel)
+                mlflow.log_param("kernel", name)
+                mlflow.log_param("samples", len(y))
                 mlflow.log_metric("score", model.score)
                 for _name, displ in model.plots().items():
                     #TODO: Close displays not to overload memory
@@ -84,7 +130,7 @@ def main(experiment_name, projectId, tenantId):
                 if model.score > best_meta['score']:
                     best_meta['score'] = model.score
                     best_meta['model'] = model
-                    best_meta['name'] = kernel
+                    best_meta['name'] = name
         mlflow.log_metric("score", best_meta['score'])
         mlflow.log_param("name", best_meta['name'])
         mlflow.sklearn.log_model(best_meta['model'], "sk_learn",
@@ -93,26 +139,66 @@ def main(experiment_name, projectId, tenantId):
                                  )
 
 
-if __name__ == '__main__':
+def init_worker(memory_limit, threads):
+    """
+    Initializer of each training process: limits its address space to memory_limit bytes (0 for no limit) and
+    its numerical libraries to threads threads, so workers share the cores instead of oversubscribing them.
+    """
     import asyncio
-    import os
-    os.environ['PG_POOL'] = 'true'
+    import resource
+    from threadpoolctl import threadpool_limits
     from utils import pg_client
-
+    global _threadpool_limits
+    # the BLAS/OpenMP pools are already loaded by the imports of the forked parent, the environment variables
+    # are not read anymore so the limit is applied at runtime
+    _threadpool_limits = threadpool_limits(limits=threads)
+    if memory_limit > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    os.environ['PG_POOL'] = 'true'
+    os.environ.setdefault('PG_MINCONN', '1')
+    os.environ.setdefault('PG_MAXCONN', '2')
     asyncio.run(pg_client.init())
+
+
+def train_projects(experiment_name, projects, tenants, run_key, workers=training_workers):
+    """
+    Trains the projects in parallel, each one in a process of a pool of workers processes.
+    A failing project (i.e. reaching its memory limit) doesn't stop the others.
+    Output: list of failed projects.
+    """
+    failed = list()
+    with ProcessPoolExecutor(max_workers=max(min(workers, len(projects)), 1), initializer=init_worker,
+                             initargs=(worker_memory_limit, worker_threads)) as executor:
+        futures = {executor.submit(main, experiment_name=experiment_name, projectId=projectId,
+                                   tenantId=tenantId, run_key=run_key): projectId
+                   for projectId, tenantId in zip(projects, tenants)}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                print(f'Project {futures[future]} processed')
+            except Exception as e:
+                print(f'[ERROR] Project {futures[future]}: {repr(e)}')
+                failed.append(futures[future])
+    return failed
+
+
+if __name__ == '__main__':
     parser = argparse.ArgumentParser(
         prog='Recommandation Trainer',
         description='This python script aims to create a model able to predict which sessions may be most interesting to replay for the users',
     )
     parser.add_argument('--projects', type=int, nargs='+')
     parser.add_argument('--tenants', type=int, nargs='+')
+    parser.add_argument('--workers', type=int, default=training_workers)
+    parser.add_argument('--run-key', default=datetime.now().strftime('%Y%m%d'))
 
     args = parser.parse_args()
 
     projects = args.projects
     tenants = args.tenants
 
-    for i in range(len(projects)):
-        print(f'Processing project {projects[i]}...')
-        main(experiment_name='s3-recommendations', projectId=projects[i], tenantId=tenants[i])
-    asyncio.run(pg_client.terminate())
+    print(f'Processing {len(projects)} projects with {args.workers} workers...')
+    failed = train_projects(experiment_name='s3-recommendations', projects=projects, tenants=tenants,
+                            run_key=args.run_key, workers=args.workers)
+    if len(failed) > 0:
+        raise SystemExit(f'Training failed for projects: {failed}')
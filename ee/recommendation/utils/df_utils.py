@@ -1,3 +1,4 @@
+import numpy as np
 from utils.declarations import CountryValue, DeviceValue
 
 
@@ -22,3 +23,18 @@ def _process_pg_response(res, _X, _Y, X_project_ids, X_users_ids, X_sessions_ids
         x['country'] = CountryValue(x['country']).get_int_val()
         x['device_type'] = DeviceValue(x['device_type']).get_int_val()
         _X.append(list(x.values()))
+
+
+COUNTRY_CODES = {c: CountryValue(c).get_int_val() for c in CountryValue.countries}
+DEVICE_CODES = {d: DeviceValue(d).get_int_val() for d in DeviceValue.device_types}
+
+
+def encode_categorical(values, codes, default, dtype):
+    """Vectorized equivalent of CountryValue/DeviceValue(x).get_int_val(): only the distinct values are looked up,
+    unknown or null values are encoded as default."""
+    values = np.asarray(values, dtype=object)
+    if len(values) == 0:
+        return np.empty(0, dtype=dtype)
+    values[np.equal(values, None)] = ''
+    uniques, inverse = np.unique(values.astype(str), return_inverse=True)
+    return np.array([codes.get(u, default) for u in uniques], dtype=dtype)[inverse]
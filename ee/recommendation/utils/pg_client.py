@@ -138,6 +138,7 @@ class PostgresClient:
             self.cursor.cursor_execute = self.cursor.execute
             self.cursor.execute = self.__execute
             self.cursor.recreate = self.recreate_cursor
+            self.cursor.server_side = self.server_side_cursor
         return self.cursor
 
     def __exit__(self, *args):
@@ -175,6 +176,13 @@ class PostgresClient:
             raise error
         return result
 
+    def server_side_cursor(self, name, itersize=10000, cursor_factory=None):
+        # named cursor: rows are kept on the server and fetched by batches of itersize (or fetchmany),
+        # by default rows are tuples in the order of the selected columns
+        cursor = self.connection.cursor(name=name, cursor_factory=cursor_factory)
+        cursor.itersize = itersize
+        return cursor
+
     def recreate_cursor(self, rollback=False):
         if rollback:
             try:
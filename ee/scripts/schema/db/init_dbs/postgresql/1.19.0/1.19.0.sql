@@ -57,6 +57,13 @@ UPDATE public.users
 SET weekly_report= FALSE
 WHERE service_account;
 
+CREATE TABLE IF NOT EXISTS public.weekly_report_runs
+(
+    run_key    text PRIMARY KEY,
+    checkpoint jsonb     NOT NULL,
+    updated_at timestamp NOT NULL DEFAULT timezone('utc'::text, now())
+);
+
 COMMIT;
 
 \elif :is_next
@@ -1302,4 +1302,11 @@ CREATE TABLE public.projects_conditions
     filters      jsonb        NOT NULL DEFAULT '[]'::jsonb
 );
 
+CREATE TABLE public.weekly_report_runs
+(
+    run_key    text PRIMARY KEY,
+    checkpoint jsonb     NOT NULL,
+    updated_at timestamp NOT NULL DEFAULT timezone('utc'::text, now())
+);
+
 COMMIT;
\ No newline at end of file
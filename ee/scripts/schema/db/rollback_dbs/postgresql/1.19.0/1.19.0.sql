@@ -28,6 +28,8 @@ SET metric_type='clickMap',
     metric_of='clickMapUrl'
 WHERE metric_type = 'heatMap';
 
+DROP TABLE IF EXISTS public.weekly_report_runs;
+
 COMMIT;
 
 \elif :is_next
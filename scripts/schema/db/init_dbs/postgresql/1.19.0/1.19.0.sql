@@ -49,6 +49,13 @@ SET metric_type='heatMap',
     metric_of='heatMapUrl'
 WHERE metric_type = 'clickMap';
 
+CREATE TABLE IF NOT EXISTS public.weekly_report_runs
+(
+    run_key    text PRIMARY KEY,
+    checkpoint jsonb     NOT NULL,
+    updated_at timestamp NOT NULL DEFAULT timezone('utc'::text, now())
+);
+
 COMMIT;
 
 \elif :is_next